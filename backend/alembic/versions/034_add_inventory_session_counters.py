@@ -0,0 +1,57 @@
+"""Add materialized statistics counters for inventory sessions
+
+Revision ID: 034
+Revises: 033
+Create Date: 2026-01-12
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '034'
+down_revision = '033'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'inventory_session_counters',
+        sa.Column('session_id', sa.Integer(), sa.ForeignKey('inventory_sessions.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('dimension', sa.String(20), nullable=False),  # expected, category, method, condition
+        sa.Column('value', sa.String(50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('session_id', 'dimension', 'value', name='pk_inventory_session_counters')
+    )
+
+    # Popular contadores das sessões existentes
+    op.execute("""
+        INSERT INTO inventory_session_counters (session_id, dimension, value, count)
+        SELECT session_id, 'expected', 'total', COUNT(*)
+        FROM inventory_expected_assets
+        GROUP BY session_id
+    """)
+    op.execute("""
+        INSERT INTO inventory_session_counters (session_id, dimension, value, count)
+        SELECT session_id, 'category', category, COUNT(*)
+        FROM inventory_read_assets
+        GROUP BY session_id, category
+    """)
+    op.execute("""
+        INSERT INTO inventory_session_counters (session_id, dimension, value, count)
+        SELECT session_id, 'method', read_method, COUNT(*)
+        FROM inventory_read_assets
+        GROUP BY session_id, read_method
+    """)
+    op.execute("""
+        INSERT INTO inventory_session_counters (session_id, dimension, value, count)
+        SELECT session_id, 'condition', physical_condition, COUNT(*)
+        FROM inventory_read_assets
+        WHERE physical_condition IS NOT NULL
+        GROUP BY session_id, physical_condition
+    """)
+
+
+def downgrade():
+    op.drop_table('inventory_session_counters')
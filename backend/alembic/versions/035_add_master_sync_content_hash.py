@@ -0,0 +1,47 @@
+"""Add content hash and throughput fields to master data sync
+
+Revision ID: 035
+Revises: 034
+Create Date: 2026-01-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '035'
+down_revision = '034'
+branch_labels = None
+depends_on = None
+
+
+MASTER_TABLES = [
+    'inventory_master_ug',
+    'inventory_master_ul',
+    'inventory_master_physical_status',
+    'inventory_master_characteristics',
+]
+
+
+def upgrade():
+    # Hash do conteúdo sincronizado - permite ignorar linhas sem alteração
+    for table in MASTER_TABLES:
+        op.add_column(table, sa.Column(
+            'content_hash',
+            sa.String(64),
+            nullable=True,
+            comment='sha256 do conteúdo recebido do sistema externo'
+        ))
+
+    op.add_column('inventory_master_sync_log', sa.Column(
+        'items_unchanged', sa.Integer(), nullable=True, server_default='0'
+    ))
+    op.add_column('inventory_master_sync_log', sa.Column(
+        'rows_per_second', sa.Numeric(12, 1), nullable=True
+    ))
+
+
+def downgrade():
+    op.drop_column('inventory_master_sync_log', 'rows_per_second')
+    op.drop_column('inventory_master_sync_log', 'items_unchanged')
+    for table in reversed(MASTER_TABLES):
+        op.drop_column(table, 'content_hash')
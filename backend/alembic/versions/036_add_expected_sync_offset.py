@@ -0,0 +1,22 @@
+"""Add resumable offset for paginated expected-asset download
+
+Revision ID: 036
+Revises: 035
+Create Date: 2026-01-14
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '036'
+down_revision = '035'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('inventory_sessions', sa.Column('expected_sync_offset', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('inventory_sessions', 'expected_sync_offset')
@@ -0,0 +1,23 @@
+"""Add chunked upload state to inventory sessions
+
+Revision ID: 037
+Revises: 036
+Create Date: 2026-01-15
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '037'
+down_revision = '036'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('inventory_sessions', sa.Column('upload_state', postgresql.JSONB(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('inventory_sessions', 'upload_state')
@@ -0,0 +1,48 @@
+"""Unique (session_id, code) for session readings and maintained readings count
+
+Revision ID: 038
+Revises: 037
+Create Date: 2026-01-16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '038'
+down_revision = '037'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Remover duplicados existentes (mantém a primeira leitura de cada código)
+    op.execute("""
+        DELETE FROM session_readings r
+        USING session_readings d
+        WHERE r.session_id = d.session_id
+          AND r.code = d.code
+          AND r.id > d.id
+    """)
+    op.create_unique_constraint(
+        'uq_session_readings_session_code', 'session_readings', ['session_id', 'code']
+    )
+
+    op.add_column(
+        'reading_sessions',
+        sa.Column('readings_count', sa.Integer(), nullable=False, server_default='0')
+    )
+    op.execute("""
+        UPDATE reading_sessions s
+        SET readings_count = c.total
+        FROM (
+            SELECT session_id, COUNT(*) AS total
+            FROM session_readings
+            GROUP BY session_id
+        ) c
+        WHERE c.session_id = s.id
+    """)
+
+
+def downgrade():
+    op.drop_column('reading_sessions', 'readings_count')
+    op.drop_constraint('uq_session_readings_session_code', 'session_readings', type_='unique')
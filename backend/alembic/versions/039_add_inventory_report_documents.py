@@ -0,0 +1,32 @@
+"""Cache inventory PDF reports as generated documents
+
+Revision ID: 039
+Revises: 038
+Create Date: 2026-01-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '039'
+down_revision = '038'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('generated_documents', 'quote_request_id', existing_type=sa.Integer(), nullable=True)
+    op.add_column(
+        'generated_documents',
+        sa.Column('inventory_session_id', sa.Integer(), sa.ForeignKey('inventory_sessions.id', ondelete='CASCADE'), nullable=True)
+    )
+    op.add_column('generated_documents', sa.Column('version_stamp', sa.String(64), nullable=True))
+    op.create_index('ix_generated_documents_inventory_session_id', 'generated_documents', ['inventory_session_id'])
+
+
+def downgrade():
+    op.execute("DELETE FROM generated_documents WHERE quote_request_id IS NULL")
+    op.drop_index('ix_generated_documents_inventory_session_id', table_name='generated_documents')
+    op.drop_column('generated_documents', 'version_stamp')
+    op.drop_column('generated_documents', 'inventory_session_id')
+    op.alter_column('generated_documents', 'quote_request_id', existing_type=sa.Integer(), nullable=False)
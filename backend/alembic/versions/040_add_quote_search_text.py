@@ -0,0 +1,41 @@
+"""Trigram search column and keyset index for quote history
+
+Revision ID: 040
+Revises: 039
+Create Date: 2026-01-18
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '040'
+down_revision = '039'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Texto de busca gerado pelo banco: descrição + nome canônico, em minúsculas
+    op.execute("""
+        ALTER TABLE quote_requests ADD COLUMN search_text TEXT
+        GENERATED ALWAYS AS (
+            lower(coalesce(input_text, '') || ' ' || coalesce(claude_payload_json ->> 'nome_canonico', ''))
+        ) STORED
+    """)
+    op.execute(
+        "CREATE INDEX ix_quote_requests_search_text_trgm "
+        "ON quote_requests USING gin (search_text gin_trgm_ops)"
+    )
+
+    # Paginação keyset em (created_at, id)
+    op.execute(
+        "CREATE INDEX ix_quote_requests_created_at_id "
+        "ON quote_requests (created_at DESC, id DESC)"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_quote_requests_created_at_id', table_name='quote_requests')
+    op.drop_index('ix_quote_requests_search_text_trgm', table_name='quote_requests')
+    op.drop_column('quote_requests', 'search_text')
@@ -0,0 +1,67 @@
+"""Daily integration cost rollup for financial reports
+
+Revision ID: 041
+Revises: 040
+Create Date: 2026-01-19
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '041'
+down_revision = '040'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'integration_cost_daily',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quote_request_id', sa.Integer(), sa.ForeignKey('quote_requests.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('project_id', sa.Integer(), sa.ForeignKey('projects.id', ondelete='SET NULL'), nullable=True),
+        sa.Column('integration_type', sa.String(50), nullable=False),
+        sa.Column('call_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('cost_usd', sa.Numeric(14, 6), nullable=False, server_default='0'),
+        sa.Column('shopping_calls', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('immersive_calls', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('first_call_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_call_at', sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint('day', 'quote_request_id', 'integration_type', name='uq_integration_cost_daily'),
+    )
+    op.create_index('ix_integration_cost_daily_id', 'integration_cost_daily', ['id'])
+    op.create_index('ix_integration_cost_daily_quote_request_id', 'integration_cost_daily', ['quote_request_id'])
+    op.create_index('ix_integration_cost_daily_day_type', 'integration_cost_daily', ['day', 'integration_type'])
+    op.create_index('ix_integration_cost_daily_project_day', 'integration_cost_daily', ['project_id', 'day'])
+
+    # Backfill a partir dos logs existentes
+    op.execute("""
+        INSERT INTO integration_cost_daily (
+            day, quote_request_id, project_id, integration_type,
+            call_count, input_tokens, output_tokens, total_tokens, cost_usd,
+            shopping_calls, immersive_calls, first_call_at, last_call_at
+        )
+        SELECT
+            l.created_at::date, l.quote_request_id, max(q.project_id), l.integration_type,
+            count(*),
+            coalesce(sum(l.input_tokens), 0),
+            coalesce(sum(l.output_tokens), 0),
+            coalesce(sum(l.total_tokens), 0),
+            coalesce(sum(l.estimated_cost_usd), 0),
+            count(*) FILTER (WHERE l.api_used = 'google_shopping'),
+            count(*) FILTER (WHERE l.api_used = 'google_immersive_product'),
+            min(l.created_at),
+            max(l.created_at)
+        FROM integration_logs l
+        JOIN quote_requests q ON q.id = l.quote_request_id
+        WHERE l.integration_type IN ('anthropic', 'openai', 'serpapi')
+        GROUP BY l.created_at::date, l.quote_request_id, l.integration_type
+    """)
+
+
+def downgrade():
+    op.drop_table('integration_cost_daily')
@@ -0,0 +1,129 @@
+"""Monthly partitioning and payload archive pointer for integration_logs
+
+Revision ID: 042
+Revises: 041
+Create Date: 2026-01-20
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '042'
+down_revision = '041'
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, quote_request_id, integration_type, model_used, input_tokens, output_tokens, "
+    "total_tokens, estimated_cost_usd, api_used, search_url, product_link, activity, "
+    "request_data, response_summary, created_at"
+)
+
+INDEXES = [
+    ("ix_integration_logs_id", "id"),
+    ("ix_integration_logs_quote_request_id", "quote_request_id"),
+    ("ix_integration_logs_integration_type", "integration_type"),
+    ("ix_integration_logs_created_at", "created_at"),
+]
+
+
+def _rename_current_table():
+    op.execute("ALTER TABLE integration_logs RENAME TO integration_logs_old")
+    op.execute("ALTER TABLE integration_logs_old RENAME CONSTRAINT integration_logs_pkey TO integration_logs_old_pkey")
+    for index_name, _ in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
+    # A sequence sobrevive à remoção da tabela antiga
+    op.execute("ALTER SEQUENCE integration_logs_id_seq OWNED BY NONE")
+
+
+def _create_indexes():
+    for index_name, column in INDEXES:
+        op.execute(f"CREATE INDEX {index_name} ON integration_logs ({column})")
+
+
+def _finish_copy():
+    op.execute("DROP TABLE integration_logs_old")
+    op.execute("ALTER SEQUENCE integration_logs_id_seq OWNED BY integration_logs.id")
+
+
+def upgrade():
+    _rename_current_table()
+
+    # Tabela particionada por mês de created_at (a PK precisa incluir a chave de partição)
+    op.execute("""
+        CREATE TABLE integration_logs (
+            id INTEGER NOT NULL DEFAULT nextval('integration_logs_id_seq'),
+            quote_request_id INTEGER NOT NULL REFERENCES quote_requests (id) ON DELETE CASCADE,
+            integration_type VARCHAR(50) NOT NULL,
+            model_used VARCHAR(100),
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            total_tokens INTEGER,
+            estimated_cost_usd NUMERIC(10, 6),
+            api_used VARCHAR(100),
+            search_url TEXT,
+            product_link TEXT,
+            activity TEXT,
+            request_data JSON,
+            response_summary JSON,
+            payload_archive VARCHAR(255),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+
+    # Uma partição por mês, do log mais antigo até dois meses à frente;
+    # a partição default recebe o que cair fora (a task agendada cria as próximas)
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start DATE := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM integration_logs_old), now()
+            ))::date;
+            last_month DATE := (date_trunc('month', now()) + interval '2 months')::date;
+        BEGIN
+            WHILE month_start <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF integration_logs FOR VALUES FROM (%L) TO (%L)',
+                    'integration_logs_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END $$
+    """)
+    op.execute("CREATE TABLE integration_logs_default PARTITION OF integration_logs DEFAULT")
+
+    _create_indexes()
+
+    op.execute(f"INSERT INTO integration_logs ({COLUMNS}) SELECT {COLUMNS} FROM integration_logs_old")
+    _finish_copy()
+
+
+def downgrade():
+    # Payloads já arquivados continuam apenas nos arquivos de STORAGE_PATH
+    _rename_current_table()
+
+    op.execute("""
+        CREATE TABLE integration_logs (
+            id INTEGER NOT NULL DEFAULT nextval('integration_logs_id_seq') PRIMARY KEY,
+            quote_request_id INTEGER NOT NULL REFERENCES quote_requests (id) ON DELETE CASCADE,
+            integration_type VARCHAR(50) NOT NULL,
+            model_used VARCHAR(100),
+            input_tokens INTEGER,
+            output_tokens INTEGER,
+            total_tokens INTEGER,
+            estimated_cost_usd NUMERIC(10, 6),
+            api_used VARCHAR(100),
+            search_url TEXT,
+            product_link TEXT,
+            activity TEXT,
+            request_data JSON,
+            response_summary JSON,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+        )
+    """)
+    _create_indexes()
+
+    op.execute(f"INSERT INTO integration_logs ({COLUMNS}) SELECT {COLUMNS} FROM integration_logs_old")
+    _finish_copy()
@@ -0,0 +1,69 @@
+"""Local mirror of the FIPE brand/model/year catalogue
+
+Revision ID: 043
+Revises: 042
+Create Date: 2026-01-21
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '043'
+down_revision = '042'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'fipe_catalog_references',
+        sa.Column('vehicle_type', sa.String(20), primary_key=True),
+        sa.Column('reference_code', sa.Integer(), nullable=False),
+        sa.Column('reference_month', sa.String(30), nullable=False),
+        sa.Column('brands_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('models_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()')),
+    )
+
+    op.create_table(
+        'fipe_catalog_brands',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('vehicle_type', sa.String(20), nullable=False),
+        sa.Column('code', sa.String(10), nullable=False),
+        sa.Column('name', sa.String(100), nullable=False),
+        sa.UniqueConstraint('vehicle_type', 'code', name='uq_fipe_catalog_brand'),
+    )
+
+    op.create_table(
+        'fipe_catalog_models',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('vehicle_type', sa.String(20), nullable=False),
+        sa.Column('brand_code', sa.String(10), nullable=False),
+        sa.Column('code', sa.String(10), nullable=False),
+        sa.Column('name', sa.String(200), nullable=False),
+        sa.UniqueConstraint('vehicle_type', 'brand_code', 'code', name='uq_fipe_catalog_model'),
+    )
+
+    op.create_table(
+        'fipe_catalog_model_years',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('vehicle_type', sa.String(20), nullable=False),
+        sa.Column('brand_code', sa.String(10), nullable=False),
+        sa.Column('model_code', sa.String(10), nullable=False),
+        sa.Column('year_code', sa.String(10), nullable=False),
+        sa.Column('year_name', sa.String(50), nullable=False),
+        sa.UniqueConstraint('vehicle_type', 'brand_code', 'model_code', 'year_code', name='uq_fipe_catalog_model_year'),
+    )
+    op.create_index(
+        'ix_fipe_catalog_model_years_brand_year',
+        'fipe_catalog_model_years',
+        ['vehicle_type', 'brand_code', 'year_code']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_fipe_catalog_model_years_brand_year', table_name='fipe_catalog_model_years')
+    op.drop_table('fipe_catalog_model_years')
+    op.drop_table('fipe_catalog_models')
+    op.drop_table('fipe_catalog_brands')
+    op.drop_table('fipe_catalog_references')
@@ -0,0 +1,29 @@
+"""Add stored/original sizes to files (compressed screenshot pipeline)
+
+Revision ID: 044
+Revises: 043
+Create Date: 2026-01-22
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '044'
+down_revision = '043'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('files', sa.Column('size_bytes', sa.Integer(), nullable=True))
+    op.add_column('files', sa.Column(
+        'original_size_bytes',
+        sa.Integer(),
+        nullable=True,
+        comment='Tamanho do screenshot capturado (PNG), antes da recompressão'
+    ))
+
+
+def downgrade():
+    op.drop_column('files', 'original_size_bytes')
+    op.drop_column('files', 'size_bytes')
@@ -0,0 +1,30 @@
+"""Add idempotency key to integration_logs (Redis-buffered records)
+
+Revision ID: 045
+Revises: 044
+Create Date: 2026-01-23
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '045'
+down_revision = '044'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('integration_logs', sa.Column('record_key', sa.String(36), nullable=True))
+    # Tabela particionada: o índice único precisa incluir created_at
+    op.create_index(
+        'uq_integration_logs_record_key',
+        'integration_logs',
+        ['record_key', 'created_at'],
+        unique=True
+    )
+
+
+def downgrade():
+    op.drop_index('uq_integration_logs_record_key', table_name='integration_logs')
+    op.drop_column('integration_logs', 'record_key')
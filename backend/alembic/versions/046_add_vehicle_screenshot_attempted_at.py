@@ -0,0 +1,27 @@
+"""Add last screenshot attempt to vehicle_price_bank (batch capture queue)
+
+Revision ID: 046
+Revises: 045
+Create Date: 2026-01-24
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '046'
+down_revision = '045'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('vehicle_price_bank', sa.Column(
+        'screenshot_attempted_at',
+        sa.DateTime(timezone=True),
+        nullable=True,
+        comment='Última tentativa de captura do screenshot FIPE em lote'
+    ))
+
+
+def downgrade():
+    op.drop_column('vehicle_price_bank', 'screenshot_attempted_at')
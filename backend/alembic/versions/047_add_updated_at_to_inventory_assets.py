@@ -0,0 +1,30 @@
+"""Add updated_at to inventory expected/read assets (PDF report cache stamp)
+
+Revision ID: 047
+Revises: 046
+Create Date: 2026-01-25
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '047'
+down_revision = '046'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('inventory_expected_assets', 'inventory_read_assets'):
+        op.add_column(table, sa.Column(
+            'updated_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.func.now(),
+            nullable=True,
+            comment='Última alteração do registro'
+        ))
+
+
+def downgrade():
+    for table in ('inventory_read_assets', 'inventory_expected_assets'):
+        op.drop_column(table, 'updated_at')
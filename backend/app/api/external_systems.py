@@ -844,6 +844,8 @@ def list_sync_logs(
             "items_created": log.items_created,
             "items_updated": log.items_updated,
             "items_failed": log.items_failed,
+            "items_unchanged": log.items_unchanged,
+            "rows_per_second": float(log.rows_per_second) if log.rows_per_second is not None else None,
             "error_message": log.error_message,
             "started_at": log.started_at,
             "completed_at": log.completed_at
@@ -1,8 +1,9 @@
 """
-Módulo Financeiro V2 - API de consulta de custos baseada em IntegrationLog
+Módulo Financeiro V2 - API de consulta de custos baseada nos logs de integração
 
-Este módulo consulta diretamente os logs de integração para gerar relatórios
-financeiros, sem necessidade de tabela de transações separada.
+Os relatórios agregam o consolidado diário de custos (integration_cost_daily),
+mantido a partir dos logs de integração; os logs brutos ficam para o
+detalhamento por cotação.
 """
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
@@ -14,7 +15,7 @@ from pydantic import BaseModel
 from enum import Enum
 
 from app.core.database import get_db
-from app.models import IntegrationLog, QuoteRequest, Project, Client, Setting, User
+from app.models import IntegrationCostDaily, QuoteRequest, Project, Client, Setting, User
 
 
 router = APIRouter(prefix="/api/v2/financial", tags=["financial-v2"])
@@ -57,7 +58,7 @@ class TransactionItem(BaseModel):
     description: str
     cost_usd: float
     cost_brl: float
-    request_data: Optional[dict] = None
+    request_data: Optional[dict] = None  # Não preenchido no relatório; ver logs da cotação
 
 
 class IntegrationTotal(BaseModel):
@@ -141,31 +142,16 @@ def parse_period(period: PeriodType, month_ref: str = None,
     return start, end
 
 
-def build_transaction_description(logs: List[IntegrationLog]) -> str:
-    """Constrói a descrição da transação baseada nos logs de integração"""
-
-    # Separar por tipo
-    anthropic_logs = [l for l in logs if l.integration_type == 'anthropic']
-    serpapi_logs = [l for l in logs if l.integration_type == 'serpapi']
-    openai_logs = [l for l in logs if l.integration_type == 'openai']
-
+def describe_usage(api: str, total_tokens: int, shopping_calls: int, immersive_calls: int) -> str:
+    """Constrói a descrição da transação a partir dos totais consolidados da API"""
     parts = []
 
-    # Anthropic - total de tokens
-    if anthropic_logs:
-        total_tokens = sum(l.total_tokens or 0 for l in anthropic_logs)
-        parts.append(f"{total_tokens:,} tokens".replace(",", "."))
-
-    # OpenAI - total de tokens
-    if openai_logs:
-        total_tokens = sum(l.total_tokens or 0 for l in openai_logs)
-        parts.append(f"{total_tokens:,} tokens".replace(",", "."))
+    # Anthropic / OpenAI - total de tokens
+    if api in ('anthropic', 'openai'):
+        parts.append(f"{int(total_tokens or 0):,} tokens".replace(",", "."))
 
     # SerpAPI - contagem por tipo de busca
-    if serpapi_logs:
-        shopping_calls = sum(1 for l in serpapi_logs if l.api_used == 'google_shopping')
-        immersive_calls = sum(1 for l in serpapi_logs if l.api_used == 'google_immersive_product')
-
+    if api == 'serpapi':
         serpapi_parts = []
         if shopping_calls > 0:
             serpapi_parts.append(f"{shopping_calls} chamada{'s' if shopping_calls > 1 else ''} Busca de preço (Google Shopping)")
@@ -178,41 +164,11 @@ def build_transaction_description(logs: List[IntegrationLog]) -> str:
     return " | ".join(parts) if parts else "Sem detalhes"
 
 
-def aggregate_logs_by_quote(logs: List[IntegrationLog], cost_config: dict) -> dict:
-    """Agrupa logs por cotação e calcula custos"""
-
-    usd_to_brl = cost_config["usd_to_brl_rate"]
-    serpapi_cost = cost_config["serpapi_cost_per_call"]
-
-    by_quote = {}
-
-    for log in logs:
-        # Ignorar logs que não são integrações de API
-        if log.integration_type not in ('anthropic', 'openai', 'serpapi'):
-            continue
-
-        quote_id = log.quote_request_id
-        if quote_id not in by_quote:
-            by_quote[quote_id] = {
-                "logs": [],
-                "cost_usd": 0.0,
-                "cost_brl": 0.0,
-                "apis": set()
-            }
-
-        by_quote[quote_id]["logs"].append(log)
-        by_quote[quote_id]["apis"].add(log.integration_type)
-
-        # Calcular custo
-        if log.integration_type in ('anthropic', 'openai'):
-            cost_usd = float(log.estimated_cost_usd or 0)
-            by_quote[quote_id]["cost_usd"] += cost_usd
-            by_quote[quote_id]["cost_brl"] += cost_usd * usd_to_brl
-        elif log.integration_type == 'serpapi':
-            # SerpAPI custo é em BRL
-            by_quote[quote_id]["cost_brl"] += serpapi_cost
-
-    return by_quote
+def api_cost(api: str, cost_usd: float, call_count: int, cost_config: dict) -> tuple:
+    """Custo (USD, BRL) de uma API: IA pelo custo estimado, SerpAPI por chamada (em BRL)"""
+    if api in ('anthropic', 'openai'):
+        return cost_usd, cost_usd * cost_config["usd_to_brl_rate"]
+    return 0.0, call_count * cost_config["serpapi_cost_per_call"]
 
 
 # =====================
@@ -301,64 +257,51 @@ def get_financial_report(
     cost_config = get_cost_config(db)
     usd_to_brl = cost_config["usd_to_brl_rate"]
 
-    # Construir query base
-    query = db.query(IntegrationLog).join(
-        QuoteRequest, IntegrationLog.quote_request_id == QuoteRequest.id
+    # Agregação SQL sobre o consolidado diário: uma linha por (cotação, API).
+    # O período é aplicado por dia (integration_cost_daily.day)
+    query = db.query(
+        IntegrationCostDaily.quote_request_id,
+        IntegrationCostDaily.integration_type,
+        func.sum(IntegrationCostDaily.call_count).label("call_count"),
+        func.sum(IntegrationCostDaily.total_tokens).label("total_tokens"),
+        func.sum(IntegrationCostDaily.cost_usd).label("cost_usd"),
+        func.sum(IntegrationCostDaily.shopping_calls).label("shopping_calls"),
+        func.sum(IntegrationCostDaily.immersive_calls).label("immersive_calls"),
+        func.min(IntegrationCostDaily.first_call_at).label("first_call_at"),
+        QuoteRequest.created_at,
+        QuoteRequest.pesquisador,
+        Project.nome.label("project_name"),
+        Client.nome.label("client_name")
+    ).join(
+        QuoteRequest, IntegrationCostDaily.quote_request_id == QuoteRequest.id
+    ).outerjoin(
+        Project, QuoteRequest.project_id == Project.id
+    ).outerjoin(
+        Client, Project.client_id == Client.id
     )
 
     # Aplicar filtros de período
     if period_start:
-        query = query.filter(IntegrationLog.created_at >= period_start)
+        query = query.filter(IntegrationCostDaily.day >= period_start.date())
     if period_end:
-        query = query.filter(IntegrationLog.created_at <= period_end)
+        query = query.filter(IntegrationCostDaily.day <= period_end.date())
 
-    # Filtrar apenas tipos válidos (excluir search_log, etc)
-    valid_types = ['anthropic', 'openai', 'serpapi']
+    # O consolidado só contém tipos com custo (anthropic, openai, serpapi)
     if integration_list:
-        # Filtrar pela lista fornecida (que já deve ser subset dos válidos)
-        query = query.filter(IntegrationLog.integration_type.in_(integration_list))
-    else:
-        # Se não especificou, filtrar apenas pelos tipos válidos
-        query = query.filter(IntegrationLog.integration_type.in_(valid_types))
+        query = query.filter(IntegrationCostDaily.integration_type.in_(integration_list))
 
     # Filtro de projeto
     if project_id:
-        query = query.filter(QuoteRequest.project_id == project_id)
-
-    # Ordenar por data
-    query = query.order_by(IntegrationLog.created_at.desc())
-
-    logs = query.all()
-
-    # Agregar por cotação
-    by_quote = aggregate_logs_by_quote(logs, cost_config)
-
-    # Buscar dados das cotações (projeto, cliente, usuário)
-    quote_ids = list(by_quote.keys())
-    quotes_data = {}
-
-    if quote_ids:
-        quotes = db.query(
-            QuoteRequest.id,
-            QuoteRequest.created_at,
-            QuoteRequest.pesquisador,
-            Project.nome.label("project_name"),
-            Client.nome.label("client_name")
-        ).outerjoin(
-            Project, QuoteRequest.project_id == Project.id
-        ).outerjoin(
-            Client, Project.client_id == Client.id
-        ).filter(
-            QuoteRequest.id.in_(quote_ids)
-        ).all()
-
-        for q in quotes:
-            quotes_data[q.id] = {
-                "created_at": q.created_at,
-                "project_name": q.project_name,
-                "client_name": q.client_name,
-                "user_name": q.pesquisador
-            }
+        query = query.filter(IntegrationCostDaily.project_id == project_id)
+
+    rows = query.group_by(
+        IntegrationCostDaily.quote_request_id,
+        IntegrationCostDaily.integration_type,
+        QuoteRequest.created_at,
+        QuoteRequest.pesquisador,
+        Project.nome,
+        Client.nome
+    ).all()
 
     # Construir lista de transações
     transactions = []
@@ -366,53 +309,33 @@ def get_financial_report(
     total_brl = 0.0
     totals_by_api = {}
 
-    for quote_id, data in by_quote.items():
-        quote_info = quotes_data.get(quote_id, {})
-
-        # Uma transação por API por cotação
-        for api in data["apis"]:
-            api_logs = [l for l in data["logs"] if l.integration_type == api]
-
-            # Calcular custo para esta API
-            if api in ('anthropic', 'openai'):
-                api_cost_usd = sum(float(l.estimated_cost_usd or 0) for l in api_logs)
-                api_cost_brl = api_cost_usd * usd_to_brl
-            else:  # serpapi
-                api_cost_usd = 0.0
-                api_cost_brl = len(api_logs) * cost_config["serpapi_cost_per_call"]
-
-            # Descrição
-            description = build_transaction_description(api_logs)
-
-            # Extrair request_data (prompt) do primeiro log que tenha
-            request_data = None
-            for log in api_logs:
-                if log.request_data and log.request_data.get("prompt"):
-                    request_data = {"prompt": log.request_data.get("prompt")}
-                    break
-
-            transactions.append(TransactionItem(
-                date=quote_info.get("created_at") or api_logs[0].created_at,
-                api=api,
-                quote_id=quote_id,
-                client_name=quote_info.get("client_name"),
-                project_name=quote_info.get("project_name"),
-                user_name=quote_info.get("user_name"),
-                description=description,
-                cost_usd=round(api_cost_usd, 6),
-                cost_brl=round(api_cost_brl, 2),
-                request_data=request_data
-            ))
-
-            # Acumular totais
-            total_usd += api_cost_usd
-            total_brl += api_cost_brl
-
-            if api not in totals_by_api:
-                totals_by_api[api] = {"usd": 0.0, "brl": 0.0, "count": 0}
-            totals_by_api[api]["usd"] += api_cost_usd
-            totals_by_api[api]["brl"] += api_cost_brl
-            totals_by_api[api]["count"] += 1
+    for row in rows:
+        api = row.integration_type
+        api_cost_usd, api_cost_brl = api_cost(api, float(row.cost_usd or 0), int(row.call_count or 0), cost_config)
+
+        transactions.append(TransactionItem(
+            date=row.created_at or row.first_call_at,
+            api=api,
+            quote_id=row.quote_request_id,
+            client_name=row.client_name,
+            project_name=row.project_name,
+            user_name=row.pesquisador,
+            description=describe_usage(
+                api, row.total_tokens, int(row.shopping_calls or 0), int(row.immersive_calls or 0)
+            ),
+            cost_usd=round(api_cost_usd, 6),
+            cost_brl=round(api_cost_brl, 2)
+        ))
+
+        # Acumular totais
+        total_usd += api_cost_usd
+        total_brl += api_cost_brl
+
+        if api not in totals_by_api:
+            totals_by_api[api] = {"usd": 0.0, "brl": 0.0, "count": 0}
+        totals_by_api[api]["usd"] += api_cost_usd
+        totals_by_api[api]["brl"] += api_cost_brl
+        totals_by_api[api]["count"] += 1
 
     # Ordenar transações por data (mais recente primeiro)
     transactions.sort(key=lambda t: t.date, reverse=True)
@@ -450,28 +373,39 @@ def get_quote_costs(quote_id: int, db: Session = Depends(get_db)):
     usd_to_brl = cost_config["usd_to_brl_rate"]
     serpapi_cost = cost_config["serpapi_cost_per_call"]
 
-    # Buscar logs da cotação
-    logs = db.query(IntegrationLog).filter(
-        IntegrationLog.quote_request_id == quote_id
-    ).all()
+    # Totais por integração a partir do consolidado diário
+    totals = {
+        row.integration_type: row
+        for row in db.query(
+            IntegrationCostDaily.integration_type,
+            func.sum(IntegrationCostDaily.call_count).label("calls"),
+            func.sum(IntegrationCostDaily.total_tokens).label("tokens"),
+            func.sum(IntegrationCostDaily.cost_usd).label("cost_usd"),
+            func.sum(IntegrationCostDaily.shopping_calls).label("shopping_calls"),
+            func.sum(IntegrationCostDaily.immersive_calls).label("immersive_calls")
+        ).filter(
+            IntegrationCostDaily.quote_request_id == quote_id
+        ).group_by(IntegrationCostDaily.integration_type).all()
+    }
+
+    def total_of(api: str, field: str):
+        row = totals.get(api)
+        return (getattr(row, field) or 0) if row else 0
 
     # Calcular custos Anthropic
-    anthropic_logs = [l for l in logs if l.integration_type == 'anthropic']
-    anthropic_cost_usd = sum(float(l.estimated_cost_usd or 0) for l in anthropic_logs)
+    anthropic_cost_usd = float(total_of('anthropic', 'cost_usd'))
     anthropic_cost_brl = anthropic_cost_usd * usd_to_brl
-    anthropic_tokens = sum(l.total_tokens or 0 for l in anthropic_logs)
+    anthropic_tokens = int(total_of('anthropic', 'tokens'))
 
     # Calcular custos OpenAI
-    openai_logs = [l for l in logs if l.integration_type == 'openai']
-    openai_cost_usd = sum(float(l.estimated_cost_usd or 0) for l in openai_logs)
+    openai_cost_usd = float(total_of('openai', 'cost_usd'))
     openai_cost_brl = openai_cost_usd * usd_to_brl
-    openai_tokens = sum(l.total_tokens or 0 for l in openai_logs)
+    openai_tokens = int(total_of('openai', 'tokens'))
 
     # Calcular custos SerpAPI
-    serpapi_logs = [l for l in logs if l.integration_type == 'serpapi']
-    serpapi_shopping = sum(1 for l in serpapi_logs if l.api_used == 'google_shopping')
-    serpapi_immersive = sum(1 for l in serpapi_logs if l.api_used == 'google_immersive_product')
-    serpapi_total_calls = len(serpapi_logs)
+    serpapi_shopping = int(total_of('serpapi', 'shopping_calls'))
+    serpapi_immersive = int(total_of('serpapi', 'immersive_calls'))
+    serpapi_total_calls = int(total_of('serpapi', 'calls'))
     serpapi_cost_brl = serpapi_total_calls * serpapi_cost
 
     # Totais
@@ -485,13 +419,13 @@ def get_quote_costs(quote_id: int, db: Session = Depends(get_db)):
             "cost_usd": round(anthropic_cost_usd, 6),
             "cost_brl": round(anthropic_cost_brl, 2),
             "tokens": anthropic_tokens,
-            "calls": len(anthropic_logs)
+            "calls": int(total_of('anthropic', 'calls'))
         },
         "openai": {
             "cost_usd": round(openai_cost_usd, 6),
             "cost_brl": round(openai_cost_brl, 2),
             "tokens": openai_tokens,
-            "calls": len(openai_logs)
+            "calls": int(total_of('openai', 'calls'))
         },
         "serpapi": {
             "cost_brl": round(serpapi_cost_brl, 2),
@@ -3,18 +3,21 @@ API para gerenciamento de Sessões de Inventário
 CRUD de sessões, carregamento de bens esperados e registro de leituras
 """
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import func, and_, or_, select, delete
 from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel, Field
 import pandas as pd
 import io
+import time
 import uuid
 import logging
 
-from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.database import get_db, get_async_db
+from app.core.auth import get_current_user, get_current_user_async
 from app.models import (
     User,
     Project,
@@ -24,6 +27,7 @@ from app.models import (
     InventoryReadAsset,
     InventorySyncLog,
     AssetCategory,
+    CounterDimension,
     ReadMethod,
     PhysicalCondition,
     ExternalSystem,
@@ -33,6 +37,17 @@ from app.models import (
     InventoryMasterPhysicalStatus,
 )
 from app.services.external_system_sync import ExternalSystemSyncService
+from app.services.expected_asset_import import (
+    normalize_columns,
+    import_expected_assets,
+    format_error_messages,
+)
+from app.services.inventory_statistics import (
+    calculate_session_statistics,
+    calculate_statistics_for_sessions,
+    apply_counter_deltas,
+    EXPECTED_TOTAL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -109,48 +124,6 @@ def generate_session_code() -> str:
     return f"INV-{date_part}-{random_part}"
 
 
-def calculate_session_statistics(db: Session, session_id: int) -> dict:
-    """Calcula estatísticas da sessão"""
-    # Total esperado
-    total_expected = db.query(func.count(InventoryExpectedAsset.id)).filter(
-        InventoryExpectedAsset.session_id == session_id
-    ).scalar() or 0
-
-    # Contagem por categoria
-    category_counts = db.query(
-        InventoryReadAsset.category,
-        func.count(InventoryReadAsset.id)
-    ).filter(
-        InventoryReadAsset.session_id == session_id
-    ).group_by(InventoryReadAsset.category).all()
-
-    stats = {
-        "total_expected": total_expected,
-        "total_found": 0,
-        "total_not_found": 0,
-        "total_unregistered": 0,
-        "total_written_off": 0,
-        "completion_percentage": 0.0
-    }
-
-    for category, count in category_counts:
-        if category == AssetCategory.FOUND.value:
-            stats["total_found"] = count
-        elif category == AssetCategory.NOT_FOUND.value:
-            stats["total_not_found"] = count
-        elif category == AssetCategory.UNREGISTERED.value:
-            stats["total_unregistered"] = count
-        elif category == AssetCategory.WRITTEN_OFF.value:
-            stats["total_written_off"] = count
-
-    # Calcular percentual de conclusão
-    if total_expected > 0:
-        verified = stats["total_found"] + stats["total_not_found"] + stats["total_written_off"]
-        stats["completion_percentage"] = round((verified / total_expected) * 100, 2)
-
-    return stats
-
-
 # ===== Session CRUD =====
 
 @router.get("")
@@ -179,9 +152,11 @@ def list_sessions(
     total = query.count()
     sessions = query.order_by(InventorySession.created_at.desc()).offset(skip).limit(limit).all()
 
+    stats_by_session = calculate_statistics_for_sessions(db, [s.id for s in sessions])
+
     result = []
     for session in sessions:
-        stats = calculate_session_statistics(db, session.id)
+        stats = stats_by_session[session.id]
         result.append({
             "id": session.id,
             "code": session.code,
@@ -500,6 +475,9 @@ def complete_session(
     session.status = InventorySessionStatus.COMPLETED.value
     session.completed_at = datetime.utcnow()
 
+    # Flush para que os contadores incluam os bens marcados como não encontrados
+    db.flush()
+
     # Atualizar estatísticas finais
     stats = calculate_session_statistics(db, session_id)
     session.total_expected = stats["total_expected"]
@@ -646,126 +624,73 @@ def add_expected_asset(
 async def upload_expected_assets(
     session_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Carrega bens esperados de um arquivo Excel/CSV"""
-    session = db.query(InventorySession).filter(InventorySession.id == session_id).first()
+    session = await db.get(InventorySession, session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
 
     if session.status != InventorySessionStatus.DRAFT.value:
         raise HTTPException(status_code=400, detail="Bens só podem ser carregados em sessões em rascunho")
 
-    # Ler arquivo
+    # Ler arquivo (tudo como texto para preservar zeros à esquerda nos códigos)
     content = await file.read()
+    read_started = time.perf_counter()
 
+    # Leitura da planilha é CPU-bound: roda no threadpool, fora do event loop
     try:
         if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
+            df = await run_in_threadpool(pd.read_csv, io.BytesIO(content), dtype=str)
         else:
-            df = pd.read_excel(io.BytesIO(content))
+            df = await run_in_threadpool(pd.read_excel, io.BytesIO(content), dtype=str)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao ler arquivo: {str(e)}")
 
-    # Mapear colunas
-    column_mapping = {
-        'numero_tombamento': 'asset_code',
-        'tombamento': 'asset_code',
-        'patrimonio': 'asset_code',
-        'plaqueta': 'asset_code',
-        'numero': 'asset_code',
-        'descricao': 'description',
-        'nome': 'description',
-        'rfid': 'rfid_code',
-        'codigo_rfid': 'rfid_code',
-        'codigo_barras': 'barcode',
-        'barcode': 'barcode',
-        'categoria': 'category',
-        'ul': 'expected_ul_code',
-        'codigo_ul': 'expected_ul_code',
-        'ul_esperada': 'expected_ul_code',
-        'ua': 'expected_ua_code',
-        'codigo_ua': 'expected_ua_code',
-        'ua_esperada': 'expected_ua_code',
-    }
-
-    df.columns = [c.lower().strip() for c in df.columns]
-    df = df.rename(columns=column_mapping)
+    read_ms = round((time.perf_counter() - read_started) * 1000, 1)
 
-    # Validar colunas obrigatórias
-    if 'asset_code' not in df.columns:
-        raise HTTPException(
-            status_code=400,
-            detail="Coluna obrigatória não encontrada: numero_tombamento ou tombamento"
-        )
-
-    if 'description' not in df.columns:
-        raise HTTPException(
-            status_code=400,
-            detail="Coluna obrigatória não encontrada: descricao ou nome"
-        )
-
-    # Processar registros
-    created = 0
-    updated = 0
-    errors = []
-
-    for idx, row in df.iterrows():
-        try:
-            asset_code = str(row['asset_code']).strip()
-            if not asset_code or asset_code == 'nan':
-                continue
-
-            existing = db.query(InventoryExpectedAsset).filter(
-                InventoryExpectedAsset.session_id == session_id,
-                InventoryExpectedAsset.asset_code == asset_code
-            ).first()
-
-            if existing:
-                existing.description = str(row.get('description', '')).strip() or existing.description
-                existing.rfid_code = str(row.get('rfid_code', '')).strip() or existing.rfid_code
-                existing.barcode = str(row.get('barcode', '')).strip() or existing.barcode
-                updated += 1
-            else:
-                asset = InventoryExpectedAsset(
-                    session_id=session_id,
-                    asset_code=asset_code,
-                    description=str(row.get('description', '')).strip(),
-                    rfid_code=str(row.get('rfid_code', '')).strip() if pd.notna(row.get('rfid_code')) else None,
-                    barcode=str(row.get('barcode', '')).strip() if pd.notna(row.get('barcode')) else None,
-                    category=str(row.get('category', '')).strip() if pd.notna(row.get('category')) else None,
-                    expected_ul_code=str(row.get('expected_ul_code', '')).strip() if pd.notna(row.get('expected_ul_code')) else None,
-                    expected_ua_code=str(row.get('expected_ua_code', '')).strip() if pd.notna(row.get('expected_ua_code')) else None
-                )
-                db.add(asset)
-                created += 1
-
-        except Exception as e:
-            errors.append(f"Linha {idx + 2}: {str(e)}")
-
-    db.commit()
+    # Mapear e validar colunas obrigatórias
+    try:
+        df = normalize_columns(df)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Importação colunar: validação vetorizada + COPY
+    result = await db.run_sync(
+        import_expected_assets,
+        session_id,
+        df,
+        overwrite=False,
+        timing={"read_ms": read_ms}
+    )
+    await db.commit()
 
     return {
         "message": "Importação concluída",
-        "created": created,
-        "updated": updated,
-        "errors": errors[:10] if errors else []
+        "created": result["created"],
+        "updated": result["updated"],
+        "failed": result["failed"],
+        "errors": format_error_messages(result["error_report"]),
+        "error_report": result["error_report"],
+        "timing": result["timing"]
     }
 
 
 class SyncOptions(BaseModel):
     """Opções de sincronização"""
-    limit: int = 5000
+    limit: Optional[int] = None  # Máximo de bens a baixar (None = todos)
+    page_size: int = 5000  # Bens por página baixada/importada
     clear_existing: bool = False  # Se True, remove bens existentes antes de sincronizar
+    resume: bool = False  # Se True, continua do ponto em que a última carga parou
 
 
 @router.post("/{session_id}/expected/sync")
 async def sync_expected_assets(
     session_id: int,
     options: Optional[SyncOptions] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Sincroniza bens esperados do sistema externo (ASI).
@@ -776,10 +701,14 @@ async def sync_expected_assets(
     if options is None:
         options = SyncOptions()
 
-    session = db.query(InventorySession).options(
-        joinedload(InventorySession.project),
-        joinedload(InventorySession.ul)
-    ).filter(InventorySession.id == session_id).first()
+    # Relacionamentos carregados antecipadamente: lazy load não é permitido em AsyncSession
+    session = (await db.execute(
+        select(InventorySession).options(
+            selectinload(InventorySession.project),
+            selectinload(InventorySession.ul),
+            selectinload(InventorySession.ug)
+        ).where(InventorySession.id == session_id)
+    )).scalar_one_or_none()
 
     if not session:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
@@ -794,112 +723,103 @@ async def sync_expected_assets(
 
     if not external_system_id:
         # Tentar obter sistema padrão
-        system = db.query(ExternalSystem).filter(
-            ExternalSystem.is_active == True,
-            ExternalSystem.is_default == True
-        ).first()
+        system = (await db.execute(
+            select(ExternalSystem).where(
+                ExternalSystem.is_active == True,
+                ExternalSystem.is_default == True
+            ).limit(1)
+        )).scalar_one_or_none()
     else:
-        system = db.query(ExternalSystem).filter(ExternalSystem.id == external_system_id).first()
+        system = await db.get(ExternalSystem, external_system_id)
 
     if not system:
         raise HTTPException(status_code=400, detail="Nenhum sistema externo configurado. Configure um sistema em Configurações > Sistemas Externos.")
 
-    # Inicializar serviço de sincronização
-    sync_service = ExternalSystemSyncService(db, system)
+    # Inicializar serviço de sincronização (o download paginado não acessa o banco)
+    sync_service = ExternalSystemSyncService(None, system)
+
+    start_offset = session.expected_sync_offset if options.resume and session.expected_sync_offset else 0
+    statistics = {"received": 0, "mapped": 0, "created": 0, "updated": 0, "failed": 0}
+    error_report = []
+    import_ms = 0.0
+    pages = 0
+    started = time.perf_counter()
 
     try:
-        # Baixar bens do sistema externo
-        result = await sync_service.download_assets_for_session(
+        # Se solicitado, limpar bens existentes (não em retomada - os já baixados seriam perdidos)
+        if options.clear_existing and start_offset == 0:
+            removed = (await db.execute(
+                delete(InventoryExpectedAsset).where(InventoryExpectedAsset.session_id == session_id)
+            )).rowcount
+            # Exclusão em massa não passa pelos eventos do ORM
+            await db.run_sync(
+                apply_counter_deltas,
+                {(session_id, CounterDimension.EXPECTED.value, EXPECTED_TOTAL): -removed}
+            )
+            await db.commit()
+
+        # Baixar e importar página a página (importação colunar); o offset é
+        # gravado a cada página para permitir retomar cargas interrompidas
+        async for page in sync_service.iter_asset_pages(
             session_code=session.code,
             ul_code=session.ul.code if session.ul else None,
             ug_code=session.ug.code if session.ug else None,
-            limit=options.limit
-        )
-
-        if not result["success"]:
-            raise HTTPException(
-                status_code=502,
-                detail=f"Falha ao baixar bens do servidor: {result.get('error', 'Erro desconhecido')}"
-            )
-
-        # Se solicitado, limpar bens existentes
-        if options.clear_existing:
-            db.query(InventoryExpectedAsset).filter(
-                InventoryExpectedAsset.session_id == session_id
-            ).delete()
-            db.commit()
+            page_size=options.page_size,
+            start_offset=start_offset,
+            max_items=options.limit
+        ):
+            pages += 1
+            statistics["received"] += page["received"]
+            statistics["mapped"] += len(page["items"])
+
+            items_df = pd.DataFrame.from_records(page["items"])
+            if not items_df.empty:
+                import_result = await db.run_sync(
+                    import_expected_assets,
+                    session_id,
+                    items_df,
+                    overwrite=True,
+                    first_row_number=page["offset"] + 1
+                )
+                for key in ("created", "updated", "failed"):
+                    statistics[key] += import_result[key]
+                error_report.extend(import_result["error_report"][:10 - len(error_report)])
+                import_ms += import_result["timing"]["import_ms"]
 
-        # Inserir/atualizar bens
-        created = 0
-        updated = 0
-        failed = 0
-        errors = []
-
-        for item in result["items"]:
-            try:
-                # Verificar se já existe
-                existing = db.query(InventoryExpectedAsset).filter(
-                    InventoryExpectedAsset.session_id == session_id,
-                    InventoryExpectedAsset.asset_code == item["asset_code"]
-                ).first()
+            session.expected_sync_offset = page["next_offset"]
+            await db.commit()
 
-                if existing:
-                    # Atualizar
-                    existing.asset_sequence = item.get("asset_sequence")
-                    existing.description = item.get("description")
-                    existing.rfid_code = item.get("rfid_code")
-                    existing.barcode = item.get("barcode")
-                    existing.expected_ul_code = item.get("expected_ul_code")
-                    existing.expected_ua_code = item.get("expected_ua_code")
-                    existing.category = item.get("category")
-                    existing.is_written_off = item.get("is_written_off", False)
-                    existing.extra_data = item.get("extra_data")
-                    updated += 1
-                else:
-                    # Criar novo
-                    expected_asset = InventoryExpectedAsset(
-                        session_id=session_id,
-                        asset_code=item["asset_code"],
-                        asset_sequence=item.get("asset_sequence"),
-                        description=item.get("description"),
-                        rfid_code=item.get("rfid_code"),
-                        barcode=item.get("barcode"),
-                        expected_ul_code=item.get("expected_ul_code"),
-                        expected_ua_code=item.get("expected_ua_code"),
-                        category=item.get("category"),
-                        is_written_off=item.get("is_written_off", False),
-                        extra_data=item.get("extra_data")
-                    )
-                    db.add(expected_asset)
-                    created += 1
-
-            except Exception as e:
-                failed += 1
-                errors.append(f"Erro ao processar bem {item.get('asset_code')}: {str(e)}")
-                if len(errors) > 10:
-                    errors.append(f"... e mais {len(result['items']) - failed} erros")
-                    break
-
-        db.commit()
+        # Carga completa: nada a retomar
+        session.expected_sync_offset = None
+        await db.commit()
 
         # Atualizar estatísticas da sessão
-        total_expected = db.query(func.count(InventoryExpectedAsset.id)).filter(
-            InventoryExpectedAsset.session_id == session_id
-        ).scalar()
+        total_expected = await db.scalar(
+            select(func.count(InventoryExpectedAsset.id)).where(
+                InventoryExpectedAsset.session_id == session_id
+            )
+        )
 
+        elapsed = time.perf_counter() - started
         return {
             "success": True,
             "message": f"Sincronização concluída com sucesso",
             "system": system.name,
             "statistics": {
-                "received": result["total_received"],
-                "mapped": result["total_mapped"],
-                "created": created,
-                "updated": updated,
-                "failed": failed,
-                "total_expected": total_expected
+                **statistics,
+                "total_expected": total_expected,
+                "resumed_from": start_offset or None
             },
-            "errors": errors if errors else None
+            "errors": [
+                f"Erro ao processar bem {e['asset_code']}: {e['error']}"
+                for e in error_report
+            ] or None,
+            "timing": {
+                "pages": pages,
+                "import_ms": round(import_ms, 1),
+                "total_ms": round(elapsed * 1000, 1),
+                "rows_per_second": round(statistics["received"] / elapsed, 1) if elapsed > 0 else None
+            }
         }
 
     except HTTPException:
@@ -916,6 +836,10 @@ async def sync_expected_assets(
 class UploadOptions(BaseModel):
     """Opções de upload para sistema externo"""
     include_photos: bool = False
+    chunk_size: Optional[int] = None  # Bens por requisição (None = configuração, 0 = envio único)
+    max_concurrency: Optional[int] = None  # Lotes em paralelo (None = configuração)
+    compress: bool = False  # Corpo com gzip (se suportado pelo servidor)
+    restart: bool = False  # Ignora lotes já enviados e reenvia tudo
 
 
 @router.post("/{session_id}/upload")
@@ -970,7 +894,11 @@ async def upload_results(
         result = await sync_service.upload_inventory_results(
             session=session,
             include_photos=options.include_photos,
-            user_login=current_user.username if current_user else "sistema"
+            user_login=current_user.username if current_user else "sistema",
+            chunk_size=options.chunk_size,
+            max_concurrency=options.max_concurrency,
+            compress=options.compress,
+            restart=options.restart
         )
 
         if not result["success"]:
@@ -991,7 +919,8 @@ async def upload_results(
             "system": system.name,
             "transmission_number": result.get("transmission_number"),
             "inventory_id": result.get("inventory_id"),
-            "items_sent": result.get("items_sent", 0)
+            "items_sent": result.get("items_sent", 0),
+            "chunks_total": result.get("chunks_total", 0)
         }
 
     except HTTPException:
@@ -1278,28 +1207,8 @@ def get_session_statistics(
     if not session:
         raise HTTPException(status_code=404, detail="Sessão não encontrada")
 
-    stats = calculate_session_statistics(db, session_id)
-
-    # Estatísticas por método de leitura
-    by_method = db.query(
-        InventoryReadAsset.read_method,
-        func.count(InventoryReadAsset.id)
-    ).filter(
-        InventoryReadAsset.session_id == session_id
-    ).group_by(InventoryReadAsset.read_method).all()
-
-    stats["by_method"] = {method: count for method, count in by_method}
-
-    # Estatísticas por condição física
-    by_condition = db.query(
-        InventoryReadAsset.physical_condition,
-        func.count(InventoryReadAsset.id)
-    ).filter(
-        InventoryReadAsset.session_id == session_id,
-        InventoryReadAsset.physical_condition.isnot(None)
-    ).group_by(InventoryReadAsset.physical_condition).all()
-
-    stats["by_condition"] = {condition: count for condition, count in by_condition}
+    # Contadores materializados: inclui totais por método e condição física
+    stats = calculate_session_statistics(db, session_id, detailed=True)
 
     return stats
 
@@ -1349,9 +1258,11 @@ def get_active_sessions_for_app(
     if not sessions:
         return MobileActiveSessionResponse(has_active_session=False, sessions=[])
 
+    stats_by_session = calculate_statistics_for_sessions(db, [s.id for s in sessions])
+
     result = []
     for session in sessions:
-        stats = calculate_session_statistics(db, session.id)
+        stats = stats_by_session[session.id]
         result.append({
             "id": session.id,
             "code": session.code,
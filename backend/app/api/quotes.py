@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, UploadFile, File as FastAPIFile, Form, HTTPException, Request
+from fastapi import APIRouter, Depends, UploadFile, File as FastAPIFile, Form, HTTPException, Query, Request
 from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, cast, String
+from sqlalchemy import select, tuple_
 from typing import List, Optional
 from slowapi import Limiter
 from slowapi.util import get_remote_address
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db
 from app.core.auth import get_current_user
+from app.core.pagination import COUNT_EXACT, count_rows, decode_cursor, encode_cursor
 from app.models import QuoteRequest, QuoteSource, File, GeneratedDocument, IntegrationLog, Setting, User, VehiclePriceBank
 from app.models.quote_request import QuoteStatus, QuoteInputType
 from app.models.file import FileType
@@ -26,6 +28,8 @@ from app.api.schemas import (
 )
 from app.tasks.quote_tasks import process_quote_request
 from app.services.pdf_generator import PDFGenerator
+from app.services.integration_cost_rollup import record_integration_costs
+from app.services.integration_log_archive import load_archived_payloads
 from app.core.config import settings
 from datetime import datetime
 from decimal import Decimal
@@ -303,6 +307,8 @@ def get_quote(
 def list_quotes(
     page: int = 1,
     per_page: int = 20,
+    cursor: Optional[str] = None,
+    count: str = Query(COUNT_EXACT, pattern="^(exact|estimated|none)$"),
     quote_id: Optional[int] = None,
     search: Optional[str] = None,
     status: Optional[str] = None,
@@ -316,8 +322,12 @@ def list_quotes(
     Lista cotações com filtros.
 
     Parâmetros:
+    - cursor: Cursor keyset (next_cursor da página anterior); quando
+      informado, substitui page/offset
+    - count: Total exato (exact), estimado pelo planejador (estimated) ou
+      não calculado (none)
     - quote_id: Filtrar por número/ID da cotação
-    - search: Buscar na descrição (input_text)
+    - search: Buscar na descrição (input_text) e no nome canônico
     - status: Filtrar por status (PROCESSING, DONE, ERROR, CANCELLED, AWAITING_REVIEW)
     - project_id: Filtrar por projeto
     - date_from: Data inicial (formato: YYYY-MM-DD)
@@ -327,61 +337,36 @@ def list_quotes(
 
     offset = (page - 1) * per_page
 
-    query = db.query(QuoteRequest).options(
-        joinedload(QuoteRequest.project).joinedload(Project.client)
-    )
-
-    count_query = db.query(QuoteRequest)
+    query = db.query(QuoteRequest)
 
     # Filtro por ID da cotação
     if quote_id is not None:
         query = query.filter(QuoteRequest.id == quote_id)
-        count_query = count_query.filter(QuoteRequest.id == quote_id)
 
     # Filtro por busca na descrição (suporta múltiplas palavras)
-    # Busca em input_text E em claude_payload_json->>'nome_canonico'
+    # search_text = input_text + nome_canonico em minúsculas (índice GIN pg_trgm)
     if search:
-        # Dividir a busca em palavras e criar filtro AND para cada palavra
-        search_words = search.strip().split()
-        if search_words:
-            # Para cada palavra, deve estar em input_text OU em nome_canonico
-            word_conditions = []
-            for word in search_words:
-                # Usar cast para converter JSON field para string
-                nome_canonico_field = cast(
-                    QuoteRequest.claude_payload_json.op('->>')('nome_canonico'),
-                    String
-                )
-                word_filter = or_(
-                    QuoteRequest.input_text.ilike(f"%{word}%"),
-                    nome_canonico_field.ilike(f"%{word}%")
-                )
-                word_conditions.append(word_filter)
-            # Todas as palavras devem ser encontradas (AND entre palavras)
-            search_filter = and_(*word_conditions)
-            query = query.filter(search_filter)
-            count_query = count_query.filter(search_filter)
+        # Todas as palavras devem ser encontradas (AND entre palavras)
+        for word in search.strip().split():
+            query = query.filter(QuoteRequest.search_text.contains(word.lower(), autoescape=True))
 
     # Filtro por status
     if status:
         try:
             status_enum = QuoteStatus(status)
             query = query.filter(QuoteRequest.status == status_enum)
-            count_query = count_query.filter(QuoteRequest.status == status_enum)
         except ValueError:
             pass  # Status inválido, ignorar
 
     # Filtro por projeto
     if project_id is not None:
         query = query.filter(QuoteRequest.project_id == project_id)
-        count_query = count_query.filter(QuoteRequest.project_id == project_id)
 
     # Filtro por período
     if date_from:
         try:
             date_from_parsed = datetime.strptime(date_from, "%Y-%m-%d")
             query = query.filter(QuoteRequest.created_at >= date_from_parsed)
-            count_query = count_query.filter(QuoteRequest.created_at >= date_from_parsed)
         except ValueError:
             pass  # Data inválida, ignorar
 
@@ -392,15 +377,35 @@ def list_quotes(
             from datetime import timedelta
             date_to_parsed = date_to_parsed + timedelta(days=1)
             query = query.filter(QuoteRequest.created_at < date_to_parsed)
-            count_query = count_query.filter(QuoteRequest.created_at < date_to_parsed)
         except ValueError:
             pass  # Data inválida, ignorar
 
-    total = count_query.count()
+    total, total_is_estimate = count_rows(db, query.with_entities(QuoteRequest.id).statement, count)
 
-    quotes = query.order_by(
-        QuoteRequest.created_at.desc()
-    ).offset(offset).limit(per_page).all()
+    # Paginação keyset em (created_at, id); sem cursor mantém page/offset
+    if cursor:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        page_query = query.filter(
+            tuple_(QuoteRequest.created_at, QuoteRequest.id) < (cursor_created_at, cursor_id)
+        )
+    else:
+        page_query = query.offset(offset)
+
+    quotes = page_query.options(
+        joinedload(QuoteRequest.project).joinedload(Project.client)
+    ).order_by(
+        QuoteRequest.created_at.desc(),
+        QuoteRequest.id.desc()
+    ).limit(per_page + 1).all()
+
+    # Uma linha a mais indica que existe próxima página
+    next_cursor = None
+    if len(quotes) > per_page:
+        quotes = quotes[:per_page]
+        next_cursor = encode_cursor(quotes[-1].created_at, quotes[-1].id)
 
     items = []
     for quote in quotes:
@@ -431,8 +436,10 @@ def list_quotes(
     return QuoteListResponse(
         items=items,
         total=total,
+        total_is_estimate=total_is_estimate,
         page=page,
-        per_page=per_page
+        per_page=per_page,
+        next_cursor=next_cursor
     )
 
 
@@ -800,7 +807,13 @@ def get_integration_logs(quote_id: int, db: Session = Depends(get_db)):
         IntegrationLog.quote_request_id == quote_id
     ).order_by(IntegrationLog.created_at).all()
 
-    return logs
+    # Payloads antigos ficam em arquivos comprimidos: reidratar na resposta
+    archived = load_archived_payloads(logs)
+    return [
+        IntegrationLogResponse.model_validate(log).model_copy(update=archived[log.id])
+        if log.id in archived else log
+        for log in logs
+    ]
 
 
 @router.delete("/admin/clear-all-data")
@@ -881,26 +894,34 @@ def clear_all_quote_data(db: Session = Depends(get_db)):
 @router.post("/lens/search", response_model=dict)
 async def lens_search(
     image: UploadFile = FastAPIFile(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Busca produtos usando Google Lens.
 
     Etapa 1 do fluxo Google Lens:
-    - Faz upload da imagem para imgbb (URL pública)
+    - Publica a imagem numa URL pública (lens_image_host: local, S3 ou imgbb;
+      a mesma imagem reaproveita a URL enquanto válida)
     - Envia URL para SerpAPI Google Lens
     - Retorna lista de produtos identificados
     """
-    from app.services.google_lens_service import GoogleLensService, upload_image_to_imgbb
+    from app.services.google_lens_service import GoogleLensService
+    from app.services.lens_image_host import get_image_host, imgbb_api_key, public_image_url
     from app.core.config import settings
     from app.models.integration_setting import IntegrationSetting
     from app.core.security import decrypt_value
 
+    # Load SerpAPI and imgbb settings in a single query
+    integrations = {
+        setting.provider: setting
+        for setting in (await db.execute(
+            select(IntegrationSetting).where(IntegrationSetting.provider.in_(["SERPAPI", "IMGBB"]))
+        )).scalars()
+    }
+
     # Get SerpAPI key
     serpapi_key = None
-    integration = db.query(IntegrationSetting).filter(
-        IntegrationSetting.provider == "SERPAPI"
-    ).first()
+    integration = integrations.get("SERPAPI")
 
     if integration and integration.settings_json.get("api_key"):
         try:
@@ -914,37 +935,24 @@ async def lens_search(
     if not serpapi_key:
         raise HTTPException(status_code=400, detail="SerpAPI key not configured")
 
-    # Get imgbb API key
-    imgbb_key = None
-    imgbb_integration = db.query(IntegrationSetting).filter(
-        IntegrationSetting.provider == "IMGBB"
-    ).first()
-
-    if imgbb_integration and imgbb_integration.settings_json.get("api_key"):
-        try:
-            imgbb_key = decrypt_value(imgbb_integration.settings_json.get("api_key"))
-        except:
-            imgbb_key = imgbb_integration.settings_json.get("api_key")
-
-    if not imgbb_key:
-        imgbb_key = os.environ.get("IMGBB_API_KEY")
-
-    if not imgbb_key:
+    image_host = get_image_host(imgbb_api_key(integrations.get("IMGBB")))
+    if not image_host:
         raise HTTPException(
             status_code=400,
-            detail="imgbb API key not configured. Configure em Configurações > Integrações ou defina IMGBB_API_KEY no ambiente."
+            detail="Hospedagem de imagens não configurada. Defina BACKEND_PUBLIC_URL (provedor local), "
+                   "configure o imgbb em Configurações > Integrações ou defina IMGBB_API_KEY no ambiente."
         )
 
     # Read image content
     content = await image.read()
 
-    # Upload image to imgbb for public URL
-    image_url = await upload_image_to_imgbb(content, imgbb_key)
+    # Public URL for SerpAPI (cached by image hash)
+    image_url = await public_image_url(content, image_host)
 
     if not image_url:
         raise HTTPException(
             status_code=500,
-            detail="Falha ao fazer upload da imagem. Verifique a chave da API imgbb."
+            detail=f"Falha ao publicar a imagem ({image_host.name}). Verifique a configuração do provedor."
         )
 
     # Search using Google Lens
@@ -961,9 +969,19 @@ async def lens_search(
 
 
 @router.get("/lens/image/{filename}")
-async def serve_lens_image(filename: str):
-    """Serve temporary lens images for SerpAPI to access"""
-    file_path = os.path.join(settings.STORAGE_PATH, "lens_temp", filename)
+async def serve_lens_image(
+    filename: str,
+    expires: Optional[int] = Query(None),
+    signature: Optional[str] = Query(None)
+):
+    """Serve temporary lens images for SerpAPI to access (URL assinada, ver lens_image_host)"""
+    from app.services.lens_image_host import lens_temp_root, verify_lens_image_signature
+
+    filename = os.path.basename(filename)
+    if not verify_lens_image_signature(filename, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired image URL")
+
+    file_path = os.path.join(lens_temp_root(), filename)
 
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Image not found")
@@ -1181,6 +1199,7 @@ async def create_quote_from_lens(
         if serpapi_cost and serpapi_cost.cost_per_call_brl:
             unit_cost = float(serpapi_cost.cost_per_call_brl)
 
+        log_entries = []
         for call in api_calls:
             log_entry = IntegrationLog(
                 quote_request_id=quote_request.id,
@@ -1199,8 +1218,12 @@ async def create_quote_from_lens(
                     'product_url': product_url
                 }
             )
-            db.add(log_entry)
+            log_entries.append(log_entry)
 
+        # Logs e consolidado diário de custos na mesma transação
+        db.add_all(log_entries)
+        db.flush()
+        record_integration_costs(db, log_entries)
         db.commit()
 
     # Start processing
@@ -2,7 +2,8 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
@@ -154,10 +155,6 @@ def get_my_active_session(
         db.commit()
         return None
 
-    readings_count = db.query(SessionReading).filter(
-        SessionReading.session_id == session.id
-    ).count()
-
     return ReadingSessionResponse(
         id=session.id,
         created_at=session.created_at,
@@ -167,7 +164,7 @@ def get_my_active_session(
         project_id=session.project_id,
         location=session.location,
         timeout_seconds=session.timeout_seconds,
-        readings_count=readings_count
+        readings_count=session.readings_count or 0
     )
 
 
@@ -195,10 +192,6 @@ def complete_session(
     db.commit()
     db.refresh(session)
 
-    readings_count = db.query(SessionReading).filter(
-        SessionReading.session_id == session.id
-    ).count()
-
     return ReadingSessionResponse(
         id=session.id,
         created_at=session.created_at,
@@ -208,7 +201,7 @@ def complete_session(
         project_id=session.project_id,
         location=session.location,
         timeout_seconds=session.timeout_seconds,
-        readings_count=readings_count
+        readings_count=session.readings_count or 0
     )
 
 
@@ -233,10 +226,6 @@ def cancel_session(
     db.commit()
     db.refresh(session)
 
-    readings_count = db.query(SessionReading).filter(
-        SessionReading.session_id == session.id
-    ).count()
-
     return ReadingSessionResponse(
         id=session.id,
         created_at=session.created_at,
@@ -246,7 +235,7 @@ def cancel_session(
         project_id=session.project_id,
         location=session.location,
         timeout_seconds=session.timeout_seconds,
-        readings_count=readings_count
+        readings_count=session.readings_count or 0
     )
 
 
@@ -345,32 +334,38 @@ def add_readings_from_app(
         db.commit()
         raise HTTPException(status_code=400, detail="Sessão expirada")
 
-    # Adicionar leituras
-    added_count = 0
+    # Deduplicar no próprio payload: handhelds releem a mesma tag várias vezes por segundo
+    rows = {}
     for reading_data in data.readings:
-        # Verificar se já existe leitura com esse código na sessão
-        existing = db.query(SessionReading).filter(
-            and_(
-                SessionReading.session_id == session_id,
-                SessionReading.code == reading_data.code
-            )
-        ).first()
-
-        if not existing:
-            reading = SessionReading(
-                session_id=session_id,
-                code=reading_data.code,
-                rssi=reading_data.rssi,
-                device_id=reading_data.device_id
-            )
-            db.add(reading)
-            added_count += 1
+        if reading_data.code not in rows:
+            rows[reading_data.code] = {
+                "session_id": session_id,
+                "code": reading_data.code,
+                "rssi": reading_data.rssi,
+                "device_id": reading_data.device_id
+            }
+
+    # Códigos já lidos na sessão são ignorados pela constraint única;
+    # RETURNING devolve só as linhas realmente inseridas
+    added_count = 0
+    if rows:
+        stmt = (
+            pg_insert(SessionReading.__table__)
+            .values(list(rows.values()))
+            .on_conflict_do_nothing(constraint="uq_session_readings_session_code")
+            .returning(SessionReading.__table__.c.id)
+        )
+        added_count = len(db.execute(stmt).fetchall())
 
-    db.commit()
+    # Contador mantido na sessão (incremento atômico) em vez de COUNT(*)
+    total_count = db.execute(
+        update(ReadingSession)
+        .where(ReadingSession.id == session_id)
+        .values(readings_count=ReadingSession.readings_count + added_count)
+        .returning(ReadingSession.readings_count)
+    ).scalar()
 
-    total_count = db.query(SessionReading).filter(
-        SessionReading.session_id == session_id
-    ).count()
+    db.commit()
 
     return {
         "success": True,
@@ -396,10 +391,6 @@ def list_sessions(
         # Verificar expiração
         check_and_expire_session(session)
 
-        readings_count = db.query(SessionReading).filter(
-            SessionReading.session_id == session.id
-        ).count()
-
         result.append(ReadingSessionResponse(
             id=session.id,
             created_at=session.created_at,
@@ -409,7 +400,7 @@ def list_sessions(
             project_id=session.project_id,
             location=session.location,
             timeout_seconds=session.timeout_seconds,
-            readings_count=readings_count
+            readings_count=session.readings_count or 0
         ))
 
     db.commit()  # Commit any status changes from expiration checks
@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import func, select
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 import logging
 
-from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.database import get_async_db
+from app.core.auth import get_current_user_async
 from app.models import User, RfidTag, RfidTagBatch, Item
 
 logger = logging.getLogger(__name__)
@@ -80,8 +81,8 @@ class BatchListResponse(BaseModel):
 @router.post("/tags", response_model=TagBatchResponse, summary="Receber tags RFID do middleware")
 async def receive_tags(
     request: TagBatchRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """
     Endpoint para receber lote de tags RFID do middleware mobile.
@@ -94,9 +95,9 @@ async def receive_tags(
     """
     try:
         # Verificar se o batch_id já existe
-        existing_batch = db.query(RfidTagBatch).filter(
-            RfidTagBatch.batch_id == request.batch_id
-        ).first()
+        existing_batch = (await db.execute(
+            select(RfidTagBatch.id).where(RfidTagBatch.batch_id == request.batch_id)
+        )).scalar_one_or_none()
 
         if existing_batch:
             raise HTTPException(
@@ -114,9 +115,10 @@ async def receive_tags(
             tag_count=len(request.tags)
         )
         db.add(batch)
-        db.flush()  # Para obter o ID
+        await db.flush()  # Para obter o ID
 
         # Processar cada tag
+        tags = []
         for tag_input in request.tags:
             # Converter timestamp ISO para datetime
             try:
@@ -124,16 +126,16 @@ async def receive_tags(
             except ValueError:
                 read_at = datetime.utcnow()
 
-            tag = RfidTag(
+            tags.append(RfidTag(
                 batch_id=batch.id,
                 epc=tag_input.epc,
                 rssi=tag_input.rssi,
                 read_at=read_at,
                 matched=False
-            )
-            db.add(tag)
+            ))
 
-        db.commit()
+        db.add_all(tags)
+        await db.commit()
 
         logger.info(
             f"Lote RFID recebido: {request.batch_id} com {len(request.tags)} tags",
@@ -156,7 +158,7 @@ async def receive_tags(
         raise
     except Exception as e:
         logger.error(f"Erro ao processar lote RFID: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro ao processar lote: {str(e)}"
@@ -169,33 +171,33 @@ async def list_batches(
     limit: int = Query(50, ge=1, le=100),
     project_id: Optional[int] = Query(None, description="Filtrar por projeto"),
     device_id: Optional[str] = Query(None, description="Filtrar por dispositivo"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Listar todos os lotes de leitura RFID"""
-    query = db.query(RfidTagBatch)
+    query = select(RfidTagBatch)
 
     if project_id:
-        query = query.filter(RfidTagBatch.project_id == project_id)
+        query = query.where(RfidTagBatch.project_id == project_id)
 
     if device_id:
-        query = query.filter(RfidTagBatch.device_id.ilike(f"%{device_id}%"))
+        query = query.where(RfidTagBatch.device_id.ilike(f"%{device_id}%"))
 
-    batches = query.order_by(RfidTagBatch.created_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(query.order_by(RfidTagBatch.created_at.desc()).offset(skip).limit(limit))
 
-    return batches
+    return result.scalars().all()
 
 
 @router.get("/batches/{batch_id}", response_model=BatchResponse, summary="Obter detalhes de um lote")
 async def get_batch(
     batch_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Obter detalhes de um lote específico incluindo todas as tags"""
-    batch = db.query(RfidTagBatch).filter(
-        RfidTagBatch.batch_id == batch_id
-    ).first()
+    batch = (await db.execute(
+        select(RfidTagBatch).options(selectinload(RfidTagBatch.tags)).where(RfidTagBatch.batch_id == batch_id)
+    )).scalar_one_or_none()
 
     if not batch:
         raise HTTPException(
@@ -209,33 +211,35 @@ async def get_batch(
 @router.get("/tags/search", response_model=List[TagResponse], summary="Buscar tag por EPC")
 async def search_tag(
     epc: str = Query(..., description="Código EPC para buscar"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Buscar todas as leituras de uma tag específica pelo EPC"""
-    tags = db.query(RfidTag).filter(
-        RfidTag.epc.ilike(f"%{epc}%")
-    ).order_by(RfidTag.read_at.desc()).limit(100).all()
+    result = await db.execute(
+        select(RfidTag).where(
+            RfidTag.epc.ilike(f"%{epc}%")
+        ).order_by(RfidTag.read_at.desc()).limit(100)
+    )
 
-    return tags
+    return result.scalars().all()
 
 
 @router.post("/tags/{tag_id}/match/{item_id}", summary="Vincular tag a um item do inventário")
 async def match_tag_to_item(
     tag_id: int,
     item_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Vincular uma tag RFID a um item do cadastro de itens"""
-    tag = db.query(RfidTag).filter(RfidTag.id == tag_id).first()
+    tag = await db.get(RfidTag, tag_id)
     if not tag:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Tag não encontrada"
         )
 
-    item = db.query(Item).filter(Item.id == item_id).first()
+    item = await db.get(Item, item_id)
     if not item:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -244,7 +248,7 @@ async def match_tag_to_item(
 
     tag.item_id = item_id
     tag.matched = True
-    db.commit()
+    await db.commit()
 
     return {"success": True, "message": f"Tag {tag.epc} vinculada ao item {item.codigo}"}
 
@@ -252,22 +256,22 @@ async def match_tag_to_item(
 @router.get("/stats", summary="Estatísticas de leitura RFID")
 async def get_stats(
     project_id: Optional[int] = Query(None, description="Filtrar por projeto"),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Obter estatísticas gerais de leitura RFID"""
-    query_batches = db.query(RfidTagBatch)
-    query_tags = db.query(RfidTag)
+    query_batches = select(func.count(RfidTagBatch.id))
+    query_tags = select(func.count(RfidTag.id))
 
     if project_id:
-        query_batches = query_batches.filter(RfidTagBatch.project_id == project_id)
-        batch_ids = [b.id for b in query_batches.all()]
-        query_tags = query_tags.filter(RfidTag.batch_id.in_(batch_ids))
+        query_batches = query_batches.where(RfidTagBatch.project_id == project_id)
+        batch_ids = select(RfidTagBatch.id).where(RfidTagBatch.project_id == project_id)
+        query_tags = query_tags.where(RfidTag.batch_id.in_(batch_ids))
 
-    total_batches = query_batches.count()
-    total_tags = query_tags.count()
-    matched_tags = query_tags.filter(RfidTag.matched == True).count()
-    unique_epcs = db.query(func.count(func.distinct(RfidTag.epc))).scalar()
+    total_batches = (await db.execute(query_batches)).scalar()
+    total_tags = (await db.execute(query_tags)).scalar()
+    matched_tags = (await db.execute(query_tags.where(RfidTag.matched == True))).scalar()
+    unique_epcs = (await db.execute(select(func.count(func.distinct(RfidTag.epc))))).scalar()
 
     return {
         "total_batches": total_batches,
@@ -281,13 +285,13 @@ async def get_stats(
 @router.delete("/batches/{batch_id}", summary="Excluir lote de leitura")
 async def delete_batch(
     batch_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
 ):
     """Excluir um lote de leitura e todas as suas tags"""
-    batch = db.query(RfidTagBatch).filter(
-        RfidTagBatch.batch_id == batch_id
-    ).first()
+    batch = (await db.execute(
+        select(RfidTagBatch).options(selectinload(RfidTagBatch.tags)).where(RfidTagBatch.batch_id == batch_id)
+    )).scalar_one_or_none()
 
     if not batch:
         raise HTTPException(
@@ -296,7 +300,7 @@ async def delete_batch(
         )
 
     tag_count = batch.tag_count
-    db.delete(batch)
-    db.commit()
+    await db.delete(batch)
+    await db.commit()
 
     return {"success": True, "message": f"Lote {batch_id} excluído com {tag_count} tags"}
@@ -125,9 +125,11 @@ class QuoteListItem(BaseModel):
 
 class QuoteListResponse(BaseModel):
     items: List[QuoteListItem]
-    total: int
+    total: Optional[int]  # None quando count=none
+    total_is_estimate: bool = False
     page: int
     per_page: int
+    next_cursor: Optional[str] = None  # Cursor keyset da próxima página
 
 
 class ParametersResponse(BaseModel):
@@ -1,12 +1,14 @@
 """
 Endpoints de saude do sistema e recuperacao de cotacoes.
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.core.database import get_db
-from app.core.auth import get_current_user
+from app.core.database import get_db, get_pool_status
+from app.core.auth import get_current_user, get_current_admin_user
+from app.core.config import settings
+from app.core.query_profiler import slow_queries
 from app.models import User
 from app.services.checkpoint_manager import (
     find_stuck_quotes,
@@ -43,8 +45,10 @@ def get_stats(
     - Quantidade travadas
     - Distribuicao por checkpoint
     - Tempo medio de processamento
+    - Uso do pool de conexoes deste processo da API (espera no checkout)
     """
     stats = get_processing_stats(db)
+    stats["database_pool"] = get_pool_status()
     return stats
 
 
@@ -259,3 +263,31 @@ def trigger_cleanup(
         "message": "Limpeza iniciada",
         "task_id": task.id
     }
+
+
+@router.get("/slow-queries")
+def list_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_admin_user)
+):
+    """
+    Statements lentos registrados por este processo da API (buffer circular).
+
+    Retorna os maiores ofensores agrupados por statement (tempo total)
+    e as ocorrencias mais recentes.
+    """
+    return {
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "buffer_size": settings.SLOW_QUERY_BUFFER_SIZE,
+        "top_offenders": slow_queries.top_offenders(limit),
+        "recent": slow_queries.recent(limit)
+    }
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries(
+    current_user: User = Depends(get_current_admin_user)
+):
+    """Limpa o buffer de statements lentos (ex.: antes de medir uma mudanca)."""
+    slow_queries.clear()
+    return {"message": "Buffer de queries lentas limpo"}
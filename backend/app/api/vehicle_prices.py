@@ -10,14 +10,18 @@ from decimal import Decimal
 import logging
 import csv
 import io
+import mimetypes
+
+from celery.result import AsyncResult
 
 from app.core.database import get_db
-from app.models import VehiclePriceBank, Setting, File
-from app.models.file import FileType
+from app.models import VehiclePriceBank, Setting
 from app.services.fipe_client import FipeClient
 from app.services.fipe_screenshot import capture_fipe_screenshot
+from app.services.vehicle_price_refresh import api_vehicle_type, apply_fipe_price, attach_screenshot
+from app.tasks.celery_app import celery_app
+from app.tasks.scheduled_tasks import capture_missing_fipe_screenshots, refresh_vehicle_prices
 from app.core.config import settings
-import hashlib
 import os
 
 logger = logging.getLogger(__name__)
@@ -120,12 +124,23 @@ class RefreshPriceResponse(BaseModel):
 
 
 class BulkRefreshResponse(BaseModel):
+    reference_month: Optional[str] = None
     total: int
+    pending: int = 0
+    skipped: int = 0
+    processed: int = 0
     success_count: int
     error_count: int
     errors: List[str] = []
 
 
+class BulkRefreshJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued, pending, progress, success, failure
+    progress: Optional[BulkRefreshResponse] = None
+    error: Optional[str] = None
+
+
 # ============= Endpoints =============
 
 @router.get("", response_model=VehiclePriceListResponse)
@@ -333,10 +348,8 @@ async def refresh_vehicle_price(
 
         # Converter vehicle_type de inteiro para string se necessário
         # Dados legados podem ter "1", "2", "3" em vez de "cars", "motorcycles", "trucks"
-        vehicle_type_map = {"1": "cars", "2": "motorcycles", "3": "trucks"}
-        vehicle_type = vehicle.vehicle_type
-        if vehicle_type in vehicle_type_map:
-            vehicle_type = vehicle_type_map[vehicle_type]
+        vehicle_type = api_vehicle_type(vehicle)
+        if vehicle_type != vehicle.vehicle_type:
             logger.info(f"Converted vehicle_type from '{vehicle.vehicle_type}' to '{vehicle_type}'")
 
         result = await fipe_client.refresh_price(
@@ -354,28 +367,7 @@ async def refresh_vehicle_price(
 
         # Atualizar registro
         price_data = result.price
-
-        # Extrair valor numérico do preço
-        price_str = price_data.price.replace("R$", "").replace(".", "").replace(",", ".").strip()
-        new_price = Decimal(price_str)
-
-        # Converter referenceMonth para date (ex: "dezembro de 2024" -> 2024-12-01)
-        ref_date = _parse_reference_month(price_data.referenceMonth)
-
-        vehicle.price_value = new_price
-        vehicle.reference_month = price_data.referenceMonth
-        vehicle.reference_date = ref_date
-        vehicle.last_api_call = datetime.utcnow()
-        vehicle.api_response_json = {
-            "price": price_data.price,
-            "brand": price_data.brand,
-            "model": price_data.model,
-            "modelYear": price_data.modelYear,
-            "fuel": price_data.fuel,
-            "codeFipe": price_data.codeFipe,
-            "referenceMonth": price_data.referenceMonth,
-            "vehicleType": price_data.vehicleType
-        }
+        new_price = apply_fipe_price(vehicle, price_data)
 
         # Capturar screenshot se não tiver ou sempre atualizar
         screenshot_captured = False
@@ -396,27 +388,7 @@ async def refresh_vehicle_price(
             if screenshot_path:
                 logger.info(f"Screenshot FIPE capturado: {screenshot_path}")
 
-                # Calcular hash do arquivo
-                def _calculate_sha256(file_path: str) -> str:
-                    sha256_hash = hashlib.sha256()
-                    with open(file_path, "rb") as f:
-                        for byte_block in iter(lambda: f.read(4096), b""):
-                            sha256_hash.update(byte_block)
-                    return sha256_hash.hexdigest()
-
-                # Criar registro de File para o screenshot
-                screenshot_file = File(
-                    type=FileType.SCREENSHOT,
-                    mime_type="image/png",
-                    storage_path=screenshot_path,
-                    sha256=_calculate_sha256(screenshot_path)
-                )
-                db.add(screenshot_file)
-                db.flush()
-
-                vehicle.screenshot_file_id = screenshot_file.id
-                vehicle.screenshot_path = screenshot_path
-                vehicle.has_screenshot = True
+                screenshot_file = attach_screenshot(db, vehicle, screenshot_path)
                 screenshot_captured = True
                 logger.info(f"Screenshot registrado: file_id={screenshot_file.id}")
 
@@ -467,10 +439,7 @@ async def retry_vehicle_screenshot(
 
     try:
         # Converter vehicle_type se necessário
-        vehicle_type_map = {"1": "cars", "2": "motorcycles", "3": "trucks"}
-        vehicle_type = vehicle.vehicle_type
-        if vehicle_type in vehicle_type_map:
-            vehicle_type = vehicle_type_map[vehicle_type]
+        vehicle_type = api_vehicle_type(vehicle)
 
         logger.info(f"Retry screenshot FIPE para {vehicle.vehicle_name} (ID: {vehicle_id})...")
 
@@ -485,27 +454,7 @@ async def retry_vehicle_screenshot(
         if screenshot_path:
             logger.info(f"Screenshot FIPE capturado: {screenshot_path}")
 
-            # Calcular hash do arquivo
-            def _calculate_sha256(file_path: str) -> str:
-                sha256_hash = hashlib.sha256()
-                with open(file_path, "rb") as f:
-                    for byte_block in iter(lambda: f.read(4096), b""):
-                        sha256_hash.update(byte_block)
-                return sha256_hash.hexdigest()
-
-            # Criar registro de File para o screenshot
-            screenshot_file = File(
-                type=FileType.SCREENSHOT,
-                mime_type="image/png",
-                storage_path=screenshot_path,
-                sha256=_calculate_sha256(screenshot_path)
-            )
-            db.add(screenshot_file)
-            db.flush()
-
-            vehicle.screenshot_file_id = screenshot_file.id
-            vehicle.screenshot_path = screenshot_path
-            vehicle.has_screenshot = True
+            screenshot_file = attach_screenshot(db, vehicle, screenshot_path)
             db.commit()
 
             logger.info(f"Screenshot registrado: file_id={screenshot_file.id}")
@@ -532,6 +481,16 @@ async def retry_vehicle_screenshot(
         )
 
 
+@router.post("/screenshots/capture-missing")
+def capture_missing_screenshots(limit: int = Query(100, ge=1, le=1000)):
+    """
+    Captura em segundo plano os screenshots FIPE pendentes (veículos sem comprovação),
+    reaproveitando uma única sessão do portal FIPE para toda a fila.
+    """
+    task = capture_missing_fipe_screenshots.delay(limit=limit)
+    return {"status": "queued", "job_id": task.id}
+
+
 @router.get("/{vehicle_id}/screenshot")
 async def get_vehicle_screenshot(
     vehicle_id: int,
@@ -552,111 +511,47 @@ async def get_vehicle_screenshot(
     if not os.path.exists(vehicle.screenshot_path):
         raise HTTPException(status_code=404, detail="Arquivo de screenshot nao encontrado")
 
+    extension = os.path.splitext(vehicle.screenshot_path)[1] or ".png"
     return FileResponse(
         vehicle.screenshot_path,
-        media_type="image/png",
-        filename=f"fipe_{vehicle.codigo_fipe}_{vehicle.year_model}.png"
+        media_type=mimetypes.guess_type(vehicle.screenshot_path)[0] or "image/png",
+        filename=f"fipe_{vehicle.codigo_fipe}_{vehicle.year_model}{extension}"
     )
 
 
-@router.post("/refresh-all", response_model=BulkRefreshResponse)
-async def refresh_all_prices(
+@router.post("/refresh-all", response_model=BulkRefreshJobResponse)
+def refresh_all_prices(
     vehicle_type: Optional[str] = None,
     brand_name: Optional[str] = None,
-    db: Session = Depends(get_db)
+    force: bool = Query(False, description="Atualizar também veículos já no mês de referência vigente")
 ):
     """
     Atualiza o preço de todos os veículos (ou filtrados) no banco de preços.
 
-    ATENÇÃO: Esta operação pode demorar e consumir muitas chamadas API.
-    Recomenda-se usar filtros para limitar o escopo.
+    Executa em segundo plano (task refresh_vehicle_prices): consultas concorrentes
+    limitadas pelo rate limit da API FIPE, commits em blocos e veículos já no mês
+    de referência vigente ignorados. Acompanhe por /refresh-all/jobs/{job_id}.
     """
-    query = db.query(VehiclePriceBank)
+    task = refresh_vehicle_prices.delay(vehicle_type=vehicle_type, brand_name=brand_name, force=force)
+    return BulkRefreshJobResponse(job_id=task.id, status="queued")
 
-    if vehicle_type:
-        query = query.filter(VehiclePriceBank.vehicle_type == vehicle_type)
 
-    if brand_name:
-        query = query.filter(VehiclePriceBank.brand_name.ilike(f"%{brand_name}%"))
+@router.get("/refresh-all/jobs/{job_id}", response_model=BulkRefreshJobResponse)
+def get_refresh_all_job(job_id: str):
+    """Consulta o andamento de uma atualização em lote"""
+    result = AsyncResult(job_id, app=celery_app)
 
-    vehicles = query.all()
-    total = len(vehicles)
-
-    if total == 0:
-        return BulkRefreshResponse(
-            total=0,
-            success_count=0,
-            error_count=0
-        )
-
-    if total > 50:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Muitos veículos para atualizar ({total}). Use filtros para reduzir para no máximo 50."
-        )
-
-    success_count = 0
-    error_count = 0
-    errors = []
-
-    fipe_client = FipeClient()
-
-    # Mapa para converter vehicle_type legado
-    vehicle_type_map = {"1": "cars", "2": "motorcycles", "3": "trucks"}
-
-    for vehicle in vehicles:
-        try:
-            # Converter vehicle_type de inteiro para string se necessário
-            vehicle_type = vehicle.vehicle_type
-            if vehicle_type in vehicle_type_map:
-                vehicle_type = vehicle_type_map[vehicle_type]
-
-            result = await fipe_client.refresh_price(
-                vehicle_type=vehicle_type,
-                brand_id=str(vehicle.brand_id),
-                model_id=str(vehicle.model_id),
-                year_id=vehicle.year_id
-            )
-
-            if result.success:
-                price_data = result.price
-                price_str = price_data.price.replace("R$", "").replace(".", "").replace(",", ".").strip()
-                new_price = Decimal(price_str)
-                ref_date = _parse_reference_month(price_data.referenceMonth)
-
-                vehicle.price_value = new_price
-                vehicle.reference_month = price_data.referenceMonth
-                vehicle.reference_date = ref_date
-                vehicle.last_api_call = datetime.utcnow()
-                vehicle.api_response_json = {
-                    "price": price_data.price,
-                    "brand": price_data.brand,
-                    "model": price_data.model,
-                    "modelYear": price_data.modelYear,
-                    "fuel": price_data.fuel,
-                    "codeFipe": price_data.codeFipe,
-                    "referenceMonth": price_data.referenceMonth,
-                    "vehicleType": price_data.vehicleType
-                }
-                success_count += 1
-            else:
-                error_count += 1
-                errors.append(f"{vehicle.vehicle_name}: {result.error_message}")
-
-        except Exception as e:
-            error_count += 1
-            errors.append(f"{vehicle.vehicle_name}: {str(e)}")
-
-    db.commit()
-
-    logger.info(f"Atualização em lote: {success_count}/{total} veículos atualizados, {error_count} erros")
-
-    return BulkRefreshResponse(
-        total=total,
-        success_count=success_count,
-        error_count=error_count,
-        errors=errors[:10]  # Limitar a 10 erros no response
-    )
+    response = BulkRefreshJobResponse(job_id=job_id, status=result.state.lower())
+    if result.state == "PROGRESS" and isinstance(result.info, dict):
+        response.progress = BulkRefreshResponse(**result.info)
+    elif result.successful():
+        if result.result.get("success"):
+            response.progress = BulkRefreshResponse(**result.result)
+        else:
+            response.error = result.result.get("error")
+    elif result.failed():
+        response.error = str(result.result)
+    return response
 
 
 @router.get("/filters/brands", response_model=List[str])
@@ -767,27 +662,3 @@ def export_vehicle_prices_csv(
             "Content-Type": "text/csv; charset=utf-8"
         }
     )
-
-
-# ============= Helpers =============
-
-def _parse_reference_month(reference_month: str) -> date:
-    """
-    Converte string de mês de referência para date.
-    Ex: "dezembro de 2024" -> date(2024, 12, 1)
-    """
-    months_map = {
-        "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3,
-        "abril": 4, "maio": 5, "junho": 6,
-        "julho": 7, "agosto": 8, "setembro": 9,
-        "outubro": 10, "novembro": 11, "dezembro": 12
-    }
-
-    try:
-        parts = reference_month.lower().replace(" de ", " ").split()
-        month_name = parts[0]
-        year = int(parts[1])
-        month = months_map.get(month_name, 1)
-        return date(year, month, 1)
-    except Exception:
-        return date.today().replace(day=1)
@@ -6,8 +6,10 @@ from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.database import get_async_db, get_db
 from app.core.config import settings
 from app.models.user import User, UserRole
 
@@ -48,13 +50,9 @@ def decode_access_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obtém o usuário atual a partir do token JWT"""
-    token = credentials.credentials
-    payload = decode_access_token(token)
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> int:
+    """Valida o token JWT e retorna o id do usuário (sub)"""
+    payload = decode_access_token(credentials.credentials)
 
     user_id: int = payload.get("sub")
     if user_id is None:
@@ -63,8 +61,11 @@ async def get_current_user(
             detail="Token inválido",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return user_id
+
 
-    user = db.query(User).filter(User.id == user_id).first()
+def _check_user(user: Optional[User]) -> User:
+    """Rejeita usuário inexistente ou inativo"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -80,6 +81,31 @@ async def get_current_user(
     return user
 
 
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Obtém o usuário atual a partir do token JWT.
+
+    Função síncrona (def): o FastAPI a executa no threadpool, então a consulta
+    não bloqueia o event loop. Endpoints async que usam get_async_db devem usar
+    get_current_user_async, para não ocupar também uma conexão do pool síncrono.
+    """
+    user_id = _user_id_from_credentials(credentials)
+    return _check_user(db.query(User).filter(User.id == user_id).first())
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Como get_current_user, na AsyncSession do endpoint (mesma sessão do get_async_db)"""
+    user_id = _user_id_from_credentials(credentials)
+    user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+    return _check_user(user)
+
+
 async def get_current_admin_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -93,7 +119,7 @@ async def get_current_admin_user(
 
 
 # Dependência opcional (permite acesso sem autenticação se não houver token)
-async def get_current_user_optional(
+def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
 ) -> Optional[User]:
@@ -102,6 +128,6 @@ async def get_current_user_optional(
         return None
 
     try:
-        return await get_current_user(credentials, db)
+        return get_current_user(credentials, db)
     except HTTPException:
         return None
@@ -24,6 +24,71 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     SECRET_KEY: str
 
+    # Envio de resultados de inventário ao ASI
+    ASI_UPLOAD_CHUNK_SIZE: int = 0  # Bens por requisição (0 = envio único; lotes são opt-in)
+    ASI_UPLOAD_MAX_CONCURRENCY: int = 3  # Lotes enviados em paralelo
+
+    # Pool de conexões com o banco, por papel do processo (api | worker | beat).
+    # Sem PROCESS_ROLE o papel é detectado pela linha de comando (celery worker/beat).
+    PROCESS_ROLE: Optional[str] = None
+    DB_POOL_SIZE_API: int = 10
+    DB_MAX_OVERFLOW_API: int = 20
+    DB_POOL_SIZE_WORKER: int = 2  # Por processo filho do Celery (prefork)
+    DB_MAX_OVERFLOW_WORKER: int = 3
+    DB_POOL_SIZE_BEAT: int = 1
+    DB_MAX_OVERFLOW_BEAT: int = 1
+    DB_POOL_TIMEOUT: int = 30  # Segundos aguardando uma conexão livre
+    DB_POOL_RECYCLE: int = 1800  # Recicla conexões com mais de 30 min
+    DB_POOL_PRE_PING: bool = True
+    # Timeout de statements (ms, 0 = sem limite)
+    DB_STATEMENT_TIMEOUT_MS_API: int = 30000
+    DB_STATEMENT_TIMEOUT_MS_WORKER: int = 300000
+    DB_STATEMENT_TIMEOUT_MS_BEAT: int = 120000
+    # Modo compatível com PgBouncer em transaction pooling: sem cache de
+    # prepared statements e sem parâmetros de sessão na conexão
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+
+    # Profiler de queries (ver app/core/query_profiler.py)
+    SLOW_QUERY_MS: int = 200  # Statements acima disso vão para o buffer de lentos
+    SLOW_QUERY_BUFFER_SIZE: int = 500
+    N_PLUS_ONE_THRESHOLD: int = 10  # Repetições do mesmo statement numa requisição
+
+    # API FIPE (fipe.parallelum.com.br) e catálogo espelhado localmente
+    FIPE_API_TOKEN: Optional[str] = None  # X-Subscription-Token (limites maiores)
+    FIPE_CATALOG_CONCURRENCY: int = 4  # Requisições simultâneas na carga do catálogo
+    FIPE_CATALOG_RECENT_YEARS: int = 2  # Anos-modelo mais recentes sempre recarregados no delta
+    FIPE_REFRESH_CONCURRENCY: int = 4  # Consultas de preço simultâneas na atualização em lote
+    FIPE_REFRESH_RATE_PER_SECOND: float = 5.0  # Teto de requisições/s à API na atualização em lote
+    FIPE_REFRESH_CHUNK_SIZE: int = 200  # Veículos por commit na atualização em lote
+
+    # Payloads de integration_logs mais antigos que isso vão para arquivos comprimidos
+    INTEGRATION_LOG_ARCHIVE_DAYS: int = 90
+
+    # Screenshots endereçados por conteúdo (STORAGE_PATH/evidence): carência antes de
+    # remover um blob sem referências (ver services/evidence_store.py)
+    EVIDENCE_GC_GRACE_HOURS: int = 24
+
+    # Pipeline pós-captura dos screenshots (ver services/screenshot_pipeline.py)
+    SCREENSHOT_FORMAT: str = "webp"  # webp, jpeg ou png (sem recompressão)
+    SCREENSHOT_QUALITY: int = 80  # Qualidade WebP/JPEG (1-100)
+    SCREENSHOT_PDF_DPI: int = 150  # Resolução da variante reduzida para o quadro A4 do PDF
+    SCREENSHOT_PIPELINE_WORKERS: int = 2  # Threads do pool de processamento de imagem
+    SCREENSHOT_READER_CACHE_SIZE: int = 64  # ImageReaders do ReportLab mantidos entre gerações de PDF
+
+    # Imagens de entrada preparadas para o OCR da IA (ver services/image_preprocessing.py)
+    AI_IMAGE_JPEG_QUALITY: int = 85  # Qualidade JPEG após orientação/redução
+    AI_IMAGE_CACHE_DAYS: int = 30  # Imagens preparadas sem uso há mais que isso saem do cache
+
+    # URL pública das imagens do Google Lens (ver services/lens_image_host.py)
+    LENS_IMAGE_HOST: str = "auto"  # auto, local, s3 ou imgbb
+    BACKEND_PUBLIC_URL: Optional[str] = None  # Base acessível pela SerpAPI (provedor local)
+    LENS_IMAGE_URL_TTL_SECONDS: int = 600  # Validade das URLs assinadas/pré-assinadas
+    LENS_S3_ENDPOINT_URL: Optional[str] = None  # Ex: http://minio:9000 (vazio = AWS)
+    LENS_S3_BUCKET: str = "lens-images"
+    LENS_S3_ACCESS_KEY: Optional[str] = None
+    LENS_S3_SECRET_KEY: Optional[str] = None
+    LENS_S3_REGION: str = "us-east-1"
+
     class Config:
         env_file = ".env"
         case_sensitive = True
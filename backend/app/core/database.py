@@ -1,9 +1,137 @@
-from sqlalchemy import create_engine
+import sys
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .config import settings
+from .query_profiler import instrument_engine
+
+
+def detect_process_role() -> str:
+    """Papel do processo (api | worker | beat): PROCESS_ROLE ou linha de comando"""
+    if settings.PROCESS_ROLE:
+        return settings.PROCESS_ROLE.lower()
+    argv = [arg.lower() for arg in sys.argv]
+    if any("celery" in arg for arg in argv):
+        return "beat" if "beat" in argv else "worker"
+    return "api"
+
+
+PROCESS_ROLE = detect_process_role()
+
+
+def _role_setting(name: str) -> Any:
+    """Lê <name>_<PAPEL> das configurações (API como padrão para papéis desconhecidos)"""
+    return getattr(settings, f"{name}_{PROCESS_ROLE.upper()}", getattr(settings, f"{name}_API"))
+
+
+# ===== Métricas do pool =====
+
+class PoolStats:
+    """Tempo de espera por checkout de conexão (thread-safe, por processo)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 2) if self.checkouts else 0.0,
+                "checkout_wait_max_ms": round(self.wait_max * 1000, 2),
+            }
+
+
+pool_stats = {"sync": PoolStats(), "async": PoolStats()}
+
+
+class _InstrumentedPoolMixin:
+    """Mede o tempo de Pool.connect() (espera por conexão livre + abertura)"""
+    stats_key = "sync"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            pool_stats[self.stats_key].record_timeout()
+            raise
+        pool_stats[self.stats_key].record_checkout(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    stats_key = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+
+# ===== Configuração dos engines =====
+
+def _engine_options(url: str, poolclass: type) -> Dict[str, Any]:
+    """Parâmetros de pool para PostgreSQL (outros bancos usam os padrões)"""
+    if not url.startswith("postgres"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": _role_setting("DB_POOL_SIZE"),
+        "max_overflow": _role_setting("DB_MAX_OVERFLOW"),
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _set_local_statement_timeout(sync_engine: Engine, timeout_ms: int) -> None:
+    """
+    Timeout por transação (SET LOCAL): atrás do PgBouncer em transaction
+    pooling, parâmetros de sessão vazariam para outros clientes.
+    """
+    @event.listens_for(sync_engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _create_sync_engine() -> Engine:
+    url = settings.DATABASE_URL
+    options = _engine_options(url, InstrumentedQueuePool)
+    timeout_ms = _role_setting("DB_STATEMENT_TIMEOUT_MS")
+
+    if options and timeout_ms and not settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(timeout_ms)}"}
+
+    sync_engine = create_engine(url, **options)
+    if options and timeout_ms and settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        _set_local_statement_timeout(sync_engine, timeout_ms)
+    instrument_engine(sync_engine)
+    return sync_engine
+
+
+engine = _create_sync_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -15,3 +143,109 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ===== Camada assíncrona (asyncpg) =====
+# Usada pelos endpoints async def: as consultas não bloqueiam o event loop.
+# O engine é criado no primeiro uso para que processos que não usam a camada
+# assíncrona (workers Celery, scripts, testes) não dependam do driver.
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def async_database_url(url: str) -> str:
+    """Converte a DATABASE_URL síncrona para o driver assíncrono equivalente"""
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _create_async_engine() -> AsyncEngine:
+    url = async_database_url(settings.DATABASE_URL)
+    options = _engine_options(url, InstrumentedAsyncQueuePool)
+    timeout_ms = _role_setting("DB_STATEMENT_TIMEOUT_MS")
+
+    if options:
+        if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+            # Prepared statements ficam presos à conexão do servidor, que o
+            # PgBouncer troca a cada transação: desativa os caches e usa nomes únicos
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            }
+        elif timeout_ms:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(int(timeout_ms))}}
+
+    async_engine = create_async_engine(url, **options)
+    if options and timeout_ms and settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        _set_local_statement_timeout(async_engine.sync_engine, timeout_ms)
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = _create_async_engine()
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # expire_on_commit=False: atributos continuam acessíveis após commit
+        # sem lazy load (não permitido fora de await)
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def dispose_engines_after_fork() -> None:
+    """
+    Descarta conexões herdadas do processo pai (Celery prefork): cada processo
+    filho abre seu próprio pool.
+    """
+    global _async_engine, _async_session_factory
+    engine.dispose(close=False)
+    _async_engine = None
+    _async_session_factory = None
+
+
+def get_pool_status() -> Dict[str, Any]:
+    """Configuração e uso dos pools deste processo"""
+    pools = {"sync": engine.pool}
+    if _async_engine is not None:
+        pools["async"] = _async_engine.pool
+
+    status = {
+        "role": PROCESS_ROLE,
+        "pgbouncer_transaction_mode": settings.DB_PGBOUNCER_TRANSACTION_MODE,
+        "statement_timeout_ms": _role_setting("DB_STATEMENT_TIMEOUT_MS"),
+        "pools": {},
+    }
+    for key, pool in pools.items():
+        info = {"pool_class": type(pool).__name__, **pool_stats[key].snapshot()}
+        if isinstance(pool, QueuePool):
+            info.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),  # Negativo = pool ainda não preenchido
+                "pool_timeout": pool.timeout(),
+            })
+        status["pools"][key] = info
+    return status
@@ -0,0 +1,76 @@
+"""
+Utilitários de paginação: cursores para paginação keyset e contagem
+estimada (pelo planejador do PostgreSQL) para listagens grandes.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+# Modos de contagem do total nas listagens
+COUNT_EXACT = "exact"
+COUNT_ESTIMATED = "estimated"
+COUNT_NONE = "none"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Cursor opaco (base64 URL-safe) para a posição (created_at, id)"""
+    payload = json.dumps([created_at.isoformat(), row_id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decodifica um cursor gerado por encode_cursor. ValueError se inválido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) de um SELECT, com os parâmetros tratados pelo dialeto"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def estimate_count(db: Session, statement) -> Optional[int]:
+    """
+    Total estimado de linhas do SELECT, segundo as estatísticas do planejador.
+    Custo constante (não executa a consulta); None fora do PostgreSQL.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    plan = db.execute(_Explain(statement)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_rows(db: Session, statement, mode: str = COUNT_EXACT) -> Tuple[Optional[int], bool]:
+    """
+    Total de linhas do SELECT conforme o modo (exact | estimated | none).
+    Retorna (total, is_estimate); a estimativa cai para contagem exata
+    quando não está disponível.
+    """
+    if mode == COUNT_NONE:
+        return None, False
+    if mode == COUNT_ESTIMATED:
+        estimate = estimate_count(db, statement)
+        if estimate is not None:
+            return estimate, True
+    total: Any = db.execute(select(func.count()).select_from(statement.order_by(None).subquery())).scalar()
+    return total, False
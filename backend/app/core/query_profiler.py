@@ -0,0 +1,187 @@
+"""
+Instrumentação de queries SQLAlchemy.
+
+- Contagem de queries e tempo total de banco por requisição HTTP
+  (registrados no log estruturado do middleware log_requests)
+- Detecção de statements repetidos na mesma requisição (padrão N+1)
+- Buffer circular com os statements lentos mais recentes, agregados
+  por statement para o endpoint administrativo de system_health
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.logging import log_database_query
+
+logger = logging.getLogger("app.db")
+
+# Tamanho máximo do statement guardado no buffer / log
+STATEMENT_MAX_LENGTH = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """Statement compacto (espaços colapsados e truncado) para agrupamento"""
+    return _WHITESPACE.sub(" ", statement).strip()[:STATEMENT_MAX_LENGTH]
+
+
+class RequestQueryStats:
+    """Queries executadas durante uma requisição"""
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.statements[statement] += 1
+
+    def as_log(self) -> Dict[str, Any]:
+        """Campos para o log estruturado da requisição"""
+        with self._lock:
+            data = {
+                "query_count": self.count,
+                "db_time_ms": round(self.total_ms, 2),
+            }
+            if self.statements:
+                statement, repeats = self.statements.most_common(1)[0]
+                if repeats >= settings.N_PLUS_ONE_THRESHOLD:
+                    data["repeated_statement"] = {"statement": statement, "count": repeats}
+            return data
+
+
+class SlowQueryBuffer:
+    """Buffer circular (thread-safe) dos statements lentos mais recentes"""
+
+    def __init__(self, maxlen: int):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries.append(entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._entries)[-limit:][::-1]
+
+    def top_offenders(self, limit: int) -> List[Dict[str, Any]]:
+        """Statements agrupados, ordenados pelo tempo total acumulado"""
+        with self._lock:
+            entries = list(self._entries)
+
+        grouped: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            group = grouped.setdefault(entry["statement"], {
+                "statement": entry["statement"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "paths": Counter(),
+                "last_seen": None,
+            })
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            if entry["path"]:
+                group["paths"][entry["path"]] += 1
+            group["last_seen"] = entry["timestamp"]
+
+        offenders = sorted(grouped.values(), key=lambda g: g["total_ms"], reverse=True)[:limit]
+        return [
+            {
+                **offender,
+                "total_ms": round(offender["total_ms"], 2),
+                "avg_ms": round(offender["total_ms"] / offender["count"], 2),
+                "max_ms": round(offender["max_ms"], 2),
+                "paths": [path for path, _ in offender["paths"].most_common(5)],
+            }
+            for offender in offenders
+        ]
+
+
+_current_request: ContextVar[Optional[RequestQueryStats]] = ContextVar("query_stats", default=None)
+
+slow_queries = SlowQueryBuffer(settings.SLOW_QUERY_BUFFER_SIZE)
+
+
+def start_request(method: str, path: str) -> RequestQueryStats:
+    """
+    Inicia a contagem para a requisição atual. O objeto é compartilhado com
+    o threadpool (endpoints def) porque o contexto é copiado, não isolado.
+    """
+    stats = RequestQueryStats(method, path)
+    _current_request.set(stats)
+    return stats
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    duration_ms = (time.perf_counter() - started) * 1000
+    normalized = normalize_statement(statement)
+
+    stats = _current_request.get()
+    if stats is not None:
+        stats.record(normalized, duration_ms)
+
+    if duration_ms >= settings.SLOW_QUERY_MS:
+        slow_queries.add({
+            "statement": normalized,
+            "duration_ms": round(duration_ms, 2),
+            "path": f"{stats.method} {stats.path}" if stats else None,
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+        })
+
+    if logger.isEnabledFor(logging.DEBUG):
+        log_database_query(
+            logger,
+            normalized,
+            duration_ms=round(duration_ms, 2),
+            rows_affected=cursor.rowcount if cursor is not None else None
+        )
+
+
+def _handle_error(exception_context):
+    """
+    Statement que falhou não passa por after_cursor_execute: descarta o início
+    empilhado, senão as próximas medições da conexão (reaproveitada pelo pool)
+    seriam pareadas com o horário errado.
+    """
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return  # Falha fora da execução de um statement (ex: conexão): nada foi empilhado
+    starts = conn.info.get("query_start_time")
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra os eventos de cursor no engine (síncrono ou engine.sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
@@ -8,6 +8,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from app.api import quotes, settings, clients, projects, materials, project_config, users, financial, blocked_domains, financial_v2, batch_quotes, debug_serpapi, vehicle_prices, rfid, reading_sessions, system_health, external_systems, inventory_sessions, inventory_reports
 from app.core.database import engine, Base
 from app.core.logging import setup_logging
+from app.core.query_profiler import start_request
 import logging
 import time
 import os
@@ -78,6 +79,7 @@ logger.info("CORS configured: allow all origins with error handling")
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
+    query_stats = start_request(request.method, request.url.path)
 
     response = await call_next(request)
 
@@ -92,6 +94,7 @@ async def log_requests(request: Request, call_next):
                 'status_code': response.status_code,
                 'duration_ms': round(duration_ms, 2)
             },
+            'database': query_stats.as_log(),
             'ip_address': request.client.host if request.client else None
         }
     )
@@ -29,8 +29,9 @@ from .project_config import ProjectConfigVersion, ProjectBankPrice
 from .user import User, UserRole
 from .financial import ApiCostConfig, FinancialTransaction
 from .blocked_domain import BlockedDomain
-from .integration_log import IntegrationLog
+from .integration_log import IntegrationLog, IntegrationCostDaily
 from .vehicle_price import VehiclePriceBank
+from .fipe_catalog import FipeCatalogReference, FipeCatalogBrand, FipeCatalogModel, FipeCatalogModelYear
 from .rfid_tag import RfidTag, RfidTagBatch
 from .reading_session import ReadingSession, SessionReading, ReadingType, SessionStatus
 
@@ -53,6 +54,8 @@ from .inventory_session import (
     InventoryExpectedAsset,
     InventoryReadAsset,
     InventorySyncLog,
+    InventorySessionCounter,
+    CounterDimension,
     AssetCategory,
     ReadMethod,
     PhysicalCondition,
@@ -93,7 +96,12 @@ __all__ = [
     "FinancialTransaction",
     "BlockedDomain",
     "IntegrationLog",
+    "IntegrationCostDaily",
     "VehiclePriceBank",
+    "FipeCatalogReference",
+    "FipeCatalogBrand",
+    "FipeCatalogModel",
+    "FipeCatalogModelYear",
     "RfidTag",
     "RfidTagBatch",
     "ReadingSession",
@@ -116,6 +124,8 @@ __all__ = [
     "InventoryExpectedAsset",
     "InventoryReadAsset",
     "InventorySyncLog",
+    "InventorySessionCounter",
+    "CounterDimension",
     "AssetCategory",
     "ReadMethod",
     "PhysicalCondition",
@@ -3,7 +3,7 @@ Models para Sistemas Externos e Dados Mestres de Inventário
 """
 from sqlalchemy import (
     Column, Integer, String, Text, DateTime, ForeignKey,
-    Boolean, Numeric, Enum as SQLEnum
+    Boolean, Numeric, UniqueConstraint, Enum as SQLEnum
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -119,12 +119,16 @@ class ExternalSystem(Base):
 class InventoryMasterUG(Base):
     """Unidade Gestora - sincronizada do sistema externo"""
     __tablename__ = "inventory_master_ug"
+    __table_args__ = (
+        UniqueConstraint("external_system_id", "code", name="uq_ug_system_code"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     external_system_id = Column(Integer, ForeignKey("external_systems.id", ondelete="CASCADE"), nullable=False)
     code = Column(String(50), nullable=False, index=True)
     name = Column(String(200), nullable=False)
     extra_data = Column(JSONB, default={})
+    content_hash = Column(String(64), nullable=True)  # sha256 do conteúdo sincronizado
     synced_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -135,6 +139,9 @@ class InventoryMasterUG(Base):
 class InventoryMasterUL(Base):
     """Unidade Local - sincronizada do sistema externo"""
     __tablename__ = "inventory_master_ul"
+    __table_args__ = (
+        UniqueConstraint("external_system_id", "code", name="uq_ul_system_code"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     external_system_id = Column(Integer, ForeignKey("external_systems.id", ondelete="CASCADE"), nullable=False)
@@ -145,6 +152,7 @@ class InventoryMasterUL(Base):
     longitude = Column(Numeric(11, 8), nullable=True)
     radius_meters = Column(Integer, default=100)
     extra_data = Column(JSONB, default={})
+    content_hash = Column(String(64), nullable=True)  # sha256 do conteúdo sincronizado
     synced_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -173,12 +181,16 @@ class InventoryMasterUA(Base):
 class InventoryMasterPhysicalStatus(Base):
     """Situação Física de Bens - sincronizada do sistema externo"""
     __tablename__ = "inventory_master_physical_status"
+    __table_args__ = (
+        UniqueConstraint("external_system_id", "code", name="uq_physical_status_system_code"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     external_system_id = Column(Integer, ForeignKey("external_systems.id", ondelete="CASCADE"), nullable=False)
     code = Column(String(20), nullable=False)
     name = Column(String(100), nullable=False)
     description = Column(Text, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 do conteúdo sincronizado
     synced_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -188,6 +200,9 @@ class InventoryMasterPhysicalStatus(Base):
 class InventoryMasterCharacteristic(Base):
     """Características de Bens - sincronizada do sistema externo"""
     __tablename__ = "inventory_master_characteristics"
+    __table_args__ = (
+        UniqueConstraint("external_system_id", "code", name="uq_characteristics_system_code"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     external_system_id = Column(Integer, ForeignKey("external_systems.id", ondelete="CASCADE"), nullable=False)
@@ -196,6 +211,7 @@ class InventoryMasterCharacteristic(Base):
     type = Column(String(30), nullable=True)  # text, number, date, list
     required = Column(Boolean, default=False)
     options = Column(JSONB, nullable=True)
+    content_hash = Column(String(64), nullable=True)  # sha256 do conteúdo sincronizado
     synced_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -214,6 +230,8 @@ class InventoryMasterSyncLog(Base):
     items_created = Column(Integer, default=0)
     items_updated = Column(Integer, default=0)
     items_failed = Column(Integer, default=0)
+    items_unchanged = Column(Integer, default=0)  # Ignorados (hash de conteúdo igual)
+    rows_per_second = Column(Numeric(12, 1), nullable=True)  # Vazão do processamento
     error_message = Column(Text, nullable=True)
     details = Column(JSONB, nullable=True)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -18,6 +18,8 @@ class File(Base):
     mime_type = Column(String(100), nullable=True)
     storage_path = Column(String(500), nullable=False)
     sha256 = Column(String(64), nullable=True, index=True)
+    size_bytes = Column(Integer, nullable=True)
+    original_size_bytes = Column(Integer, nullable=True)  # Tamanho capturado, antes da recompressão
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     quote_request_id = Column(Integer, ForeignKey("quote_requests.id"), nullable=True)
@@ -0,0 +1,64 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class FipeCatalogReference(Base):
+    """
+    Mês de referência FIPE espelhado por tipo de veículo (cars, motorcycles, trucks).
+    A task refresh_fipe_catalog só recarrega o catálogo quando a referência muda.
+    """
+    __tablename__ = "fipe_catalog_references"
+
+    vehicle_type = Column(String(20), primary_key=True)
+    reference_code = Column(Integer, nullable=False)  # Código da tabela de referência (API /references)
+    reference_month = Column(String(30), nullable=False)  # Ex: "janeiro de 2026"
+    brands_count = Column(Integer, nullable=False, default=0)
+    models_count = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class FipeCatalogBrand(Base):
+    """Marca do catálogo FIPE espelhado"""
+    __tablename__ = "fipe_catalog_brands"
+    __table_args__ = (
+        UniqueConstraint("vehicle_type", "code", name="uq_fipe_catalog_brand"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    vehicle_type = Column(String(20), nullable=False)
+    code = Column(String(10), nullable=False)
+    name = Column(String(100), nullable=False)
+
+
+class FipeCatalogModel(Base):
+    """Modelo de uma marca no catálogo FIPE espelhado"""
+    __tablename__ = "fipe_catalog_models"
+    __table_args__ = (
+        UniqueConstraint("vehicle_type", "brand_code", "code", name="uq_fipe_catalog_model"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    vehicle_type = Column(String(20), nullable=False)
+    brand_code = Column(String(10), nullable=False)
+    code = Column(String(10), nullable=False)
+    name = Column(String(200), nullable=False)
+
+
+class FipeCatalogModelYear(Base):
+    """
+    Ano-modelo/combustível disponível para um modelo (ex: "2020-1", "2020 Gasolina").
+    Atende as listas anos-por-marca, modelos-por-marca-e-ano e anos-por-modelo.
+    """
+    __tablename__ = "fipe_catalog_model_years"
+    __table_args__ = (
+        UniqueConstraint("vehicle_type", "brand_code", "model_code", "year_code", name="uq_fipe_catalog_model_year"),
+        Index("ix_fipe_catalog_model_years_brand_year", "vehicle_type", "brand_code", "year_code"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    vehicle_type = Column(String(20), nullable=False)
+    brand_code = Column(String(10), nullable=False)
+    model_code = Column(String(10), nullable=False)
+    year_code = Column(String(10), nullable=False)
+    year_name = Column(String(50), nullable=False)
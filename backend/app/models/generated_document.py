@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -8,7 +8,10 @@ class GeneratedDocument(Base):
     __tablename__ = "generated_documents"
 
     id = Column(Integer, primary_key=True, index=True)
-    quote_request_id = Column(Integer, ForeignKey("quote_requests.id"), nullable=False, index=True)
+    quote_request_id = Column(Integer, ForeignKey("quote_requests.id"), nullable=True, index=True)
+    # Relatórios de inventário: sessão + carimbo de versão das leituras (cache)
+    inventory_session_id = Column(Integer, ForeignKey("inventory_sessions.id", ondelete="CASCADE"), nullable=True, index=True)
+    version_stamp = Column(String(64), nullable=True)
     pdf_file_id = Column(Integer, ForeignKey("files.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, JSON, Numeric
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Date, DateTime, ForeignKey, JSON, Numeric, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -7,6 +7,10 @@ from app.core.database import Base
 class IntegrationLog(Base):
     """Log de chamadas para integrações externas (Anthropic, SerpAPI, etc)"""
     __tablename__ = "integration_logs"
+    __table_args__ = (
+        # A chave de partição (created_at) precisa fazer parte do índice único
+        Index("uq_integration_logs_record_key", "record_key", "created_at", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quote_request_id = Column(Integer, ForeignKey("quote_requests.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -28,10 +32,51 @@ class IntegrationLog(Base):
 
     # Comum a ambos
     activity = Column(Text, nullable=True)  # Descrição da atividade
-    request_data = Column(JSON, nullable=True)  # Dados da requisição (opcional)
-    response_summary = Column(JSON, nullable=True)  # Resumo da resposta (opcional)
+    # none_as_null: None vira NULL SQL, não o JSON 'null' (que o arquivamento veria como payload)
+    request_data = Column(JSON(none_as_null=True), nullable=True)  # Dados da requisição (opcional)
+    response_summary = Column(JSON(none_as_null=True), nullable=True)  # Resumo da resposta (opcional)
+    # Arquivo (relativo a STORAGE_PATH/integration_log_archive) com request_data e
+    # response_summary arquivados; ver services/integration_log_archive.py
+    payload_archive = Column(String(255), nullable=True)
+    # Chave de idempotência do registro (uuid gerado ao registrar a chamada): um
+    # lote regravado após falha entre o commit e a limpeza do Redis é ignorado
+    record_key = Column(String(36), nullable=True)
 
+    # No PostgreSQL a tabela é particionada por mês de created_at e a chave
+    # primária física é (id, created_at); id continua único (sequence)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
     # Relationship
     quote_request = relationship("QuoteRequest", back_populates="integration_logs")
+
+
+class IntegrationCostDaily(Base):
+    """
+    Consolidado diário de custos de integração por (dia, cotação, integração).
+    Mantido incrementalmente pelo integration_logger e reconstruído pela task
+    reconcile_integration_cost_rollup; os relatórios financeiros agregam daqui
+    e usam integration_logs apenas para detalhamento.
+    """
+    __tablename__ = "integration_cost_daily"
+    __table_args__ = (
+        UniqueConstraint("day", "quote_request_id", "integration_type", name="uq_integration_cost_daily"),
+        Index("ix_integration_cost_daily_day_type", "day", "integration_type"),
+        Index("ix_integration_cost_daily_project_day", "project_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    quote_request_id = Column(Integer, ForeignKey("quote_requests.id", ondelete="CASCADE"), nullable=False, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id", ondelete="SET NULL"), nullable=True)
+    integration_type = Column(String(50), nullable=False)
+
+    call_count = Column(Integer, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    cost_usd = Column(Numeric(14, 6), nullable=False, default=0)  # IA (SerpAPI é cobrado por chamada)
+    shopping_calls = Column(Integer, nullable=False, default=0)  # SerpAPI google_shopping
+    immersive_calls = Column(Integer, nullable=False, default=0)  # SerpAPI google_immersive_product
+
+    first_call_at = Column(DateTime(timezone=True), nullable=True)
+    last_call_at = Column(DateTime(timezone=True), nullable=True)
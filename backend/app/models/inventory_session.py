@@ -3,7 +3,7 @@ Models para Sessões de Inventário e Bens
 """
 from sqlalchemy import (
     Column, Integer, String, Text, DateTime, ForeignKey,
-    Boolean, Numeric, Enum as SQLEnum
+    Boolean, Numeric, PrimaryKeyConstraint, Enum as SQLEnum
 )
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
@@ -109,6 +109,8 @@ class InventorySession(Base):
     collector_id = Column(String(20), nullable=True)  # ID do coletor/dispositivo
     objective_code = Column(String(20), nullable=True, default='01')  # Código do objetivo
     responsible_code = Column(String(50), nullable=True)  # Código do responsável
+    expected_sync_offset = Column(Integer, nullable=True)  # Próximo registro da carga do ASI (retomada)
+    upload_state = Column(JSONB, nullable=True)  # Estado do envio em lotes ao ASI (retomada)
 
     # Metadados
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
@@ -125,6 +127,7 @@ class InventorySession(Base):
     expected_assets = relationship("InventoryExpectedAsset", back_populates="session", cascade="all, delete-orphan")
     read_assets = relationship("InventoryReadAsset", back_populates="session", cascade="all, delete-orphan")
     sync_logs = relationship("InventorySyncLog", back_populates="session", cascade="all, delete-orphan")
+    counters = relationship("InventorySessionCounter", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
 
     @property
     def total_read(self) -> int:
@@ -182,6 +185,9 @@ class InventoryExpectedAsset(Base):
     # Dados extras do sistema externo
     extra_data = Column(JSONB, default={})
 
+    # Última alteração (invalida o cache do relatório PDF)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
     # Relacionamentos
     session = relationship("InventorySession", back_populates="expected_assets")
     readings = relationship("InventoryReadAsset", back_populates="expected_asset")
@@ -228,6 +234,7 @@ class InventoryReadAsset(Base):
 
     # Timestamp
     read_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Sincronização
     synced = Column(Boolean, default=False)
@@ -263,3 +270,32 @@ class InventorySyncLog(Base):
 
     # Relacionamentos
     session = relationship("InventorySession", back_populates="sync_logs")
+
+
+class CounterDimension(str, enum.Enum):
+    """Dimensões dos contadores materializados da sessão"""
+    EXPECTED = "expected"    # Total de bens esperados (valor fixo "total")
+    CATEGORY = "category"    # Leituras por categoria
+    METHOD = "method"        # Leituras por método de leitura
+    CONDITION = "condition"  # Leituras por situação física
+
+
+class InventorySessionCounter(Base):
+    """
+    Contador Materializado da Sessão
+    Mantido na mesma transação das leituras (ver services/inventory_statistics.py),
+    evitando GROUP BY sobre inventory_read_assets a cada consulta de estatísticas.
+    """
+    __tablename__ = "inventory_session_counters"
+    __table_args__ = (
+        PrimaryKeyConstraint("session_id", "dimension", "value", name="pk_inventory_session_counters"),
+    )
+
+    session_id = Column(Integer, ForeignKey("inventory_sessions.id", ondelete="CASCADE"), nullable=False)
+    dimension = Column(String(20), nullable=False)
+    value = Column(String(50), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Relacionamentos
+    session = relationship("InventorySession", back_populates="counters")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Numeric, Enum as SQLEnum, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Numeric, Enum as SQLEnum, ForeignKey, Computed
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -69,6 +69,15 @@ class QuoteRequest(Base):
     claude_payload_json = Column(JSON, nullable=True)
     search_query_final = Column(Text, nullable=True)
 
+    # Texto de busca do histórico (gerado pelo banco, índice GIN pg_trgm)
+    search_text = Column(
+        Text,
+        Computed(
+            "lower(coalesce(input_text, '') || ' ' || coalesce(claude_payload_json ->> 'nome_canonico', ''))",
+            persisted=True
+        )
+    )
+
     local = Column(String(200), nullable=True)
     pesquisador = Column(String(200), nullable=True)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -46,6 +46,9 @@ class ReadingSession(Base):
     # Tempo de expiração em segundos (padrão 5 minutos)
     timeout_seconds = Column(Integer, default=300)
 
+    # Total de leituras (mantido no insert, evita COUNT em session_readings)
+    readings_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     # Relacionamentos
     user = relationship("User")
     project = relationship("Project")
@@ -57,6 +60,9 @@ class SessionReading(Base):
     Leitura individual dentro de uma sessão.
     """
     __tablename__ = "session_readings"
+    __table_args__ = (
+        UniqueConstraint("session_id", "code", name="uq_session_readings_session_code"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -49,6 +49,7 @@ class VehiclePriceBank(Base):
     screenshot_file_id = Column(Integer, ForeignKey("files.id"), nullable=True)
     screenshot_path = Column(String(500), nullable=True)  # Caminho do screenshot
     has_screenshot = Column(Boolean, default=False, nullable=True)  # Indica se tem screenshot válido
+    screenshot_attempted_at = Column(DateTime(timezone=True), nullable=True)  # Última tentativa de captura em lote
 
     # Relacionamentos
     quote_request = relationship("QuoteRequest", backref="vehicle_prices")
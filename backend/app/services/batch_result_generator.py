@@ -1,15 +1,23 @@
 """
 Gerador de arquivos de resultado para cotacoes em lote.
 Gera ZIP com PDFs e Excel com resumo.
+
+O resumo do Excel vem de uma unica consulta (cotacoes + fontes aceitas) e e
+gravado em streaming com xlsxwriter (constant_memory), com fallback para o
+openpyxl write-only; em generate_batch_results a gravacao roda em paralelo
+com a montagem do ZIP.
 """
 import os
 import zipfile
-import hashlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Iterator, List, Optional
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session, selectinload
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
 
 from app.models import QuoteRequest, QuoteSource, File, GeneratedDocument, Setting
 from app.models.quote_request import QuoteStatus
@@ -18,8 +26,15 @@ from app.models.file import FileType
 from app.models.vehicle_price import VehiclePriceBank
 from app.models.project_config import ProjectConfigVersion
 from app.services.pdf_generator import PDFGenerator
+from app.services.evidence_store import sha256_file
 from app.core.config import settings
 
+try:
+    import xlsxwriter
+    XLSXWRITER_AVAILABLE = True
+except ImportError:
+    XLSXWRITER_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 # Diretorio para armazenar resultados de lote
@@ -32,17 +47,18 @@ def ensure_results_dir():
 
 
 def _calculate_sha256(file_path: str) -> str:
-    """Calcula o hash SHA256 de um arquivo."""
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    """Calcula o hash SHA256 de um arquivo (blocos de 1 MB)."""
+    return sha256_file(file_path)
 
 
-def generate_pdf_for_quote(db: Session, quote: QuoteRequest) -> Optional[str]:
+def generate_pdf_for_quote(
+    db: Session,
+    quote: QuoteRequest,
+    pdf_generator: Optional[PDFGenerator] = None
+) -> Optional[str]:
     """
-    Gera o PDF para uma cotacao individual.
+    Gera o PDF para uma cotacao individual. Em lote, passar o mesmo
+    `pdf_generator` para todas as cotacoes.
 
     Returns:
         Caminho do PDF gerado ou None se erro.
@@ -84,8 +100,9 @@ def generate_pdf_for_quote(db: Session, quote: QuoteRequest) -> Optional[str]:
             "screenshot_path": screenshot_path
         })
 
-    # Instanciar gerador de PDF
-    pdf_generator = PDFGenerator()
+    # Instanciar gerador de PDF (fontes e estilos ja em cache no processo)
+    if pdf_generator is None:
+        pdf_generator = PDFGenerator()
 
     # Determinar nome do item
     item_name = "Item"
@@ -223,8 +240,10 @@ def generate_batch_zip(db: Session, batch: BatchQuoteJob) -> Optional[str]:
     """
     ensure_results_dir()
 
-    # Buscar cotacoes concluidas do lote
-    quotes = db.query(QuoteRequest).filter(
+    # Buscar cotacoes concluidas do lote (documentos e PDFs em 2 queries, sem N+1)
+    quotes = db.query(QuoteRequest).options(
+        selectinload(QuoteRequest.documents).selectinload(GeneratedDocument.pdf_file)
+    ).filter(
         QuoteRequest.batch_job_id == batch.id,
         QuoteRequest.status.in_([QuoteStatus.DONE, QuoteStatus.AWAITING_REVIEW])
     ).order_by(QuoteRequest.batch_index).all()
@@ -235,6 +254,7 @@ def generate_batch_zip(db: Session, batch: BatchQuoteJob) -> Optional[str]:
 
     # Gerar PDFs que ainda nao existem
     logger.info(f"Verificando/gerando PDFs para {len(quotes)} cotacoes do lote {batch.id}")
+    pdf_generator = PDFGenerator()
     for quote in quotes:
         # Verificar se ja existe PDF
         has_pdf = False
@@ -245,7 +265,7 @@ def generate_batch_zip(db: Session, batch: BatchQuoteJob) -> Optional[str]:
 
         if not has_pdf:
             logger.info(f"Gerando PDF para cotacao {quote.id} (lote {batch.id})")
-            generate_pdf_for_quote(db, quote)
+            generate_pdf_for_quote(db, quote, pdf_generator)
             # Refresh para pegar o documento recem criado
             db.refresh(quote)
 
@@ -298,6 +318,126 @@ def generate_batch_zip(db: Session, batch: BatchQuoteJob) -> Optional[str]:
         return None
 
 
+# Larguras das colunas do resumo (as de cotacao sao repetidas numero_cotacoes vezes)
+EXCEL_LEADING_WIDTHS = [20, 60]  # Codigo, Descricao
+EXCEL_QUOTE_WIDTH = 15
+EXCEL_TRAILING_WIDTHS = [15, 12, 12, 18, 15]  # Valor Medio, Variacao, Numero, Data, Status
+
+
+def fetch_batch_summary(db: Session, batch_id: int, numero_cotacoes: int = 3) -> pd.DataFrame:
+    """
+    Resumo do lote em uma unica consulta: cotacoes + fontes aceitas (LEFT JOIN),
+    montado em colunas pelo pandas. Uma linha por cotacao, na ordem do lote.
+    """
+    rows = db.execute(
+        select(
+            QuoteRequest.id,
+            QuoteRequest.codigo_item,
+            QuoteRequest.input_text,
+            QuoteRequest.valor_medio,
+            QuoteRequest.variacao_percentual,
+            QuoteRequest.created_at,
+            QuoteRequest.status,
+            QuoteSource.price_value,
+        )
+        .outerjoin(QuoteSource, and_(
+            QuoteSource.quote_request_id == QuoteRequest.id,
+            QuoteSource.is_accepted.is_(True)
+        ))
+        .where(QuoteRequest.batch_job_id == batch_id)
+        .order_by(QuoteRequest.batch_index, QuoteRequest.id, QuoteSource.id)
+    ).all()
+
+    flat = pd.DataFrame(rows, columns=[
+        "id", "codigo_item", "input_text", "valor_medio", "variacao_percentual",
+        "created_at", "status", "price_value",
+    ])
+    quotes = flat.drop_duplicates("id").set_index("id")
+
+    summary = pd.DataFrame(index=quotes.index)
+    summary['Código (Material)'] = quotes["codigo_item"].fillna('')
+    summary['Descrição'] = quotes["input_text"].fillna('')
+
+    # Colunas de cotacao: n-esima fonte aceita (ordem de id) de cada cotacao
+    rank = flat.groupby("id").cumcount()
+    for i in range(numero_cotacoes):
+        summary[f'Cotação {i + 1}'] = flat.loc[rank == i].set_index("id")["price_value"]
+
+    # Valor medio, variacao, numero e data
+    summary['Valor Médio'] = quotes["valor_medio"]
+    summary['Variação (%)'] = quotes["variacao_percentual"]
+    summary['Nº Cotação'] = quotes.index
+    # created_at NULL vira NaT (verdadeiro em `if`, sem strftime)
+    summary['Data'] = [
+        created_at.strftime('%d/%m/%Y %H:%M') if pd.notna(created_at) else '' for created_at in quotes["created_at"]
+    ]
+    summary['Status'] = [status.value if status else '' for status in quotes["status"]]
+
+    return summary.reset_index(drop=True)
+
+
+def _excel_rows(summary: pd.DataFrame) -> Iterator[list]:
+    """Linhas do resumo com celulas vazias como None (NaN nao e valor valido no xlsx)"""
+    for row in summary.itertuples(index=False, name=None):
+        yield [None if pd.isna(value) else value for value in row]
+
+
+def write_batch_excel(summary: pd.DataFrame, excel_path: str, numero_cotacoes: int = 3) -> int:
+    """
+    Grava o resumo em streaming (memoria constante): xlsxwriter em modo
+    constant_memory ou, sem ele, planilha write-only do openpyxl.
+    Retorna o numero de linhas gravadas.
+    """
+    widths = EXCEL_LEADING_WIDTHS + [EXCEL_QUOTE_WIDTH] * numero_cotacoes + EXCEL_TRAILING_WIDTHS
+    count = 0
+
+    if XLSXWRITER_AVAILABLE:
+        workbook = xlsxwriter.Workbook(excel_path, {"constant_memory": True})
+        try:
+            worksheet = workbook.add_worksheet('Resumo')
+            header_format = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+            for col, width in enumerate(widths):
+                worksheet.set_column(col, col, width)
+            worksheet.write_row(0, 0, list(summary.columns), header_format)
+            for count, row in enumerate(_excel_rows(summary), start=1):
+                worksheet.write_row(count, 0, row)
+        finally:
+            workbook.close()
+        return count
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Resumo')
+    for col, width in enumerate(widths, start=1):
+        worksheet.column_dimensions[get_column_letter(col)].width = width
+    worksheet.append(list(summary.columns))
+    for row in _excel_rows(summary):
+        worksheet.append(row)
+        count += 1
+    workbook.save(excel_path)
+    return count
+
+
+def _write_batch_excel_file(batch_id: int, summary: pd.DataFrame, numero_cotacoes: int) -> Optional[str]:
+    """Grava o Excel do lote em BATCH_RESULTS_DIR; None se erro"""
+    ensure_results_dir()
+
+    # Nome do arquivo Excel
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    excel_filename = f"lote_{batch_id}_resumo_{timestamp}.xlsx"
+    excel_path = os.path.join(BATCH_RESULTS_DIR, excel_filename)
+
+    try:
+        rows = write_batch_excel(summary, excel_path, numero_cotacoes)
+        logger.info(f"Excel gerado para lote {batch_id}: {excel_path} ({rows} linhas)")
+        return excel_path
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar Excel para lote {batch_id}: {e}")
+        if os.path.exists(excel_path):
+            os.remove(excel_path)
+        return None
+
+
 def generate_batch_excel(db: Session, batch: BatchQuoteJob, numero_cotacoes: int = 3) -> Optional[str]:
     """
     Gera um arquivo Excel com resumo das cotacoes do lote.
@@ -319,88 +459,12 @@ def generate_batch_excel(db: Session, batch: BatchQuoteJob, numero_cotacoes: int
     Returns:
         Caminho do arquivo Excel ou None se erro.
     """
-    ensure_results_dir()
-
-    # Buscar cotacoes do lote
-    quotes = db.query(QuoteRequest).filter(
-        QuoteRequest.batch_job_id == batch.id
-    ).order_by(QuoteRequest.batch_index).all()
-
-    if not quotes:
+    summary = fetch_batch_summary(db, batch.id, numero_cotacoes)
+    if summary.empty:
         logger.info(f"Nenhuma cotacao encontrada para o lote {batch.id}")
         return None
 
-    # Preparar dados para o DataFrame
-    data = []
-
-    for quote in quotes:
-        # Buscar fontes aceitas da cotacao
-        sources = db.query(QuoteSource).filter(
-            QuoteSource.quote_request_id == quote.id,
-            QuoteSource.is_accepted == True
-        ).order_by(QuoteSource.id).all()
-
-        # Dados basicos
-        row = {
-            'Código (Material)': quote.codigo_item or '',
-            'Descrição': quote.input_text or '',
-        }
-
-        # Adicionar colunas de cotacao
-        for i in range(numero_cotacoes):
-            col_name = f'Cotação {i + 1}'
-            if i < len(sources):
-                row[col_name] = sources[i].price_value
-            else:
-                row[col_name] = None
-
-        # Valor medio, variacao, numero e data
-        row['Valor Médio'] = quote.valor_medio
-        row['Variação (%)'] = quote.variacao_percentual
-        row['Nº Cotação'] = quote.id
-        row['Data'] = quote.created_at.strftime('%d/%m/%Y %H:%M') if quote.created_at else ''
-        row['Status'] = quote.status.value if quote.status else ''
-
-        data.append(row)
-
-    # Criar DataFrame
-    df = pd.DataFrame(data)
-
-    # Nome do arquivo Excel
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    excel_filename = f"lote_{batch.id}_resumo_{timestamp}.xlsx"
-    excel_path = os.path.join(BATCH_RESULTS_DIR, excel_filename)
-
-    try:
-        with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Resumo')
-
-            # Ajustar largura das colunas
-            worksheet = writer.sheets['Resumo']
-            worksheet.column_dimensions['A'].width = 20  # Codigo
-            worksheet.column_dimensions['B'].width = 60  # Descricao
-
-            # Colunas de cotacao
-            col_letter = 'C'
-            for i in range(numero_cotacoes):
-                worksheet.column_dimensions[chr(ord(col_letter) + i)].width = 15
-
-            # Demais colunas
-            remaining_start = chr(ord('C') + numero_cotacoes)
-            worksheet.column_dimensions[remaining_start].width = 15  # Valor Medio
-            worksheet.column_dimensions[chr(ord(remaining_start) + 1)].width = 12  # Variacao
-            worksheet.column_dimensions[chr(ord(remaining_start) + 2)].width = 12  # Numero
-            worksheet.column_dimensions[chr(ord(remaining_start) + 3)].width = 18  # Data
-            worksheet.column_dimensions[chr(ord(remaining_start) + 4)].width = 15  # Status
-
-        logger.info(f"Excel gerado para lote {batch.id}: {excel_path} ({len(quotes)} linhas)")
-        return excel_path
-
-    except Exception as e:
-        logger.error(f"Erro ao gerar Excel para lote {batch.id}: {e}")
-        if os.path.exists(excel_path):
-            os.remove(excel_path)
-        return None
+    return _write_batch_excel_file(batch.id, summary, numero_cotacoes)
 
 
 def generate_batch_results(db: Session, batch_id: int, numero_cotacoes: int = 3) -> dict:
@@ -427,14 +491,23 @@ def generate_batch_results(db: Session, batch_id: int, numero_cotacoes: int = 3)
         "excel_path": None
     }
 
-    # Gerar ZIP com PDFs (inclui geracao de PDFs faltantes)
-    zip_path = generate_batch_zip(db, batch)
-    if zip_path:
-        batch.result_zip_path = zip_path
-        result["zip_path"] = zip_path
+    # Resumo lido antes; o Excel e gravado em paralelo com o ZIP (que usa a sessao)
+    summary = fetch_batch_summary(db, batch.id, numero_cotacoes)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch-excel") as executor:
+        excel_future = None
+        if not summary.empty:
+            excel_future = executor.submit(_write_batch_excel_file, batch.id, summary, numero_cotacoes)
+        else:
+            logger.info(f"Nenhuma cotacao encontrada para o lote {batch.id}")
+
+        # Gerar ZIP com PDFs (inclui geracao de PDFs faltantes)
+        zip_path = generate_batch_zip(db, batch)
+        if zip_path:
+            batch.result_zip_path = zip_path
+            result["zip_path"] = zip_path
+
+        excel_path = excel_future.result() if excel_future else None
 
-    # Gerar Excel com resumo
-    excel_path = generate_batch_excel(db, batch, numero_cotacoes)
     if excel_path:
         batch.result_excel_path = excel_path
         result["excel_path"] = excel_path
@@ -1,10 +1,11 @@
 import anthropic
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel
 import base64
 import json
 import logging
 import time
+from app.services.image_preprocessing import PreparedImage, prepare_image
 from app.services.prompts import (
     PROMPT_ANALISE_PATRIMONIAL,
     PROMPT_OCR_IMAGEM,
@@ -105,12 +106,15 @@ class ClaudeClient:
     async def analyze_item(
         self,
         input_text: Optional[str] = None,
-        image_files: Optional[List[bytes]] = None
+        image_files: Optional[List[Union[PreparedImage, bytes]]] = None
     ) -> ItemAnalysisResult:
         """
         Analisa item em duas etapas:
         1. Análise da descrição de texto OU OCR de imagem
         2. Se specs relevantes não estiverem visíveis, busca na web
+
+        image_files: imagens já preparadas (image_preprocessing.prepare_input_image);
+        bytes crus são preparados aqui, sem cache.
         """
         # Se só tiver texto (sem imagem), usar fluxo simplificado
         if input_text and not image_files:
@@ -125,13 +129,15 @@ class ClaudeClient:
             })
 
         if image_files:
-            for img_data in image_files:
-                img_base64 = base64.standard_b64encode(img_data).decode("utf-8")
+            for image in image_files:
+                if isinstance(image, bytes):
+                    image = prepare_image(image, provider="anthropic")
+                img_base64 = base64.standard_b64encode(image.data).decode("utf-8")
                 content.append({
                     "type": "image",
                     "source": {
                         "type": "base64",
-                        "media_type": "image/jpeg",
+                        "media_type": image.media_type,
                         "data": img_base64,
                     },
                 })
@@ -0,0 +1,182 @@
+"""
+Armazenamento de evidências (screenshots) endereçado por conteúdo.
+
+Cada arquivo é gravado uma única vez, com nome igual ao seu sha256, numa árvore
+de subdiretórios (STORAGE_PATH/evidence/ab/cd/abcd...png). Registros File de
+cotações diferentes apontam para o mesmo blob quando o conteúdo se repete.
+
+- store_bytes: hash calculado em memória antes de gravar (grava só se não existir)
+- store_file: para arquivos já gravados por terceiros (ex: Playwright); hash em
+  blocos de 1 MB e o arquivo é movido para a árvore (ou descartado, se repetido)
+- collect_unreferenced_blobs: contagem de referências (files.storage_path e
+  vehicle_price_bank.screenshot_path); blobs sem referência são removidos após
+  EVIDENCE_GC_GRACE_HOURS. Executado pela task cleanup_old_processing.
+  Variantes derivadas de um blob (ex: abcd...pdf.jpg, gerada pelo
+  screenshot_pipeline) acompanham o blob de origem.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import time
+import uuid
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import File, VehiclePriceBank
+from app.models.file import FileType
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def evidence_root() -> str:
+    return os.path.join(settings.STORAGE_PATH, "evidence")
+
+
+def staging_path(filename: str) -> str:
+    """Caminho temporário para arquivos gravados antes de entrarem na árvore"""
+    staging_dir = os.path.join(evidence_root(), "tmp")
+    os.makedirs(staging_dir, exist_ok=True)
+    return os.path.join(staging_dir, filename)
+
+
+def sha256_file(file_path: str) -> str:
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256_hash.update(block)
+    return sha256_hash.hexdigest()
+
+
+def blob_path(sha256: str, extension: str = ".png") -> str:
+    return os.path.join(evidence_root(), sha256[:2], sha256[2:4], f"{sha256}{extension}")
+
+
+def blob_key(path: str) -> str:
+    """Caminho sem extensões: o blob e suas variantes compartilham a mesma chave"""
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, filename.split(".", 1)[0])
+
+
+def _touch_blob(path: str) -> bool:
+    """
+    Renova o mtime de um blob reaproveitado, para a coleta (que só remove
+    blobs sem referência mais antigos que a carência) não apagá-lo antes do
+    registro File ser gravado. Retorna False se o blob não existe.
+    """
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def write_blob(path: str, data: bytes) -> None:
+    """Grava o arquivo de forma atômica (temporário + rename), se ainda não existir"""
+    if _touch_blob(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def store_bytes(data: bytes, extension: str = ".png") -> Tuple[str, str]:
+    """Grava o conteúdo na árvore (se ainda não existir); retorna (sha256, caminho)"""
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = blob_path(sha256, extension)
+    write_blob(path, data)
+    return sha256, path
+
+
+def store_file(file_path: str) -> Tuple[str, str]:
+    """Move um arquivo já gravado para a árvore; retorna (sha256, caminho do blob)"""
+    sha256 = sha256_file(file_path)
+    path = blob_path(sha256, os.path.splitext(file_path)[1] or ".png")
+    if _touch_blob(path):
+        os.remove(file_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(file_path, path)
+    return sha256, path
+
+
+def register_screenshot(
+    db: Session,
+    storage_path: str,
+    sha256: Optional[str] = None,
+    quote_request_id: Optional[int] = None,
+    original_size_bytes: Optional[int] = None
+) -> File:
+    """
+    Cria o registro File de um screenshot já armazenado (blob compartilhado).
+    `original_size_bytes` é o tamanho capturado antes da recompressão, quando conhecido.
+    """
+    screenshot_file = File(
+        type=FileType.SCREENSHOT,
+        mime_type=mimetypes.guess_type(storage_path)[0] or "image/png",
+        storage_path=storage_path,
+        sha256=sha256 or sha256_file(storage_path),
+        size_bytes=os.path.getsize(storage_path),
+        original_size_bytes=original_size_bytes,
+        quote_request_id=quote_request_id
+    )
+    db.add(screenshot_file)
+    db.flush()
+    return screenshot_file
+
+
+def blob_reference_counts(db: Session) -> Dict[str, int]:
+    """Quantas referências (File e Banco de Preços de Veículos) cada blob tem"""
+    prefix = evidence_root() + os.sep
+    counts: Counter = Counter()
+    for path, count in db.query(File.storage_path, func.count(File.id)).filter(
+        File.storage_path.like(f"{prefix}%")
+    ).group_by(File.storage_path):
+        counts[path] += count
+    for path, count in db.query(VehiclePriceBank.screenshot_path, func.count(VehiclePriceBank.id)).filter(
+        VehiclePriceBank.screenshot_path.like(f"{prefix}%")
+    ).group_by(VehiclePriceBank.screenshot_path):
+        counts[path] += count
+    return counts
+
+
+def collect_unreferenced_blobs(db: Session, grace_hours: Optional[int] = None) -> Dict[str, int]:
+    """
+    Remove blobs (e temporários) sem nenhuma referência. Só considera arquivos
+    mais antigos que a carência, para não apagar um blob gravado por uma
+    cotação em andamento cujo File ainda não foi commitado.
+    """
+    root = evidence_root()
+    if not os.path.isdir(root):
+        return {"scanned": 0, "removed": 0}
+
+    if grace_hours is None:
+        grace_hours = settings.EVIDENCE_GC_GRACE_HOURS
+    cutoff = time.time() - grace_hours * 3600
+    referenced_keys = {blob_key(path) for path, count in blob_reference_counts(db).items() if count > 0}
+
+    scanned = removed = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            scanned += 1
+            if blob_key(path) in referenced_keys:
+                continue
+            try:
+                if os.path.getmtime(path) > cutoff:
+                    continue
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+
+    logger.info(f"[EVIDENCE-GC] {removed} de {scanned} arquivos sem referência removidos")
+    return {"scanned": scanned, "removed": removed}
@@ -0,0 +1,321 @@
+"""
+Importação colunar de bens esperados (carga) para sessões de inventário.
+
+Pipeline usado pelo upload de planilhas e pela sincronização com o ASI:
+1. Normalização e validação vetorizadas no pandas (sem iterrows)
+2. Resolução de duplicados com operações de conjunto contra os códigos
+   já existentes na sessão
+3. Inserção em massa via COPY e atualização via tabela temporária
+   (UPDATE ... FROM), em poucas idas ao banco independente do volume
+
+Retorna um relatório de erros por linha e os tempos de cada etapa.
+"""
+import io
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+from app.models.inventory_session import InventoryExpectedAsset, CounterDimension
+from app.services.inventory_statistics import apply_counter_deltas, EXPECTED_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Mapeamento de nomes de colunas da planilha para campos do modelo
+COLUMN_MAPPING = {
+    'numero_tombamento': 'asset_code',
+    'tombamento': 'asset_code',
+    'patrimonio': 'asset_code',
+    'plaqueta': 'asset_code',
+    'numero': 'asset_code',
+    'descricao': 'description',
+    'nome': 'description',
+    'rfid': 'rfid_code',
+    'codigo_rfid': 'rfid_code',
+    'codigo_barras': 'barcode',
+    'barcode': 'barcode',
+    'categoria': 'category',
+    'ul': 'expected_ul_code',
+    'codigo_ul': 'expected_ul_code',
+    'ul_esperada': 'expected_ul_code',
+    'ua': 'expected_ua_code',
+    'codigo_ua': 'expected_ua_code',
+    'ua_esperada': 'expected_ua_code',
+}
+
+# Colunas texto e tamanho máximo (espelha InventoryExpectedAsset)
+TEXT_COLUMNS = {
+    'asset_code': 50,
+    'asset_sequence': 20,
+    'description': None,
+    'rfid_code': 100,
+    'barcode': 100,
+    'category': 100,
+    'expected_ul_code': 50,
+    'expected_ua_code': 50,
+}
+
+# Ordem das colunas gravadas via COPY
+COPY_COLUMNS = [
+    'session_id', 'asset_code', 'asset_sequence', 'description', 'rfid_code',
+    'barcode', 'category', 'expected_ul_code', 'expected_ua_code',
+    'is_written_off', 'processed', 'extra_data',
+]
+
+# Campos atualizados em bens já existentes
+# overwrite=True (sincronização ASI): substitui todos os campos
+# overwrite=False (planilha): mantém o valor atual quando a célula está vazia
+OVERWRITE_FIELDS = [
+    'asset_sequence', 'description', 'rfid_code', 'barcode', 'expected_ul_code',
+    'expected_ua_code', 'category', 'is_written_off', 'extra_data',
+]
+MERGE_FIELDS = ['description', 'rfid_code', 'barcode']
+
+# Limite de entradas no relatório de erros da resposta
+MAX_ERROR_REPORT = 1000
+
+_EMPTY_VALUES = ['', 'nan', 'NaN', 'None', 'none', 'null', 'NULL']
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza nomes de colunas da planilha e valida as obrigatórias.
+    Lança ValueError com mensagem amigável se faltar coluna obrigatória.
+    """
+    df = df.copy()
+    df.columns = [str(c).lower().strip() for c in df.columns]
+    df = df.rename(columns=COLUMN_MAPPING)
+    # Várias colunas de origem podem mapear para o mesmo campo - mantém a primeira
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    if 'asset_code' not in df.columns:
+        raise ValueError("Coluna obrigatória não encontrada: numero_tombamento ou tombamento")
+    if 'description' not in df.columns:
+        raise ValueError("Coluna obrigatória não encontrada: descricao ou nome")
+
+    return df
+
+
+def _to_text(series: pd.Series) -> pd.Series:
+    """Converte uma coluna para texto limpo (NA para vazios), de forma vetorizada"""
+    if pd.api.types.is_float_dtype(series):
+        # Códigos numéricos lidos como float (123.0) viram "123"
+        non_null = series.dropna()
+        if len(non_null) and (non_null % 1 == 0).all():
+            series = series.astype('Int64')
+    result = series.astype('string').str.strip()
+    return result.mask(result.isin(_EMPTY_VALUES))
+
+
+def _to_bool(series: pd.Series) -> pd.Series:
+    """Converte S/N, 1/0, true/false para bool (vazio = False)."""
+    if pd.api.types.is_bool_dtype(series):
+        return series.fillna(False).astype(bool)
+    normalized = series.astype('string').str.strip().str.upper()
+    return normalized.isin(['S', 'SIM', 'Y', 'YES', 'TRUE', '1', '1.0']).fillna(False).astype(bool)
+
+
+def _serialize_extra(value: Any) -> str:
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return '{}'
+
+
+def prepare_expected_assets(
+    df: pd.DataFrame,
+    first_row_number: int = 2
+) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Normaliza e valida os registros de forma vetorizada.
+
+    Args:
+        df: DataFrame com colunas já mapeadas (asset_code, description, ...)
+        first_row_number: Número da linha de origem do primeiro registro
+            (2 para planilhas com cabeçalho na linha 1)
+
+    Returns:
+        (DataFrame válido, relatório de erros [{row, asset_code, error}])
+    """
+    df = df.reset_index(drop=True)
+    prepared = pd.DataFrame({'row': df.index + first_row_number})
+
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            prepared[column] = _to_text(df[column])
+        else:
+            prepared[column] = pd.Series(pd.NA, index=df.index, dtype='string')
+
+    if 'is_written_off' in df.columns:
+        prepared['is_written_off'] = _to_bool(df['is_written_off'])
+    else:
+        prepared['is_written_off'] = False
+
+    if 'extra_data' in df.columns:
+        prepared['extra_data'] = df['extra_data'].map(_serialize_extra)
+    else:
+        prepared['extra_data'] = '{}'
+
+    error_frames = []
+
+    def reject(mask: pd.Series, message: str):
+        if mask.any():
+            error_frames.append(prepared.loc[mask, ['row', 'asset_code']].assign(error=message))
+        return prepared.loc[~mask]
+
+    prepared = reject(prepared['asset_code'].isna(), "Código do bem vazio")
+
+    for column, max_length in TEXT_COLUMNS.items():
+        if max_length:
+            too_long = prepared[column].str.len().fillna(0) > max_length
+            prepared = reject(too_long, f"Campo {column} excede {max_length} caracteres")
+
+    # Duplicados no próprio arquivo: vale a última ocorrência
+    duplicated = prepared['asset_code'].duplicated(keep='last')
+    prepared = reject(duplicated, "Código duplicado no arquivo (mantida a última ocorrência)")
+
+    errors: List[Dict[str, Any]] = []
+    if error_frames:
+        report = pd.concat(error_frames).sort_values('row')
+        report['asset_code'] = report['asset_code'].astype(object).where(report['asset_code'].notna(), None)
+        errors = report.to_dict('records')
+
+    return prepared, errors
+
+
+def _copy_frame(db: Session, table: str, columns: List[str], frame: pd.DataFrame) -> None:
+    """Grava um DataFrame com COPY ... FROM STDIN (CSV), na transação atual."""
+    if frame.empty:
+        return
+    buffer = io.StringIO()
+    # Campos vazios sem aspas são interpretados como NULL pelo COPY CSV
+    frame.to_csv(buffer, columns=columns, index=False, header=False)
+    buffer.seek(0)
+
+    dbapi_connection = db.connection().connection
+    driver_connection = getattr(dbapi_connection, "driver_connection", None)
+    if driver_connection is not None and hasattr(driver_connection, "copy_to_table"):
+        # Sessão assíncrona (AsyncSession.run_sync): COPY pelo protocolo do asyncpg
+        await_only(driver_connection.copy_to_table(
+            table,
+            source=buffer.getvalue().encode("utf-8"),
+            columns=columns,
+            format="csv"
+        ))
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _update_existing(db: Session, session_id: int, frame: pd.DataFrame, overwrite: bool) -> None:
+    """Atualiza bens existentes via tabela temporária + UPDATE ... FROM."""
+    if frame.empty:
+        return
+
+    columns = ['asset_code'] + OVERWRITE_FIELDS
+    db.execute(text("DROP TABLE IF EXISTS tmp_expected_asset_import"))
+    db.execute(text(
+        "CREATE TEMP TABLE tmp_expected_asset_import ON COMMIT DROP AS "
+        f"SELECT {', '.join(columns)} FROM inventory_expected_assets WITH NO DATA"
+    ))
+    _copy_frame(db, "tmp_expected_asset_import", columns, frame)
+
+    if overwrite:
+        assignments = [f"{field} = s.{field}" for field in OVERWRITE_FIELDS]
+    else:
+        assignments = [f"{field} = COALESCE(s.{field}, t.{field})" for field in MERGE_FIELDS]
+
+    db.execute(text(
+        f"UPDATE inventory_expected_assets t SET {', '.join(assignments)}, updated_at = now() "
+        "FROM tmp_expected_asset_import s "
+        "WHERE t.session_id = :session_id AND t.asset_code = s.asset_code"
+    ), {"session_id": session_id})
+
+
+def import_expected_assets(
+    db: Session,
+    session_id: int,
+    df: pd.DataFrame,
+    overwrite: bool,
+    first_row_number: int = 2,
+    timing: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Importa bens esperados em massa para uma sessão.
+
+    Args:
+        db: Sessão do banco (o commit fica a cargo do chamador)
+        session_id: ID da sessão de inventário
+        df: DataFrame com colunas já mapeadas para os campos do modelo
+        overwrite: True substitui todos os campos de bens existentes;
+            False só preenche description/rfid_code/barcode quando informados
+        first_row_number: Número da linha de origem do primeiro registro
+        timing: Tempos (ms) de etapas anteriores, ex: leitura do arquivo
+
+    Returns:
+        Dict com created, updated, failed, error_report e timing
+    """
+    timing = dict(timing or {})
+    started = time.perf_counter()
+
+    step = time.perf_counter()
+    prepared, errors = prepare_expected_assets(df, first_row_number=first_row_number)
+    timing["normalize_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    # Códigos já existentes na sessão: uma consulta + operação de conjunto
+    step = time.perf_counter()
+    existing_codes = {
+        code for (code,) in db.query(InventoryExpectedAsset.asset_code).filter(
+            InventoryExpectedAsset.session_id == session_id
+        )
+    }
+    is_existing = prepared['asset_code'].isin(existing_codes)
+    new_rows = prepared.loc[~is_existing].assign(session_id=session_id, processed=False)
+    existing_rows = prepared.loc[is_existing]
+    timing["diff_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    step = time.perf_counter()
+    _copy_frame(db, InventoryExpectedAsset.__tablename__, COPY_COLUMNS, new_rows)
+    # COPY não dispara eventos do ORM: atualizar o contador de esperados manualmente
+    apply_counter_deltas(db, {
+        (session_id, CounterDimension.EXPECTED.value, EXPECTED_TOTAL): len(new_rows)
+    })
+    timing["insert_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    step = time.perf_counter()
+    _update_existing(db, session_id, existing_rows, overwrite)
+    timing["update_ms"] = round((time.perf_counter() - step) * 1000, 1)
+
+    elapsed = time.perf_counter() - started
+    timing["import_ms"] = round(elapsed * 1000, 1)
+    processed = len(prepared)
+    timing["rows_per_second"] = round(processed / elapsed, 1) if elapsed > 0 else None
+
+    logger.info(
+        f"Importação de bens esperados (sessão {session_id}): {len(new_rows)} criados, "
+        f"{len(existing_rows)} atualizados, {len(errors)} rejeitados em {timing['import_ms']} ms"
+    )
+
+    return {
+        "created": len(new_rows),
+        "updated": len(existing_rows),
+        "failed": len(errors),
+        "error_report": errors[:MAX_ERROR_REPORT],
+        "timing": timing
+    }
+
+
+def format_error_messages(error_report: List[Dict[str, Any]], limit: int = 10) -> List[str]:
+    """Resumo textual dos primeiros erros (formato legado da resposta)."""
+    return [f"Linha {e['row']}: {e['error']}" for e in error_report[:limit]]
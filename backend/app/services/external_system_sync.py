@@ -2,14 +2,32 @@
 Serviço de Sincronização com Sistemas Externos (ASI)
 Responsável por baixar dados mestres (UGs, ULs, características, etc.)
 """
+import asyncio
+import copy
 import httpx
 import json
+import gzip
+import hashlib
 import logging
 import base64
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, AsyncIterator
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
 from app.models import (
     ExternalSystem,
@@ -24,6 +42,45 @@ from app.models import (
 
 logger = logging.getLogger(__name__)
 
+# Linhas por comando INSERT ... ON CONFLICT na sincronização de dados mestres
+UPSERT_CHUNK_SIZE = 500
+
+# Bens por página na carga de bens do ASI
+ASSET_PAGE_SIZE = 5000
+
+# Leitura/codificação de fotos fora do event loop no envio ao ASI
+_photo_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="asi-photo")
+
+# Caminhos (prefixos ijson) onde o ASI devolve a lista de bens:
+# lista direta [...], {"itens": [...]}, {"bens": [...]} ou {"items": [...]}
+ASSET_ITEM_PREFIXES = {"item", "itens.item", "bens.item", "items.item"}
+
+
+class _AsyncByteReader:
+    """Adapta um iterador assíncrono de bytes para a interface read() usada pelo ijson"""
+
+    def __init__(self, chunks: AsyncIterator[bytes], first_chunk: bytes = b""):
+        self._chunks = chunks
+        self._pending = first_chunk
+
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            # ijson chama read(0) para detectar se o arquivo é de bytes ou texto
+            return b""
+        if self._pending:
+            data, self._pending = self._pending, b""
+            return data
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+def content_hash(values: Dict[str, Any]) -> str:
+    """Hash estável (sha256) do conteúdo de uma linha de dados mestres"""
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
 class ExternalSystemSyncService:
     """Serviço para sincronização de dados com sistemas externos"""
@@ -154,6 +211,8 @@ class ExternalSystemSyncService:
         items_created: int = 0,
         items_updated: int = 0,
         items_failed: int = 0,
+        items_unchanged: int = 0,
+        rows_per_second: Optional[float] = None,
         error_message: Optional[str] = None,
         details: Optional[dict] = None
     ):
@@ -163,172 +222,144 @@ class ExternalSystemSyncService:
         log.items_created = items_created
         log.items_updated = items_updated
         log.items_failed = items_failed
+        log.items_unchanged = items_unchanged
+        log.rows_per_second = rows_per_second
         log.error_message = error_message
         log.details = details
         log.completed_at = datetime.utcnow()
         self.db.commit()
 
-    async def sync_ugs(self) -> Dict[str, int]:
-        """Sincroniza Unidades Gestoras"""
-        sync_log = self._create_sync_log("ug")
-
-        try:
-            # Fazer requisição ao endpoint de UGs
-            data = await self._make_request(self.system.endpoint_download_ug)
-
-            # Processar itens
-            items = data if isinstance(data, list) else data.get("itens", [])
-            items_received = len(items)
-            items_created = 0
-            items_updated = 0
-            items_failed = 0
-
-            for item in items:
-                try:
-                    code = item.get("C01") or item.get("codigo") or item.get("code")
-                    name = item.get("C02") or item.get("nome") or item.get("name")
+    def _bulk_upsert(
+        self,
+        model: Any,
+        constraint: str,
+        rows: List[dict],
+        fields: List[str]
+    ) -> Dict[str, int]:
+        """
+        Insere/atualiza dados mestres em massa.
 
-                    if not code or not name:
-                        items_failed += 1
-                        continue
+        Carrega código e hash de conteúdo existentes em uma única consulta,
+        ignora linhas cujo hash não mudou e grava o restante com
+        INSERT ... ON CONFLICT (external_system_id, code) DO UPDATE em lotes.
+        """
+        # Código repetido no mesmo payload: vale a última ocorrência
+        # (ON CONFLICT não aceita afetar a mesma linha duas vezes por comando)
+        rows_by_code = {row["code"]: row for row in rows}
 
-                    # Verificar se já existe
-                    existing = self.db.query(InventoryMasterUG).filter(
-                        InventoryMasterUG.external_system_id == self.system.id,
-                        InventoryMasterUG.code == code
-                    ).first()
-
-                    if existing:
-                        existing.name = name
-                        existing.extra_data = item
-                        existing.synced_at = datetime.utcnow()
-                        items_updated += 1
-                    else:
-                        ug = InventoryMasterUG(
-                            external_system_id=self.system.id,
-                            code=code,
-                            name=name,
-                            extra_data=item
-                        )
-                        self.db.add(ug)
-                        items_created += 1
+        existing_hashes = dict(
+            self.db.query(model.code, model.content_hash).filter(
+                model.external_system_id == self.system.id
+            ).all()
+        )
 
-                except Exception as e:
-                    logger.error(f"Erro ao processar UG: {e}")
-                    items_failed += 1
+        created = 0
+        updated = 0
+        unchanged = 0
+        pending = []
+        now = datetime.utcnow()
 
-            self.db.commit()
+        for code, row in rows_by_code.items():
+            row["content_hash"] = content_hash({field: row.get(field) for field in fields})
 
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.SUCCESS.value if items_failed == 0 else SyncStatus.PARTIAL.value,
-                items_received=items_received,
-                items_created=items_created,
-                items_updated=items_updated,
-                items_failed=items_failed
+            if code in existing_hashes:
+                if existing_hashes[code] == row["content_hash"]:
+                    unchanged += 1
+                    continue
+                updated += 1
+            else:
+                created += 1
+
+            row["external_system_id"] = self.system.id
+            row["synced_at"] = now
+            pending.append(row)
+
+        table = model.__table__
+        for start in range(0, len(pending), UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(table).values(pending[start:start + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                constraint=constraint,
+                set_={
+                    column: stmt.excluded[column]
+                    for column in fields + ["content_hash", "synced_at"]
+                }
             )
+            self.db.execute(stmt)
 
-            return {
-                "received": items_received,
-                "created": items_created,
-                "updated": items_updated,
-                "failed": items_failed
-            }
+        self.db.commit()
 
-        except Exception as e:
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.FAILED.value,
-                error_message=str(e)
-            )
-            raise
+        return {"created": created, "updated": updated, "unchanged": unchanged}
 
-    async def sync_uls(self) -> Dict[str, int]:
-        """Sincroniza Unidades Locais"""
-        sync_log = self._create_sync_log("ul")
+    async def _sync_master_table(
+        self,
+        sync_type: str,
+        endpoint: str,
+        model: Any,
+        constraint: str,
+        fields: List[str],
+        map_item: Callable[[dict], Optional[dict]]
+    ) -> Dict[str, int]:
+        """
+        Fluxo comum de sincronização de uma tabela de dados mestres.
+        map_item converte o item do ASI em {"code": ..., <fields>} ou None se inválido.
+        """
+        sync_log = self._create_sync_log(sync_type)
 
         try:
-            data = await self._make_request(self.system.endpoint_download_ul)
+            download_started = time.perf_counter()
+            data = await self._make_request(endpoint)
+            download_ms = round((time.perf_counter() - download_started) * 1000, 1)
+
+            process_started = time.perf_counter()
 
             items = data if isinstance(data, list) else data.get("itens", [])
             items_received = len(items)
-            items_created = 0
-            items_updated = 0
             items_failed = 0
+            rows = []
 
             for item in items:
                 try:
-                    code = item.get("C01") or item.get("codigo") or item.get("code")
-                    name = item.get("C02") or item.get("nome") or item.get("name")
-                    ug_code = item.get("C03") or item.get("ug_code")
-
-                    if not code or not name:
-                        items_failed += 1
-                        continue
-
-                    # Buscar UG pai
-                    ug_id = None
-                    if ug_code:
-                        ug = self.db.query(InventoryMasterUG).filter(
-                            InventoryMasterUG.external_system_id == self.system.id,
-                            InventoryMasterUG.code == ug_code
-                        ).first()
-                        if ug:
-                            ug_id = ug.id
-
-                    # Extrair geolocalização se disponível
-                    latitude = item.get("latitude") or item.get("lat")
-                    longitude = item.get("longitude") or item.get("lng") or item.get("lon")
-
-                    existing = self.db.query(InventoryMasterUL).filter(
-                        InventoryMasterUL.external_system_id == self.system.id,
-                        InventoryMasterUL.code == code
-                    ).first()
-
-                    if existing:
-                        existing.name = name
-                        existing.ug_id = ug_id
-                        existing.latitude = latitude
-                        existing.longitude = longitude
-                        existing.extra_data = item
-                        existing.synced_at = datetime.utcnow()
-                        items_updated += 1
-                    else:
-                        ul = InventoryMasterUL(
-                            external_system_id=self.system.id,
-                            ug_id=ug_id,
-                            code=code,
-                            name=name,
-                            latitude=latitude,
-                            longitude=longitude,
-                            extra_data=item
-                        )
-                        self.db.add(ul)
-                        items_created += 1
-
+                    row = map_item(item)
                 except Exception as e:
-                    logger.error(f"Erro ao processar UL: {e}")
+                    logger.error(f"Erro ao processar item de {sync_type}: {e}")
+                    row = None
+
+                if row is None:
                     items_failed += 1
+                    continue
+                rows.append(row)
 
-            self.db.commit()
+            counts = self._bulk_upsert(model, constraint, rows, fields)
+
+            elapsed = time.perf_counter() - process_started
+            rows_per_second = round(items_received / elapsed, 1) if elapsed > 0 else None
 
             self._complete_sync_log(
                 sync_log,
                 SyncStatus.SUCCESS.value if items_failed == 0 else SyncStatus.PARTIAL.value,
                 items_received=items_received,
-                items_created=items_created,
-                items_updated=items_updated,
-                items_failed=items_failed
+                items_created=counts["created"],
+                items_updated=counts["updated"],
+                items_failed=items_failed,
+                items_unchanged=counts["unchanged"],
+                rows_per_second=rows_per_second,
+                details={
+                    "download_ms": download_ms,
+                    "process_ms": round(elapsed * 1000, 1)
+                }
             )
 
             return {
                 "received": items_received,
-                "created": items_created,
-                "updated": items_updated,
-                "failed": items_failed
+                "created": counts["created"],
+                "updated": counts["updated"],
+                "unchanged": counts["unchanged"],
+                "failed": items_failed,
+                "rows_per_second": rows_per_second
             }
 
         except Exception as e:
+            self.db.rollback()
             self._complete_sync_log(
                 sync_log,
                 SyncStatus.FAILED.value,
@@ -336,154 +367,101 @@ class ExternalSystemSyncService:
             )
             raise
 
-    async def sync_physical_status(self) -> Dict[str, int]:
-        """Sincroniza Situações Físicas"""
-        sync_log = self._create_sync_log("physical_status")
-
-        try:
-            data = await self._make_request(self.system.endpoint_download_physical_status)
-
-            items = data if isinstance(data, list) else data.get("itens", [])
-            items_received = len(items)
-            items_created = 0
-            items_updated = 0
-            items_failed = 0
-
-            for item in items:
-                try:
-                    code = item.get("C01") or item.get("codigo") or item.get("code")
-                    name = item.get("C02") or item.get("nome") or item.get("name")
-                    description = item.get("C03") or item.get("descricao") or item.get("description")
-
-                    if not code or not name:
-                        items_failed += 1
-                        continue
-
-                    existing = self.db.query(InventoryMasterPhysicalStatus).filter(
-                        InventoryMasterPhysicalStatus.external_system_id == self.system.id,
-                        InventoryMasterPhysicalStatus.code == code
-                    ).first()
+    async def sync_ugs(self) -> Dict[str, int]:
+        """Sincroniza Unidades Gestoras"""
+        def map_item(item: dict) -> Optional[dict]:
+            code = item.get("C01") or item.get("codigo") or item.get("code")
+            name = item.get("C02") or item.get("nome") or item.get("name")
+            if not code or not name:
+                return None
+            return {"code": code, "name": name, "extra_data": item}
+
+        return await self._sync_master_table(
+            "ug",
+            self.system.endpoint_download_ug,
+            InventoryMasterUG,
+            "uq_ug_system_code",
+            ["name", "extra_data"],
+            map_item
+        )
 
-                    if existing:
-                        existing.name = name
-                        existing.description = description
-                        existing.synced_at = datetime.utcnow()
-                        items_updated += 1
-                    else:
-                        status = InventoryMasterPhysicalStatus(
-                            external_system_id=self.system.id,
-                            code=code,
-                            name=name,
-                            description=description
-                        )
-                        self.db.add(status)
-                        items_created += 1
+    async def sync_uls(self) -> Dict[str, int]:
+        """Sincroniza Unidades Locais"""
+        # UGs pai carregadas uma única vez (em vez de uma consulta por UL)
+        ug_ids = dict(
+            self.db.query(InventoryMasterUG.code, InventoryMasterUG.id).filter(
+                InventoryMasterUG.external_system_id == self.system.id
+            ).all()
+        )
 
-                except Exception as e:
-                    logger.error(f"Erro ao processar situação física: {e}")
-                    items_failed += 1
+        def map_item(item: dict) -> Optional[dict]:
+            code = item.get("C01") or item.get("codigo") or item.get("code")
+            name = item.get("C02") or item.get("nome") or item.get("name")
+            ug_code = item.get("C03") or item.get("ug_code")
 
-            self.db.commit()
+            if not code or not name:
+                return None
 
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.SUCCESS.value if items_failed == 0 else SyncStatus.PARTIAL.value,
-                items_received=items_received,
-                items_created=items_created,
-                items_updated=items_updated,
-                items_failed=items_failed
-            )
+            # Extrair geolocalização se disponível
+            latitude = item.get("latitude") or item.get("lat")
+            longitude = item.get("longitude") or item.get("lng") or item.get("lon")
 
             return {
-                "received": items_received,
-                "created": items_created,
-                "updated": items_updated,
-                "failed": items_failed
+                "code": code,
+                "name": name,
+                "ug_id": ug_ids.get(ug_code) if ug_code else None,
+                "latitude": latitude,
+                "longitude": longitude,
+                "extra_data": item
             }
 
-        except Exception as e:
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.FAILED.value,
-                error_message=str(e)
-            )
-            raise
+        return await self._sync_master_table(
+            "ul",
+            self.system.endpoint_download_ul,
+            InventoryMasterUL,
+            "uq_ul_system_code",
+            ["name", "ug_id", "latitude", "longitude", "extra_data"],
+            map_item
+        )
+
+    async def sync_physical_status(self) -> Dict[str, int]:
+        """Sincroniza Situações Físicas"""
+        def map_item(item: dict) -> Optional[dict]:
+            code = item.get("C01") or item.get("codigo") or item.get("code")
+            name = item.get("C02") or item.get("nome") or item.get("name")
+            description = item.get("C03") or item.get("descricao") or item.get("description")
+            if not code or not name:
+                return None
+            return {"code": code, "name": name, "description": description}
+
+        return await self._sync_master_table(
+            "physical_status",
+            self.system.endpoint_download_physical_status,
+            InventoryMasterPhysicalStatus,
+            "uq_physical_status_system_code",
+            ["name", "description"],
+            map_item
+        )
 
     async def sync_characteristics(self) -> Dict[str, int]:
         """Sincroniza Características de Bens"""
-        sync_log = self._create_sync_log("characteristics")
-
-        try:
-            data = await self._make_request(self.system.endpoint_download_characteristics)
-
-            items = data if isinstance(data, list) else data.get("itens", [])
-            items_received = len(items)
-            items_created = 0
-            items_updated = 0
-            items_failed = 0
-
-            for item in items:
-                try:
-                    code = item.get("C01") or item.get("codigo") or item.get("code")
-                    name = item.get("C02") or item.get("nome") or item.get("name")
-                    char_type = item.get("C03") or item.get("tipo") or item.get("type")
-                    required = item.get("obrigatorio") or item.get("required") or False
-
-                    if not code or not name:
-                        items_failed += 1
-                        continue
-
-                    existing = self.db.query(InventoryMasterCharacteristic).filter(
-                        InventoryMasterCharacteristic.external_system_id == self.system.id,
-                        InventoryMasterCharacteristic.code == code
-                    ).first()
-
-                    if existing:
-                        existing.name = name
-                        existing.type = char_type
-                        existing.required = required
-                        existing.synced_at = datetime.utcnow()
-                        items_updated += 1
-                    else:
-                        char = InventoryMasterCharacteristic(
-                            external_system_id=self.system.id,
-                            code=code,
-                            name=name,
-                            type=char_type,
-                            required=required
-                        )
-                        self.db.add(char)
-                        items_created += 1
-
-                except Exception as e:
-                    logger.error(f"Erro ao processar característica: {e}")
-                    items_failed += 1
-
-            self.db.commit()
-
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.SUCCESS.value if items_failed == 0 else SyncStatus.PARTIAL.value,
-                items_received=items_received,
-                items_created=items_created,
-                items_updated=items_updated,
-                items_failed=items_failed
-            )
-
-            return {
-                "received": items_received,
-                "created": items_created,
-                "updated": items_updated,
-                "failed": items_failed
-            }
-
-        except Exception as e:
-            self._complete_sync_log(
-                sync_log,
-                SyncStatus.FAILED.value,
-                error_message=str(e)
-            )
-            raise
+        def map_item(item: dict) -> Optional[dict]:
+            code = item.get("C01") or item.get("codigo") or item.get("code")
+            name = item.get("C02") or item.get("nome") or item.get("name")
+            char_type = item.get("C03") or item.get("tipo") or item.get("type")
+            required = item.get("obrigatorio") or item.get("required") or False
+            if not code or not name:
+                return None
+            return {"code": code, "name": name, "type": char_type, "required": required}
+
+        return await self._sync_master_table(
+            "characteristics",
+            self.system.endpoint_download_characteristics,
+            InventoryMasterCharacteristic,
+            "uq_characteristics_system_code",
+            ["name", "type", "required"],
+            map_item
+        )
 
     async def sync_all(self) -> Dict[str, Dict[str, int]]:
         """Sincroniza todos os dados mestres"""
@@ -516,6 +494,196 @@ class ExternalSystemSyncService:
 
         return results
 
+    def _map_asset_item(self, item: dict) -> dict:
+        """
+        Mapeia um bem do ASI para os campos de InventoryExpectedAsset.
+
+        Campos esperados do ASI:
+        CD_BEM_PERM - Código do bem (plaqueta)
+        SQ_BEM_PERM - Sequência do bem
+        DS_BEM - Descrição
+        CD_RFID - Código RFID
+        CD_BARRA - Código de barras
+        CD_UL_ATUAL - Código da UL atual
+        CD_UA_ATUAL - Código da UA atual
+        ST_BAIXADO - Se está baixado (S/N ou 1/0)
+        DS_CATEGORIA - Categoria do bem
+        """
+        return {
+            "asset_code": item.get("CD_BEM_PERM") or item.get("codigo") or item.get("code"),
+            "asset_sequence": item.get("SQ_BEM_PERM") or item.get("sequencia"),
+            "description": item.get("DS_BEM") or item.get("descricao") or item.get("description"),
+            "rfid_code": item.get("CD_RFID") or item.get("rfid"),
+            "barcode": item.get("CD_BARRA") or item.get("codigo_barras") or item.get("barcode"),
+            "expected_ul_code": item.get("CD_UL_ATUAL") or item.get("ul_code"),
+            "expected_ua_code": item.get("CD_UA_ATUAL") or item.get("ua_code"),
+            "category": item.get("DS_CATEGORIA") or item.get("categoria"),
+            "is_written_off": self._parse_boolean(
+                item.get("ST_BAIXADO") or item.get("baixado") or item.get("written_off")
+            ),
+            "extra_data": item  # Guardar dados originais para referência
+        }
+
+    async def _iter_response_items(self, response: httpx.Response) -> AsyncIterator[dict]:
+        """
+        Lê os bens de uma resposta do ASI à medida que os bytes chegam.
+
+        Com ijson o JSON é interpretado de forma incremental e cada bem é
+        entregue assim que termina de chegar, sem materializar a resposta.
+        Respostas com double JSON encoding (o corpo é uma string JSON) não
+        podem ser lidas incrementalmente e são interpretadas por inteiro.
+        """
+        chunks = response.aiter_bytes()
+        first_chunk = b""
+        async for chunk in chunks:
+            if chunk.strip():
+                first_chunk = chunk.lstrip()
+                break
+
+        if not first_chunk:
+            return
+
+        if not IJSON_AVAILABLE or first_chunk[:1] == b'"':
+            body = first_chunk + b"".join([chunk async for chunk in chunks])
+            data = self._parse_response(body.decode("utf-8"))
+            items = []
+            if isinstance(data, list):
+                items = data
+            elif isinstance(data, dict):
+                items = data.get("itens") or data.get("bens") or data.get("items") or []
+            for item in items:
+                yield item
+            return
+
+        reader = _AsyncByteReader(chunks, first_chunk)
+        builder = None
+        depth = 0
+        async for prefix, event, value in ijson.parse_async(reader, use_float=True):
+            if builder is None:
+                if event != "start_map" or prefix not in ASSET_ITEM_PREFIXES:
+                    continue
+                builder = ObjectBuilder()
+
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    yield builder.value
+                    builder = None
+
+    async def _fetch_asset_page(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        payload: dict
+    ) -> Dict[str, Any]:
+        """Baixa uma página de bens (com novas tentativas em falhas de conexão)"""
+        headers = self._get_auth_headers()
+
+        for attempt in range(self.system.retry_attempts):
+            try:
+                async with client.stream("POST", url, headers=headers, json=payload) as response:
+                    if response.status_code in (401, 403):
+                        raise PermissionError("Falha na autenticação")
+                    elif response.status_code == 404:
+                        raise FileNotFoundError(f"Endpoint não encontrado: {url}")
+                    elif response.status_code != 200:
+                        body = await response.aread()
+                        raise Exception(f"Erro HTTP {response.status_code}: {body[:200].decode(errors='replace')}")
+
+                    received = 0
+                    items = []
+                    async for item in self._iter_response_items(response):
+                        received += 1
+                        mapped = self._map_asset_item(item)
+                        # Só adicionar se tiver código do bem
+                        if mapped["asset_code"]:
+                            items.append(mapped)
+
+                    return {"received": received, "items": items}
+
+            except (httpx.TimeoutException, httpx.ConnectError) as e:
+                if attempt < self.system.retry_attempts - 1:
+                    logger.warning(f"Tentativa {attempt + 1} falhou, tentando novamente...")
+                    continue
+                raise ConnectionError(f"Falha na conexão após {self.system.retry_attempts} tentativas: {e}")
+
+    async def iter_asset_pages(
+        self,
+        session_code: str,
+        ul_code: Optional[str] = None,
+        ug_code: Optional[str] = None,
+        page_size: int = ASSET_PAGE_SIZE,
+        start_offset: int = 0,
+        max_items: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Baixa os bens de um levantamento em páginas ($offset/$limit).
+
+        O ASI usa o endpoint /coletorweb/storages/create/{codigo_levantamento}
+        que retorna os bens esperados para aquele levantamento. Cada página é
+        lida de forma incremental e entregue já mapeada, então a memória usada
+        é limitada ao tamanho da página e não ao total do levantamento.
+
+        Args:
+            session_code: Código da sessão/levantamento
+            ul_code: Código da UL (opcional, para filtro)
+            ug_code: Código da UG (opcional, para filtro)
+            page_size: Bens por página
+            start_offset: Posição inicial (retomada de uma carga interrompida)
+            max_items: Limite total de registros a baixar (None = todos)
+
+        Yields:
+            Dict com offset, next_offset, received (itens recebidos na página)
+            e items (bens mapeados com código)
+        """
+        endpoint = self.system.endpoint_load_assets or "/coletorweb/storages/create"
+        url = self.base_url + f"{endpoint}/{session_code}"
+
+        offset = start_offset
+        previous_first_code = None
+
+        async with httpx.AsyncClient(verify=False, timeout=self.system.timeout_seconds) as client:
+            while True:
+                limit = page_size
+                if max_items is not None:
+                    limit = min(page_size, max_items - (offset - start_offset))
+                    if limit <= 0:
+                        return
+
+                # Payload para filtrar/paginar
+                payload = {"$limit": limit, "$offset": offset}
+                if ul_code:
+                    payload["ul_code"] = ul_code
+                if ug_code:
+                    payload["ug_code"] = ug_code
+
+                logger.info(f"Baixando bens do ASI: {url} (offset {offset}, limite {limit})")
+                page = await self._fetch_asset_page(client, url, payload)
+
+                if page["received"] == 0:
+                    return
+
+                # Servidor que ignora $offset devolveria a mesma página indefinidamente
+                first_code = page["items"][0]["asset_code"] if page["items"] else None
+                if offset > start_offset and first_code is not None and first_code == previous_first_code:
+                    logger.warning(f"Servidor ignorou $offset={offset} - encerrando a paginação")
+                    return
+                previous_first_code = first_code
+
+                yield {
+                    "offset": offset,
+                    "next_offset": offset + page["received"],
+                    "received": page["received"],
+                    "items": page["items"]
+                }
+
+                if page["received"] < limit:
+                    return
+                offset += page["received"]
+
     async def download_assets_for_session(
         self,
         session_code: str,
@@ -524,10 +692,8 @@ class ExternalSystemSyncService:
         limit: int = 5000
     ) -> Dict[str, Any]:
         """
-        Baixa bens do sistema externo para uma sessão de inventário.
-
-        O ASI usa o endpoint /coletorweb/storages/create/{codigo_levantamento}
-        que retorna os bens esperados para aquele levantamento.
+        Baixa bens do sistema externo para uma sessão de inventário (todas as páginas).
+        Para cargas grandes prefira iter_asset_pages, que não acumula os bens em memória.
 
         Args:
             session_code: Código da sessão/levantamento
@@ -539,69 +705,17 @@ class ExternalSystemSyncService:
             Dict com lista de bens e estatísticas
         """
         try:
-            # Montar endpoint - baseado no app de referência
-            endpoint = self.system.endpoint_load_assets or "/coletorweb/storages/create"
-            url_endpoint = f"{endpoint}/{session_code}"
-
-            # Payload para filtrar/limitar
-            payload = {"$limit": limit}
-            if ul_code:
-                payload["ul_code"] = ul_code
-            if ug_code:
-                payload["ug_code"] = ug_code
-
-            logger.info(f"Baixando bens do ASI: {url_endpoint}")
-
-            # Fazer requisição
-            data = await self._make_request(url_endpoint, method="POST", data=payload)
-
-            # Processar resposta
-            # O ASI pode retornar em diferentes formatos:
-            # - {"itens": [...]}
-            # - Lista direta [...]
-            # - {"bens": [...]}
-            items = []
-            if isinstance(data, list):
-                items = data
-            elif isinstance(data, dict):
-                items = data.get("itens") or data.get("bens") or data.get("items") or []
-
-            # Mapear campos do ASI para nosso formato
-            # Campos esperados do ASI:
-            # CD_BEM_PERM - Código do bem (plaqueta)
-            # SQ_BEM_PERM - Sequência do bem
-            # DS_BEM - Descrição
-            # CD_RFID - Código RFID
-            # CD_BARRA - Código de barras
-            # CD_UL_ATUAL - Código da UL atual
-            # CD_UA_ATUAL - Código da UA atual
-            # ST_BAIXADO - Se está baixado (S/N ou 1/0)
-            # DS_CATEGORIA - Categoria do bem
-
+            total_received = 0
             mapped_items = []
-            for item in items:
-                mapped = {
-                    "asset_code": item.get("CD_BEM_PERM") or item.get("codigo") or item.get("code"),
-                    "asset_sequence": item.get("SQ_BEM_PERM") or item.get("sequencia"),
-                    "description": item.get("DS_BEM") or item.get("descricao") or item.get("description"),
-                    "rfid_code": item.get("CD_RFID") or item.get("rfid"),
-                    "barcode": item.get("CD_BARRA") or item.get("codigo_barras") or item.get("barcode"),
-                    "expected_ul_code": item.get("CD_UL_ATUAL") or item.get("ul_code"),
-                    "expected_ua_code": item.get("CD_UA_ATUAL") or item.get("ua_code"),
-                    "category": item.get("DS_CATEGORIA") or item.get("categoria"),
-                    "is_written_off": self._parse_boolean(
-                        item.get("ST_BAIXADO") or item.get("baixado") or item.get("written_off")
-                    ),
-                    "extra_data": item  # Guardar dados originais para referência
-                }
-
-                # Só adicionar se tiver código do bem
-                if mapped["asset_code"]:
-                    mapped_items.append(mapped)
+            async for page in self.iter_asset_pages(
+                session_code, ul_code=ul_code, ug_code=ug_code, max_items=limit
+            ):
+                total_received += page["received"]
+                mapped_items.extend(page["items"])
 
             return {
                 "success": True,
-                "total_received": len(items),
+                "total_received": total_received,
                 "total_mapped": len(mapped_items),
                 "items": mapped_items
             }
@@ -626,11 +740,111 @@ class ExternalSystemSyncService:
             return value.upper() in ('S', 'SIM', 'Y', 'YES', 'TRUE', '1')
         return False
 
+    def _read_photo_base64(self, photo_path: str) -> Optional[str]:
+        """Lê a foto de uma leitura e retorna em base64 (executado no pool de threads)"""
+        path = photo_path if os.path.isabs(photo_path) else os.path.join(settings.STORAGE_PATH, photo_path)
+        try:
+            with open(path, "rb") as f:
+                return base64.b64encode(f.read()).decode("ascii")
+        except OSError as e:
+            logger.warning(f"Foto não encontrada para envio ({path}): {e}")
+            return None
+
+    def _build_upload_item(self, session: Any, reading: Any, expected: Any) -> Optional[dict]:
+        """Monta o item C12 (formato ASI) de uma leitura"""
+        read_ts = int(reading.read_at.timestamp() * 1000) if reading.read_at else int(datetime.utcnow().timestamp() * 1000)
+
+        if reading.category == "found" and expected is not None:
+            # Bem encontrado - formato completo
+            return {
+                "C01": expected.asset_code,  # codBem
+                "C02": expected.asset_sequence or "1",  # sequencial
+                "C03": session.ul_code or expected.expected_ul_code or "",  # ulAtual
+                "C04": reading.rfid_code or "",  # codRFID
+                "C05": "",  # codBemServico (não temos)
+                "C06": self._map_physical_condition(reading.physical_condition),  # codSituacaoFisica
+                "C07": read_ts,  # dataRegistro
+                "C09": "01"  # codStatus (encontrado)
+            }
+
+        if reading.category == "unregistered":
+            # Bem não cadastrado - formato reduzido
+            return {
+                "C01": reading.rfid_code or reading.barcode or reading.asset_code or "",  # código (decimal do RFID)
+                "C04": reading.rfid_code or "",  # codRfid
+                "C07": read_ts  # dataRegistro
+            }
+
+        return None
+
+    def _iter_upload_chunks(self, session: Any, chunk_size: int, include_photos: bool):
+        """
+        Percorre as leituras da sessão em ordem de id, em streaming (yield_per),
+        agrupando os itens C12 em lotes de chunk_size.
+
+        Yields:
+            (índice do lote, itens, caminhos de foto por posição no lote)
+        """
+        from app.models import InventoryReadAsset, InventoryExpectedAsset
+
+        query = self.db.query(
+            InventoryReadAsset, InventoryExpectedAsset
+        ).outerjoin(
+            InventoryExpectedAsset, InventoryReadAsset.expected_asset_id == InventoryExpectedAsset.id
+        ).filter(
+            InventoryReadAsset.session_id == session.id
+        ).order_by(InventoryReadAsset.id).yield_per(max(chunk_size, 100))
+
+        index = 0
+        items = []
+        photos = {}
+        for reading, expected in query:
+            item = self._build_upload_item(session, reading, expected)
+            if not item:
+                continue
+            # Foto só é enviada para bens encontrados (formato completo)
+            if include_photos and reading.photo_path and "C09" in item:
+                photos[len(items)] = reading.photo_path
+            items.append(item)
+
+            if chunk_size and len(items) >= chunk_size:
+                yield index, items, photos
+                index += 1
+                items = []
+                photos = {}
+
+        if items or index == 0:
+            yield index, items, photos
+
+    def _save_upload_state(self, session_id: int, state: dict) -> None:
+        """
+        Persiste o estado do envio em lotes na sessão.
+
+        Usa sessão independente: a sessão principal está percorrendo as
+        leituras com cursor no servidor, que um commit invalidaria.
+        """
+        state_db = SessionLocal()
+        try:
+            from app.models import InventorySession
+            state_db.query(InventorySession).filter(
+                InventorySession.id == session_id
+            ).update({"upload_state": state}, synchronize_session=False)
+            state_db.commit()
+        except Exception as e:
+            logger.error(f"Erro ao salvar estado do envio da sessão {session_id}: {e}")
+            state_db.rollback()
+        finally:
+            state_db.close()
+
     async def upload_inventory_results(
         self,
         session: Any,  # InventorySession
         include_photos: bool = False,
-        user_login: str = "sistema"
+        user_login: str = "sistema",
+        chunk_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        compress: bool = False,
+        restart: bool = False
     ) -> Dict[str, Any]:
         """
         Envia resultados do inventário para o sistema externo ASI.
@@ -639,75 +853,44 @@ class ExternalSystemSyncService:
         com double encoding: o JSON é stringificado, aspas duplas substituídas
         por aspas simples, e encapsulado em aspas duplas.
 
+        Os bens (C12) são enviados em lotes de chunk_size, com até
+        max_concurrency lotes em paralelo. O estado de cada lote fica em
+        session.upload_state, então uma nova chamada reenvia apenas os lotes
+        que falharam.
+
         Args:
             session: Sessão de inventário com leituras
             include_photos: Se deve incluir fotos base64
             user_login: Login do usuário para registro
+            chunk_size: Bens por requisição (0 = envio único; None = configuração)
+            max_concurrency: Lotes em paralelo (None = configuração)
+            compress: Envia o corpo com gzip (Content-Encoding)
+            restart: Descarta o estado anterior e reenvia todos os lotes
 
         Returns:
             Dict com resultado do upload (num_transmissao, id_levantamento, etc.)
         """
-        from app.models import InventoryReading, InventoryExpectedAsset
+        if chunk_size is None:
+            chunk_size = settings.ASI_UPLOAD_CHUNK_SIZE
+        if max_concurrency is None:
+            max_concurrency = settings.ASI_UPLOAD_MAX_CONCURRENCY
+        max_concurrency = max(1, max_concurrency)
+
+        # Estado anterior só é reaproveitado com o mesmo tamanho de lote
+        state = copy.deepcopy(session.upload_state or {})
+        if restart or state.get("status") == "completed" or state.get("chunk_size") != chunk_size:
+            state = {"chunk_size": chunk_size, "chunks": {}}
+        state["status"] = "running"
+        state["started_at"] = datetime.utcnow().isoformat()
+        chunks_state = state["chunks"]
 
         try:
-            # Buscar leituras da sessão
-            readings = self.db.query(InventoryReading).filter(
-                InventoryReading.session_id == session.id
-            ).all()
-
-            # Buscar bens esperados
-            expected_assets = self.db.query(InventoryExpectedAsset).filter(
-                InventoryExpectedAsset.session_id == session.id
-            ).all()
-
-            # Criar mapa de bens esperados por código
-            expected_map = {a.asset_code: a for a in expected_assets}
-
             # Montar payload no formato ASI
             now_ts = int(datetime.utcnow().timestamp() * 1000)
             start_ts = int(session.started_at.timestamp() * 1000) if session.started_at else now_ts
             end_ts = int(session.completed_at.timestamp() * 1000) if session.completed_at else now_ts
 
-            # Lista de bens (C12)
-            items_c12 = []
-
-            for reading in readings:
-                item = {}
-
-                # Buscar bem esperado correspondente
-                expected = expected_map.get(reading.matched_asset_code)
-
-                if reading.category == "found" and expected:
-                    # Bem encontrado - formato completo
-                    item = {
-                        "C01": reading.matched_asset_code,  # codBem
-                        "C02": expected.asset_sequence or "1",  # sequencial
-                        "C03": reading.found_ul_code or expected.expected_ul_code or "",  # ulAtual
-                        "C04": reading.rfid_code or "",  # codRFID
-                        "C05": "",  # codBemServico (não temos)
-                        "C06": self._map_physical_condition(reading.physical_condition),  # codSituacaoFisica
-                        "C07": int(reading.read_at.timestamp() * 1000),  # dataRegistro
-                        "C09": "01"  # codStatus (encontrado)
-                    }
-
-                    # Adicionar foto se disponível e solicitado
-                    if include_photos and reading.photo_file_id:
-                        # TODO: Buscar foto do storage e converter para base64
-                        pass
-
-                elif reading.category == "unregistered":
-                    # Bem não cadastrado - formato reduzido
-                    item = {
-                        "C01": reading.rfid_code or reading.barcode or "",  # código (decimal do RFID)
-                        "C04": reading.rfid_code or "",  # codRfid
-                        "C07": int(reading.read_at.timestamp() * 1000)  # dataRegistro
-                    }
-
-                if item:
-                    items_c12.append(item)
-
-            # Montar payload completo
-            payload = {
+            base_payload = {
                 "C01": session.id,  # id
                 "C02": session.collector_id or "1",  # idColetor
                 "C04": session.org_code or "001",  # codOrgao
@@ -715,48 +898,126 @@ class ExternalSystemSyncService:
                 "C08": user_login,  # login
                 "C10": start_ts,  # dataInicio
                 "C11": end_ts,  # dataFim
-                "C12": items_c12,  # bens
                 "C13": session.objective_code or "01",  # codObjetivo
                 "C15": now_ts  # dataTransmissao
             }
 
             # Campos opcionais
             if session.ua_code:
-                payload["C06"] = session.ua_code
+                base_payload["C06"] = session.ua_code
             if session.ul_code:
-                payload["C07"] = session.ul_code
+                base_payload["C07"] = session.ul_code
             if session.responsible_code:
-                payload["C16"] = session.responsible_code
+                base_payload["C16"] = session.responsible_code
 
             # Endpoint de upload
             endpoint = self.system.endpoint_upload or "/coletorweb/service/atualizarColetaLevantamento"
+            loop = asyncio.get_running_loop()
+            semaphore = asyncio.Semaphore(max_concurrency)
 
-            logger.info(f"Enviando inventário para ASI: {endpoint}, {len(items_c12)} bens")
+            async def send_chunk(index: int, items: List[dict], photos: Dict[int, str]):
+                key = str(index)
+                try:
+                    if photos:
+                        encoded = await asyncio.gather(*[
+                            loop.run_in_executor(_photo_executor, self._read_photo_base64, path)
+                            for path in photos.values()
+                        ])
+                        for position, photo in zip(photos.keys(), encoded):
+                            if photo:
+                                items[position]["C08"] = photo  # fotoBase64
+
+                    chunk_state = chunks_state.setdefault(key, {"attempts": 0})
+                    chunk_state["items"] = len(items)
+                    chunk_state["attempts"] += 1
+
+                    result = await self._make_upload_request(
+                        endpoint, {**base_payload, "C12": items}, compress=compress
+                    )
 
-            # Fazer requisição com encoding especial
-            result = await self._make_upload_request(endpoint, payload)
+                    # Verificar resposta
+                    if not result.get("C03") or not result.get("C14"):
+                        raise ValueError(f"Resposta incompleta do servidor: {result}")
 
-            # Verificar resposta
-            if not result.get("C03") or not result.get("C14"):
-                raise ValueError(f"Resposta incompleta do servidor: {result}")
+                    chunk_state.update({
+                        "status": "sent",
+                        "transmission_number": result.get("C03"),
+                        "inventory_id": result.get("C14"),
+                        "error": None
+                    })
+                except Exception as e:
+                    logger.error(f"Erro ao enviar lote {index} da sessão {session.id}: {e}")
+                    chunks_state.setdefault(key, {"attempts": 1}).update({"status": "failed", "error": str(e)})
+                finally:
+                    semaphore.release()
+                    # Commit síncrono fora do loop: os demais lotes seguem em envio
+                    await asyncio.to_thread(self._save_upload_state, session.id, copy.deepcopy(state))
+
+            logger.info(
+                f"Enviando inventário para ASI: {endpoint}, lotes de {chunk_size or 'todos os'} bens, "
+                f"até {max_concurrency} em paralelo"
+            )
+
+            tasks = []
+            total_chunks = 0
+            try:
+                for index, items, photos in self._iter_upload_chunks(session, chunk_size, include_photos):
+                    total_chunks += 1
+                    if chunks_state.get(str(index), {}).get("status") == "sent":
+                        continue  # Enviado em uma execução anterior
+                    # Limita os lotes montados em memória aos que estão em envio
+                    await semaphore.acquire()
+                    tasks.append(asyncio.create_task(send_chunk(index, items, photos)))
+
+                await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                # Erro ao montar os lotes (ou cancelamento): não deixa envios órfãos
+                pending = [task for task in tasks if not task.done()]
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+            state["total_chunks"] = total_chunks
+            sent = [chunks_state[str(i)] for i in range(total_chunks) if chunks_state.get(str(i), {}).get("status") == "sent"]
+            failed = total_chunks - len(sent)
+            items_sent = sum(chunk.get("items", 0) for chunk in sent)
+
+            state["status"] = "completed" if failed == 0 else "partial"
+            state["completed_at"] = datetime.utcnow().isoformat()
+            await asyncio.to_thread(self._save_upload_state, session.id, state)
+
+            if failed:
+                return {
+                    "success": False,
+                    "error": f"{failed} de {total_chunks} lotes falharam - reenvie para retomar os lotes pendentes",
+                    "items_sent": items_sent,
+                    "chunks_total": total_chunks,
+                    "chunks_failed": failed
+                }
 
+            # O último lote identifica a transmissão completa
+            last = sent[-1] if sent else {}
             return {
                 "success": True,
-                "transmission_number": result.get("C03"),
-                "inventory_id": result.get("C14"),
-                "items_sent": len(items_c12),
-                "raw_response": result
+                "transmission_number": last.get("transmission_number"),
+                "inventory_id": last.get("inventory_id"),
+                "items_sent": items_sent,
+                "chunks_total": total_chunks,
+                "chunks_failed": 0
             }
 
         except Exception as e:
             logger.error(f"Erro ao enviar inventário: {e}")
+            state["status"] = "failed"
+            await asyncio.to_thread(self._save_upload_state, session.id, state)
             return {
                 "success": False,
                 "error": str(e),
                 "items_sent": 0
             }
 
-    async def _make_upload_request(self, endpoint: str, data: dict) -> Any:
+    async def _make_upload_request(self, endpoint: str, data: dict, compress: bool = False) -> Any:
         """
         Faz requisição de upload com encoding especial do ASI.
         O ASI espera: "{'campo1': 'valor1', ...}"
@@ -770,7 +1031,11 @@ class ExternalSystemSyncService:
         # 3. Encapsular em aspas duplas
         body_str = json.dumps(data)
         body_str = body_str.replace('"', "'")
-        body_str = '"' + body_str + '"'
+        body = ('"' + body_str + '"').encode("utf-8")
+
+        if compress:
+            body = gzip.compress(body)
+            headers["Content-Encoding"] = "gzip"
 
         async with httpx.AsyncClient(
             verify=False,
@@ -781,7 +1046,7 @@ class ExternalSystemSyncService:
                     response = await client.post(
                         url,
                         headers=headers,
-                        content=body_str
+                        content=body
                     )
 
                     if response.status_code == 200:
@@ -0,0 +1,313 @@
+"""
+Catálogo FIPE espelhado localmente (marcas, modelos e anos por tipo de veículo).
+
+O catálogo só muda quando a FIPE publica uma nova tabela de referência. A task
+refresh_fipe_catalog consulta /references e, se o mês mudou, recarrega o
+espelho: na primeira carga todos os pares (marca, ano); nas seguintes (delta)
+apenas anos ainda não espelhados e os FIPE_CATALOG_RECENT_YEARS mais recentes,
+onde surgem os modelos novos.
+
+Com o espelho carregado, FipeClient(catalog=FipeCatalog(db)) resolve marca,
+ano e modelo sem HTTP; resta apenas a consulta de preço, que também é evitada
+quando o Banco de Preços de Veículos já tem o veículo no mês vigente.
+"""
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import (
+    FipeCatalogReference,
+    FipeCatalogBrand,
+    FipeCatalogModel,
+    FipeCatalogModelYear,
+    VehiclePriceBank,
+)
+from app.services.fipe_client import FipeClient, FipeBrand, FipeModel, FipeYear, FipePrice
+
+logger = logging.getLogger(__name__)
+
+VEHICLE_TYPES = list(FipeClient.VEHICLE_TYPES)
+
+# Ano "Zero KM" na FIPE (ex: "32000-1")
+ZERO_KM_YEAR = "32000"
+
+
+class FipeCatalog:
+    """
+    Consultas ao catálogo espelhado, no formato do FipeClient.
+    Retorna lista vazia quando o tipo de veículo ainda não foi espelhado
+    (o FipeClient então consulta a API).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._references: Dict[str, Optional[FipeCatalogReference]] = {}
+
+    def reference(self, vehicle_type: str) -> Optional[FipeCatalogReference]:
+        if vehicle_type not in self._references:
+            self._references[vehicle_type] = self.db.get(FipeCatalogReference, vehicle_type)
+        return self._references[vehicle_type]
+
+    def brands(self, vehicle_type: str) -> List[FipeBrand]:
+        if not self.reference(vehicle_type):
+            return []
+        rows = self.db.execute(
+            select(FipeCatalogBrand.code, FipeCatalogBrand.name)
+            .where(FipeCatalogBrand.vehicle_type == vehicle_type)
+            .order_by(FipeCatalogBrand.name)
+        ).all()
+        return [FipeBrand(code=code, name=name) for code, name in rows]
+
+    def models(self, vehicle_type: str, brand_id: str) -> List[FipeModel]:
+        if not self.reference(vehicle_type):
+            return []
+        rows = self.db.execute(
+            select(FipeCatalogModel.code, FipeCatalogModel.name)
+            .where(FipeCatalogModel.vehicle_type == vehicle_type, FipeCatalogModel.brand_code == str(brand_id))
+            .order_by(FipeCatalogModel.name)
+        ).all()
+        return [FipeModel(code=code, name=name) for code, name in rows]
+
+    def years_by_brand(self, vehicle_type: str, brand_id: str) -> List[FipeYear]:
+        if not self.reference(vehicle_type):
+            return []
+        rows = self.db.execute(
+            select(FipeCatalogModelYear.year_code, FipeCatalogModelYear.year_name)
+            .where(FipeCatalogModelYear.vehicle_type == vehicle_type, FipeCatalogModelYear.brand_code == str(brand_id))
+            .distinct()
+            .order_by(FipeCatalogModelYear.year_code.desc())
+        ).all()
+        return [FipeYear(code=code, name=name) for code, name in rows]
+
+    def models_by_brand_year(self, vehicle_type: str, brand_id: str, year_id: str) -> List[FipeModel]:
+        if not self.reference(vehicle_type):
+            return []
+        rows = self.db.execute(
+            select(FipeCatalogModel.code, FipeCatalogModel.name)
+            .join(FipeCatalogModelYear, (
+                (FipeCatalogModelYear.vehicle_type == FipeCatalogModel.vehicle_type)
+                & (FipeCatalogModelYear.brand_code == FipeCatalogModel.brand_code)
+                & (FipeCatalogModelYear.model_code == FipeCatalogModel.code)
+            ))
+            .where(
+                FipeCatalogModel.vehicle_type == vehicle_type,
+                FipeCatalogModel.brand_code == str(brand_id),
+                FipeCatalogModelYear.year_code == year_id
+            )
+            .order_by(FipeCatalogModel.name)
+        ).all()
+        return [FipeModel(code=code, name=name) for code, name in rows]
+
+    def years(self, vehicle_type: str, brand_id: str, model_id: str) -> List[FipeYear]:
+        if not self.reference(vehicle_type):
+            return []
+        rows = self.db.execute(
+            select(FipeCatalogModelYear.year_code, FipeCatalogModelYear.year_name)
+            .where(
+                FipeCatalogModelYear.vehicle_type == vehicle_type,
+                FipeCatalogModelYear.brand_code == str(brand_id),
+                FipeCatalogModelYear.model_code == str(model_id)
+            )
+            .order_by(FipeCatalogModelYear.year_code.desc())
+        ).all()
+        return [FipeYear(code=code, name=name) for code, name in rows]
+
+    def cached_price(self, vehicle_type: str, brand_id: str, model_id: str, year_id: str) -> Optional[FipePrice]:
+        """Preço do Banco de Preços de Veículos, se já estiver no mês de referência espelhado"""
+        reference = self.reference(vehicle_type)
+        if not reference:
+            return None
+        try:
+            brand_id, model_id = int(brand_id), int(model_id)
+        except (TypeError, ValueError):
+            return None
+
+        vehicle = self.db.query(VehiclePriceBank).filter(
+            VehiclePriceBank.vehicle_type == vehicle_type,
+            VehiclePriceBank.brand_id == brand_id,
+            VehiclePriceBank.model_id == model_id,
+            VehiclePriceBank.year_id == year_id,
+            VehiclePriceBank.reference_month == reference.reference_month
+        ).first()
+        if not vehicle or not vehicle.api_response_json:
+            return None
+        try:
+            return FipePrice(**vehicle.api_response_json)
+        except Exception:
+            return None
+
+
+# ===== Carga do espelho =====
+
+def _year_number(year_code: str) -> int:
+    try:
+        return int(year_code.split("-")[0])
+    except ValueError:
+        return 0
+
+
+def _years_to_fetch(years: List[FipeYear], mirrored: set, full: bool) -> List[FipeYear]:
+    """Anos da marca a (re)carregar: todos na carga completa; no delta, os novos e os mais recentes"""
+    if full:
+        return years
+    recent = sorted(
+        {_year_number(y.code) for y in years if not y.code.startswith(ZERO_KM_YEAR)},
+        reverse=True
+    )[:settings.FIPE_CATALOG_RECENT_YEARS]
+    return [
+        y for y in years
+        if y.code not in mirrored or y.code.startswith(ZERO_KM_YEAR) or _year_number(y.code) in recent
+    ]
+
+
+async def _fetch_brand(
+    fipe_client: FipeClient,
+    semaphore: asyncio.Semaphore,
+    vehicle_type: str,
+    brand: FipeBrand,
+    mirrored_years: set,
+    full: bool
+) -> Tuple[FipeBrand, List[FipeYear], Dict[str, List[FipeModel]]]:
+    """Anos da marca e, para os anos a recarregar, os modelos de cada ano"""
+    async with semaphore:
+        years = await fipe_client.get_years_by_brand(vehicle_type, brand.code)
+
+    async def fetch_models(year: FipeYear):
+        async with semaphore:
+            return year.code, await fipe_client.get_models_by_brand_year(vehicle_type, brand.code, year.code)
+
+    results = await asyncio.gather(*[
+        fetch_models(year) for year in _years_to_fetch(years, mirrored_years, full)
+    ])
+    return brand, years, dict(results)
+
+
+def _store_brand(
+    db: Session,
+    vehicle_type: str,
+    brand: FipeBrand,
+    years: List[FipeYear],
+    models_by_year: Dict[str, List[FipeModel]]
+) -> int:
+    """Grava modelos e anos-modelo recarregados de uma marca; retorna o número de modelos"""
+    year_names = {year.code: year.name for year in years}
+
+    models = {model.code: model.name for year_models in models_by_year.values() for model in year_models}
+    if models:
+        stmt = pg_insert(FipeCatalogModel).values([
+            {"vehicle_type": vehicle_type, "brand_code": brand.code, "code": code, "name": name}
+            for code, name in models.items()
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["vehicle_type", "brand_code", "code"],
+            set_={"name": stmt.excluded.name}
+        ))
+
+    if models_by_year:
+        db.execute(delete(FipeCatalogModelYear).where(
+            FipeCatalogModelYear.vehicle_type == vehicle_type,
+            FipeCatalogModelYear.brand_code == brand.code,
+            FipeCatalogModelYear.year_code.in_(list(models_by_year))
+        ))
+        rows = [
+            {
+                "vehicle_type": vehicle_type,
+                "brand_code": brand.code,
+                "model_code": model.code,
+                "year_code": year_code,
+                "year_name": year_names.get(year_code, year_code),
+            }
+            for year_code, year_models in models_by_year.items()
+            for model in year_models
+        ]
+        if rows:
+            db.execute(pg_insert(FipeCatalogModelYear).values(rows).on_conflict_do_nothing())
+    return len(models)
+
+
+async def refresh_fipe_catalog(
+    db: Session,
+    vehicle_type: str,
+    force: bool = False,
+    http_client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, object]:
+    """
+    Atualiza o espelho de um tipo de veículo se a referência FIPE mudou
+    (ou se force=True). Commit por marca; a referência só é gravada no final,
+    então uma carga interrompida é retomada na próxima execução.
+    """
+    if http_client is None:
+        limits = httpx.Limits(max_connections=settings.FIPE_CATALOG_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=30.0, limits=limits, headers=FipeClient.request_headers()) as client:
+            return await refresh_fipe_catalog(db, vehicle_type, force, client)
+
+    fipe_client = FipeClient(http_client=http_client)
+
+    references = await fipe_client.get_references()
+    current = references[0]
+    reference_code, reference_month = int(current["code"]), current["month"].strip()
+
+    stored = db.get(FipeCatalogReference, vehicle_type)
+    if stored and stored.reference_code == reference_code and not force:
+        return {"vehicle_type": vehicle_type, "updated": False, "reference_month": reference_month}
+
+    full = stored is None
+    logger.info(
+        f"[FIPE-CATALOG] Atualizando {vehicle_type} para '{reference_month}' "
+        f"({'carga completa' if full else 'delta'})"
+    )
+
+    brands = await fipe_client.get_brands(vehicle_type)
+    stmt = pg_insert(FipeCatalogBrand).values([
+        {"vehicle_type": vehicle_type, "code": brand.code, "name": brand.name} for brand in brands
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["vehicle_type", "code"],
+        set_={"name": stmt.excluded.name}
+    ))
+    db.commit()
+
+    mirrored: Dict[str, set] = {}
+    for brand_code, year_code in db.execute(
+        select(FipeCatalogModelYear.brand_code, FipeCatalogModelYear.year_code)
+        .where(FipeCatalogModelYear.vehicle_type == vehicle_type)
+        .distinct()
+    ):
+        mirrored.setdefault(brand_code, set()).add(year_code)
+
+    semaphore = asyncio.Semaphore(settings.FIPE_CATALOG_CONCURRENCY)
+    models_count = 0
+    for brand in brands:
+        brand, years, models_by_year = await _fetch_brand(
+            fipe_client, semaphore, vehicle_type, brand, mirrored.get(brand.code, set()), full
+        )
+        models_count += _store_brand(db, vehicle_type, brand, years, models_by_year)
+        db.commit()
+
+    reference = stored or FipeCatalogReference(vehicle_type=vehicle_type)
+    reference.reference_code = reference_code
+    reference.reference_month = reference_month
+    reference.brands_count = len(brands)
+    reference.models_count = db.query(FipeCatalogModel).filter(
+        FipeCatalogModel.vehicle_type == vehicle_type
+    ).count()
+    db.add(reference)
+    db.commit()
+
+    logger.info(
+        f"[FIPE-CATALOG] {vehicle_type}: {len(brands)} marcas, {models_count} modelos recarregados, "
+        f"{fipe_client.api_calls} chamadas à API"
+    )
+    return {
+        "vehicle_type": vehicle_type,
+        "updated": True,
+        "full": full,
+        "reference_month": reference_month,
+        "api_calls": fipe_client.api_calls,
+    }
@@ -3,10 +3,15 @@ Cliente para API FIPE (Tabela FIPE de veículos)
 Documentação: https://deividfortuna.github.io/fipe/v2/
 """
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
 from pydantic import BaseModel
 import logging
-from difflib import SequenceMatcher
+
+from app.core.config import settings
+from app.services.vehicle_name_index import name_index, normalize_brand, normalize_vehicle_name, similarity
+
+if TYPE_CHECKING:
+    from app.services.fipe_catalog import FipeCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -78,62 +83,100 @@ class FipeClient:
         "trucks": "caminhões"
     }
 
-    def __init__(self, timeout: float = 30.0):
+    def __init__(
+        self,
+        timeout: float = 30.0,
+        catalog: Optional["FipeCatalog"] = None,
+        http_client: Optional[httpx.AsyncClient] = None
+    ):
+        """
+        Args:
+            timeout: Timeout das requisições (quando não há http_client)
+            catalog: Catálogo FIPE espelhado localmente; marcas, modelos e anos
+                são resolvidos nele sem chamadas HTTP (ver services/fipe_catalog.py)
+            http_client: Cliente HTTP compartilhado (reaproveita conexões)
+        """
         self.timeout = timeout
+        self.catalog = catalog
+        self.http_client = http_client
         self.api_calls = 0
         self.search_path = []
 
+    @staticmethod
+    def request_headers() -> Dict[str, str]:
+        """Cabeçalhos da API (token de assinatura, se configurado)"""
+        if settings.FIPE_API_TOKEN:
+            return {"X-Subscription-Token": settings.FIPE_API_TOKEN}
+        return {}
+
+    async def _get_json(self, url: str) -> Any:
+        """GET na API FIPE, contabilizando a chamada no caminho de busca"""
+        self.api_calls += 1
+        self.search_path.append(f"GET {url}")
+
+        if self.http_client is not None:
+            response = await self.http_client.get(url, headers=self.request_headers())
+            response.raise_for_status()
+            return response.json()
+
+        async with httpx.AsyncClient(timeout=self.timeout, headers=self.request_headers()) as client:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.json()
+
+    def _from_catalog(self, description: str, items):
+        """Registra no caminho de busca uma lista resolvida no catálogo local"""
+        if items:
+            self.search_path.append(f"LOCAL {description}")
+        return items
+
     def _similarity(self, a: str, b: str) -> float:
         """Calcula similaridade entre duas strings"""
-        return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+        return similarity(normalize_vehicle_name(a), normalize_vehicle_name(b))
 
     def _normalize_brand(self, brand: str) -> str:
         """Normaliza nome de marca para busca"""
-        mappings = {
-            "vw": "volkswagen",
-            "volks": "volkswagen",
-            "gm": "chevrolet",
-            "mb": "mercedes-benz",
-            "mercedes": "mercedes-benz",
-        }
-        brand_lower = brand.lower().strip()
-        return mappings.get(brand_lower, brand_lower)
+        return normalize_brand(brand)
+
+    async def get_references(self) -> List[Dict[str, Any]]:
+        """Tabelas de referência FIPE (a primeira é a vigente): [{"code", "month"}]"""
+        return await self._get_json(f"{self.BASE_URL}/references")
 
     async def get_brands(self, vehicle_type: str) -> List[FipeBrand]:
         """Lista todas as marcas para um tipo de veículo"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            local = self._from_catalog(f"{vehicle_type}/brands", self.catalog.brands(vehicle_type))
+            if local:
+                return local
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeBrand(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands")
+        return [FipeBrand(code=item["code"], name=item["name"]) for item in data]
 
     async def get_models(self, vehicle_type: str, brand_id: str) -> List[FipeModel]:
         """Lista modelos de uma marca"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            local = self._from_catalog(
+                f"{vehicle_type}/brands/{brand_id}/models",
+                self.catalog.models(vehicle_type, brand_id)
+            )
+            if local:
+                return local
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeModel(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models")
+        return [FipeModel(code=item["code"], name=item["name"]) for item in data]
 
     async def get_years_by_brand(self, vehicle_type: str, brand_id: str) -> List[FipeYear]:
         """Lista anos disponíveis para uma marca (NOVO FLUXO)"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/years"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            local = self._from_catalog(
+                f"{vehicle_type}/brands/{brand_id}/years",
+                self.catalog.years_by_brand(vehicle_type, brand_id)
+            )
+            if local:
+                return local
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeYear(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/years")
+        return [FipeYear(code=item["code"], name=item["name"]) for item in data]
 
     async def get_models_by_brand_year(
         self,
@@ -142,39 +185,34 @@ class FipeClient:
         year_id: str
     ) -> List[FipeModel]:
         """Lista modelos disponíveis para uma marca e ano específico (NOVO FLUXO)"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/years/{year_id}/models"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            local = self._from_catalog(
+                f"{vehicle_type}/brands/{brand_id}/years/{year_id}/models",
+                self.catalog.models_by_brand_year(vehicle_type, brand_id, year_id)
+            )
+            if local:
+                return local
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeModel(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/years/{year_id}/models")
+        return [FipeModel(code=item["code"], name=item["name"]) for item in data]
 
     async def get_years(self, vehicle_type: str, brand_id: str, model_id: str) -> List[FipeYear]:
         """Lista anos disponíveis para um modelo"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models/{model_id}/years"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            local = self._from_catalog(
+                f"{vehicle_type}/brands/{brand_id}/models/{model_id}/years",
+                self.catalog.years(vehicle_type, brand_id, model_id)
+            )
+            if local:
+                return local
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeYear(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models/{model_id}/years")
+        return [FipeYear(code=item["code"], name=item["name"]) for item in data]
 
     async def get_years_by_fipe_code(self, vehicle_type: str, fipe_code: str) -> List[FipeYear]:
         """Lista anos disponíveis por código FIPE"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/{fipe_code}/years"
-        self.search_path.append(f"GET {url}")
-
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return [FipeYear(code=item["code"], name=item["name"]) for item in data]
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/{fipe_code}/years")
+        return [FipeYear(code=item["code"], name=item["name"]) for item in data]
 
     async def get_price(
         self,
@@ -184,15 +222,14 @@ class FipeClient:
         year_id: str
     ) -> FipePrice:
         """Obtém preço FIPE para um veículo específico"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models/{model_id}/years/{year_id}"
-        self.search_path.append(f"GET {url}")
+        if self.catalog is not None:
+            cached = self.catalog.cached_price(vehicle_type, brand_id, model_id, year_id)
+            if cached is not None:
+                self.search_path.append(f"CACHE {vehicle_type}/brands/{brand_id}/models/{model_id}/years/{year_id}")
+                return cached
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return FipePrice(**data)
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/brands/{brand_id}/models/{model_id}/years/{year_id}")
+        return FipePrice(**data)
 
     async def get_price_by_fipe_code(
         self,
@@ -201,15 +238,8 @@ class FipeClient:
         year_id: str
     ) -> FipePrice:
         """Obtém preço FIPE por código FIPE"""
-        self.api_calls += 1
-        url = f"{self.BASE_URL}/{vehicle_type}/{fipe_code}/years/{year_id}"
-        self.search_path.append(f"GET {url}")
-
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.get(url)
-            response.raise_for_status()
-            data = response.json()
-            return FipePrice(**data)
+        data = await self._get_json(f"{self.BASE_URL}/{vehicle_type}/{fipe_code}/years/{year_id}")
+        return FipePrice(**data)
 
     async def find_brand(
         self,
@@ -220,38 +250,27 @@ class FipeClient:
         """Busca marca por nome (com variações)"""
         brands = await self.get_brands(vehicle_type)
 
-        # Normalizar termo de busca
-        normalized_search = self._normalize_brand(search_term)
-
-        # Lista de termos para buscar (principal + variações)
-        search_terms = [normalized_search]
+        # Termo principal + variações, normalizados
+        search_terms = [self._normalize_brand(search_term)]
         if variations:
             search_terms.extend([self._normalize_brand(v) for v in variations])
 
-        best_match = None
-        best_score = 0.0
+        index = name_index(tuple(brand.name for brand in brands))
 
-        for brand in brands:
-            brand_name_lower = brand.name.lower()
+        # Busca exata (termo contido no nome ou vice-versa)
+        position = index.first_direct_match(search_terms)
+        if position is not None:
+            logger.info(f"Marca encontrada (match direto): {brands[position].name}")
+            return brands[position]
 
-            for term in search_terms:
-                # Busca exata (ignorando case)
-                if term in brand_name_lower or brand_name_lower in term:
-                    logger.info(f"Marca encontrada (match direto): {brand.name}")
-                    return brand
+        # Busca por similaridade
+        position, best_score = index.best_similar(search_terms, threshold=0.6)
+        if position is not None:
+            logger.info(f"Marca encontrada (similaridade {best_score:.2f}): {brands[position].name}")
+            return brands[position]
 
-                # Busca por similaridade
-                score = self._similarity(term, brand_name_lower)
-                if score > best_score and score > 0.6:
-                    best_score = score
-                    best_match = brand
-
-        if best_match:
-            logger.info(f"Marca encontrada (similaridade {best_score:.2f}): {best_match.name}")
-        else:
-            logger.warning(f"Marca não encontrada: {search_term}")
-
-        return best_match
+        logger.warning(f"Marca não encontrada: {search_term}")
+        return None
 
     async def find_model(
         self,
@@ -261,47 +280,40 @@ class FipeClient:
         variations: List[str] = None,
         keywords: List[str] = None
     ) -> Optional[FipeModel]:
-        """Busca modelo por nome (com variações e palavras-chave)"""
+        """
+        Busca modelo por nome (com variações e palavras-chave).
+
+        Como na busca linear, vence o primeiro modelo da lista que tenha todas as
+        keywords ou match direto com algum termo; sem nenhum, o mais similar.
+        Os nomes são comparados normalizados (sem acentos e pontuação) e a
+        similaridade avalia só os candidatos com mais trigramas em comum.
+        """
         models = await self.get_models(vehicle_type, brand_id)
 
-        search_terms = [search_term.lower()]
+        search_terms = [search_term]
         if variations:
-            search_terms.extend([v.lower() for v in variations])
-
-        best_match = None
-        best_score = 0.0
-
-        for model in models:
-            model_name_lower = model.name.lower()
-
-            # Busca por palavras-chave (todas devem estar presentes)
-            if keywords:
-                all_keywords_match = all(
-                    kw.lower() in model_name_lower
-                    for kw in keywords
-                )
-                if all_keywords_match:
-                    logger.info(f"Modelo encontrado (keywords): {model.name}")
-                    return model
+            search_terms.extend(variations)
 
-            for term in search_terms:
-                # Match exato ou parcial
-                if term in model_name_lower or model_name_lower in term:
-                    logger.info(f"Modelo encontrado (match direto): {model.name}")
-                    return model
+        index = name_index(tuple(model.name for model in models))
 
-                # Similaridade
-                score = self._similarity(term, model_name_lower)
-                if score > best_score and score > 0.5:
-                    best_score = score
-                    best_match = model
+        # Keywords (todas presentes) ou match exato/parcial: o primeiro da lista
+        keyword_position = index.first_with_all(keywords) if keywords else None
+        direct_position = index.first_direct_match(search_terms)
+        if keyword_position is not None and (direct_position is None or keyword_position <= direct_position):
+            logger.info(f"Modelo encontrado (keywords): {models[keyword_position].name}")
+            return models[keyword_position]
+        if direct_position is not None:
+            logger.info(f"Modelo encontrado (match direto): {models[direct_position].name}")
+            return models[direct_position]
 
-        if best_match:
-            logger.info(f"Modelo encontrado (similaridade {best_score:.2f}): {best_match.name}")
-        else:
-            logger.warning(f"Modelo não encontrado: {search_term}")
+        # Similaridade
+        position, best_score = index.best_similar(search_terms, threshold=0.5)
+        if position is not None:
+            logger.info(f"Modelo encontrado (similaridade {best_score:.2f}): {models[position].name}")
+            return models[position]
 
-        return best_match
+        logger.warning(f"Modelo não encontrado: {search_term}")
+        return None
 
     async def find_year(
         self,
@@ -728,74 +740,74 @@ class FipeClient:
         """
         Busca modelo em uma lista já filtrada (sem chamada API).
 
-        Estratégia de matching (em ordem de prioridade):
-        1. Match exato de keywords (todas presentes)
-        2. Match por palavras do termo principal (quanto mais palavras, melhor)
-        3. Match por similaridade de string
+        Estratégia de matching, percorrendo a lista na ordem (como a busca linear):
+        1. Modelo com todas as keywords: retornado imediatamente
+        2. Match por palavras do termo principal (quanto mais palavras, melhor);
+           em empate, um modelo posterior só vence se a similaridade superar o
+           melhor score até então (inicialmente a fração de palavras)
+        3. Enquanto nenhum modelo tiver palavras em comum: match direto (termo
+           contido no nome ou vice-versa) é retornado imediatamente
+        4. Sem palavras nem match direto: match por similaridade de string
+
+        O índice só responde quais posições casam com cada critério; apenas essas
+        posições são visitadas. Os nomes são comparados normalizados (sem acentos
+        e pontuação) e a similaridade do passo 4 avalia só os candidatos com mais
+        trigramas em comum.
         """
-        search_terms = [search_term.lower()]
+        search_terms = [search_term]
         if variations:
-            search_terms.extend([v.lower() for v in variations])
+            search_terms.extend(variations)
 
-        best_match = None
-        best_score = 0.0
-        best_word_count = 0
+        index = name_index(tuple(model.name for model in models))
 
-        # Extrair palavras significativas do termo de busca (ignorar palavras muito curtas)
-        search_words = [w for w in search_term.lower().split() if len(w) >= 2]
+        # Ignorar palavras muito curtas
+        search_words = [w for w in normalize_vehicle_name(search_term).split() if len(w) >= 2]
         logger.info(f"[FIPE-OPT] Buscando modelo com palavras: {search_words}")
 
-        for model in models:
-            model_name_lower = model.name.lower()
+        keyword_positions = index.positions_with_all(keywords) if keywords else set()
+        word_counts = index.word_matches(search_words)
+        direct_positions = index.direct_matches(search_terms)
 
+        best_position = None
+        best_score = 0.0
+        best_word_count = 0
+        for position in sorted(keyword_positions | set(word_counts) | direct_positions):
             # 1. Busca por keywords (todas devem estar presentes)
-            if keywords:
-                all_keywords_match = all(
-                    kw.lower() in model_name_lower
-                    for kw in keywords
-                )
-                if all_keywords_match:
-                    logger.info(f"[FIPE-OPT] Modelo por keywords: {model.name}")
-                    return model
-
-            # 2. Contar quantas palavras do termo de busca estão no modelo
-            matching_words = sum(1 for word in search_words if word in model_name_lower)
+            if position in keyword_positions:
+                logger.info(f"[FIPE-OPT] Modelo por keywords: {models[position].name}")
+                return models[position]
 
-            # Se encontrou modelo com mais palavras coincidentes, priorizar
+            # 2. Modelo com mais palavras coincidentes: priorizar
+            matching_words = word_counts.get(position, 0)
             if matching_words > best_word_count:
                 best_word_count = matching_words
-                best_match = model
-                best_score = matching_words / len(search_words) if search_words else 0
-                logger.info(f"[FIPE-OPT] Candidato com {matching_words}/{len(search_words)} palavras: {model.name}")
+                best_position = position
+                best_score = matching_words / len(search_words)
 
-            # 3. Se empate em palavras, usar similaridade como desempate
+            # Empate em palavras: similaridade como desempate
             elif matching_words == best_word_count and matching_words > 0:
                 for term in search_terms:
-                    score = self._similarity(term, model_name_lower)
+                    score = similarity(normalize_vehicle_name(term), index.names[position])
                     if score > best_score:
                         best_score = score
-                        best_match = model
+                        best_position = position
 
-            # 4. Fallback: Match direto simples (termo está no nome ou vice-versa)
-            elif best_word_count == 0:
-                for term in search_terms:
-                    if term in model_name_lower or model_name_lower in term:
-                        logger.info(f"[FIPE-OPT] Modelo por match direto: {model.name}")
-                        return model
+            # 3. Match direto, só enquanto nenhum modelo teve palavras em comum
+            elif best_word_count == 0 and position in direct_positions:
+                logger.info(f"[FIPE-OPT] Modelo por match direto: {models[position].name}")
+                return models[position]
 
-                    # Similaridade
-                    score = self._similarity(term, model_name_lower)
-                    if score > best_score and score > 0.5:
-                        best_score = score
-                        best_match = model
+        if best_position is not None:
+            logger.info(f"[FIPE-OPT] Modelo por palavras ({best_word_count}/{len(search_words)}): {models[best_position].name}")
+            return models[best_position]
 
-        if best_match:
-            if best_word_count > 0:
-                logger.info(f"[FIPE-OPT] Modelo por palavras ({best_word_count}/{len(search_words)}): {best_match.name}")
-            else:
-                logger.info(f"[FIPE-OPT] Modelo por similaridade ({best_score:.2f}): {best_match.name}")
+        # 4. Similaridade
+        position, best_score = index.best_similar(search_terms, threshold=0.5)
+        if position is not None:
+            logger.info(f"[FIPE-OPT] Modelo por similaridade ({best_score:.2f}): {models[position].name}")
+            return models[position]
 
-        return best_match
+        return None
 
     async def refresh_price(
         self,
@@ -5,17 +5,24 @@ REQ-FIPE-002: Screenshot de Comprovacao da Consulta FIPE
 
 Versao Robusta - Baseada na analise da estrutura real do site veiculos.fipe.org.br
 Utiliza multiplos seletores CSS e XPath com fallbacks para maior confiabilidade.
+
+Sessao reutilizavel: o portal e carregado uma vez por sessao e o formulario de
+pesquisa por codigo FIPE e limpo entre as consultas (sem recarregar a pagina).
+Para varios veiculos, usar capture_batch / capture_fipe_screenshots com uma
+unica instancia do servico. Se a pagina cair (fechada/desanexada), a sessao
+reabre o portal e repete a consulta.
 """
 
 import asyncio
-from playwright.async_api import async_playwright, Browser, Playwright, Page, TimeoutError as PlaywrightTimeout
-from typing import Optional, Dict, Any, List
+from playwright.async_api import (
+    async_playwright, Browser, BrowserContext, Playwright, Page,
+    Error as PlaywrightError, TimeoutError as PlaywrightTimeout
+)
+from typing import Optional, Dict, Any, List, Iterable, Callable
 from dataclasses import dataclass
 from enum import Enum
 import logging
-import os
-from datetime import datetime
-from app.core.config import settings
+from app.services.screenshot_pipeline import store_screenshot
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +34,16 @@ class TipoVeiculo(Enum):
     CAMINHAO = "trucks"
 
 
+@dataclass
+class SolicitacaoScreenshot:
+    """Consulta da fila de captura (ver FipeScreenshotService.capture_batch)"""
+    codigo_fipe: str
+    ano_modelo: int
+    combustivel: str
+    vehicle_type: str = "cars"
+    quote_id: Optional[int] = None
+
+
 @dataclass
 class ResultadoScreenshot:
     """Estrutura de dados para resultado da captura"""
@@ -46,6 +63,29 @@ class FipeScreenshotService:
 
     URL_BASE = "https://veiculos.fipe.org.br/"
 
+    # Novas tentativas de uma consulta apos recuperar a pagina (fechada/desanexada)
+    MAX_RECUPERACOES = 1
+
+    # Trechos de mensagens do Playwright que indicam pagina perdida
+    ERROS_PAGINA_PERDIDA = (
+        "detached",
+        "not attached",
+        "has been closed",
+        "Target closed",
+        "Execution context was destroyed",
+    )
+
+    # Tabela de resultado da pesquisa por codigo FIPE (por tipo de veiculo)
+    SELETORES_TABELA_RESULTADO = [
+        "#resultadoConsultacarroCodigoFipe table",
+        "#resultadoConsultamotoCodigoFipe table",
+        "#resultadoConsultacaminhaoCodigoFipe table",
+        "div[id*='resultadoConsulta'] table",
+        "table.tabelaResultado",
+        ".resultado table",
+        "table:has(td:text('Código Fipe'))",
+    ]
+
     # Mapeamento de tipo de veiculo para seletores de accordion
     VEHICLE_TYPE_SELECTORS = {
         TipoVeiculo.CARRO: [
@@ -94,7 +134,11 @@ class FipeScreenshotService:
         self.slow_mo = slow_mo
         self.browser: Optional[Browser] = None
         self.playwright: Optional[Playwright] = None
+        self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        # Estado do portal na sessao: carregado e qual tipo/aba esta aberto
+        self._portal_carregado = False
+        self._tipo_ativo: Optional[TipoVeiculo] = None
 
     async def __aenter__(self):
         await self._iniciar_browser()
@@ -120,24 +164,106 @@ class FipeScreenshotService:
         )
 
         # Cria contexto com User-Agent realista
-        context = await self.browser.new_context(
+        self.context = await self.browser.new_context(
             viewport={"width": 1920, "height": 1080},
             user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             locale='pt-BR',
             timezone_id='America/Sao_Paulo',
         )
 
-        self.page = await context.new_page()
+        self.page = await self.context.new_page()
         self.page.set_default_timeout(self.timeout)
+        self._portal_carregado = False
+        self._tipo_ativo = None
 
     async def _fechar_browser(self):
         """Fecha o browser e libera recursos"""
-        if self.page:
+        if self.page and not self.page.is_closed():
             await self.page.close()
         if self.browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
+        self.page = self.context = self.browser = self.playwright = None
+
+    async def _abrir_portal(self):
+        """Carrega o portal FIPE (uma vez por sessao ou apos recuperacao)"""
+        logger.info("[FIPE-SCREENSHOT] Acessando veiculos.fipe.org.br")
+        await self.page.goto(self.URL_BASE, wait_until="networkidle", timeout=30000)
+        await self._aguardar_carregamento(1.0)
+        self._portal_carregado = True
+        self._tipo_ativo = None
+
+    def _pagina_perdida(self, erro: Exception) -> bool:
+        """Indica se o erro veio de pagina fechada/desanexada (recuperavel reabrindo o portal)"""
+        if self.page is None or self.page.is_closed():
+            return True
+        mensagem = str(erro)
+        return isinstance(erro, PlaywrightError) and any(trecho in mensagem for trecho in self.ERROS_PAGINA_PERDIDA)
+
+    async def _recuperar_pagina(self):
+        """Reabre a pagina (ou o browser inteiro, se caiu) e recarrega o portal"""
+        logger.warning("[FIPE-SCREENSHOT] Pagina perdida, recuperando sessao...")
+        if self.browser is None or not self.browser.is_connected():
+            await self._fechar_browser()
+            await self._iniciar_browser()
+        else:
+            if self.page and not self.page.is_closed():
+                await self.page.close()
+            self.page = await self.context.new_page()
+            self.page.set_default_timeout(self.timeout)
+        await self._abrir_portal()
+
+    async def _preparar_formulario(self, tipo: TipoVeiculo):
+        """
+        Deixa a pesquisa por codigo FIPE do tipo pronta para uma nova consulta:
+        na primeira consulta do tipo abre accordion e aba; nas seguintes apenas
+        limpa o formulario.
+        """
+        if not self._portal_carregado:
+            await self._abrir_portal()
+
+        if self._tipo_ativo == tipo:
+            await self._resetar_formulario(tipo)
+            return
+
+        logger.info(f"[FIPE-SCREENSHOT] Selecionando tipo: {tipo.value}")
+        await self._selecionar_tipo_veiculo(tipo)
+        logger.info("[FIPE-SCREENSHOT] Selecionando aba 'Pesquisa por codigo Fipe'")
+        await self._selecionar_aba_codigo_fipe()
+        self._tipo_ativo = tipo
+
+    async def _resetar_formulario(self, tipo: TipoVeiculo):
+        """
+        Limpa a pesquisa anterior sem recarregar a pagina: aciona "Limpar Pesquisa"
+        (se disponivel), esvazia o campo de codigo, remove as opcoes de ano e
+        esconde o resultado anterior, para que as esperas seguintes so sejam
+        satisfeitas pela nova consulta.
+        """
+        sufixo = {TipoVeiculo.CARRO: "carro", TipoVeiculo.MOTO: "moto", TipoVeiculo.CAMINHAO: "caminhao"}[tipo]
+        try:
+            botao_limpar = self.page.locator(
+                f"#buttonLimparPesquisar{sufixo}PorCodigoFipe, a:has-text('Limpar Pesquisa'):visible"
+            ).first
+            if await botao_limpar.count() > 0 and await botao_limpar.is_visible():
+                await botao_limpar.click()
+        except PlaywrightTimeout:
+            pass
+
+        await self.page.evaluate('''
+            (sufixo) => {
+                var campo = document.getElementById("selectCodigo" + sufixo + "CodigoFipe");
+                if (campo) { campo.value = ""; }
+                var select = document.getElementById("selectCodigoAno" + sufixo + "CodigoFipe");
+                if (select) {
+                    Array.from(select.querySelectorAll("option")).slice(1).forEach(o => o.remove());
+                    if (typeof jQuery !== 'undefined') { jQuery(select).trigger('chosen:updated'); }
+                }
+                var resultado = document.getElementById("resultadoConsulta" + sufixo + "CodigoFipe");
+                if (resultado) { resultado.style.display = "none"; }
+            }
+        ''', sufixo)
+        logger.info(f"[FIPE-SCREENSHOT] Formulario limpo para nova consulta ({tipo.value})")
 
     async def _aguardar_carregamento(self, tempo_extra: float = 0.5):
         """Aguarda carregamento completo da pagina"""
@@ -281,16 +407,15 @@ class FipeScreenshotService:
         await campo_encontrado.dispatch_event("change")
         await campo_encontrado.dispatch_event("blur")
 
-        # Aguarda carregamento do dropdown de anos (AJAX)
-        await asyncio.sleep(3)
-
-        # Aguarda networkidle para garantir que AJAX completou
+        # Aguarda o AJAX popular o dropdown de anos (em vez de pausas fixas)
         try:
-            await self.page.wait_for_load_state("networkidle", timeout=5000)
-        except:
-            pass
-
-        await asyncio.sleep(1)
+            await self.page.wait_for_function(
+                '''() => Array.from(document.querySelectorAll("select[id*='CodigoAno'][id*='CodigoFipe']"))
+                    .some(s => s.options.length > 1)''',
+                timeout=10000
+            )
+        except PlaywrightTimeout:
+            logger.warning("[FIPE-SCREENSHOT] Dropdown de anos nao carregou no tempo esperado")
 
     async def _selecionar_ano_modelo(self, ano_modelo: int, combustivel: str, max_retries: int = 3):
         """Seleciona o ano/modelo no dropdown com retry"""
@@ -456,7 +581,7 @@ class FipeScreenshotService:
         else:
             raise ValueError(f"Ano {ano_modelo} nao disponivel. Opcoes: {opcoes_disponiveis[:5]}")
 
-    async def _clicar_pesquisar(self):
+    async def _clicar_pesquisar(self, codigo_fipe: str):
         """Clica no botao de pesquisar da aba codigo FIPE"""
         # Seletores especificos para o botao Pesquisar da aba codigo FIPE
         # O site tem multiplos botoes Pesquisar, precisa clicar no correto
@@ -486,18 +611,17 @@ class FipeScreenshotService:
                 }
             ''')
 
-        # Aguarda resultado
-        await self._aguardar_carregamento(2.0)
-
-        # Aguarda tabela de resultado
+        # Aguarda a tabela de resultado visivel e com o codigo desta consulta
+        # (nao a da consulta anterior da sessao)
         try:
-            await self.page.wait_for_selector(
-                "table.tabelaResultado, .resultado table, table:has-text('Preço Médio'), table:has-text('Preco Medio')",
-                state="visible",
+            await self.page.wait_for_function(
+                '''(codigo) => Array.from(document.querySelectorAll("div[id*='resultadoConsulta'] table, table.tabelaResultado"))
+                    .some(t => t.offsetParent !== null && t.innerText.includes(codigo))''',
+                arg=codigo_fipe,
                 timeout=15000
             )
             logger.info("[FIPE-SCREENSHOT] Tabela de resultado encontrada")
-        except:
+        except PlaywrightTimeout:
             logger.warning("[FIPE-SCREENSHOT] Tabela de resultado nao encontrada no timeout")
 
     async def _extrair_dados_resultado(self) -> Dict[str, str]:
@@ -519,21 +643,7 @@ class FipeScreenshotService:
             "preco medio": "preco_medio",
         }
 
-        seletores_tabela = [
-            "table.tabelaResultado",
-            ".resultado table",
-            "table:has-text('Preço Médio')",
-            "table:has-text('Preco Medio')",
-        ]
-
-        tabela = None
-        for seletor in seletores_tabela:
-            try:
-                tabela = await self.page.query_selector(seletor)
-                if tabela:
-                    break
-            except:
-                continue
+        tabela = await self._localizar_tabela_resultado()
 
         if tabela:
             linhas = await tabela.query_selector_all("tr")
@@ -560,96 +670,77 @@ class FipeScreenshotService:
 
         return dados
 
-    async def _capturar_screenshot(self, codigo_fipe: str, quote_id: Optional[int]) -> str:
-        """Captura screenshot da pagina com resultado (area especifica: 2162px a 3143px vertical)"""
-        from PIL import Image
-        import io
-
-        # Criar diretorio para screenshots
-        screenshots_dir = os.path.join(settings.STORAGE_PATH, "screenshots", "fipe")
-        os.makedirs(screenshots_dir, exist_ok=True)
-
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        codigo_limpo = codigo_fipe.replace("-", "").replace("/", "").replace(" ", "")
-        filename = f"fipe_screenshot_{quote_id or 'temp'}_{timestamp}.png"
-        filepath = os.path.join(screenshots_dir, filename)
-
-        # Verificar se ainda estamos na pagina correta
-        current_url = self.page.url
-        logger.info(f"[FIPE-SCREENSHOT] URL atual antes do screenshot: {current_url}")
-
-        if "veiculos.fipe.org.br" not in current_url:
-            logger.warning(f"[FIPE-SCREENSHOT] URL incorreta! Esperado veiculos.fipe.org.br, atual: {current_url}")
-            # Tentar voltar para a pagina de veiculos se necessario
-            await self.page.goto(self.URL_BASE, wait_until="networkidle", timeout=self.timeout)
-            await asyncio.sleep(2)
-
-        # Aguardar um momento para garantir que a tabela esteja renderizada
-        await asyncio.sleep(1)
-
-        # Tentar capturar o elemento da tabela de resultado diretamente
-        # para garantir que o conteudo correto seja capturado
-        seletores_tabela = [
-            "table.tabelaResultado",
-            ".resultado table",
-            "#resultadoConsultacarroCodigoFipe table",
-            "#resultadoConsultamotoCodigoFipe table",
-            "#resultadoConsultacaminhaoCodigoFipe table",
-            "div[id*='resultadoConsulta'] table",
-            "table:has(td:text('Código Fipe'))",
-        ]
-
-        elemento_tabela = None
-        for seletor in seletores_tabela:
+    async def _localizar_tabela_resultado(self):
+        """Tabela de resultado visivel (a do tipo de veiculo ativo)"""
+        for seletor in self.SELETORES_TABELA_RESULTADO:
             try:
-                elemento = self.page.locator(seletor).first
-                if await elemento.count() > 0:
-                    elemento_tabela = elemento
+                tabela = await self.page.query_selector(f"{seletor} >> visible=true")
+                if tabela:
                     logger.info(f"[FIPE-SCREENSHOT] Tabela encontrada com seletor: {seletor}")
-                    break
-            except Exception:
+                    return tabela
+            except PlaywrightError as e:
+                if self._pagina_perdida(e):
+                    raise
                 continue
+        return None
 
-        if elemento_tabela:
-            # Scrollar para a tabela ficar visivel
-            await elemento_tabela.scroll_into_view_if_needed()
-            await asyncio.sleep(0.5)
+    async def _capturar_screenshot(self, codigo_fipe: str, quote_id: Optional[int]) -> str:
+        """
+        Captura screenshot apenas do elemento da tabela de resultado, recomprime e
+        grava no armazenamento endereçado por conteúdo (ver services/screenshot_pipeline.py)
+        """
+        elemento_tabela = await self._localizar_tabela_resultado()
+        if not elemento_tabela:
+            raise Exception(f"Tabela de resultado nao encontrada para {codigo_fipe}")
 
-            # Capturar screenshot do elemento da tabela
-            await elemento_tabela.screenshot(path=filepath, type="png")
-            logger.info(f"[FIPE-SCREENSHOT] Screenshot da tabela de resultado capturado")
-        else:
-            logger.warning(f"[FIPE-SCREENSHOT] Tabela nao encontrada, capturando area especifica da pagina")
-            # Capturar a pagina inteira primeiro
-            full_screenshot = await self.page.screenshot(
-                full_page=True,
-                type="png"
-            )
+        # O screenshot do elemento rola a pagina ate ele automaticamente
+        imagem = await elemento_tabela.screenshot(type="png")
+        stored = await store_screenshot(imagem)
 
-            # Recortar area especifica: posicao vertical 2162px ate 3143px
-            # Isso captura apenas a regiao onde a tabela de resultado geralmente aparece
-            img = Image.open(io.BytesIO(full_screenshot))
-            img_width, img_height = img.size
+        logger.info(
+            f"[FIPE-SCREENSHOT] Screenshot salvo: {stored.path} (cotacao {quote_id or '-'}, "
+            f"economia {stored.bytes_saved // 1024} KB)"
+        )
+        return stored.path
 
-            # Definir coordenadas do recorte (y_inicio, y_fim)
-            y_inicio = 2162
-            y_fim = 3143
+    async def _executar_consulta(
+        self,
+        codigo_fipe: str,
+        ano_modelo: int,
+        combustivel: str,
+        tipo: TipoVeiculo,
+        quote_id: Optional[int]
+    ) -> ResultadoScreenshot:
+        """Uma consulta no portal ja aberto (formulario preparado pela sessao)"""
+        # 1. Tipo de veiculo e aba de pesquisa por codigo (ou apenas limpar o formulario)
+        await self._preparar_formulario(tipo)
+
+        # 2. Preencher codigo FIPE
+        logger.info(f"[FIPE-SCREENSHOT] Preenchendo codigo: {codigo_fipe}")
+        await self._preencher_codigo_fipe(codigo_fipe)
+
+        # 3. Selecionar ano/modelo
+        logger.info(f"[FIPE-SCREENSHOT] Selecionando ano: {ano_modelo} {combustivel}")
+        await self._selecionar_ano_modelo(ano_modelo, combustivel)
+
+        # 4. Clicar em pesquisar
+        logger.info("[FIPE-SCREENSHOT] Clicando em Pesquisar")
+        await self._clicar_pesquisar(codigo_fipe)
+
+        # 5. Extrair dados
+        dados = await self._extrair_dados_resultado()
 
-            # Ajustar se a imagem for menor que o esperado
-            if img_height < y_fim:
-                logger.warning(f"[FIPE-SCREENSHOT] Pagina menor que esperado ({img_height}px), ajustando recorte")
-                y_fim = img_height
-                # Se a pagina for muito menor, capturar do meio para baixo
-                if img_height < y_inicio:
-                    y_inicio = max(0, img_height - 1000)
+        # 6. Capturar screenshot da tabela
+        screenshot_path = await self._capturar_screenshot(codigo_fipe, quote_id)
 
-            # Recortar: (left, upper, right, lower)
-            cropped = img.crop((0, y_inicio, img_width, y_fim))
-            cropped.save(filepath, "PNG")
-            logger.info(f"[FIPE-SCREENSHOT] Screenshot recortado ({y_inicio}px a {y_fim}px) salvo")
+        logger.info(f"[FIPE-SCREENSHOT] Captura concluida com sucesso! Preco: {dados.get('preco_medio', 'N/A')}")
 
-        logger.info(f"[FIPE-SCREENSHOT] Screenshot salvo: {filepath}")
-        return filepath
+        return ResultadoScreenshot(
+            screenshot_path=screenshot_path,
+            sucesso=True,
+            dados_extraidos=dados,
+            erro=None
+        )
 
     async def capture_fipe_result(
         self,
@@ -662,15 +753,17 @@ class FipeScreenshotService:
         """
         Captura screenshot do resultado da consulta FIPE.
 
-        Fluxo robusto:
-        1. Acessa pagina inicial
-        2. Clica no tipo de veiculo (expande accordion)
-        3. Clica na aba "Pesquisa por codigo Fipe"
-        4. Preenche codigo FIPE
-        5. Seleciona ano/combustivel
-        6. Clica em Pesquisar
-        7. Extrai dados do resultado
-        8. Captura screenshot
+        Fluxo (portal reaproveitado entre consultas da mesma sessao):
+        1. Carrega o portal, se ainda nao carregado
+        2. Abre tipo de veiculo e aba "Pesquisa por codigo Fipe" (ou limpa o formulario)
+        3. Preenche codigo FIPE
+        4. Seleciona ano/combustivel
+        5. Clica em Pesquisar e aguarda a tabela desta consulta
+        6. Extrai dados do resultado
+        7. Captura screenshot da tabela
+
+        Se a pagina for fechada/desanexada no meio da consulta, reabre o portal
+        e repete (ate MAX_RECUPERACOES vezes).
 
         Args:
             codigo_fipe: Codigo FIPE do veiculo (ex: "022140-6")
@@ -690,68 +783,65 @@ class FipeScreenshotService:
         }
         tipo = tipo_map.get(vehicle_type, TipoVeiculo.CARRO)
 
-        logger.info(f"[FIPE-SCREENSHOT] Iniciando captura robusta para {codigo_fipe} - {ano_modelo} {combustivel}")
-
-        try:
-            # 1. Acessar site FIPE
-            logger.info("[FIPE-SCREENSHOT] Passo 1: Acessando veiculos.fipe.org.br")
-            await self.page.goto(self.URL_BASE, wait_until="networkidle", timeout=30000)
-            await self._aguardar_carregamento(1.0)
-
-            # 2. Selecionar tipo de veiculo
-            logger.info(f"[FIPE-SCREENSHOT] Passo 2: Selecionando tipo: {tipo.value}")
-            await self._selecionar_tipo_veiculo(tipo)
-
-            # 3. Selecionar aba de pesquisa por codigo
-            logger.info("[FIPE-SCREENSHOT] Passo 3: Selecionando aba 'Pesquisa por codigo Fipe'")
-            await self._selecionar_aba_codigo_fipe()
-
-            # 4. Preencher codigo FIPE
-            logger.info(f"[FIPE-SCREENSHOT] Passo 4: Preenchendo codigo: {codigo_fipe}")
-            await self._preencher_codigo_fipe(codigo_fipe)
-
-            # 5. Selecionar ano/modelo
-            logger.info(f"[FIPE-SCREENSHOT] Passo 5: Selecionando ano: {ano_modelo} {combustivel}")
-            await self._selecionar_ano_modelo(ano_modelo, combustivel)
-
-            # 6. Clicar em pesquisar
-            logger.info("[FIPE-SCREENSHOT] Passo 6: Clicando em Pesquisar")
-            await self._clicar_pesquisar()
-
-            # 7. Extrair dados
-            logger.info("[FIPE-SCREENSHOT] Passo 7: Extraindo dados do resultado")
-            dados = await self._extrair_dados_resultado()
-
-            # 8. Capturar screenshot
-            logger.info("[FIPE-SCREENSHOT] Passo 8: Capturando screenshot")
-            screenshot_path = await self._capturar_screenshot(codigo_fipe, quote_id)
-
-            logger.info(f"[FIPE-SCREENSHOT] Captura concluida com sucesso! Preco: {dados.get('preco_medio', 'N/A')}")
-
-            return ResultadoScreenshot(
-                screenshot_path=screenshot_path,
-                sucesso=True,
-                dados_extraidos=dados,
-                erro=None
-            )
+        logger.info(f"[FIPE-SCREENSHOT] Iniciando captura para {codigo_fipe} - {ano_modelo} {combustivel}")
 
-        except PlaywrightTimeout as e:
-            logger.error(f"[FIPE-SCREENSHOT] Timeout: {e}")
-            return ResultadoScreenshot(
-                screenshot_path=None,
-                sucesso=False,
-                dados_extraidos={},
-                erro=f"Timeout: {str(e)}"
-            )
+        for tentativa in range(self.MAX_RECUPERACOES + 1):
+            try:
+                return await self._executar_consulta(codigo_fipe, ano_modelo, combustivel, tipo, quote_id)
+
+            except Exception as e:
+                if tentativa < self.MAX_RECUPERACOES and self._pagina_perdida(e):
+                    logger.warning(f"[FIPE-SCREENSHOT] Pagina desanexada ({e}), nova tentativa")
+                    try:
+                        await self._recuperar_pagina()
+                        continue
+                    except Exception as erro_recuperacao:
+                        e = erro_recuperacao
+
+                # Estado do formulario desconhecido: a proxima consulta recarrega o portal
+                self._portal_carregado = False
+                self._tipo_ativo = None
+
+                if isinstance(e, PlaywrightTimeout):
+                    logger.error(f"[FIPE-SCREENSHOT] Timeout: {e}")
+                    erro = f"Timeout: {str(e)}"
+                else:
+                    logger.error(f"[FIPE-SCREENSHOT] Erro: {e}")
+                    erro = str(e)
+
+                return ResultadoScreenshot(
+                    screenshot_path=None,
+                    sucesso=False,
+                    dados_extraidos={},
+                    erro=erro
+                )
 
-        except Exception as e:
-            logger.error(f"[FIPE-SCREENSHOT] Erro: {e}")
-            return ResultadoScreenshot(
-                screenshot_path=None,
-                sucesso=False,
-                dados_extraidos={},
-                erro=str(e)
+    async def capture_batch(
+        self,
+        solicitacoes: Iterable[SolicitacaoScreenshot],
+        ao_concluir: Optional[Callable[[int, ResultadoScreenshot], None]] = None
+    ) -> List[ResultadoScreenshot]:
+        """
+        Processa uma fila de consultas na mesma sessao (portal carregado uma vez).
+        Falha de uma consulta nao interrompe as demais. ao_concluir(indice,
+        resultado) e chamado a cada consulta, para gravar o progresso sem
+        esperar o fim da fila.
+        """
+        resultados = []
+        for indice, solicitacao in enumerate(solicitacoes):
+            resultado = await self.capture_fipe_result(
+                codigo_fipe=solicitacao.codigo_fipe,
+                ano_modelo=solicitacao.ano_modelo,
+                combustivel=solicitacao.combustivel,
+                vehicle_type=solicitacao.vehicle_type,
+                quote_id=solicitacao.quote_id
             )
+            resultados.append(resultado)
+            if ao_concluir:
+                ao_concluir(indice, resultado)
+        sucesso = sum(1 for resultado in resultados if resultado.sucesso)
+        logger.info(f"[FIPE-SCREENSHOT] Fila processada: {sucesso}/{len(resultados)} capturas")
+        return resultados
 
 
 async def capture_fipe_screenshot(
@@ -795,3 +885,34 @@ async def capture_fipe_screenshot(
     except Exception as e:
         logger.error(f"[FIPE-SCREENSHOT] Erro ao capturar screenshot: {e}")
         return None
+
+
+async def capture_fipe_screenshots(
+    solicitacoes: List[SolicitacaoScreenshot],
+    ao_capturar: Optional[Callable[[int, str], None]] = None
+) -> List[Optional[str]]:
+    """
+    Captura os screenshots de varios veiculos com um unico navegador/portal.
+
+    Args:
+        solicitacoes: Fila de consultas
+        ao_capturar: Chamado com (indice, caminho) a cada screenshot capturado
+
+    Returns:
+        Caminho de cada screenshot (None nos que falharam), na ordem da fila
+    """
+    if not solicitacoes:
+        return []
+
+    def ao_concluir(indice: int, resultado: ResultadoScreenshot):
+        if ao_capturar and resultado.sucesso:
+            ao_capturar(indice, resultado.screenshot_path)
+
+    try:
+        async with FipeScreenshotService(headless=True) as service:
+            resultados = await service.capture_batch(solicitacoes, ao_concluir)
+            return [resultado.screenshot_path if resultado.sucesso else None for resultado in resultados]
+
+    except Exception as e:
+        logger.error(f"[FIPE-SCREENSHOT] Erro ao capturar screenshots em lote: {e}")
+        return [None] * len(solicitacoes)
@@ -2,7 +2,7 @@
 Google Lens Service for product identification using SerpAPI.
 
 Flow:
-1. Upload image to a temporary URL (imgbb or similar)
+1. Publish image at a temporary URL (see lens_image_host: local, S3 or imgbb)
 2. Call Google Lens API with type=products
 3. Extract product info from visual_matches
 4. Access product link to get detailed specifications
@@ -14,7 +14,6 @@ from pydantic import BaseModel
 import httpx
 import logging
 import asyncio
-import os
 import base64
 from datetime import datetime
 
@@ -23,7 +22,7 @@ from app.services.prompts import PROMPT_EXTRACAO_HTML
 logger = logging.getLogger(__name__)
 
 
-async def upload_image_to_imgbb(image_data: bytes, api_key: str) -> Optional[str]:
+async def upload_image_to_imgbb(image_data: bytes, api_key: str, expiration: int = 600) -> Optional[str]:
     """
     Upload image to imgbb.com and return the public URL.
 
@@ -33,6 +32,7 @@ async def upload_image_to_imgbb(image_data: bytes, api_key: str) -> Optional[str
     Args:
         image_data: Raw image bytes
         api_key: imgbb API key
+        expiration: Seconds until imgbb deletes the image
 
     Returns:
         Public URL of the uploaded image, or None on failure
@@ -51,7 +51,7 @@ async def upload_image_to_imgbb(image_data: bytes, api_key: str) -> Optional[str
                 data={
                     "key": api_key,
                     "image": image_base64,
-                    "expiration": 600,  # 10 minutes expiration
+                    "expiration": expiration,
                 }
             )
 
@@ -196,52 +196,36 @@ class GoogleLensService:
     async def search_by_image_data(
         self,
         image_data: bytes,
-        image_filename: str = "image.jpg"
+        image_filename: str = "image.jpg",
+        imgbb_key: Optional[str] = None
     ) -> Tuple[LensResult, Optional[str]]:
         """
-        Search Google Lens using image data (base64).
+        Search Google Lens using image data.
 
-        Note: SerpAPI requires a public URL, so we need to first upload
-        the image to a temporary hosting service or use a data URL.
-
-        For now, we'll save the image locally and use file:// URL
-        (works only for local development) or return error suggesting
-        to use a URL instead.
+        SerpAPI requires a public URL, so the image is first published by the
+        configured image host (see lens_image_host). Repeated searches with the
+        same image reuse the URL.
 
         Args:
             image_data: Raw image bytes
             image_filename: Original filename
+            imgbb_key: imgbb API key; if omitted, read from the IMGBB integration
+                (or IMGBB_API_KEY), as in the lens_search endpoint
 
         Returns:
             Tuple of (LensResult, error_message)
         """
-        # SerpAPI Google Lens requires a public URL
-        # For production, you would:
-        # 1. Upload to S3/GCS with signed URL
-        # 2. Use imgur or similar temporary hosting
-        # 3. Host image on your own server
-
-        # For now, we'll try with a data URL (may not work with all images)
-        # or save locally and serve via backend
-
-        from app.core.config import settings
-
-        # Save image to storage
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"lens_{timestamp}_{image_filename}"
-        storage_path = os.path.join(settings.STORAGE_PATH, "lens_temp", safe_filename)
-        os.makedirs(os.path.dirname(storage_path), exist_ok=True)
+        from app.services.lens_image_host import get_image_host, load_imgbb_api_key, public_image_url
 
-        with open(storage_path, "wb") as f:
-            f.write(image_data)
+        host = get_image_host(imgbb_key or await load_imgbb_api_key())
+        if not host:
+            return LensResult(), "Image host not configured (LENS_IMAGE_HOST / BACKEND_PUBLIC_URL)"
 
-        # Generate public URL (requires backend to serve static files)
-        # This URL format depends on your backend configuration
-        base_url = os.environ.get("BACKEND_PUBLIC_URL", "http://localhost:8000")
-        image_url = f"{base_url}/api/files/lens_temp/{safe_filename}"
+        image_url = await public_image_url(image_data, host)
+        if not image_url:
+            return LensResult(), f"Failed to publish {image_filename} via {host.name}"
 
-        logger.info(f"Image saved for Lens: {storage_path}")
-        logger.info(f"Public URL: {image_url}")
+        logger.info(f"Public URL for Lens: {image_url}")
 
         # Search using the URL
         result = await self.search_by_image_url(image_url)
@@ -0,0 +1,195 @@
+"""
+Preparo das imagens de entrada (INPUT_IMAGE) antes do OCR pela IA.
+
+Fotos de celular chegam com vários MB, orientação só no EXIF e resolução muito
+acima do que os provedores usam: a Anthropic reduz tudo para ~1568 px no maior
+lado (~1,15 MP) e a OpenAI (detail "high") para 2048 px / 768 px no menor lado.
+Enviar o original só aumenta o upload, o base64 e a latência. Cada imagem é:
+- orientada conforme o EXIF (ImageOps.exif_transpose)
+- reduzida aos limites do provedor (nunca ampliada)
+- recodificada em JPEG com AI_IMAGE_JPEG_QUALITY; se já estiver nos limites, sem
+  rotação e num formato aceito, os bytes originais são mantidos
+- enviada com o media_type real (detectado pelo Pillow, não pela extensão)
+
+O resultado fica em cache em disco (STORAGE_PATH/ai_images), pela sha256 do
+arquivo + provedor + versão do preparo (limites e qualidade JPEG): recotações
+(que copiam o File com a mesma sha256) e retentativas da task não reprocessam
+nem releem o original, e mudar os limites ou a qualidade invalida o cache.
+Imagens que o Pillow não abre (enviadas como vieram) não entram no cache.
+"""
+import hashlib
+import io
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image as PILImage, ImageOps
+
+from app.core.config import settings
+from app.services.evidence_store import sha256_file, write_blob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ProviderImageLimits:
+    """Resolução a partir da qual o provedor reduz a imagem do lado dele"""
+    max_long_edge: int
+    max_short_edge: Optional[int] = None
+    max_pixels: Optional[int] = None
+
+
+PROVIDER_LIMITS = {
+    "anthropic": ProviderImageLimits(max_long_edge=1568, max_pixels=1_150_000),
+    "openai": ProviderImageLimits(max_long_edge=2048, max_short_edge=768),
+}
+
+EXIF_ORIENTATION = 0x0112
+
+# Formato Pillow -> media_type aceito pelas APIs de visão
+SUPPORTED_MEDIA_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp",
+}
+
+EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+}
+
+
+@dataclass
+class PreparedImage:
+    """Imagem pronta para o provedor: bytes e media_type correspondente"""
+    data: bytes
+    media_type: str
+    original_size_bytes: int = 0
+    cached: bool = False
+    fallback: bool = False  # Original enviado sem preparo (Pillow não abriu)
+
+
+def detect_media_type(data: bytes) -> Optional[str]:
+    """media_type real da imagem (pelo conteúdo), se for um formato aceito pelos provedores"""
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            return SUPPORTED_MEDIA_TYPES.get(image.format)
+    except Exception:
+        return None
+
+
+def target_size(width: int, height: int, limits: ProviderImageLimits) -> tuple:
+    """Dimensões após aplicar os limites do provedor, mantendo a proporção"""
+    scale = min(1.0, limits.max_long_edge / max(width, height))
+    if limits.max_short_edge:
+        scale = min(scale, limits.max_short_edge / min(width, height))
+    if limits.max_pixels:
+        scale = min(scale, (limits.max_pixels / (width * height)) ** 0.5)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def prepare_image(data: bytes, provider: str = "anthropic") -> PreparedImage:
+    """Orienta, reduz e recodifica a imagem para o provedor (síncrono, sem cache)"""
+    limits = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["anthropic"])
+
+    try:
+        with PILImage.open(io.BytesIO(data)) as source:
+            source_format = source.format
+            rotated = source.getexif().get(EXIF_ORIENTATION, 1) != 1
+            oriented = ImageOps.exif_transpose(source) if rotated else source
+            size = target_size(*oriented.size, limits)
+
+            media_type = SUPPORTED_MEDIA_TYPES.get(source_format)
+            if media_type and not rotated and size == oriented.size:
+                return PreparedImage(data=data, media_type=media_type, original_size_bytes=len(data))
+
+            image = oriented.convert("RGB")  # JPEG não aceita alfa/paleta
+            if size != image.size:
+                image = image.resize(size, PILImage.LANCZOS)
+    except Exception as e:
+        # Formato que o Pillow não abre (ex: HEIC): envia como veio e deixa o provedor decidir
+        logger.warning(f"[AI_IMAGE] Imagem não pôde ser preparada ({e}); enviando original")
+        return PreparedImage(data=data, media_type="image/jpeg", original_size_bytes=len(data), fallback=True)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=settings.AI_IMAGE_JPEG_QUALITY, optimize=True)
+    prepared = buffer.getvalue()
+    logger.info(
+        f"[AI_IMAGE] {provider}: {source_format} {len(data) // 1024} KB -> "
+        f"JPEG {image.size[0]}x{image.size[1]} {len(prepared) // 1024} KB"
+    )
+    return PreparedImage(data=prepared, media_type="image/jpeg", original_size_bytes=len(data))
+
+
+def cache_root() -> str:
+    return os.path.join(settings.STORAGE_PATH, "ai_images")
+
+
+def _cache_stem(sha256: str, provider: str) -> str:
+    """Caminho no cache sem extensão; a versão muda com os limites do provedor e a qualidade"""
+    limits = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["anthropic"])
+    version = hashlib.sha256(f"{limits}|{settings.AI_IMAGE_JPEG_QUALITY}".encode()).hexdigest()[:8]
+    return os.path.join(cache_root(), sha256[:2], f"{sha256}_{provider}_{version}")
+
+
+def _cached_path(sha256: str, provider: str) -> Optional[str]:
+    stem = _cache_stem(sha256, provider)
+    for extension in EXTENSIONS.values():
+        if os.path.exists(stem + extension):
+            return stem + extension
+    return None
+
+
+def prepare_input_image(
+    file_path: str,
+    sha256: Optional[str] = None,
+    provider: str = "anthropic"
+) -> PreparedImage:
+    """
+    Imagem de entrada preparada para o provedor, a partir do cache quando
+    disponível. sha256 é a do registro File (calculada no upload); sem ela, o
+    hash é calculado a partir do arquivo.
+    """
+    sha256 = sha256 or sha256_file(file_path)
+
+    cached_path = _cached_path(sha256, provider)
+    if cached_path:
+        with open(cached_path, "rb") as f:
+            data = f.read()
+        os.utime(cached_path)  # Mantém no cache enquanto estiver em uso (ver purge_prepared_images)
+        extension = os.path.splitext(cached_path)[1]
+        media_type = next(mt for mt, ext in EXTENSIONS.items() if ext == extension)
+        return PreparedImage(data=data, media_type=media_type, cached=True)
+
+    with open(file_path, "rb") as f:
+        prepared = prepare_image(f.read(), provider)
+
+    extension = EXTENSIONS.get(prepared.media_type)
+    if extension and not prepared.fallback:
+        write_blob(_cache_stem(sha256, provider) + extension, prepared.data)
+    return prepared
+
+
+def purge_prepared_images(max_age_days: Optional[int] = None) -> int:
+    """Remove do cache as imagens preparadas não usadas há mais de max_age_days"""
+    if max_age_days is None:
+        max_age_days = settings.AI_IMAGE_CACHE_DAYS
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for directory, _, filenames in os.walk(cache_root()):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+    if removed:
+        logger.info(f"[AI_IMAGE] {removed} imagens preparadas removidas do cache")
+    return removed
@@ -0,0 +1,163 @@
+"""
+Consolidado diário de custos de integração (integration_cost_daily).
+
+Cada lote de chamadas gravado pelo integration_logger incrementa a linha
+de (dia, cotação, integração) na mesma transação dos logs; o dia é o do
+created_at de cada log (como na reconstrução), não o da gravação, para que
+logs drenados do buffer depois da meia-noite caiam no dia da chamada. A
+reconstrução por intervalo de dias recalcula o consolidado a partir de
+integration_logs (backfill e reconciliação agendada).
+
+Incrementos e reconstrução são serializados por um advisory lock de
+transação: os incrementos o tomam compartilhado e a reconstrução exclusivo,
+para que ela não apague nem sobrescreva o incremento de uma gravação ainda
+não confirmada (cujo log o recálculo não enxerga).
+"""
+import logging
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import Date, DateTime, cast, delete, func, insert, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models import IntegrationLog, IntegrationCostDaily, QuoteRequest
+
+logger = logging.getLogger(__name__)
+
+# Integrações com custo (demais tipos de log, ex. search_log, são ignorados)
+COST_INTEGRATION_TYPES = ("anthropic", "openai", "serpapi")
+
+SERPAPI_SHOPPING = "google_shopping"
+SERPAPI_IMMERSIVE = "google_immersive_product"
+
+ROLLUP_KEY = ["day", "quote_request_id", "integration_type"]
+ROLLUP_COLUMNS = [
+    "day", "quote_request_id", "project_id", "integration_type",
+    "call_count", "input_tokens", "output_tokens", "total_tokens", "cost_usd",
+    "shopping_calls", "immersive_calls", "first_call_at", "last_call_at",
+]
+SUMMED_COLUMNS = [
+    "call_count", "input_tokens", "output_tokens", "total_tokens", "cost_usd",
+    "shopping_calls", "immersive_calls",
+]
+
+# Chave do advisory lock que serializa incrementos e reconstrução
+ROLLUP_LOCK_KEY = 0x1C0571
+
+
+def record_integration_cost(db: Session, log: IntegrationLog) -> None:
+    """
+    Soma a chamada ao consolidado do dia (upsert), sem commit.
+    O projeto é lido da cotação no próprio INSERT ... SELECT.
+    """
+    record_integration_costs(db, [log])
+
+
+def record_integration_costs(db: Session, logs: Iterable[IntegrationLog]) -> None:
+    """
+    Soma um lote de chamadas ao consolidado do dia, sem commit: um upsert
+    por (dia, cotação, integração), não um por chamada. O dia vem do
+    created_at do log; log ainda sem created_at (não gravado) conta como agora.
+    """
+    totals: Dict[Tuple[Optional[date], int, str], Dict[str, Any]] = {}
+    for log in logs:
+        if log.integration_type not in COST_INTEGRATION_TYPES:
+            continue
+        called_at = log.created_at
+        key = (called_at.date() if called_at else None, log.quote_request_id, log.integration_type)
+        total = totals.setdefault(key, {**dict.fromkeys(SUMMED_COLUMNS, 0), "first": None, "last": None})
+        if called_at:
+            total["first"] = min(total["first"] or called_at, called_at)
+            total["last"] = max(total["last"] or called_at, called_at)
+        total["call_count"] += 1
+        total["input_tokens"] += log.input_tokens or 0
+        total["output_tokens"] += log.output_tokens or 0
+        total["total_tokens"] += log.total_tokens or 0
+        total["cost_usd"] += log.estimated_cost_usd or 0
+        total["shopping_calls"] += 1 if log.api_used == SERPAPI_SHOPPING else 0
+        total["immersive_calls"] += 1 if log.api_used == SERPAPI_IMMERSIVE else 0
+
+    if not totals:
+        return
+
+    db.execute(select(func.pg_advisory_xact_lock_shared(ROLLUP_LOCK_KEY)))
+    table = IntegrationCostDaily.__table__
+    for (_, quote_request_id, integration_type), total in totals.items():
+        first_call_at = literal(total["first"], DateTime(timezone=True)) if total["first"] else func.now()
+        last_call_at = literal(total["last"], DateTime(timezone=True)) if total["last"] else func.now()
+        values = select(
+            cast(first_call_at, Date),
+            QuoteRequest.id,
+            QuoteRequest.project_id,
+            literal(integration_type),
+            literal(total["call_count"]),
+            literal(total["input_tokens"]),
+            literal(total["output_tokens"]),
+            literal(total["total_tokens"]),
+            literal(total["cost_usd"], IntegrationCostDaily.cost_usd.type),
+            literal(total["shopping_calls"]),
+            literal(total["immersive_calls"]),
+            first_call_at,
+            last_call_at,
+        ).where(QuoteRequest.id == quote_request_id)
+
+        stmt = pg_insert(IntegrationCostDaily).from_select(ROLLUP_COLUMNS, values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={
+                **{column: table.c[column] + stmt.excluded[column] for column in SUMMED_COLUMNS},
+                "project_id": stmt.excluded.project_id,
+                "last_call_at": stmt.excluded.last_call_at,
+            }
+        )
+        db.execute(stmt)
+
+
+def rebuild_cost_rollup(db: Session, start_day: Optional[date] = None, end_day: Optional[date] = None) -> int:
+    """
+    Recalcula o consolidado dos dias informados (inclusive) a partir dos logs.
+    Sem limites, reconstrói tudo. Retorna o número de linhas geradas; sem commit.
+
+    Toma o advisory lock exclusivo: espera as gravações em andamento
+    confirmarem (o recálculo passa a ver seus logs) e segura as novas até o
+    commit do chamador, que então somam sobre o total reconstruído.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+    log_day = cast(IntegrationLog.created_at, Date)
+
+    cleanup = delete(IntegrationCostDaily)
+    aggregate = select(
+        log_day,
+        IntegrationLog.quote_request_id,
+        func.max(QuoteRequest.project_id),
+        IntegrationLog.integration_type,
+        func.count(IntegrationLog.id),
+        func.coalesce(func.sum(IntegrationLog.input_tokens), 0),
+        func.coalesce(func.sum(IntegrationLog.output_tokens), 0),
+        func.coalesce(func.sum(IntegrationLog.total_tokens), 0),
+        func.coalesce(func.sum(IntegrationLog.estimated_cost_usd), 0),
+        func.count(IntegrationLog.id).filter(IntegrationLog.api_used == SERPAPI_SHOPPING),
+        func.count(IntegrationLog.id).filter(IntegrationLog.api_used == SERPAPI_IMMERSIVE),
+        func.min(IntegrationLog.created_at),
+        func.max(IntegrationLog.created_at),
+    ).join(
+        QuoteRequest, IntegrationLog.quote_request_id == QuoteRequest.id
+    ).where(
+        IntegrationLog.integration_type.in_(COST_INTEGRATION_TYPES)
+    ).group_by(
+        log_day, IntegrationLog.quote_request_id, IntegrationLog.integration_type
+    )
+
+    if start_day:
+        cleanup = cleanup.where(IntegrationCostDaily.day >= start_day)
+        aggregate = aggregate.where(log_day >= start_day)
+    if end_day:
+        cleanup = cleanup.where(IntegrationCostDaily.day <= end_day)
+        aggregate = aggregate.where(log_day <= end_day)
+
+    db.execute(cleanup)
+    result = db.execute(insert(IntegrationCostDaily).from_select(ROLLUP_COLUMNS, aggregate))
+    rows = result.rowcount or 0
+    logger.info(f"Consolidado de custos reconstruído ({start_day or 'início'} a {end_day or 'hoje'}): {rows} linhas")
+    return rows
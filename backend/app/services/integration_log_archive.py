@@ -0,0 +1,200 @@
+"""
+Arquivamento (cold storage) dos payloads de integration_logs.
+
+request_data e response_summary (prompts completos e resumos JSON) de logs
+com mais de INTEGRATION_LOG_ARCHIVE_DAYS dias são movidos para arquivos JSONL
+comprimidos (zstd; gzip se zstandard não estiver instalado) em
+STORAGE_PATH/integration_log_archive/<AAAA-MM>/, um arquivo por mês e por
+execução. A linha mantém as colunas de custo/tokens e aponta o arquivo em
+payload_archive; get_integration_logs reidrata os payloads sob demanda.
+
+No PostgreSQL a tabela é particionada por mês de created_at (migração 042);
+ensure_integration_log_partitions cria as partições dos próximos meses.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import func, null, or_, text, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import IntegrationLog
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = "integration_log_archive"
+ZSTD_LEVEL = 10
+
+
+def _archive_root() -> str:
+    return os.path.join(settings.STORAGE_PATH, ARCHIVE_DIR)
+
+
+def _compress(data: bytes) -> bytes:
+    if ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data)
+
+
+def _decompress(path: str, data: bytes) -> bytes:
+    if path.endswith(".zst"):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"zstandard não instalado; não é possível ler {path}")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return gzip.decompress(data)
+
+
+def _write_month_file(month: str, logs: List[IntegrationLog], run_stamp: str) -> str:
+    """Grava os payloads do mês em um arquivo novo; retorna o caminho relativo"""
+    extension = "jsonl.zst" if ZSTD_AVAILABLE else "jsonl.gz"
+    relative_path = os.path.join(month, f"payloads_{run_stamp}_{logs[0].id}.{extension}")
+    full_path = os.path.join(_archive_root(), relative_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+
+    lines = (
+        json.dumps({
+            "id": log.id,
+            "request_data": log.request_data,
+            "response_summary": log.response_summary,
+        }, ensure_ascii=False, default=str)
+        for log in logs
+    )
+    payload = ("\n".join(lines) + "\n").encode("utf-8")
+
+    # Grava em arquivo temporário e renomeia: o ponteiro nunca aponta para arquivo parcial
+    tmp_path = full_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(payload))
+    os.replace(tmp_path, full_path)
+    return relative_path
+
+
+def archive_integration_payloads(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: int = 5000
+) -> int:
+    """
+    Move os payloads de logs anteriores ao corte para arquivos comprimidos
+    e limpa as colunas JSON. Faz commit a cada lote; retorna o total arquivado.
+    """
+    days = older_than_days if older_than_days is not None else settings.INTEGRATION_LOG_ARCHIVE_DAYS
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    run_stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    archived = 0
+    last_id = 0
+
+    while True:
+        logs = db.query(IntegrationLog).filter(
+            IntegrationLog.id > last_id,
+            IntegrationLog.created_at < cutoff,
+            IntegrationLog.payload_archive.is_(None),
+            # json_typeof também descarta o JSON 'null' gravado por versões anteriores
+            or_(
+                func.json_typeof(IntegrationLog.request_data) != "null",
+                func.json_typeof(IntegrationLog.response_summary) != "null"
+            )
+        ).order_by(IntegrationLog.id).limit(batch_size).all()
+
+        if not logs:
+            break
+        last_id = logs[-1].id
+
+        by_month: Dict[str, List[IntegrationLog]] = defaultdict(list)
+        for log in logs:
+            by_month[log.created_at.strftime("%Y-%m")].append(log)
+
+        for month, month_logs in by_month.items():
+            relative_path = _write_month_file(month, month_logs, run_stamp)
+            db.execute(
+                update(IntegrationLog)
+                .where(IntegrationLog.id.in_([log.id for log in month_logs]))
+                .values(request_data=null(), response_summary=null(), payload_archive=relative_path)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        db.expunge_all()
+        archived += len(logs)
+
+    if archived:
+        logger.info(f"Payloads de {archived} logs de integração arquivados (anteriores a {cutoff:%Y-%m-%d})")
+    return archived
+
+
+def load_archived_payloads(logs: Iterable[IntegrationLog]) -> Dict[int, Dict[str, Any]]:
+    """
+    Lê dos arquivos os payloads dos logs arquivados (cada arquivo é lido uma vez).
+    Retorna {id: {"request_data": ..., "response_summary": ...}}; arquivos
+    ausentes ou ilegíveis são registrados e ignorados.
+    """
+    wanted: Dict[str, set] = defaultdict(set)
+    for log in logs:
+        if log.payload_archive:
+            wanted[log.payload_archive].add(log.id)
+
+    payloads: Dict[int, Dict[str, Any]] = {}
+    for relative_path, ids in wanted.items():
+        full_path = os.path.join(_archive_root(), relative_path)
+        try:
+            with open(full_path, "rb") as f:
+                content = _decompress(full_path, f.read())
+        except Exception as e:
+            logger.error(f"Erro ao ler arquivo de payloads {relative_path}: {e}")
+            continue
+
+        for line in content.splitlines():
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry["id"] in ids:
+                payloads[entry["id"]] = {
+                    "request_data": entry.get("request_data"),
+                    "response_summary": entry.get("response_summary"),
+                }
+    return payloads
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ensure_integration_log_partitions(db: Session, months_ahead: int = 2) -> List[str]:
+    """
+    Cria (se não existirem) as partições mensais de integration_logs do mês
+    atual até months_ahead meses à frente. Apenas PostgreSQL; sem commit.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+
+    created = []
+    start = _month_start(datetime.now(timezone.utc).date())
+    for _ in range(months_ahead + 1):
+        end = _next_month(start)
+        name = f"integration_logs_{start:%Y_%m}"
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if not exists:
+            db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF integration_logs "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+        start = end
+
+    if created:
+        logger.info(f"Partições de integration_logs criadas: {', '.join(created)}")
+    return created
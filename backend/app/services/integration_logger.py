@@ -4,12 +4,21 @@ IMPORTANTE: Os logs de integração usam uma sessão de banco independente para
 que sejam persistidos mesmo em caso de erro/rollback na transação principal.
 Isso é crítico para manter o histórico de consumo de APIs mesmo em cotações com erro.
 """
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models import IntegrationLog
 from app.core.database import SessionLocal
-from typing import Optional, Dict, Any
+from app.services.integration_cost_rollup import record_integration_costs
+from app.core.config import settings
+from typing import Optional, Dict, Any, List
+from datetime import datetime, timezone
 from decimal import Decimal
+import json
 import logging
+import time
+import uuid
+
+import redis
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +61,18 @@ OPENAI_COSTS = {
 }
 
 
+def _record_cost(log_db: Session, log_entries: List[IntegrationLog]):
+    """
+    Atualiza o consolidado diário de custos em um savepoint: se falhar, o log
+    bruto é gravado mesmo assim (a reconciliação agendada corrige o consolidado).
+    """
+    try:
+        with log_db.begin_nested():
+            record_integration_costs(log_db, log_entries)
+    except Exception as e:
+        logger.error(f"Error updating integration cost rollup: {e}")
+
+
 def calculate_ai_cost(provider: str, model: str, input_tokens: int, output_tokens: int) -> float:
     """Calcula o custo estimado de uma chamada de IA (Anthropic ou OpenAI)"""
     if provider == "openai":
@@ -70,6 +91,107 @@ def calculate_anthropic_cost(model: str, input_tokens: int, output_tokens: int)
     return calculate_ai_cost("anthropic", model, input_tokens, output_tokens)
 
 
+def _ai_call_record(
+    quote_request_id: int,
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    activity: str,
+    integration_type: str,
+    request_data: Optional[Dict[str, Any]],
+    response_summary: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Registro (serializável em JSON) de uma chamada de IA"""
+    estimated_cost = calculate_ai_cost(integration_type, model, input_tokens, output_tokens)
+    return {
+        "quote_request_id": quote_request_id,
+        "integration_type": integration_type,
+        "model_used": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "total_tokens": input_tokens + output_tokens,
+        "estimated_cost_usd": str(Decimal(str(estimated_cost))),
+        "activity": activity,
+        "request_data": request_data,
+        "response_summary": response_summary,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "record_key": str(uuid.uuid4()),
+    }
+
+
+def _serpapi_call_record(
+    quote_request_id: int,
+    api_used: str,
+    search_url: str,
+    activity: str,
+    request_data: Optional[Dict[str, Any]],
+    response_summary: Optional[Dict[str, Any]],
+    product_link: Optional[str]
+) -> Dict[str, Any]:
+    """Registro (serializável em JSON) de uma chamada SerpAPI"""
+    return {
+        "quote_request_id": quote_request_id,
+        "integration_type": "serpapi",
+        "api_used": api_used,
+        "search_url": search_url,
+        "product_link": product_link,
+        "activity": activity,
+        "request_data": request_data,
+        "response_summary": response_summary,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "record_key": str(uuid.uuid4()),
+    }
+
+
+def _log_from_record(record: Dict[str, Any]) -> IntegrationLog:
+    values = dict(record)
+    if values.get("estimated_cost_usd") is not None:
+        values["estimated_cost_usd"] = Decimal(values["estimated_cost_usd"])
+    if values.get("created_at"):
+        values["created_at"] = datetime.fromisoformat(values["created_at"])
+    return IntegrationLog(**values)
+
+
+def persist_log_records(records: List[Dict[str, Any]]) -> bool:
+    """
+    Grava um lote de registros em uma única transação (insert em lote +
+    consolidado de custos). Usa sessão independente para garantir persistência
+    mesmo em caso de rollback na transação principal. Retorna False se falhar.
+
+    Registros cuja record_key já está gravada são ignorados: se o processo
+    morrer depois do commit e antes de limpar a lista Redis, regravar o lote
+    não duplica logs nem custos.
+    """
+    if not records:
+        return True
+
+    log_db = SessionLocal()
+    try:
+        keys = [record["record_key"] for record in records if record.get("record_key")]
+        if keys:
+            persisted = set(log_db.scalars(
+                select(IntegrationLog.record_key).where(IntegrationLog.record_key.in_(keys))
+            ))
+            if persisted:
+                logger.info(f"Skipping {len(persisted)} integration logs already persisted")
+                records = [record for record in records if record.get("record_key") not in persisted]
+            if not records:
+                return True
+
+        log_entries = [_log_from_record(record) for record in records]
+        log_db.add_all(log_entries)
+        log_db.flush()
+        _record_cost(log_db, log_entries)
+        log_db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error persisting {len(records)} integration logs: {e}")
+        log_db.rollback()
+        return False
+    finally:
+        log_db.close()
+
+
 def log_ai_call(
     db: Session,  # Mantido para compatibilidade, mas não usado
     quote_request_id: int,
@@ -84,39 +206,15 @@ def log_ai_call(
     """
     Registra uma chamada para API de IA (Anthropic ou OpenAI).
 
-    Usa sessão independente para garantir persistência mesmo em caso de rollback.
+    Grava imediatamente; no processamento de cotações use IntegrationLogBuffer.
     """
-    # Usar sessão independente para garantir que o log seja persistido
-    # mesmo em caso de erro/rollback na transação principal
-    log_db = SessionLocal()
-    try:
-        total_tokens = input_tokens + output_tokens
-        estimated_cost = calculate_ai_cost(integration_type, model, input_tokens, output_tokens)
-
-        log_entry = IntegrationLog(
-            quote_request_id=quote_request_id,
-            integration_type=integration_type,
-            model_used=model,
-            input_tokens=input_tokens,
-            output_tokens=output_tokens,
-            total_tokens=total_tokens,
-            estimated_cost_usd=Decimal(str(estimated_cost)),
-            activity=activity,
-            request_data=request_data,
-            response_summary=response_summary
-        )
-
-        log_db.add(log_entry)
-        log_db.commit()
-
+    record = _ai_call_record(
+        quote_request_id, model, input_tokens, output_tokens, activity,
+        integration_type, request_data, response_summary
+    )
+    if persist_log_records([record]):
         provider_name = "OpenAI" if integration_type == "openai" else "Anthropic"
-        logger.info(f"Logged {provider_name} call: {activity} - {total_tokens} tokens, ${estimated_cost:.6f}")
-
-    except Exception as e:
-        logger.error(f"Error logging AI call: {e}")
-        log_db.rollback()
-    finally:
-        log_db.close()
+        logger.info(f"Logged {provider_name} call: {activity} - {record['total_tokens']} tokens, ${record['estimated_cost_usd']}")
 
 
 def log_anthropic_call(
@@ -160,30 +258,184 @@ def log_serpapi_call(
     """
     Registra uma chamada para SerpAPI.
 
-    Usa sessão independente para garantir persistência mesmo em caso de rollback.
+    Grava imediatamente; no processamento de cotações use IntegrationLogBuffer.
     """
-    # Usar sessão independente para garantir que o log seja persistido
-    # mesmo em caso de erro/rollback na transação principal
-    log_db = SessionLocal()
-    try:
-        log_entry = IntegrationLog(
-            quote_request_id=quote_request_id,
-            integration_type="serpapi",
-            api_used=api_used,
-            search_url=search_url,
-            product_link=product_link,
-            activity=activity,
-            request_data=request_data,
-            response_summary=response_summary
-        )
-
-        log_db.add(log_entry)
-        log_db.commit()
-
+    record = _serpapi_call_record(
+        quote_request_id, api_used, search_url, activity,
+        request_data, response_summary, product_link
+    )
+    if persist_log_records([record]):
         logger.info(f"Logged SerpAPI call: {activity} - {api_used}")
 
-    except Exception as e:
-        logger.error(f"Error logging SerpAPI call: {e}")
-        log_db.rollback()
-    finally:
-        log_db.close()
+
+# ===== Buffer de logs por cotação =====
+
+# Lista Redis com os registros ainda não gravados de uma cotação
+PENDING_KEY_PREFIX = "integration_logs:pending:"
+
+# Tempo sem escrita (segundos) para a drenagem considerar a lista abandonada
+PENDING_IDLE_SECONDS = 600
+
+# Após uma falha, o Redis é ignorado por esse tempo (segundos): cada comando
+# contra um Redis fora do ar custaria o socket_timeout em toda chamada logada
+REDIS_RETRY_SECONDS = 60
+
+_redis_client = None
+_redis_down_until = 0.0
+
+
+def get_redis_client():
+    """Cliente Redis (lazy) para o fallback dos logs pendentes"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _redis_client
+
+
+def _redis_available() -> bool:
+    return time.monotonic() >= _redis_down_until
+
+
+def _mark_redis_down(e: Exception, action: str):
+    """Abre o circuito: o buffer segue só em memória até REDIS_RETRY_SECONDS"""
+    global _redis_down_until
+    _redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    logger.warning(f"Could not {action} in Redis, skipping Redis for {REDIS_RETRY_SECONDS}s: {e}")
+
+
+class IntegrationLogBuffer:
+    """
+    Acumula em memória os logs de integração de uma cotação e grava tudo em
+    um único insert em lote nos checkpoints (flush), sem bloquear o loop de
+    extração em commits no Postgres.
+
+    Cada registro também é anexado (RPUSH) a uma lista Redis da cotação: se o
+    worker morrer antes do flush, o próximo processamento da mesma cotação
+    recarrega os pendentes, e a task drain_pending_integration_logs grava os
+    de cotações que não voltarem a ser processadas. Cada registro leva uma
+    record_key, e persist_log_records ignora as já gravadas: um crash entre o
+    commit e o DELETE da lista não duplica logs nem custos.
+    """
+
+    def __init__(self, quote_request_id: int, redis_client=None):
+        self.quote_request_id = quote_request_id
+        self.key = f"{PENDING_KEY_PREFIX}{quote_request_id}"
+        self.redis = redis_client if redis_client is not None else get_redis_client()
+        self._records: List[Dict[str, Any]] = self._load_pending()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _load_pending(self) -> List[Dict[str, Any]]:
+        if not _redis_available():
+            return []
+        try:
+            pending = [json.loads(item) for item in self.redis.lrange(self.key, 0, -1)]
+        except Exception as e:
+            _mark_redis_down(e, f"load pending integration logs for quote {self.quote_request_id}")
+            return []
+        if pending:
+            logger.info(f"Recovered {len(pending)} pending integration logs for quote {self.quote_request_id}")
+        return pending
+
+    def _append(self, record: Dict[str, Any]):
+        self._records.append(record)
+        if not _redis_available():
+            return
+        try:
+            self.redis.rpush(self.key, json.dumps(record, default=str))
+        except Exception as e:
+            # Sem Redis o buffer continua em memória (perde apenas a proteção contra crash)
+            _mark_redis_down(e, "buffer integration log")
+
+    def log_ai_call(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        activity: str,
+        integration_type: str = "anthropic",
+        request_data: Optional[Dict[str, Any]] = None,
+        response_summary: Optional[Dict[str, Any]] = None
+    ):
+        """Equivalente a log_ai_call, gravado no próximo flush"""
+        self._append(_ai_call_record(
+            self.quote_request_id, model, input_tokens, output_tokens, activity,
+            integration_type, request_data, response_summary
+        ))
+
+    def log_serpapi_call(
+        self,
+        api_used: str,
+        search_url: str,
+        activity: str,
+        request_data: Optional[Dict[str, Any]] = None,
+        response_summary: Optional[Dict[str, Any]] = None,
+        product_link: Optional[str] = None
+    ):
+        """Equivalente a log_serpapi_call, gravado no próximo flush"""
+        self._append(_serpapi_call_record(
+            self.quote_request_id, api_used, search_url, activity,
+            request_data, response_summary, product_link
+        ))
+
+    def flush(self) -> int:
+        """
+        Grava os registros acumulados e limpa a lista Redis.
+        Se o banco falhar, os registros ficam para o próximo flush.
+        Retorna o número de registros gravados.
+        """
+        if not self._records:
+            return 0
+
+        records = self._records
+        if not persist_log_records(records):
+            return 0
+
+        self._records = []
+        if _redis_available():
+            try:
+                self.redis.delete(self.key)
+            except Exception as e:
+                # A lista que sobrar é regravada sem duplicar (record_key)
+                _mark_redis_down(e, "clear pending integration logs")
+
+        logger.info(f"Flushed {len(records)} integration logs for quote {self.quote_request_id}")
+        return len(records)
+
+
+def drain_pending_integration_logs(db: Session, redis_client=None, idle_seconds: int = PENDING_IDLE_SECONDS) -> int:
+    """
+    Grava os logs pendentes no Redis de cotações cujo processamento foi
+    interrompido. Ignora cotações em processamento e listas com escrita recente.
+    Retorna o número de registros gravados.
+    """
+    from app.models import QuoteRequest
+    from app.models.quote_request import QuoteStatus
+
+    client = redis_client if redis_client is not None else get_redis_client()
+    drained = 0
+
+    for key in client.scan_iter(match=f"{PENDING_KEY_PREFIX}*"):
+        key = key.decode() if isinstance(key, bytes) else key
+        quote_request_id = int(key[len(PENDING_KEY_PREFIX):])
+
+        idle = client.object("idletime", key)
+        if idle is not None and idle < idle_seconds:
+            continue
+
+        status = db.query(QuoteRequest.status).filter(QuoteRequest.id == quote_request_id).scalar()
+        if status == QuoteStatus.PROCESSING:
+            continue
+
+        if status is None:
+            # Cotação excluída: os logs não têm mais a quem pertencer
+            client.delete(key)
+            continue
+
+        records = [json.loads(item) for item in client.lrange(key, 0, -1)]
+        if persist_log_records(records):
+            client.delete(key)
+            drained += len(records)
+
+    return drained
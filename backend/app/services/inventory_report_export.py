@@ -0,0 +1,381 @@
+"""
+Exportação de relatórios de inventário em streaming.
+
+O Excel é gerado com planilhas write-only do openpyxl e estilos nomeados
+(registrados uma vez no workbook, em vez de objetos de estilo por célula).
+As linhas vêm do banco com yield_per e são gravadas direto em um arquivo
+temporário, então a memória não cresce com o tamanho da sessão.
+
+Para sessões muito grandes há exportação em CSV e Parquet (pyarrow opcional).
+"""
+import csv
+import itertools
+import logging
+import os
+import tempfile
+from typing import Any, Iterator, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import (
+    InventorySession,
+    InventoryExpectedAsset,
+    InventoryReadAsset,
+    AssetCategory,
+)
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import NamedStyle, Font, Alignment, PatternFill, Border, Side
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Linhas por lote lido do banco (yield_per) e gravado no Parquet
+ROW_BATCH_SIZE = 2000
+
+ASSET_HEADERS = [
+    "Código do Bem", "Descrição", "Tag RFID", "Código Barras", "UL Esperada",
+    "Status", "Método Leitura", "Data Leitura", "Estado Físico",
+]
+ASSET_WIDTHS = [15, 40, 20, 15, 15, 15, 15, 18, 15]
+
+UNREGISTERED_HEADERS = ["Identificador", "Método Leitura", "Data Leitura"]
+UNREGISTERED_WIDTHS = [30, 15, 18]
+
+STATUS_LABELS = {
+    'found': 'Encontrado',
+    'not_found': 'Não Encontrado',
+    'unregistered': 'Não Cadastrado',
+    'written_off': 'Baixado'
+}
+
+SESSION_STATUS_LABELS = {
+    'draft': 'Rascunho',
+    'in_progress': 'Em Andamento',
+    'paused': 'Pausada',
+    'completed': 'Concluída',
+    'cancelled': 'Cancelada'
+}
+
+# Estilo nomeado da coluna Status por situação
+STATUS_STYLES = {
+    "Encontrado": "status_found",
+    "Não Encontrado": "status_not_found",
+    "Não Cadastrado": "status_unregistered",
+}
+
+MEDIA_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _format_datetime(value) -> str:
+    return value.strftime("%d/%m/%Y %H:%M") if value else "-"
+
+
+# ===== Leitura em streaming =====
+
+def iter_asset_rows(db: Session, session_id: int) -> Iterator[List[Any]]:
+    """
+    Linhas do detalhamento de bens (uma por bem esperado), em ordem de código.
+
+    Bens e leituras vêm de uma única consulta com outer join lida em lotes;
+    se um bem tiver mais de uma leitura, vale a mais recente (maior id).
+    """
+    query = db.query(
+        InventoryExpectedAsset.id,
+        InventoryExpectedAsset.asset_code,
+        InventoryExpectedAsset.description,
+        InventoryExpectedAsset.rfid_code,
+        InventoryExpectedAsset.barcode,
+        InventoryExpectedAsset.expected_ul_code,
+        InventoryExpectedAsset.is_written_off,
+        InventoryReadAsset.category,
+        InventoryReadAsset.read_method,
+        InventoryReadAsset.read_at,
+        InventoryReadAsset.physical_condition,
+    ).outerjoin(
+        InventoryReadAsset, InventoryReadAsset.expected_asset_id == InventoryExpectedAsset.id
+    ).filter(
+        InventoryExpectedAsset.session_id == session_id
+    ).order_by(
+        InventoryExpectedAsset.asset_code, InventoryExpectedAsset.id, InventoryReadAsset.id
+    ).execution_options(yield_per=ROW_BATCH_SIZE)
+
+    for _, group in itertools.groupby(query, key=lambda row: row.id):
+        *_, row = group
+
+        status = "Pendente"
+        read_method = "-"
+        read_at = "-"
+        physical_condition = "-"
+
+        if row.category:
+            status = STATUS_LABELS.get(row.category, row.category)
+            read_method = row.read_method or "-"
+            read_at = _format_datetime(row.read_at)
+            physical_condition = row.physical_condition or "-"
+        elif row.is_written_off:
+            status = "Baixado"
+
+        yield [
+            row.asset_code,
+            row.description or "-",
+            row.rfid_code or "-",
+            row.barcode or "-",
+            row.expected_ul_code or "-",
+            status,
+            read_method,
+            read_at,
+            physical_condition
+        ]
+
+
+def iter_unregistered_rows(db: Session, session_id: int) -> Iterator[List[Any]]:
+    """Linhas das leituras de bens não cadastrados"""
+    query = db.query(
+        InventoryReadAsset.asset_code,
+        InventoryReadAsset.rfid_code,
+        InventoryReadAsset.read_method,
+        InventoryReadAsset.read_at,
+    ).filter(
+        InventoryReadAsset.session_id == session_id,
+        InventoryReadAsset.category == AssetCategory.UNREGISTERED.value
+    ).order_by(InventoryReadAsset.id).execution_options(yield_per=ROW_BATCH_SIZE)
+
+    for row in query:
+        yield [
+            row.asset_code or row.rfid_code or "-",
+            row.read_method or "-",
+            _format_datetime(row.read_at)
+        ]
+
+
+def iter_export_rows(db: Session, session_id: int) -> Iterator[List[Any]]:
+    """Bens esperados seguidos dos não cadastrados, no layout do detalhamento (CSV/Parquet)"""
+    yield from iter_asset_rows(db, session_id)
+    for identifier, read_method, read_at in iter_unregistered_rows(db, session_id):
+        yield [identifier, "-", "-", "-", "-", "Não Cadastrado", read_method, read_at, "-"]
+
+
+# ===== Excel =====
+
+def _register_styles(wb: "Workbook") -> None:
+    """Registra os estilos nomeados usados no relatório"""
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+
+    def fill(color: str) -> PatternFill:
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    styles = [
+        NamedStyle(name="title", font=Font(size=16, bold=True)),
+        NamedStyle(name="section", font=Font(size=14, bold=True)),
+        NamedStyle(name="label", font=Font(bold=True)),
+        NamedStyle(
+            name="header", font=Font(color="FFFFFF", bold=True), fill=fill("2563eb"),
+            border=border, alignment=Alignment(horizontal='center')
+        ),
+        NamedStyle(name="cell", border=border),
+        NamedStyle(name="cell_center", border=border, alignment=Alignment(horizontal='center')),
+        NamedStyle(name="status_found", border=border, fill=fill("dcfce7")),
+        NamedStyle(name="status_not_found", border=border, fill=fill("fee2e2")),
+        NamedStyle(name="status_unregistered", border=border, fill=fill("dbeafe")),
+    ]
+    for style in styles:
+        wb.add_named_style(style)
+
+
+def _styled(ws, value: Any, style: str) -> "WriteOnlyCell":
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _set_widths(ws, widths: List[int]) -> None:
+    for index, width in enumerate(widths):
+        ws.column_dimensions[chr(ord('A') + index)].width = width
+
+
+def _percent(value: int, total: int) -> str:
+    return f"{(value / total * 100 if total > 0 else 0):.1f}%"
+
+
+def _write_summary(wb: "Workbook", session: InventorySession, stats: dict) -> None:
+    ws = wb.create_sheet("Resumo")
+    _set_widths(ws, [20, 40, 15])
+
+    ws.append([_styled(ws, "Relatório de Inventário Patrimonial", "title")])
+    ws.append([])
+    ws.append([_styled(ws, "Informações da Sessão", "section")])
+
+    info_data = [
+        ("Código", session.code),
+        ("Nome", session.name or "-"),
+        ("Status", SESSION_STATUS_LABELS.get(session.status, session.status)),
+        ("Projeto", session.project.nome if session.project else "-"),
+        ("UG", f"{session.ug.code} - {session.ug.name}" if session.ug else "-"),
+        ("UL", f"{session.ul.code} - {session.ul.name}" if session.ul else "-"),
+        ("Data Criação", _format_datetime(session.created_at)),
+        ("Data Início", _format_datetime(session.started_at)),
+        ("Data Conclusão", _format_datetime(session.completed_at)),
+    ]
+    for label, value in info_data:
+        ws.append([_styled(ws, label, "label"), value])
+
+    ws.append([])
+    ws.append([_styled(ws, "Resumo Estatístico", "section")])
+    ws.append([])
+    ws.append([_styled(ws, header, "header") for header in ["Indicador", "Quantidade", "Percentual"]])
+
+    total = stats["total_expected"]
+    stats_data = [
+        ("Total Esperado", total, "100%"),
+        ("Encontrados", stats["total_found"], _percent(stats["total_found"], total)),
+        ("Não Encontrados", stats["total_not_found"], _percent(stats["total_not_found"], total)),
+        ("Não Cadastrados", stats["total_unregistered"], "-"),
+        ("Baixados", stats["total_written_off"], _percent(stats["total_written_off"], total)),
+        ("Conclusão", f"{stats['completion_percentage']:.1f}%", ""),
+    ]
+    for label, qty, pct in stats_data:
+        ws.append([
+            _styled(ws, label, "cell"),
+            _styled(ws, qty, "cell_center"),
+            _styled(ws, pct, "cell_center"),
+        ])
+
+
+def write_excel_report(db: Session, session: InventorySession, stats: dict, path: str) -> int:
+    """
+    Grava o relatório Excel (Resumo, Bens Detalhados e Não Cadastrados) em path.
+    Retorna o número de bens detalhados.
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("Biblioteca openpyxl não disponível")
+
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+
+    _write_summary(wb, session, stats)
+
+    # Aba 2: Bens Detalhados
+    ws = wb.create_sheet("Bens Detalhados")
+    _set_widths(ws, ASSET_WIDTHS)
+    ws.append([_styled(ws, header, "header") for header in ASSET_HEADERS])
+
+    status_column = ASSET_HEADERS.index("Status")
+    total_rows = 0
+    for row in iter_asset_rows(db, session.id):
+        cells = [_styled(ws, value, "cell") for value in row]
+        status_style = STATUS_STYLES.get(row[status_column])
+        if status_style:
+            cells[status_column].style = status_style
+        ws.append(cells)
+        total_rows += 1
+
+    # Aba 3: Não Cadastrados (se houver)
+    unregistered = iter_unregistered_rows(db, session.id)
+    first = next(unregistered, None)
+    if first is not None:
+        ws = wb.create_sheet("Não Cadastrados")
+        _set_widths(ws, UNREGISTERED_WIDTHS)
+        ws.append([_styled(ws, header, "header") for header in UNREGISTERED_HEADERS])
+        for row in itertools.chain([first], unregistered):
+            ws.append([_styled(ws, value, "cell") for value in row])
+
+    wb.save(path)
+    return total_rows
+
+
+# ===== CSV / Parquet =====
+
+def write_csv_report(db: Session, session: InventorySession, path: str) -> int:
+    """Grava o detalhamento em CSV (UTF-8 com BOM, separador ';' para o Excel pt-BR)"""
+    total_rows = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(ASSET_HEADERS)
+        for row in iter_export_rows(db, session.id):
+            writer.writerow(row)
+            total_rows += 1
+    return total_rows
+
+
+def write_parquet_report(db: Session, session: InventorySession, path: str) -> int:
+    """Grava o detalhamento em Parquet, um row group por lote"""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Biblioteca pyarrow não disponível")
+
+    schema = pyarrow.schema([(header, pyarrow.string()) for header in ASSET_HEADERS])
+    total_rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        rows = iter_export_rows(db, session.id)
+        while True:
+            batch = list(itertools.islice(rows, ROW_BATCH_SIZE))
+            if not batch:
+                break
+            columns = [[None if value is None else str(value) for value in column] for column in zip(*batch)]
+            writer.write_table(pyarrow.Table.from_arrays(columns, schema=schema))
+            total_rows += len(batch)
+    return total_rows
+
+
+def generate_report_file(
+    db: Session,
+    session: InventorySession,
+    stats: dict,
+    file_format: str = "xlsx"
+) -> Tuple[str, int]:
+    """
+    Gera o relatório em um arquivo temporário.
+
+    Returns:
+        (caminho do arquivo, número de linhas detalhadas) - o chamador remove o arquivo
+    """
+    fd, path = tempfile.mkstemp(prefix=f"inventario_{session.id}_", suffix=f".{file_format}")
+    os.close(fd)
+
+    try:
+        if file_format == "xlsx":
+            rows = write_excel_report(db, session, stats, path)
+        elif file_format == "csv":
+            rows = write_csv_report(db, session, path)
+        elif file_format == "parquet":
+            rows = write_parquet_report(db, session, path)
+        else:
+            raise ValueError(f"Formato não suportado: {file_format}")
+    except Exception:
+        os.remove(path)
+        raise
+
+    logger.info(f"Relatório de inventário da sessão {session.id} ({file_format}): {rows} linhas")
+    return path, rows
+
+
+def iter_file_and_remove(path: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Lê o arquivo em blocos para StreamingResponse e o remove ao final"""
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
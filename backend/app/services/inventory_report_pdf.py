@@ -0,0 +1,289 @@
+"""
+Relatório PDF de sessões de inventário com cache.
+
+A renderização (ReportLab) roda em uma task Celery na fila "render". O PDF
+gerado é guardado como GeneratedDocument vinculado à sessão e a um carimbo
+de versão calculado a partir dos contadores materializados e das últimas
+inclusões/edições de leituras e bens esperados; enquanto nada disso muda, o
+download é servido do cache.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import (
+    File,
+    GeneratedDocument,
+    InventorySession,
+    InventoryExpectedAsset,
+    InventoryReadAsset,
+)
+from app.models.file import FileType
+from app.services.inventory_statistics import get_session_counters
+from app.services.inventory_report_export import iter_asset_rows, SESSION_STATUS_LABELS
+
+logger = logging.getLogger(__name__)
+
+# Linhas da tabela detalhada por página
+DETAIL_ROWS_PER_PAGE = 40
+
+
+def report_version_stamp(db: Session, session: InventorySession, include_details: bool) -> str:
+    """
+    Carimbo de versão do relatório: muda quando leituras, bens esperados ou
+    dados da sessão mudam. Formato "<hash>-full" ou "<hash>-summary".
+    """
+    counters = get_session_counters(db, [session.id])[session.id]
+
+    # Maior id pega inclusões; maior updated_at pega edições no próprio registro
+    last_reading_id, last_reading_update = db.query(
+        func.max(InventoryReadAsset.id), func.max(InventoryReadAsset.updated_at)
+    ).filter(InventoryReadAsset.session_id == session.id).one()
+
+    last_expected_id, last_expected_update = db.query(
+        func.max(InventoryExpectedAsset.id), func.max(InventoryExpectedAsset.updated_at)
+    ).filter(InventoryExpectedAsset.session_id == session.id).one()
+
+    payload = json.dumps({
+        "counters": sorted(f"{dimension}:{value}={count}" for (dimension, value), count in counters.items()),
+        "last_reading_id": last_reading_id,
+        "last_reading_update": last_reading_update,
+        "last_expected_id": last_expected_id,
+        "last_expected_update": last_expected_update,
+        "status": session.status,
+        "updated_at": session.updated_at,
+        "completed_at": session.completed_at,
+    }, sort_keys=True, default=str)
+
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return f"{digest}-{'full' if include_details else 'summary'}"
+
+
+def get_cached_report(db: Session, session_id: int, version_stamp: str) -> Optional[GeneratedDocument]:
+    """Retorna o documento em cache para a versão informada (se o arquivo ainda existir)"""
+    document = db.query(GeneratedDocument).filter(
+        GeneratedDocument.inventory_session_id == session_id,
+        GeneratedDocument.version_stamp == version_stamp
+    ).order_by(GeneratedDocument.id.desc()).first()
+
+    if document and document.pdf_file and os.path.exists(document.pdf_file.storage_path):
+        return document
+    return None
+
+
+def store_report(db: Session, session: InventorySession, version_stamp: str, pdf_bytes: bytes) -> GeneratedDocument:
+    """
+    Grava o PDF em disco e registra File + GeneratedDocument.
+    Versões anteriores da mesma variante (full/summary) são removidas.
+    """
+    variant = version_stamp.rsplit("-", 1)[-1]
+    pdf_dir = os.path.join(settings.STORAGE_PATH, "inventory_reports", str(session.id))
+    os.makedirs(pdf_dir, exist_ok=True)
+    pdf_path = os.path.join(pdf_dir, f"inventario_{session.code}_{version_stamp}.pdf")
+
+    with open(pdf_path, "wb") as f:
+        f.write(pdf_bytes)
+
+    stale = db.query(GeneratedDocument).filter(
+        GeneratedDocument.inventory_session_id == session.id,
+        GeneratedDocument.version_stamp.like(f"%-{variant}"),
+        GeneratedDocument.version_stamp != version_stamp
+    ).all()
+    for document in stale:
+        stale_file = document.pdf_file
+        db.delete(document)
+        if stale_file:
+            if stale_file.storage_path != pdf_path and os.path.exists(stale_file.storage_path):
+                os.remove(stale_file.storage_path)
+            db.delete(stale_file)
+
+    pdf_file = File(
+        type=FileType.PDF,
+        mime_type="application/pdf",
+        storage_path=pdf_path,
+        sha256=hashlib.sha256(pdf_bytes).hexdigest()
+    )
+    db.add(pdf_file)
+    db.flush()
+
+    document = GeneratedDocument(
+        inventory_session_id=session.id,
+        version_stamp=version_stamp,
+        pdf_file_id=pdf_file.id
+    )
+    db.add(document)
+    db.commit()
+    return document
+
+
+def build_inventory_pdf(
+    db: Session,
+    session: InventorySession,
+    stats: dict,
+    include_details: bool = True,
+    generated_by: Optional[str] = None
+) -> bytes:
+    """
+    Renderiza o relatório PDF da sessão.
+    Inclui resumo estatístico e opcionalmente lista detalhada de bens.
+    """
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        rightMargin=2*cm,
+        leftMargin=2*cm,
+        topMargin=2*cm,
+        bottomMargin=2*cm
+    )
+
+    styles = getSampleStyleSheet()
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=1  # Center
+    )
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12
+    )
+    normal_style = styles['Normal']
+
+    elements = []
+
+    # Título
+    elements.append(Paragraph("Relatório de Inventário Patrimonial", title_style))
+    elements.append(Spacer(1, 20))
+
+    # Informações da Sessão
+    elements.append(Paragraph("Informações da Sessão", subtitle_style))
+
+    session_info = [
+        ["Código", session.code],
+        ["Nome", session.name or "-"],
+        ["Status", SESSION_STATUS_LABELS.get(session.status, session.status)],
+        ["Projeto", session.project.nome if session.project else "-"],
+        ["UG", f"{session.ug.code} - {session.ug.name}" if session.ug else "-"],
+        ["UL", f"{session.ul.code} - {session.ul.name}" if session.ul else "-"],
+        ["Data Criação", session.created_at.strftime("%d/%m/%Y %H:%M") if session.created_at else "-"],
+        ["Data Início", session.started_at.strftime("%d/%m/%Y %H:%M") if session.started_at else "-"],
+        ["Data Conclusão", session.completed_at.strftime("%d/%m/%Y %H:%M") if session.completed_at else "-"],
+    ]
+
+    t = Table(session_info, colWidths=[5*cm, 12*cm])
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('PADDING', (0, 0), (-1, -1), 8),
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 20))
+
+    # Estatísticas
+    elements.append(Paragraph("Resumo Estatístico", subtitle_style))
+
+    stats_data = [
+        ["Indicador", "Quantidade", "Percentual"],
+        ["Total Esperado", str(stats["total_expected"]), "100%"],
+        ["Encontrados", str(stats["total_found"]), f"{(stats['total_found']/stats['total_expected']*100 if stats['total_expected'] > 0 else 0):.1f}%"],
+        ["Não Encontrados", str(stats["total_not_found"]), f"{(stats['total_not_found']/stats['total_expected']*100 if stats['total_expected'] > 0 else 0):.1f}%"],
+        ["Não Cadastrados", str(stats["total_unregistered"]), "-"],
+        ["Baixados", str(stats["total_written_off"]), f"{(stats['total_written_off']/stats['total_expected']*100 if stats['total_expected'] > 0 else 0):.1f}%"],
+        ["Conclusão", f"{stats['completion_percentage']:.1f}%", ""],
+    ]
+
+    t = Table(stats_data, colWidths=[7*cm, 5*cm, 5*cm])
+    t.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('PADDING', (0, 0), (-1, -1), 8),
+        ('BACKGROUND', (0, 2), (-1, 2), colors.HexColor('#dcfce7')),  # Encontrados - verde claro
+        ('BACKGROUND', (0, 3), (-1, 3), colors.HexColor('#fee2e2')),  # Não encontrados - vermelho claro
+    ]))
+    elements.append(t)
+    elements.append(Spacer(1, 20))
+
+    # Lista detalhada de bens
+    if include_details:
+        elements.append(PageBreak())
+        elements.append(Paragraph("Lista Detalhada de Bens", subtitle_style))
+
+        header = ["Código", "Descrição", "RFID", "Status", "Data Leitura"]
+        detail_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('PADDING', (0, 0), (-1, -1), 4),
+        ])
+
+        # Uma tabela por página (máx DETAIL_ROWS_PER_PAGE linhas), com cabeçalho repetido
+        page_rows = []
+        pages = 0
+        for row in iter_asset_rows(db, session.id):
+            asset_code, description, rfid_code, _, _, status, _, read_at, _ = row
+
+            # Truncar descrição se muito longa
+            if len(description) > 40:
+                description = description[:37] + "..."
+
+            page_rows.append([asset_code, description, rfid_code, status, read_at])
+
+            if len(page_rows) == DETAIL_ROWS_PER_PAGE:
+                if pages:
+                    elements.append(PageBreak())
+                t = Table([header] + page_rows, colWidths=[3*cm, 6*cm, 3*cm, 2.5*cm, 3*cm])
+                t.setStyle(detail_style)
+                elements.append(t)
+                pages += 1
+                page_rows = []
+
+        if page_rows or not pages:
+            if pages:
+                elements.append(PageBreak())
+            t = Table([header] + page_rows, colWidths=[3*cm, 6*cm, 3*cm, 2.5*cm, 3*cm])
+            t.setStyle(detail_style)
+            elements.append(t)
+
+    # Rodapé
+    footer = f"Relatório gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}"
+    if generated_by:
+        footer += f" por {generated_by}"
+    elements.append(Spacer(1, 30))
+    elements.append(Paragraph(
+        footer,
+        ParagraphStyle('Footer', parent=normal_style, fontSize=8, textColor=colors.grey)
+    ))
+
+    doc.build(elements)
+    return buffer.getvalue()
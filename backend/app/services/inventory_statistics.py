@@ -0,0 +1,315 @@
+"""
+Estatisticas materializadas de sessoes de inventario.
+
+Mantem contadores por sessao (bens esperados e leituras por categoria,
+metodo de leitura e situacao fisica) na tabela inventory_session_counters.
+Os contadores sao atualizados no mesmo flush/transacao em que leituras e
+bens esperados sao inseridos, alterados ou removidos via ORM, entao as
+consultas de estatisticas leem poucas linhas indexadas em vez de executar
+GROUP BY sobre inventory_read_assets.
+
+Operacoes em massa que nao passam pelo ORM (query.delete(), COPY, INSERT
+direto) devem chamar apply_counter_deltas() ou reconcile_session_counters().
+"""
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory_session import (
+    InventorySession,
+    InventoryExpectedAsset,
+    InventoryReadAsset,
+    InventorySessionCounter,
+    CounterDimension,
+    AssetCategory,
+    ReadMethod,
+)
+
+logger = logging.getLogger(__name__)
+
+# Chave de um contador: (session_id, dimension, value)
+CounterKey = Tuple[int, str, str]
+
+# Valor usado na dimensao "expected" (um unico contador por sessao)
+EXPECTED_TOTAL = "total"
+
+# Atributos de InventoryReadAsset que alimentam os contadores
+TRACKED_READING_ATTRS = ("category", "read_method", "physical_condition")
+
+# Valor contado quando a leitura nao informa categoria/metodo (default do modelo).
+# Mesma regra nos contadores incrementais e na recontagem (compute_session_counts)
+DEFAULT_CATEGORY = AssetCategory.FOUND.value
+DEFAULT_READ_METHOD = ReadMethod.RFID.value
+
+
+def reading_counter_keys(
+    category: Optional[str],
+    read_method: Optional[str],
+    physical_condition: Optional[str]
+) -> List[Tuple[str, str]]:
+    """Retorna as chaves (dimensao, valor) afetadas por uma leitura."""
+    keys = [
+        (CounterDimension.CATEGORY.value, category or DEFAULT_CATEGORY),
+        (CounterDimension.METHOD.value, read_method or DEFAULT_READ_METHOD),
+    ]
+    if physical_condition:
+        keys.append((CounterDimension.CONDITION.value, physical_condition))
+    return keys
+
+
+def _previous_value(state, attr: str):
+    """
+    Valor anterior de um atributo no flush atual.
+    Retorna (valor, conhecido) - conhecido=False quando o valor antigo
+    nao estava carregado (objeto expirado antes da alteracao).
+    """
+    history = state.attrs[attr].history
+    if not history.has_changes():
+        return state.attrs[attr].value, True
+    if history.deleted:
+        return history.deleted[0], True
+    return None, False
+
+
+def _collect_flush_deltas(session: Session) -> Tuple[Dict[CounterKey, int], Set[int]]:
+    """Calcula os deltas de contadores a partir dos objetos do flush."""
+    deltas: Dict[CounterKey, int] = defaultdict(int)
+    needs_reconcile: Set[int] = set()
+
+    deleted_sessions = {
+        obj.id for obj in session.deleted if isinstance(obj, InventorySession)
+    }
+
+    for obj in session.new:
+        if isinstance(obj, InventoryReadAsset):
+            for dimension, value in reading_counter_keys(obj.category, obj.read_method, obj.physical_condition):
+                deltas[(obj.session_id, dimension, value)] += 1
+        elif isinstance(obj, InventoryExpectedAsset):
+            deltas[(obj.session_id, CounterDimension.EXPECTED.value, EXPECTED_TOTAL)] += 1
+
+    for obj in session.deleted:
+        if obj.__class__ not in (InventoryReadAsset, InventoryExpectedAsset):
+            continue
+        if obj.session_id in deleted_sessions:
+            continue  # Contadores removidos via ON DELETE CASCADE
+        if isinstance(obj, InventoryReadAsset):
+            for dimension, value in reading_counter_keys(obj.category, obj.read_method, obj.physical_condition):
+                deltas[(obj.session_id, dimension, value)] -= 1
+        else:
+            deltas[(obj.session_id, CounterDimension.EXPECTED.value, EXPECTED_TOTAL)] -= 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, InventoryReadAsset):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[attr].history.has_changes() for attr in TRACKED_READING_ATTRS):
+            continue
+
+        old_values = []
+        for attr in TRACKED_READING_ATTRS:
+            value, known = _previous_value(state, attr)
+            if not known:
+                break
+            old_values.append(value)
+        else:
+            for dimension, value in reading_counter_keys(*old_values):
+                deltas[(obj.session_id, dimension, value)] -= 1
+            for dimension, value in reading_counter_keys(obj.category, obj.read_method, obj.physical_condition):
+                deltas[(obj.session_id, dimension, value)] += 1
+            continue
+
+        needs_reconcile.add(obj.session_id)
+
+    return deltas, needs_reconcile
+
+
+def _upsert_counters(connection, deltas: Dict[CounterKey, int]) -> None:
+    """Aplica deltas com INSERT ... ON CONFLICT DO UPDATE (count = count + delta)."""
+    # Ordenar as linhas evita deadlocks entre coletores gravando na mesma sessao
+    rows = [
+        {"session_id": key[0], "dimension": key[1], "value": key[2], "count": delta}
+        for key, delta in sorted(deltas.items())
+        if delta and key[0] is not None
+    ]
+    if not rows:
+        return
+
+    table = InventorySessionCounter.__table__
+    stmt = pg_insert(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        constraint="pk_inventory_session_counters",
+        set_={
+            "count": table.c.count + stmt.excluded.count,
+            "updated_at": func.now()
+        }
+    )
+    connection.execute(stmt)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history faz o ORM carregar o valor antigo antes da alteracao, mesmo
+# com o objeto expirado (ex: apos commit), para que o delta seja exato
+for _attr in TRACKED_READING_ATTRS:
+    event.listen(
+        getattr(InventoryReadAsset, _attr), "set", _load_previous_value,
+        active_history=True, retval=True
+    )
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_session_counters(session: Session, flush_context) -> None:
+    """Mantem os contadores na mesma transacao do flush das leituras."""
+    deltas, needs_reconcile = _collect_flush_deltas(session)
+    if deltas:
+        _upsert_counters(session.connection(), deltas)
+    for session_id in needs_reconcile:
+        _rewrite_counters(session.connection(), session_id, compute_session_counts(session, session_id))
+
+
+def apply_counter_deltas(db: Session, deltas: Dict[CounterKey, int]) -> None:
+    """
+    Aplica deltas manualmente.
+    Usado por operacoes em massa que nao disparam eventos do ORM.
+    """
+    _upsert_counters(db.connection(), deltas)
+
+
+# ===== Consulta =====
+
+def get_session_counters(db: Session, session_ids: Iterable[int]) -> Dict[int, Dict[Tuple[str, str], int]]:
+    """Le os contadores de uma ou mais sessoes em uma unica consulta."""
+    session_ids = list(session_ids)
+    counters: Dict[int, Dict[Tuple[str, str], int]] = {sid: {} for sid in session_ids}
+    if not session_ids:
+        return counters
+
+    rows = db.query(
+        InventorySessionCounter.session_id,
+        InventorySessionCounter.dimension,
+        InventorySessionCounter.value,
+        InventorySessionCounter.count
+    ).filter(InventorySessionCounter.session_id.in_(session_ids)).all()
+
+    for session_id, dimension, value, count in rows:
+        counters[session_id][(dimension, value)] = count
+    return counters
+
+
+def build_statistics(counters: Dict[Tuple[str, str], int], detailed: bool = False) -> dict:
+    """Monta o dicionario de estatisticas a partir dos contadores de uma sessao."""
+    category = CounterDimension.CATEGORY.value
+    stats = {
+        "total_expected": max(0, counters.get((CounterDimension.EXPECTED.value, EXPECTED_TOTAL), 0)),
+        "total_found": max(0, counters.get((category, AssetCategory.FOUND.value), 0)),
+        "total_not_found": max(0, counters.get((category, AssetCategory.NOT_FOUND.value), 0)),
+        "total_unregistered": max(0, counters.get((category, AssetCategory.UNREGISTERED.value), 0)),
+        "total_written_off": max(0, counters.get((category, AssetCategory.WRITTEN_OFF.value), 0)),
+        "completion_percentage": 0.0
+    }
+
+    if stats["total_expected"] > 0:
+        verified = stats["total_found"] + stats["total_not_found"] + stats["total_written_off"]
+        stats["completion_percentage"] = round((verified / stats["total_expected"]) * 100, 2)
+
+    if detailed:
+        stats["by_method"] = {
+            value: count for (dimension, value), count in counters.items()
+            if dimension == CounterDimension.METHOD.value and count > 0
+        }
+        stats["by_condition"] = {
+            value: count for (dimension, value), count in counters.items()
+            if dimension == CounterDimension.CONDITION.value and count > 0
+        }
+
+    return stats
+
+
+def calculate_session_statistics(db: Session, session_id: int, detailed: bool = False) -> dict:
+    """Calcula estatisticas da sessao a partir dos contadores materializados."""
+    counters = get_session_counters(db, [session_id])[session_id]
+    return build_statistics(counters, detailed=detailed)
+
+
+def calculate_statistics_for_sessions(db: Session, session_ids: Iterable[int]) -> Dict[int, dict]:
+    """Estatisticas de varias sessoes (listagens) com uma unica consulta."""
+    return {
+        session_id: build_statistics(counters)
+        for session_id, counters in get_session_counters(db, session_ids).items()
+    }
+
+
+# ===== Reconciliacao =====
+
+def compute_session_counts(db: Session, session_id: int) -> Dict[Tuple[str, str], int]:
+    """Recalcula os contadores de uma sessao diretamente das tabelas de origem."""
+    counts: Dict[Tuple[str, str], int] = {}
+
+    total_expected = db.query(func.count(InventoryExpectedAsset.id)).filter(
+        InventoryExpectedAsset.session_id == session_id
+    ).scalar() or 0
+    if total_expected:
+        counts[(CounterDimension.EXPECTED.value, EXPECTED_TOTAL)] = total_expected
+
+    # Categoria/metodo ausentes contam como o default (ver reading_counter_keys);
+    # situacao fisica ausente nao gera contador
+    for dimension, column in (
+        (CounterDimension.CATEGORY.value, func.coalesce(InventoryReadAsset.category, DEFAULT_CATEGORY)),
+        (CounterDimension.METHOD.value, func.coalesce(InventoryReadAsset.read_method, DEFAULT_READ_METHOD)),
+        (CounterDimension.CONDITION.value, InventoryReadAsset.physical_condition),
+    ):
+        rows = db.query(column, func.count(InventoryReadAsset.id)).filter(
+            InventoryReadAsset.session_id == session_id,
+            column.isnot(None)
+        ).group_by(column).all()
+        for value, count in rows:
+            counts[(dimension, value)] = count
+
+    return counts
+
+
+def _rewrite_counters(connection, session_id: int, counts: Dict[Tuple[str, str], int]) -> None:
+    """Substitui todos os contadores de uma sessao pelos valores informados."""
+    table = InventorySessionCounter.__table__
+    connection.execute(table.delete().where(table.c.session_id == session_id))
+    if counts:
+        connection.execute(table.insert(), [
+            {"session_id": session_id, "dimension": dimension, "value": value, "count": count}
+            for (dimension, value), count in sorted(counts.items())
+        ])
+
+
+def reconcile_session_counters(db: Session, session_id: int) -> Dict[str, dict]:
+    """
+    Compara os contadores materializados com a contagem real e corrige divergencias.
+    Retorna as divergencias encontradas ({"dimensao:valor": {"stored": x, "actual": y}}).
+    Nao faz commit - o chamador controla a transacao.
+    """
+    # Bloquear os contadores existentes faz com que incrementos concorrentes
+    # aguardem a reescrita (e sejam aplicados depois dela) em vez de se perderem
+    stored_rows = db.query(InventorySessionCounter).filter(
+        InventorySessionCounter.session_id == session_id
+    ).with_for_update().all()
+    stored = {(row.dimension, row.value): row.count for row in stored_rows}
+
+    actual = compute_session_counts(db, session_id)
+
+    drift = {}
+    for key in set(stored) | set(actual):
+        if stored.get(key, 0) != actual.get(key, 0):
+            drift[f"{key[0]}:{key[1]}"] = {"stored": stored.get(key, 0), "actual": actual.get(key, 0)}
+
+    if drift:
+        logger.warning(f"Divergencia nos contadores da sessao {session_id}: {drift}")
+        # Evitar que objetos carregados acima sobrescrevam a reescrita
+        for row in stored_rows:
+            db.expunge(row)
+        _rewrite_counters(db.connection(), session_id, actual)
+
+    return drift
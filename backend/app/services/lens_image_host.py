@@ -0,0 +1,254 @@
+"""
+URL pública da imagem para o Google Lens (SerpAPI só aceita imagens por URL).
+
+Antes, cada busca codificava a imagem em base64 e a enviava ao imgbb, uma ida e
+volta externa a cada busca. O provedor agora é configurável (LENS_IMAGE_HOST):
+- local: a imagem é gravada em STORAGE_PATH/lens_temp/<sha256>.<ext> e servida
+  pelo próprio backend (GET /api/quotes/lens/image/{filename}) com URL assinada
+  (HMAC com SECRET_KEY) que expira em LENS_IMAGE_URL_TTL_SECONDS
+- s3: bucket S3-compatível (ex: MinIO local) com URL pré-assinada; requer boto3.
+  Os objetos ficam em lens/ e purge_lens_images remove os mais antigos que o
+  prazo da URL (dispensa regra de lifecycle no bucket)
+- imgbb: comportamento anterior (chave na integração IMGBB ou IMGBB_API_KEY)
+- auto (padrão): local se BACKEND_PUBLIC_URL estiver configurada, senão imgbb
+
+As URLs ficam em cache pela sha256 da imagem (e provedor) até pouco antes de
+expirarem: repetir a busca com a mesma foto não reenvia nada.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.security import decrypt_value
+from app.services.evidence_store import write_blob
+from app.services.image_preprocessing import EXTENSIONS, detect_media_type
+
+logger = logging.getLogger(__name__)
+
+# Margem para a URL em cache não expirar durante a busca na SerpAPI
+URL_CACHE_MARGIN_SECONDS = 60
+
+_url_cache = TTLCache(
+    maxsize=256,
+    ttl=max(settings.LENS_IMAGE_URL_TTL_SECONDS - URL_CACHE_MARGIN_SECONDS, 1)
+)
+
+
+def lens_temp_root() -> str:
+    return os.path.join(settings.STORAGE_PATH, "lens_temp")
+
+
+def sign_lens_image(filename: str, expires: int) -> str:
+    message = f"{filename}:{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_lens_image_signature(filename: str, expires: Optional[int], signature: Optional[str]) -> bool:
+    """Assinatura válida e ainda não expirada (ver LocalImageHost)"""
+    if not expires or not signature or expires < time.time():
+        return False
+    return hmac.compare_digest(sign_lens_image(filename, expires), signature)
+
+
+class ImageHost(ABC):
+    """Provedor de URL pública para imagens das buscas no Google Lens"""
+    name = "base"
+
+    @abstractmethod
+    async def upload(self, image_data: bytes, sha256: str, extension: str) -> Optional[str]:
+        """Publica a imagem e retorna a URL (None se falhar)"""
+
+
+class LocalImageHost(ImageHost):
+    """Servida pelo próprio backend, com URL assinada de curta duração"""
+    name = "local"
+
+    def __init__(self, public_url: str):
+        self.public_url = public_url.rstrip("/")
+
+    @staticmethod
+    def _store(path: str, image_data: bytes) -> None:
+        write_blob(path, image_data)
+        os.utime(path)  # Imagem repetida: renova o prazo antes do purge_lens_images
+
+    async def upload(self, image_data: bytes, sha256: str, extension: str) -> Optional[str]:
+        filename = f"{sha256}{extension}"
+        await asyncio.to_thread(self._store, os.path.join(lens_temp_root(), filename), image_data)
+        expires = int(time.time()) + settings.LENS_IMAGE_URL_TTL_SECONDS
+        return (
+            f"{self.public_url}/api/quotes/lens/image/{filename}"
+            f"?expires={expires}&signature={sign_lens_image(filename, expires)}"
+        )
+
+
+class S3ImageHost(ImageHost):
+    """Bucket S3-compatível (MinIO em desenvolvimento) com URL pré-assinada"""
+    name = "s3"
+    prefix = "lens/"
+
+    def __init__(self):
+        try:
+            import boto3
+        except ImportError:
+            logger.error("boto3 not installed. Install with: pip install boto3")
+            raise
+        self.bucket = settings.LENS_S3_BUCKET
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=settings.LENS_S3_ENDPOINT_URL,
+            aws_access_key_id=settings.LENS_S3_ACCESS_KEY,
+            aws_secret_access_key=settings.LENS_S3_SECRET_KEY,
+            region_name=settings.LENS_S3_REGION,
+        )
+
+    def _upload(self, image_data: bytes, key: str, media_type: str) -> str:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=image_data, ContentType=media_type)
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=settings.LENS_IMAGE_URL_TTL_SECONDS,
+        )
+
+    async def upload(self, image_data: bytes, sha256: str, extension: str) -> Optional[str]:
+        media_type = next((mt for mt, ext in EXTENSIONS.items() if ext == extension), "image/jpeg")
+        try:
+            return await asyncio.to_thread(self._upload, image_data, f"{self.prefix}{sha256}{extension}", media_type)
+        except Exception as e:
+            logger.error(f"Error uploading to S3 bucket {self.bucket}: {e}")
+            return None
+
+    def purge_expired(self, cutoff: float) -> int:
+        """Remove de lens/ os objetos gravados antes de cutoff (epoch); o reenvio renova LastModified"""
+        expired = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=self.prefix):
+            expired.extend(
+                {"Key": obj["Key"]} for obj in page.get("Contents", [])
+                if obj["LastModified"].timestamp() < cutoff
+            )
+        # delete_objects aceita até 1000 chaves por chamada
+        for start in range(0, len(expired), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={"Objects": expired[start:start + 1000], "Quiet": True})
+        return len(expired)
+
+
+class ImgbbImageHost(ImageHost):
+    """Hospedagem externa (imgbb.com), comportamento anterior"""
+    name = "imgbb"
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    async def upload(self, image_data: bytes, sha256: str, extension: str) -> Optional[str]:
+        from app.services.google_lens_service import upload_image_to_imgbb
+
+        return await upload_image_to_imgbb(
+            image_data, self.api_key, expiration=settings.LENS_IMAGE_URL_TTL_SECONDS
+        )
+
+
+def imgbb_api_key(integration=None) -> Optional[str]:
+    """
+    Chave do imgbb: a da integração IMGBB (IntegrationSetting, criptografada)
+    ou, sem ela, IMGBB_API_KEY do ambiente
+    """
+    stored = (integration.settings_json or {}).get("api_key") if integration else None
+    key = None
+    if stored:
+        try:
+            key = decrypt_value(stored)
+        except Exception:
+            key = stored  # Gravada sem criptografia
+    return key or os.environ.get("IMGBB_API_KEY")
+
+
+async def load_imgbb_api_key(db: Optional[AsyncSession] = None) -> Optional[str]:
+    """imgbb_api_key lendo a integração IMGBB do banco (sessão própria se db não for informada)"""
+    from app.core.database import AsyncSessionLocal
+    from app.models.integration_setting import IntegrationSetting
+
+    query = select(IntegrationSetting).where(IntegrationSetting.provider == "IMGBB")
+    try:
+        if db is not None:
+            integration = (await db.execute(query)).scalars().first()
+        else:
+            async with AsyncSessionLocal() as session:
+                integration = (await session.execute(query)).scalars().first()
+    except Exception as e:
+        logger.warning(f"[LENS] Integração IMGBB não pôde ser lida ({e}); usando IMGBB_API_KEY")
+        integration = None
+    return imgbb_api_key(integration)
+
+
+def get_image_host(imgbb_key: Optional[str] = None) -> Optional[ImageHost]:
+    """
+    Provedor conforme LENS_IMAGE_HOST. Retorna None quando o provedor escolhido
+    não está configurado (BACKEND_PUBLIC_URL para local, boto3 para s3, chave
+    para imgbb).
+    """
+    host = settings.LENS_IMAGE_HOST.lower()
+    if host == "auto":
+        host = "local" if settings.BACKEND_PUBLIC_URL else "imgbb"
+
+    if host == "local":
+        return LocalImageHost(settings.BACKEND_PUBLIC_URL) if settings.BACKEND_PUBLIC_URL else None
+    if host == "s3":
+        try:
+            return S3ImageHost()
+        except ImportError:
+            return None
+    return ImgbbImageHost(imgbb_key) if imgbb_key else None
+
+
+async def public_image_url(image_data: bytes, host: ImageHost) -> Optional[str]:
+    """URL pública da imagem, reaproveitando o envio anterior da mesma imagem"""
+    sha256 = hashlib.sha256(image_data).hexdigest()
+    key = (host.name, sha256)
+    if key in _url_cache:
+        logger.info(f"[LENS] URL em cache para {sha256[:12]} ({host.name})")
+        return _url_cache[key]
+
+    extension = EXTENSIONS.get(detect_media_type(image_data) or "image/jpeg", ".jpg")
+    url = await host.upload(image_data, sha256, extension)
+    if url:
+        _url_cache[key] = url
+        logger.info(f"[LENS] Imagem {sha256[:12]} publicada via {host.name}")
+    return url
+
+
+def purge_lens_images() -> int:
+    """
+    Remove as imagens cujas URLs já expiraram: de lens_temp e, com
+    LENS_IMAGE_HOST=s3, do prefixo lens/ do bucket
+    """
+    cutoff = time.time() - settings.LENS_IMAGE_URL_TTL_SECONDS
+    removed = 0
+    if os.path.isdir(lens_temp_root()):
+        for entry in os.scandir(lens_temp_root()):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+
+    if settings.LENS_IMAGE_HOST.lower() == "s3":
+        try:
+            removed += S3ImageHost().purge_expired(cutoff)
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.error(f"[LENS] Erro ao remover imagens expiradas do bucket {settings.LENS_S3_BUCKET}: {e}")
+
+    if removed:
+        logger.info(f"[LENS] {removed} imagens temporárias removidas")
+    return removed
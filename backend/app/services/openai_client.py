@@ -1,10 +1,11 @@
 import openai
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from pydantic import BaseModel
 import base64
 import json
 import logging
 import time
+from app.services.image_preprocessing import PreparedImage, prepare_image
 from app.services.prompts import (
     PROMPT_ANALISE_PATRIMONIAL,
     PROMPT_OCR_IMAGEM,
@@ -103,12 +104,15 @@ class OpenAIClient:
     async def analyze_item(
         self,
         input_text: Optional[str] = None,
-        image_files: Optional[List[bytes]] = None
+        image_files: Optional[List[Union[PreparedImage, bytes]]] = None
     ) -> ItemAnalysisResult:
         """
         Analisa item em duas etapas (igual ao Claude):
         1. OCR e identificação básica da imagem
         2. Geração de query otimizada para busca
+
+        image_files: imagens já preparadas (image_preprocessing.prepare_input_image);
+        bytes crus são preparados aqui, sem cache.
         """
         # Se só tiver texto (sem imagem), usar fluxo simplificado
         if input_text and not image_files:
@@ -123,12 +127,14 @@ class OpenAIClient:
             })
 
         if image_files:
-            for img_data in image_files:
-                img_base64 = base64.standard_b64encode(img_data).decode("utf-8")
+            for image in image_files:
+                if isinstance(image, bytes):
+                    image = prepare_image(image, provider="openai")
+                img_base64 = base64.standard_b64encode(image.data).decode("utf-8")
                 content.append({
                     "type": "image_url",
                     "image_url": {
-                        "url": f"data:image/jpeg;base64,{img_base64}",
+                        "url": f"data:{image.media_type};base64,{img_base64}",
                         "detail": "high"
                     }
                 })
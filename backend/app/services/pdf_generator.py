@@ -1,61 +1,50 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import mm
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
 from typing import List, Dict, Optional
 from datetime import datetime
-import locale
 from decimal import Decimal
-import os
+import logging
+
+from app.services.pdf_templates import (
+    ASSETS_DIR,
+    FONTS_DIR,
+    LOGO_HEADER_STYLE,
+    LOGO_PATH,
+    QUOTE_PAGE_HEADER_NO_LOGO_STYLE,
+    QUOTE_PAGE_HEADER_STYLE,
+    SOURCE_TABLE_STYLE,
+    SUMMARY_TABLE_COMMANDS,
+    RenderProfile,
+    logo_image,
+    pdf_fonts,
+    quote_styles,
+    setup_locale,
+)
+from app.services.screenshot_pipeline import pdf_screenshot
+
+logger = logging.getLogger(__name__)
 
 
 class PDFGenerator:
+    """
+    Relatório de cotação de preços. Fontes, estilos e logo vêm de
+    services/pdf_templates.py, montados uma vez por processo: instanciar o
+    gerador é barato e a mesma instância pode gerar vários PDFs.
+    """
     # Caminho para os assets
-    FONTS_DIR = os.path.join(os.path.dirname(__file__), "fonts")
-    ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
-    LOGO_PATH = os.path.join(os.path.dirname(__file__), "assets", "Union lk.png")
+    FONTS_DIR = FONTS_DIR
+    ASSETS_DIR = ASSETS_DIR
+    LOGO_PATH = LOGO_PATH
 
     # Larguras das colunas (primeira coluna menor para o logo)
     FIRST_COL_WIDTH = 55 * mm
     SECOND_COL_WIDTH = 125 * mm
 
     def __init__(self):
-        try:
-            locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
-        except:
-            try:
-                locale.setlocale(locale.LC_TIME, 'Portuguese_Brazil.1252')
-            except:
-                pass
-
-        # Registrar fontes Poppins
-        self._register_fonts()
-
-    def _register_fonts(self):
-        """Registra as fontes Poppins no ReportLab"""
-        try:
-            poppins_regular = os.path.join(self.FONTS_DIR, "Poppins-Regular.ttf")
-            poppins_bold = os.path.join(self.FONTS_DIR, "Poppins-Bold.ttf")
-
-            if os.path.exists(poppins_regular):
-                pdfmetrics.registerFont(TTFont('Poppins', poppins_regular))
-            if os.path.exists(poppins_bold):
-                pdfmetrics.registerFont(TTFont('Poppins-Bold', poppins_bold))
-        except Exception as e:
-            print(f"Warning: Could not register Poppins fonts: {e}")
-
-    def _get_font_name(self, bold: bool = False) -> str:
-        """Retorna o nome da fonte (Poppins se disponível, senão Helvetica)"""
-        try:
-            if bold:
-                return 'Poppins-Bold' if pdfmetrics.getFont('Poppins-Bold') else 'Helvetica-Bold'
-            return 'Poppins' if pdfmetrics.getFont('Poppins') else 'Helvetica'
-        except:
-            return 'Helvetica-Bold' if bold else 'Helvetica'
+        setup_locale()
+        self.fonts = pdf_fonts()
 
     def generate_filename(
         self,
@@ -96,7 +85,11 @@ class PDFGenerator:
         # Novo parâmetro para identificar tipo de busca
         input_type: str = "TEXT",  # TEXT ou IMAGE
         quote_id: Optional[int] = None,
+        profile: Optional[RenderProfile] = None,
     ):
+        """`profile` recebe o tempo de cada seção da geração (ver RenderProfile)"""
+        profile = profile if profile is not None else RenderProfile()
+
         doc = SimpleDocTemplate(
             output_path,
             pagesize=A4,
@@ -107,78 +100,10 @@ class PDFGenerator:
         )
 
         story = []
-        styles = getSampleStyleSheet()
-
-        font_regular = self._get_font_name(bold=False)
-        font_bold = self._get_font_name(bold=True)
-
-        # Estilos personalizados com Poppins
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=14,
-            textColor=colors.HexColor('#000000'),
-            spaceAfter=0,
-            alignment=TA_LEFT,
-            fontName=font_bold
-        )
-
-        section_title_style = ParagraphStyle(
-            'SectionTitle',
-            parent=styles['Normal'],
-            fontSize=11,
-            fontName=font_bold,
-            spaceAfter=4,
-        )
-
-        # Estilo para células de tabela com quebra de linha
-        cell_style = ParagraphStyle(
-            'CellStyle',
-            parent=styles['Normal'],
-            fontSize=9,
-            fontName=font_regular,
-            leading=11,  # Espaçamento entre linhas
-        )
-
-        cell_style_bold = ParagraphStyle(
-            'CellStyleBold',
-            parent=styles['Normal'],
-            fontSize=9,
-            fontName=font_bold,
-            leading=11,
-        )
-
-        header_style = ParagraphStyle(
-            'Header',
-            parent=styles['Normal'],
-            fontSize=10,
-            fontName=font_bold,
-        )
-
-        link_title_style = ParagraphStyle(
-            'LinkTitle',
-            parent=styles['Normal'],
-            fontSize=9,
-            fontName=font_bold,
-        )
-
-        link_style = ParagraphStyle(
-            'Link',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.blue,
-            wordWrap='CJK',
-            fontName=font_regular,
-        )
-
-        # Estilo para número da cotação no canto direito
-        quote_number_style = ParagraphStyle(
-            'QuoteNumber',
-            parent=styles['Normal'],
-            fontSize=10,
-            fontName=font_bold,
-            alignment=TA_RIGHT,
-        )
+        with profile.section("estilos"):
+            styles = quote_styles()
+        cell_style = styles.cell
+        cell_style_bold = styles.cell_bold
 
         # Determinar se variação está OK ou não
         variacao_ok = True
@@ -188,147 +113,140 @@ class PDFGenerator:
         total_sources = len(sources)
 
         # ========== PÁGINA 1: RESUMO ==========
-        story.extend(self._build_header(title_style, font_bold, font_regular))
-
-        # Seção "Resumo de cotações"
-        story.append(Spacer(1, 6*mm))
-        story.append(Paragraph("Resumo de cotações", section_title_style))
-        story.append(Spacer(1, 3*mm))
-
-        # Tabela de resumo - usar Paragraph para permitir quebra de linha
-        if is_vehicle and fipe_data:
-            # Layout específico para veículos FIPE
-            header_data = [
-                [Paragraph('Código (Material):', cell_style_bold), Paragraph(codigo or 'N/A', cell_style)],
-                [Paragraph('Item:', cell_style_bold), Paragraph(item_name, cell_style)],
-                [Paragraph('Data da Pesquisa:', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
-                [Paragraph('Pesquisador:', cell_style_bold), Paragraph(pesquisador or 'N/A', cell_style)],
-                [Paragraph('Local da Pesquisa:', cell_style_bold), Paragraph(local or 'N/A', cell_style)],
-                [Paragraph('Código FIPE:', cell_style_bold), Paragraph(fipe_data.get('codigo_fipe', 'N/A'), cell_style)],
-                [Paragraph('Marca:', cell_style_bold), Paragraph(fipe_data.get('marca', 'N/A'), cell_style)],
-                [Paragraph('Modelo:', cell_style_bold), Paragraph(fipe_data.get('modelo', 'N/A'), cell_style)],
-                [Paragraph('Ano/Combustível:', cell_style_bold), Paragraph(fipe_data.get('ano_combustivel', 'N/A'), cell_style)],
-                [Paragraph('Valor FIPE:', cell_style_bold), Paragraph(self._format_currency(valor_medio), cell_style)],
-            ]
-        else:
-            # Layout padrão para outros itens
-            header_data = [
-                [Paragraph('Código (Material):', cell_style_bold), Paragraph(codigo or 'N/A', cell_style)],
-                [Paragraph('Item:', cell_style_bold), Paragraph(item_name, cell_style)],
-                [Paragraph('Data da Pesquisa:', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
-                [Paragraph('Pesquisador:', cell_style_bold), Paragraph(pesquisador or 'N/A', cell_style)],
-                [Paragraph('Local da Pesquisa:', cell_style_bold), Paragraph(local or 'N/A', cell_style)],
-                [Paragraph('Valor da Média:', cell_style_bold), Paragraph(self._format_currency(valor_medio), cell_style)],
-            ]
-
-            # Adicionar variação se disponível (apenas para não-veículos)
-            if variacao_percentual is not None:
-                variacao_str = f"{float(variacao_percentual):.2f}%".replace('.', ',')
-                header_data.append([Paragraph('Variação Calculada:', cell_style_bold), Paragraph(variacao_str, cell_style)])
-
-            if variacao_maxima_percent is not None:
-                header_data.append([Paragraph('Variação Máx. Configurada:', cell_style_bold), Paragraph(f"{variacao_maxima_percent:.1f}%".replace('.', ','), cell_style)])
-
-        header_table = Table(header_data, colWidths=[self.FIRST_COL_WIDTH, self.SECOND_COL_WIDTH])
-
-        # Estilo da tabela de cabeçalho
-        header_table_style = [
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8E8E8')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # TOP para alinhar texto no topo quando há quebra
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]
+        with profile.section("resumo"):
+            story.extend(self._build_header(styles))
 
-        # Colorir linha de variação calculada (apenas para não-veículos)
-        if not is_vehicle and variacao_percentual is not None:
-            variacao_row = len(header_data) - 2 if variacao_maxima_percent else len(header_data) - 1
-            if variacao_ok:
-                header_table_style.append(('BACKGROUND', (1, variacao_row), (1, variacao_row), colors.HexColor('#90EE90')))  # Verde
+            # Seção "Resumo de cotações"
+            story.append(Spacer(1, 6*mm))
+            story.append(Paragraph("Resumo de cotações", styles.section_title))
+            story.append(Spacer(1, 3*mm))
+
+            # Tabela de resumo - usar Paragraph para permitir quebra de linha
+            if is_vehicle and fipe_data:
+                # Layout específico para veículos FIPE
+                header_data = [
+                    [Paragraph('Código (Material):', cell_style_bold), Paragraph(codigo or 'N/A', cell_style)],
+                    [Paragraph('Item:', cell_style_bold), Paragraph(item_name, cell_style)],
+                    [Paragraph('Data da Pesquisa:', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
+                    [Paragraph('Pesquisador:', cell_style_bold), Paragraph(pesquisador or 'N/A', cell_style)],
+                    [Paragraph('Local da Pesquisa:', cell_style_bold), Paragraph(local or 'N/A', cell_style)],
+                    [Paragraph('Código FIPE:', cell_style_bold), Paragraph(fipe_data.get('codigo_fipe', 'N/A'), cell_style)],
+                    [Paragraph('Marca:', cell_style_bold), Paragraph(fipe_data.get('marca', 'N/A'), cell_style)],
+                    [Paragraph('Modelo:', cell_style_bold), Paragraph(fipe_data.get('modelo', 'N/A'), cell_style)],
+                    [Paragraph('Ano/Combustível:', cell_style_bold), Paragraph(fipe_data.get('ano_combustivel', 'N/A'), cell_style)],
+                    [Paragraph('Valor FIPE:', cell_style_bold), Paragraph(self._format_currency(valor_medio), cell_style)],
+                ]
             else:
-                header_table_style.append(('BACKGROUND', (1, variacao_row), (1, variacao_row), colors.HexColor('#FF6B6B')))  # Vermelho
+                # Layout padrão para outros itens
+                header_data = [
+                    [Paragraph('Código (Material):', cell_style_bold), Paragraph(codigo or 'N/A', cell_style)],
+                    [Paragraph('Item:', cell_style_bold), Paragraph(item_name, cell_style)],
+                    [Paragraph('Data da Pesquisa:', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
+                    [Paragraph('Pesquisador:', cell_style_bold), Paragraph(pesquisador or 'N/A', cell_style)],
+                    [Paragraph('Local da Pesquisa:', cell_style_bold), Paragraph(local or 'N/A', cell_style)],
+                    [Paragraph('Valor da Média:', cell_style_bold), Paragraph(self._format_currency(valor_medio), cell_style)],
+                ]
+
+                # Adicionar variação se disponível (apenas para não-veículos)
+                if variacao_percentual is not None:
+                    variacao_str = f"{float(variacao_percentual):.2f}%".replace('.', ',')
+                    header_data.append([Paragraph('Variação Calculada:', cell_style_bold), Paragraph(variacao_str, cell_style)])
+
+                if variacao_maxima_percent is not None:
+                    header_data.append([Paragraph('Variação Máx. Configurada:', cell_style_bold), Paragraph(f"{variacao_maxima_percent:.1f}%".replace('.', ','), cell_style)])
+
+            header_table = Table(header_data, colWidths=[self.FIRST_COL_WIDTH, self.SECOND_COL_WIDTH])
+
+            # Estilo da tabela de cabeçalho
+            header_table_style = list(SUMMARY_TABLE_COMMANDS)
+
+            # Colorir linha de variação calculada (apenas para não-veículos)
+            if not is_vehicle and variacao_percentual is not None:
+                variacao_row = len(header_data) - 2 if variacao_maxima_percent else len(header_data) - 1
+                if variacao_ok:
+                    header_table_style.append(('BACKGROUND', (1, variacao_row), (1, variacao_row), colors.HexColor('#90EE90')))  # Verde
+                else:
+                    header_table_style.append(('BACKGROUND', (1, variacao_row), (1, variacao_row), colors.HexColor('#FF6B6B')))  # Vermelho
+
+            # Para veículos, destacar linha do Valor FIPE em verde
+            if is_vehicle:
+                valor_fipe_row = len(header_data) - 1  # Última linha é Valor FIPE
+                header_table_style.append(('BACKGROUND', (1, valor_fipe_row), (1, valor_fipe_row), colors.HexColor('#90EE90')))
+
+            header_table.setStyle(TableStyle(header_table_style))
+            story.append(header_table)
 
-        # Para veículos, destacar linha do Valor FIPE em verde
-        if is_vehicle:
-            valor_fipe_row = len(header_data) - 1  # Última linha é Valor FIPE
-            header_table_style.append(('BACKGROUND', (1, valor_fipe_row), (1, valor_fipe_row), colors.HexColor('#90EE90')))
+        # ========== PÁGINAS DE COTAÇÕES INDIVIDUAIS (uma por página) ==========
+        with profile.section("cotacoes"):
+            for idx, source in enumerate(sources):
+                story.append(PageBreak())
+                story.extend(self._build_source_page(styles, source, item_name, data_pesquisa, idx + 1, total_sources))
 
-        header_table.setStyle(TableStyle(header_table_style))
-        story.append(header_table)
+        profile.build(doc, story)
+        logger.debug(f"PDF {output_path}: {profile.as_log()}")
 
-        # ========== PÁGINAS DE COTAÇÕES INDIVIDUAIS (uma por página) ==========
-        for idx, source in enumerate(sources):
-            story.append(PageBreak())
-
-            # Cabeçalho da página de cotação
-            story.extend(self._build_quote_page_header(
-                title_style,
-                quote_number_style,
-                font_bold,
-                font_regular,
-                idx + 1,
-                total_sources
-            ))
+    def _build_source_page(
+        self,
+        styles,
+        source: Dict,
+        item_name: str,
+        data_pesquisa: datetime,
+        quote_index: int,
+        total_sources: int
+    ) -> List:
+        """Página de uma cotação individual: cabeçalho, dados, link e screenshot"""
+        cell_style = styles.cell
+        cell_style_bold = styles.cell_bold
+        elements = []
 
-            story.append(Spacer(1, 6*mm))
+        # Cabeçalho da página de cotação
+        elements.extend(self._build_quote_page_header(styles, quote_index, total_sources))
 
-            # Tabela com dados da cotação individual - usar Paragraph para quebra de linha
-            cot_data = [
-                [Paragraph('Cotação', cell_style_bold), Paragraph(f"#{idx + 1} de {total_sources}", cell_style)],
-                [Paragraph('Item', cell_style_bold), Paragraph(item_name, cell_style)],
-                [Paragraph('Data da Pesquisa', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
-                [Paragraph('Valor R$', cell_style_bold), Paragraph(self._format_currency(source['price_value']), cell_style)],
-            ]
-
-            cot_table = Table(cot_data, colWidths=[45*mm, 135*mm])
-            cot_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F0F0F0')),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # TOP para alinhar texto no topo quando há quebra
-                ('LEFTPADDING', (0, 0), (-1, -1), 4),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ]))
-
-            story.append(cot_table)
-            story.append(Spacer(1, 4*mm))
-
-            # Link da pesquisa
-            story.append(Paragraph("Link", link_title_style))
-            story.append(Spacer(1, 2*mm))
-            link_text = f'<a href="{source["url"]}">{source["url"]}</a>'
-            link_para = Paragraph(link_text, link_style)
-            story.append(link_para)
-            story.append(Spacer(1, 4*mm))
-
-            # Imagem/Screenshot
-            story.append(Paragraph("Imagem", link_title_style))
-            story.append(Spacer(1, 2*mm))
-
-            if source.get('screenshot_path'):
-                try:
-                    # Largura disponível = A4 (210mm) - margens (15mm + 15mm) = 180mm
-                    # Altura disponível para imagem (restante da página)
-                    content_width = 180*mm
-                    content_height = 150*mm  # Altura máxima da imagem
-                    img_width = content_width * 0.95  # 95% da largura do conteúdo
-                    img = Image(source['screenshot_path'], width=img_width, height=content_height, kind='proportional')
-                    story.append(img)
-                except Exception as e:
-                    story.append(Paragraph(f"[Erro ao carregar imagem: {str(e)}]", styles['Normal']))
-            else:
-                story.append(Paragraph("[Screenshot não disponível]", styles['Normal']))
+        elements.append(Spacer(1, 6*mm))
+
+        # Tabela com dados da cotação individual - usar Paragraph para quebra de linha
+        cot_data = [
+            [Paragraph('Cotação', cell_style_bold), Paragraph(f"#{quote_index} de {total_sources}", cell_style)],
+            [Paragraph('Item', cell_style_bold), Paragraph(item_name, cell_style)],
+            [Paragraph('Data da Pesquisa', cell_style_bold), Paragraph(data_pesquisa.strftime('%d/%m/%Y'), cell_style)],
+            [Paragraph('Valor R$', cell_style_bold), Paragraph(self._format_currency(source['price_value']), cell_style)],
+        ]
+
+        cot_table = Table(cot_data, colWidths=[45*mm, 135*mm])
+        cot_table.setStyle(SOURCE_TABLE_STYLE)
+
+        elements.append(cot_table)
+        elements.append(Spacer(1, 4*mm))
 
-        doc.build(story)
+        # Link da pesquisa
+        elements.append(Paragraph("Link", styles.link_title))
+        elements.append(Spacer(1, 2*mm))
+        link_text = f'<a href="{source["url"]}">{source["url"]}</a>'
+        elements.append(Paragraph(link_text, styles.link))
+        elements.append(Spacer(1, 4*mm))
 
-    def _build_header(self, title_style, font_bold, font_regular) -> List:
+        # Imagem/Screenshot
+        elements.append(Paragraph("Imagem", styles.link_title))
+        elements.append(Spacer(1, 2*mm))
+
+        if source.get('screenshot_path'):
+            try:
+                # Largura disponível = A4 (210mm) - margens (15mm + 15mm) = 180mm
+                # Altura disponível para imagem (restante da página)
+                content_width = 180*mm
+                content_height = 150*mm  # Altura máxima da imagem
+                img_width = content_width * 0.95  # 95% da largura do conteúdo
+                # Variante reduzida para o PDF, com ImageReader em cache entre gerações
+                img = pdf_screenshot(source['screenshot_path'], width=img_width, height=content_height, kind='proportional')
+                elements.append(img)
+            except Exception as e:
+                elements.append(Paragraph(f"[Erro ao carregar imagem: {str(e)}]", styles.normal))
+        else:
+            elements.append(Paragraph("[Screenshot não disponível]", styles.normal))
+
+        return elements
+
+    def _build_header(self, styles) -> List:
         """
         Constrói o cabeçalho da primeira página com logo e título.
         Logo alinhado à esquerda com 90% da largura da primeira coluna.
@@ -337,17 +255,10 @@ class PDFGenerator:
 
         # Calcular tamanho do logo (90% da primeira coluna)
         logo_width = self.FIRST_COL_WIDTH * 0.9
-
-        # Tentar carregar o logo
-        logo_element = None
-        if os.path.exists(self.LOGO_PATH):
-            try:
-                logo_element = Image(self.LOGO_PATH, width=logo_width, height=logo_width * 0.4, kind='proportional')
-            except Exception as e:
-                print(f"Warning: Could not load logo: {e}")
+        logo_element = logo_image(logo_width, logo_width * 0.4)
 
         # Título
-        title = Paragraph("Relatório de Cotação de Preços", title_style)
+        title = Paragraph("Relatório de Cotação de Preços", styles.title)
 
         if logo_element:
             # Criar tabela para alinhar logo à esquerda e título ao lado
@@ -355,15 +266,7 @@ class PDFGenerator:
                 [[logo_element, title]],
                 colWidths=[self.FIRST_COL_WIDTH, self.SECOND_COL_WIDTH]
             )
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-                ('TOPPADDING', (0, 0), (-1, -1), 0),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ]))
+            header_table.setStyle(LOGO_HEADER_STYLE)
             elements.append(header_table)
         else:
             elements.append(title)
@@ -372,10 +275,7 @@ class PDFGenerator:
 
     def _build_quote_page_header(
         self,
-        title_style,
-        quote_number_style,
-        font_bold,
-        font_regular,
+        styles,
         quote_index: int,
         total_quotes: int
     ) -> List:
@@ -387,20 +287,13 @@ class PDFGenerator:
 
         # Calcular tamanho do logo (90% da primeira coluna)
         logo_width = self.FIRST_COL_WIDTH * 0.9
-
-        # Tentar carregar o logo
-        logo_element = None
-        if os.path.exists(self.LOGO_PATH):
-            try:
-                logo_element = Image(self.LOGO_PATH, width=logo_width, height=logo_width * 0.4, kind='proportional')
-            except Exception as e:
-                print(f"Warning: Could not load logo: {e}")
+        logo_element = logo_image(logo_width, logo_width * 0.4)
 
         # Título
-        title = Paragraph("Relatório de Cotação de Preços", title_style)
+        title = Paragraph("Relatório de Cotação de Preços", styles.title)
 
         # Número da cotação
-        quote_number = Paragraph(f"Id {quote_index}/{total_quotes}", quote_number_style)
+        quote_number = Paragraph(f"Id {quote_index}/{total_quotes}", styles.quote_number)
 
         if logo_element:
             # Criar tabela com 3 colunas: logo | título | número
@@ -408,16 +301,7 @@ class PDFGenerator:
                 [[logo_element, title, quote_number]],
                 colWidths=[self.FIRST_COL_WIDTH, 80*mm, 45*mm]
             )
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                ('ALIGN', (1, 0), (1, 0), 'LEFT'),
-                ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-                ('TOPPADDING', (0, 0), (-1, -1), 0),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-            ]))
+            header_table.setStyle(QUOTE_PAGE_HEADER_STYLE)
             elements.append(header_table)
         else:
             # Sem logo, criar tabela com título e número
@@ -425,13 +309,7 @@ class PDFGenerator:
                 [[title, quote_number]],
                 colWidths=[135*mm, 45*mm]
             )
-            header_table.setStyle(TableStyle([
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-                ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ]))
+            header_table.setStyle(QUOTE_PAGE_HEADER_NO_LOGO_STYLE)
             elements.append(header_table)
 
         return elements
@@ -0,0 +1,397 @@
+"""
+Recursos compartilhados dos geradores de PDF (cotação e FIPE).
+
+Montados uma única vez por processo e reaproveitados em todas as gerações
+(um lote gera centenas de PDFs no mesmo worker):
+- locale pt_BR e registro das fontes Poppins (antes: a cada PDFGenerator())
+- ParagraphStyles e TableStyles fixos (antes: getSampleStyleSheet() e uma
+  dúzia de estilos a cada PDF)
+- logo do cabeçalho: ImageReader decodificado uma vez (cache do screenshot_pipeline)
+- imagens sem o filtro ASCII85 (rl_config.useA85 desligado só durante o
+  doc.build dos geradores, ver without_ascii85)
+
+RenderProfile mede o tempo de cada seção da geração (montagem da story e
+doc.build, com o tempo de layout/desenho de cada página). Os geradores
+registram o perfil em DEBUG; scripts/benchmark_pdf_render.py o agrega.
+"""
+import locale
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, TableStyle
+
+from app.services.screenshot_pipeline import CachedImage, cached_image_reader
+
+logger = logging.getLogger(__name__)
+
+FONTS_DIR = os.path.join(os.path.dirname(__file__), "fonts")
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
+LOGO_PATH = os.path.join(ASSETS_DIR, "Union lk.png")
+
+
+# ==================== Locale e fontes ====================
+
+@lru_cache(maxsize=None)
+def setup_locale() -> None:
+    """Datas por extenso em português (%A, %B)"""
+    for name in ('pt_BR.UTF-8', 'Portuguese_Brazil.1252'):
+        try:
+            locale.setlocale(locale.LC_TIME, name)
+            return
+        except locale.Error:
+            continue
+
+
+@dataclass(frozen=True)
+class PdfFonts:
+    regular: str
+    bold: str
+
+
+@lru_cache(maxsize=None)
+def pdf_fonts() -> PdfFonts:
+    """Registra as fontes Poppins no ReportLab (Helvetica se indisponíveis)"""
+    registered = set()
+    for font_name, filename in (('Poppins', 'Poppins-Regular.ttf'), ('Poppins-Bold', 'Poppins-Bold.ttf')):
+        path = os.path.join(FONTS_DIR, filename)
+        if not os.path.exists(path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(font_name, path))
+            registered.add(font_name)
+        except Exception as e:
+            logger.warning(f"Could not register font {font_name}: {e}")
+
+    return PdfFonts(
+        regular='Poppins' if 'Poppins' in registered else 'Helvetica',
+        bold='Poppins-Bold' if 'Poppins-Bold' in registered else 'Helvetica-Bold',
+    )
+
+
+# ==================== Estilos do relatório de cotação ====================
+
+@dataclass(frozen=True)
+class QuoteStyles:
+    normal: ParagraphStyle
+    title: ParagraphStyle
+    section_title: ParagraphStyle
+    cell: ParagraphStyle
+    cell_bold: ParagraphStyle
+    header: ParagraphStyle
+    link_title: ParagraphStyle
+    link: ParagraphStyle
+    quote_number: ParagraphStyle
+
+
+@lru_cache(maxsize=None)
+def quote_styles() -> QuoteStyles:
+    styles = getSampleStyleSheet()
+    fonts = pdf_fonts()
+
+    return QuoteStyles(
+        normal=styles['Normal'],
+        title=ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=14,
+            textColor=colors.HexColor('#000000'),
+            spaceAfter=0,
+            alignment=TA_LEFT,
+            fontName=fonts.bold
+        ),
+        section_title=ParagraphStyle(
+            'SectionTitle',
+            parent=styles['Normal'],
+            fontSize=11,
+            fontName=fonts.bold,
+            spaceAfter=4,
+        ),
+        # Células de tabela com quebra de linha
+        cell=ParagraphStyle(
+            'CellStyle',
+            parent=styles['Normal'],
+            fontSize=9,
+            fontName=fonts.regular,
+            leading=11,  # Espaçamento entre linhas
+        ),
+        cell_bold=ParagraphStyle(
+            'CellStyleBold',
+            parent=styles['Normal'],
+            fontSize=9,
+            fontName=fonts.bold,
+            leading=11,
+        ),
+        header=ParagraphStyle(
+            'Header',
+            parent=styles['Normal'],
+            fontSize=10,
+            fontName=fonts.bold,
+        ),
+        link_title=ParagraphStyle(
+            'LinkTitle',
+            parent=styles['Normal'],
+            fontSize=9,
+            fontName=fonts.bold,
+        ),
+        link=ParagraphStyle(
+            'Link',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.blue,
+            wordWrap='CJK',
+            fontName=fonts.regular,
+        ),
+        # Número da cotação no canto direito
+        quote_number=ParagraphStyle(
+            'QuoteNumber',
+            parent=styles['Normal'],
+            fontSize=10,
+            fontName=fonts.bold,
+            alignment=TA_RIGHT,
+        ),
+    )
+
+
+# Tabela de resumo (página 1); a cor da linha de variação é acrescentada por PDF
+SUMMARY_TABLE_COMMANDS: Tuple[tuple, ...] = (
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8E8E8')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # TOP para alinhar texto no topo quando há quebra
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+)
+
+SOURCE_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F0F0F0')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),  # TOP para alinhar texto no topo quando há quebra
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+])
+
+# Cabeçalhos: logo | título (página 1) e logo | título | número (páginas de cotação)
+LOGO_HEADER_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+])
+
+QUOTE_PAGE_HEADER_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'LEFT'),
+    ('ALIGN', (2, 0), (2, 0), 'RIGHT'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+    ('TOPPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+])
+
+QUOTE_PAGE_HEADER_NO_LOGO_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+
+def logo_image(width: float, height: float) -> Optional[CachedImage]:
+    """Logo do cabeçalho sobre o ImageReader em cache (decodificado uma vez por processo)"""
+    if not os.path.exists(LOGO_PATH):
+        return None
+    try:
+        return CachedImage(cached_image_reader(LOGO_PATH), width=width, height=height, kind='proportional')
+    except Exception as e:
+        logger.warning(f"Could not load logo: {e}")
+        return None
+
+
+# ==================== Estilos do PDF FIPE ====================
+
+@dataclass(frozen=True)
+class FipeStyles:
+    title: ParagraphStyle
+    subtitle: ParagraphStyle
+    section_title: ParagraphStyle
+    price: ParagraphStyle
+    error: ParagraphStyle
+    screenshot_note: ParagraphStyle
+    note: ParagraphStyle
+    footer: ParagraphStyle
+
+
+@lru_cache(maxsize=None)
+def fipe_styles() -> FipeStyles:
+    styles = getSampleStyleSheet()
+
+    return FipeStyles(
+        title=ParagraphStyle(
+            'FipeTitle',
+            parent=styles['Heading1'],
+            fontSize=18,
+            textColor=colors.HexColor('#1a5f7a'),
+            spaceAfter=12,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        subtitle=ParagraphStyle(
+            'FipeSubtitle',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#333333'),
+            spaceAfter=8,
+            alignment=TA_CENTER,
+            fontName='Helvetica'
+        ),
+        section_title=ParagraphStyle(
+            'SectionTitle',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#1a5f7a'),
+            spaceBefore=12,
+            spaceAfter=6,
+            fontName='Helvetica-Bold'
+        ),
+        price=ParagraphStyle(
+            'FipePrice',
+            parent=styles['Normal'],
+            fontSize=24,
+            textColor=colors.HexColor('#2e7d32'),
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceBefore=8,
+            spaceAfter=8
+        ),
+        error=ParagraphStyle(
+            'ErrorStyle',
+            parent=styles['Normal'],
+            fontSize=12,
+            textColor=colors.HexColor('#c62828'),
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold',
+            spaceBefore=10,
+            spaceAfter=10
+        ),
+        screenshot_note=ParagraphStyle(
+            'ScreenshotNote',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#666666'),
+            alignment=TA_CENTER,
+            spaceBefore=4
+        ),
+        note=ParagraphStyle(
+            'NoteStyle',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#ff9800'),
+            alignment=TA_CENTER,
+            spaceBefore=6
+        ),
+        footer=ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#666666'),
+            alignment=TA_CENTER
+        ),
+    )
+
+
+@lru_cache(maxsize=None)
+def fipe_info_table_style(background: str, grid: str, font_size: int = 10, padding: int = 5) -> TableStyle:
+    """Tabelas rótulo/valor do PDF FIPE (veículo, resultado, detalhes da consulta)"""
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor(background)),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor(grid)),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), padding),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+    ])
+
+
+# ==================== Perfil de renderização ====================
+
+@contextmanager
+def without_ascii85():
+    """
+    Streams gravados em binário no PDF durante o bloco: o filtro ASCII85 (padrão
+    do ReportLab) é codificado em Python puro e dominava o doc.build com
+    screenshots (+25% de tamanho). A configuração global é restaurada ao sair,
+    sem afetar outros usos do ReportLab no processo.
+    """
+    previous = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = previous
+
+
+@dataclass
+class RenderProfile:
+    """Tempo (ms) de cada seção da geração de um PDF"""
+    sections: Dict[str, float] = field(default_factory=dict)
+    pages_ms: List[float] = field(default_factory=list)
+
+    @contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def build(self, doc: SimpleDocTemplate, story: list) -> None:
+        """doc.build registrando também o tempo de layout/desenho de cada página"""
+        page_starts: List[float] = []
+
+        def on_page(canvas, doc):
+            page_starts.append(time.perf_counter())
+
+        with self.section("build"), without_ascii85():
+            doc.build(story, onFirstPage=on_page, onLaterPages=on_page)
+        page_ends = page_starts[1:] + [time.perf_counter()]
+        self.pages_ms = [(end - start) * 1000 for start, end in zip(page_starts, page_ends)]
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.sections.values())
+
+    def as_log(self) -> str:
+        parts = [f"{name}={ms:.1f}ms" for name, ms in self.sections.items()]
+        if self.pages_ms:
+            parts.append("páginas=[" + ", ".join(f"{ms:.1f}" for ms in self.pages_ms) + "]ms")
+        return " ".join(parts)
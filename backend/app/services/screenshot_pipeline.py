@@ -0,0 +1,172 @@
+"""
+Pipeline pós-captura dos screenshots de evidência.
+
+O Playwright entrega PNGs de 1366x(900-1800) px, vários MB por cotação. Antes de
+entrarem no armazenamento endereçado por conteúdo (evidence_store):
+- são recomprimidos em SCREENSHOT_FORMAT (webp/jpeg) com SCREENSHOT_QUALITY; se o
+  resultado não for menor, o PNG original é mantido
+- ganham uma variante pronta para PDF (mesmo blob + ".pdf.jpg"), reduzida ao
+  quadro útil da página A4 em SCREENSHOT_PDF_DPI
+- o trabalho de imagem (Pillow) e a gravação rodam num pool de threads, fora do
+  event loop da captura
+
+Os geradores de PDF usam pdf_screenshot(), que prefere a variante e mantém em
+cache os ImageReader do ReportLab entre gerações (regerar um PDF não relê nem
+decodifica a imagem de novo).
+"""
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from PIL import Image as PILImage
+from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image
+
+from app.core.config import settings
+from app.services.evidence_store import store_bytes, write_blob
+
+logger = logging.getLogger(__name__)
+
+# formato -> (formato Pillow, extensão)
+FORMATS = {
+    "webp": ("WEBP", ".webp"),
+    "jpeg": ("JPEG", ".jpg"),
+    "png": ("PNG", ".png"),
+}
+
+# Quadro útil da página A4 (210mm - margens de 15mm) e altura máxima da imagem no PDF
+PDF_FRAME_WIDTH = 180 * mm
+PDF_FRAME_HEIGHT = 150 * mm
+PDF_VARIANT_SUFFIX = ".pdf.jpg"
+PDF_VARIANT_QUALITY = 85
+
+_pipeline_executor = ThreadPoolExecutor(
+    max_workers=settings.SCREENSHOT_PIPELINE_WORKERS, thread_name_prefix="screenshot-pipeline"
+)
+
+
+@dataclass
+class StoredScreenshot:
+    """Screenshot já processado e gravado na árvore de evidências"""
+    sha256: str
+    path: str
+    size_bytes: int
+    original_size_bytes: int
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size_bytes - self.size_bytes
+
+
+def pdf_variant_path(screenshot_path: str) -> str:
+    return os.path.splitext(screenshot_path)[0] + PDF_VARIANT_SUFFIX
+
+
+def _encode(image: PILImage.Image, pil_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if pil_format == "WEBP":
+        image.save(buffer, format=pil_format, quality=quality, method=4)
+    else:
+        image.save(buffer, format=pil_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _pdf_variant(image: PILImage.Image) -> bytes:
+    """JPEG reduzido para caber no quadro do PDF na resolução configurada"""
+    dpi = settings.SCREENSHOT_PDF_DPI
+    max_size = (round(PDF_FRAME_WIDTH / 72 * dpi), round(PDF_FRAME_HEIGHT / 72 * dpi))
+    variant = image.copy()
+    variant.thumbnail(max_size, PILImage.LANCZOS)  # Mantém proporção; nunca amplia
+    return _encode(variant, "JPEG", PDF_VARIANT_QUALITY)
+
+
+def process_screenshot(data: bytes) -> StoredScreenshot:
+    """Recomprime o screenshot, grava o blob e a variante para PDF (síncrono)"""
+    pil_format, extension = FORMATS.get(settings.SCREENSHOT_FORMAT.lower(), FORMATS["webp"])
+
+    with PILImage.open(io.BytesIO(data)) as source:
+        image = source.convert("RGB")  # Screenshots são opacos; JPEG não aceita alfa
+
+    compressed = data
+    if pil_format != "PNG":
+        encoded = _encode(image, pil_format, settings.SCREENSHOT_QUALITY)
+        if len(encoded) < len(data):
+            compressed = encoded
+    if compressed is data:
+        extension = ".png"  # PNG original mantido (formato png ou recompressão maior)
+
+    sha256, path = store_bytes(compressed, extension)
+    write_blob(pdf_variant_path(path), _pdf_variant(image))
+
+    stored = StoredScreenshot(
+        sha256=sha256, path=path, size_bytes=len(compressed), original_size_bytes=len(data)
+    )
+    logger.info(
+        f"[SCREENSHOT] {extension[1:]} {stored.size_bytes // 1024} KB "
+        f"(original {stored.original_size_bytes // 1024} KB, economia {stored.bytes_saved // 1024} KB)"
+    )
+    return stored
+
+
+def _process_file(file_path: str) -> StoredScreenshot:
+    with open(file_path, "rb") as f:
+        data = f.read()
+    stored = process_screenshot(data)
+    os.remove(file_path)
+    return stored
+
+
+async def store_screenshot(data: bytes) -> StoredScreenshot:
+    """Processa e grava o screenshot (bytes PNG) no pool de threads do pipeline"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pipeline_executor, process_screenshot, data)
+
+
+async def store_screenshot_file(file_path: str) -> StoredScreenshot:
+    """Como store_screenshot, para um PNG já gravado (o arquivo de origem é removido)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pipeline_executor, _process_file, file_path)
+
+
+@lru_cache(maxsize=settings.SCREENSHOT_READER_CACHE_SIZE)
+def _cached_reader(path: str, mtime: float) -> ImageReader:
+    return ImageReader(path)
+
+
+def cached_image_reader(path: str) -> ImageReader:
+    """
+    ImageReader compartilhado entre gerações de PDF. A chave inclui o mtime
+    para não servir um arquivo substituído no mesmo caminho.
+    """
+    return _cached_reader(path, os.path.getmtime(path))
+
+
+def pdf_image_reader(screenshot_path: str) -> ImageReader:
+    """ImageReader da variante para PDF (ou do próprio arquivo, para screenshots antigos sem variante)"""
+    variant = pdf_variant_path(screenshot_path)
+    return cached_image_reader(variant if os.path.exists(variant) else screenshot_path)
+
+
+class CachedImage(Image):
+    """platypus.Image sobre um ImageReader já carregado (ver pdf_image_reader)"""
+
+    def __init__(self, reader: ImageReader, width=None, height=None, kind: str = "direct"):
+        self._img = reader
+        super().__init__(reader.fileName, width=width, height=height, kind=kind, lazy=0)
+        self._img = reader  # O ramo JPEG do Image descarta _img; o desenho deve usar o cache
+
+
+def pdf_screenshot(
+    screenshot_path: str,
+    width: Optional[float] = None,
+    height: Optional[float] = None,
+    kind: str = "direct"
+) -> CachedImage:
+    """Flowable do screenshot para os geradores de PDF"""
+    return CachedImage(pdf_image_reader(screenshot_path), width=width, height=height, kind=kind)
@@ -0,0 +1,193 @@
+"""
+Índice de nomes de veículos para resolução de marca/modelo FIPE.
+
+- Normalização única (minúsculas, sem acentos, pontuação como espaço) usada
+  também por FipeClient._normalize_brand
+- Índice invertido de trigramas: buscas de substring, palavras e palavras-chave
+  consultam só os nomes que contêm os trigramas do termo
+- Similaridade por distância de edição com rapidfuzz (fuzz.ratio, mesma escala
+  0..1 do SequenceMatcher.ratio); sem rapidfuzz, cai para difflib
+- A similaridade é calculada apenas para os candidatos com mais trigramas em
+  comum, não para a lista inteira
+
+Os métodos respondem "quais posições" casam; a ordem de prioridade entre os
+critérios (percorrendo a lista do início, como a busca linear) fica com o
+FipeClient.
+"""
+import re
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    from rapidfuzz import fuzz
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:
+    RAPIDFUZZ_AVAILABLE = False
+
+# Candidatos (por trigramas em comum) avaliados pela similaridade
+SIMILARITY_CANDIDATES = 30
+
+BRAND_ALIASES = {
+    "vw": "volkswagen",
+    "volks": "volkswagen",
+    "gm": "chevrolet",
+    "mb": "mercedes-benz",
+    "mercedes": "mercedes-benz",
+}
+
+_SEPARATORS = re.compile(r"[^\w.\-/]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_vehicle_name(text: str) -> str:
+    """Minúsculas, sem acentos e com espaços/pontuação colapsados"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _SEPARATORS.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def normalize_brand(brand: str) -> str:
+    """Nome de marca normalizado, com apelidos comuns expandidos (vw -> volkswagen)"""
+    normalized = normalize_vehicle_name(brand)
+    return BRAND_ALIASES.get(normalized, normalized)
+
+
+def similarity(a: str, b: str) -> float:
+    """Similaridade 0..1 entre dois nomes já normalizados"""
+    if RAPIDFUZZ_AVAILABLE:
+        return fuzz.ratio(a, b) / 100
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas do texto (com bordas), como no pg_trgm"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _inner_trigrams(text: str) -> Set[str]:
+    """Trigramas presentes em qualquer texto que contenha `text` como substring"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class VehicleNameIndex:
+    """
+    Índice sobre uma lista de nomes. As buscas retornam posições na lista e
+    desempates favorecem o primeiro da lista, como na busca linear.
+    """
+
+    def __init__(self, names: Sequence[str]):
+        self.names: List[str] = [normalize_vehicle_name(name) for name in names]
+        self._postings: Dict[str, List[int]] = {}
+        self._positions_by_name: Dict[str, List[int]] = {}
+        for position, name in enumerate(self.names):
+            self._positions_by_name.setdefault(name, []).append(position)
+            for gram in trigrams(name):
+                self._postings.setdefault(gram, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _containing(self, term: str) -> Iterable[int]:
+        """Posições cujo nome pode conter `term` (filtro por trigramas, sem falsos negativos)"""
+        grams = _inner_trigrams(term)
+        if not grams:
+            return range(len(self.names))
+        postings = sorted((self._postings.get(gram, []) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return sorted(result)
+
+    def positions_containing(self, term: str) -> List[int]:
+        """Posições (em ordem) cujo nome contém o termo"""
+        term = normalize_vehicle_name(term)
+        return [p for p in self._containing(term) if term in self.names[p]]
+
+    def direct_matches(self, terms: Sequence[str]) -> Set[int]:
+        """Posições cujo nome contém algum termo ou está contido nele"""
+        matches = set()
+        for term in terms:
+            term = normalize_vehicle_name(term)
+            if not term:
+                continue
+            matches.update(self.positions_containing(term))
+            # Nome contido no termo: consulta cada substring do termo (termos são curtos)
+            for start in range(len(term)):
+                for end in range(start + 1, len(term) + 1):
+                    matches.update(self._positions_by_name.get(term[start:end], []))
+        return matches
+
+    def first_direct_match(self, terms: Sequence[str]) -> Optional[int]:
+        """Primeira posição (na ordem da lista) com match direto (ver direct_matches)"""
+        return min(self.direct_matches(terms), default=None)
+
+    def positions_with_all(self, keywords: Sequence[str]) -> Set[int]:
+        """Posições cujo nome contém todas as palavras-chave"""
+        keywords = [normalize_vehicle_name(kw) for kw in keywords if kw]
+        if not keywords:
+            return set()
+        candidates = None
+        for keyword in keywords:
+            found = set(self.positions_containing(keyword))
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return set()
+        return candidates
+
+    def first_with_all(self, keywords: Sequence[str]) -> Optional[int]:
+        """Primeira posição cujo nome contém todas as palavras-chave"""
+        return min(self.positions_with_all(keywords), default=None)
+
+    def word_matches(self, words: Sequence[str]) -> Counter:
+        """Quantas das palavras cada nome contém: {posição: contagem}"""
+        counts = Counter()
+        for word in words:
+            for position in self.positions_containing(word):
+                counts[position] += 1
+        return counts
+
+    def _similarity_candidates(self, term: str, limit: int) -> List[int]:
+        if len(self.names) <= limit:
+            return list(range(len(self.names)))
+        hits = Counter(p for gram in trigrams(term) for p in self._postings.get(gram, []))
+        return [position for position, _ in hits.most_common(limit)]
+
+    def best_similar(
+        self,
+        terms: Sequence[str],
+        threshold: float = 0.0,
+        positions: Optional[Iterable[int]] = None,
+        limit: int = SIMILARITY_CANDIDATES
+    ) -> Tuple[Optional[int], float]:
+        """
+        Posição do nome mais similar a algum dos termos (score > threshold), avaliando só os
+        candidatos com mais trigramas em comum ou as posições informadas.
+        """
+        best_position, best_score = None, threshold
+        positions = sorted(positions) if positions is not None else None
+        normalized_terms = [normalize_vehicle_name(term) for term in terms if term]
+        for term in normalized_terms:
+            candidates = positions if positions is not None else self._similarity_candidates(term, limit)
+            for position in candidates:
+                score = similarity(term, self.names[position])
+                if score > best_score or (score == best_score and best_position is not None and position < best_position):
+                    best_position, best_score = position, score
+        if best_position is None:
+            return None, 0.0
+        return best_position, best_score
+
+
+@lru_cache(maxsize=128)
+def name_index(names: Tuple[str, ...]) -> VehicleNameIndex:
+    """
+    Índice para uma lista de nomes (ex.: modelos de uma marca/ano), reaproveitado
+    enquanto a mesma lista for consultada. Os resultados são posições na lista.
+    """
+    return VehicleNameIndex(names)
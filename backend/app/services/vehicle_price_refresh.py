@@ -0,0 +1,229 @@
+"""
+Atualização em lote do Banco de Preços de Veículos pela API FIPE.
+
+Usada pela task refresh_vehicle_prices (disparada por POST /api/vehicle-prices/refresh-all)
+quando a FIPE publica uma nova tabela de referência:
+- veículos que já estão no mês de referência vigente são ignorados (salvo force=True)
+- consultas de preço concorrentes, limitadas por FIPE_REFRESH_CONCURRENCY e por
+  FIPE_REFRESH_RATE_PER_SECOND, sobre um único httpx.AsyncClient (pool de conexões)
+- commit a cada FIPE_REFRESH_CHUNK_SIZE veículos; uma execução interrompida é
+  retomada na próxima, pois os já atualizados ficam no mês vigente
+- progresso informado a cada bloco (callback), publicado pela task no backend do Celery
+"""
+import asyncio
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import VehiclePriceBank, File
+from app.services.evidence_store import register_screenshot
+from app.services.fipe_client import FipeClient, FipePrice
+
+logger = logging.getLogger(__name__)
+
+# Dados legados podem ter "1", "2", "3" em vez de "cars", "motorcycles", "trucks"
+LEGACY_VEHICLE_TYPES = {"1": "cars", "2": "motorcycles", "3": "trucks"}
+
+# Tentativas quando a API responde 429 (limite de requisições)
+RATE_LIMIT_RETRIES = 3
+
+MONTHS = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "marco": 3,
+    "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9,
+    "outubro": 10, "novembro": 11, "dezembro": 12
+}
+
+
+def parse_reference_month(reference_month: str) -> date:
+    """
+    Converte string de mês de referência para date.
+    Ex: "dezembro de 2024" -> date(2024, 12, 1)
+    """
+    try:
+        parts = reference_month.lower().replace(" de ", " ").split()
+        month_name = parts[0]
+        year = int(parts[1])
+        month = MONTHS.get(month_name, 1)
+        return date(year, month, 1)
+    except Exception:
+        return date.today().replace(day=1)
+
+
+def parse_price_value(price: str) -> Decimal:
+    """Ex: "R$ 80.000,00" -> Decimal("80000.00")"""
+    return Decimal(price.replace("R$", "").replace(".", "").replace(",", ".").strip())
+
+
+def api_vehicle_type(vehicle: VehiclePriceBank) -> str:
+    return LEGACY_VEHICLE_TYPES.get(vehicle.vehicle_type, vehicle.vehicle_type)
+
+
+def apply_fipe_price(vehicle: VehiclePriceBank, price_data: FipePrice) -> Decimal:
+    """Grava no veículo o preço retornado pela API; retorna o novo valor"""
+    new_price = parse_price_value(price_data.price)
+    reference_month = price_data.referenceMonth.strip()
+
+    vehicle.price_value = new_price
+    vehicle.reference_month = reference_month
+    vehicle.reference_date = parse_reference_month(reference_month)
+    vehicle.last_api_call = datetime.utcnow()
+    vehicle.api_response_json = {
+        "price": price_data.price,
+        "brand": price_data.brand,
+        "model": price_data.model,
+        "modelYear": price_data.modelYear,
+        "fuel": price_data.fuel,
+        "codeFipe": price_data.codeFipe,
+        "referenceMonth": price_data.referenceMonth,
+        "vehicleType": price_data.vehicleType
+    }
+    return new_price
+
+
+def attach_screenshot(db: Session, vehicle: VehiclePriceBank, screenshot_path: str) -> File:
+    """Registra o screenshot FIPE capturado (File) e o associa ao veículo"""
+    screenshot_file = register_screenshot(db, screenshot_path)
+
+    vehicle.screenshot_file_id = screenshot_file.id
+    vehicle.screenshot_path = screenshot_path
+    vehicle.has_screenshot = True
+    return screenshot_file
+
+
+class _RateLimiter:
+    """Espaça o início das requisições para no máximo `rate` por segundo"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next_slot = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def _fetch_price(
+    fipe_client: FipeClient,
+    semaphore: asyncio.Semaphore,
+    limiter: _RateLimiter,
+    vehicle: VehiclePriceBank
+) -> FipePrice:
+    async with semaphore:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await limiter.wait()
+            try:
+                return await fipe_client.get_price(
+                    api_vehicle_type(vehicle),
+                    str(vehicle.brand_id),
+                    str(vehicle.model_id),
+                    vehicle.year_id
+                )
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+
+
+def _pending_query(vehicle_type: Optional[str], brand_name: Optional[str], reference_month: Optional[str]):
+    query = select(VehiclePriceBank.id)
+    if vehicle_type:
+        query = query.where(VehiclePriceBank.vehicle_type == vehicle_type)
+    if brand_name:
+        query = query.where(VehiclePriceBank.brand_name.ilike(f"%{brand_name}%"))
+    if reference_month:
+        query = query.where(VehiclePriceBank.reference_month != reference_month)
+    return query.order_by(VehiclePriceBank.id)
+
+
+async def refresh_vehicle_prices(
+    db: Session,
+    vehicle_type: Optional[str] = None,
+    brand_name: Optional[str] = None,
+    force: bool = False,
+    http_client: Optional[httpx.AsyncClient] = None,
+    progress: Optional[Callable[[Dict[str, object]], None]] = None
+) -> Dict[str, object]:
+    """
+    Atualiza os preços dos veículos (todos ou filtrados) que ainda não estão no
+    mês de referência FIPE vigente. `progress` recebe os contadores a cada bloco.
+    """
+    if http_client is None:
+        limits = httpx.Limits(max_connections=settings.FIPE_REFRESH_CONCURRENCY)
+        async with httpx.AsyncClient(timeout=30.0, limits=limits, headers=FipeClient.request_headers()) as client:
+            return await refresh_vehicle_prices(db, vehicle_type, brand_name, force, client, progress)
+
+    fipe_client = FipeClient(http_client=http_client)
+    references = await fipe_client.get_references()
+    reference_month = references[0]["month"].strip()
+
+    total = db.execute(
+        select(func.count()).select_from(_pending_query(vehicle_type, brand_name, None).subquery())
+    ).scalar()
+    pending_ids = db.execute(
+        _pending_query(vehicle_type, brand_name, None if force else reference_month)
+    ).scalars().all()
+
+    stats: Dict[str, object] = {
+        "reference_month": reference_month,
+        "total": total,
+        "pending": len(pending_ids),
+        "skipped": total - len(pending_ids),
+        "processed": 0,
+        "success_count": 0,
+        "error_count": 0,
+        "errors": [],
+    }
+    logger.info(
+        f"[FIPE-REFRESH] {len(pending_ids)} de {total} veículos a atualizar para '{reference_month}'"
+    )
+    if progress:
+        progress(stats)
+
+    semaphore = asyncio.Semaphore(settings.FIPE_REFRESH_CONCURRENCY)
+    limiter = _RateLimiter(settings.FIPE_REFRESH_RATE_PER_SECOND)
+    errors: List[str] = stats["errors"]
+    chunk_size = settings.FIPE_REFRESH_CHUNK_SIZE
+
+    for start in range(0, len(pending_ids), chunk_size):
+        chunk_ids = pending_ids[start:start + chunk_size]
+        vehicles = db.query(VehiclePriceBank).filter(VehiclePriceBank.id.in_(chunk_ids)).all()
+
+        results = await asyncio.gather(
+            *(_fetch_price(fipe_client, semaphore, limiter, vehicle) for vehicle in vehicles),
+            return_exceptions=True
+        )
+        for vehicle, result in zip(vehicles, results):
+            if isinstance(result, Exception):
+                stats["error_count"] += 1
+                if len(errors) < 10:  # Limitar a 10 erros no resultado
+                    errors.append(f"{vehicle.vehicle_name}: {result}")
+                continue
+            apply_fipe_price(vehicle, result)
+            stats["success_count"] += 1
+
+        db.commit()
+        stats["processed"] += len(chunk_ids)
+        if progress:
+            progress(stats)
+
+    stats["api_calls"] = fipe_client.api_calls
+    logger.info(
+        f"[FIPE-REFRESH] Atualização em lote: {stats['success_count']}/{stats['pending']} veículos atualizados, "
+        f"{stats['error_count']} erros, {stats['skipped']} já na referência vigente"
+    )
+    return stats
@@ -1,12 +1,14 @@
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init
 from app.core.config import settings
+from app.core.database import dispose_engines_after_fork
 
 celery_app = Celery(
     "quote_tasks",
     broker=settings.REDIS_URL,
     backend=settings.REDIS_URL,
-    include=['app.tasks.quote_tasks', 'app.tasks.batch_tasks', 'app.tasks.scheduled_tasks']
+    include=['app.tasks.quote_tasks', 'app.tasks.batch_tasks', 'app.tasks.scheduled_tasks', 'app.tasks.report_tasks']
 )
 
 celery_app.conf.update(
@@ -33,8 +35,20 @@ celery_app.conf.update(
     # Timeout para tasks longas (10 minutos)
     task_time_limit=600,
     task_soft_time_limit=540,
+    # Renderização de relatórios em fila própria: o worker precisa consumir
+    # "-Q celery,render" (ou um worker dedicado "-Q render", como no docker-compose)
+    task_routes={
+        'render_inventory_report': {'queue': 'render'},
+    },
 )
 
+
+@worker_process_init.connect
+def _reset_db_pool(**kwargs):
+    """Cada processo filho do worker abre suas próprias conexões (pool por processo)"""
+    dispose_engines_after_fork()
+
+
 # Configuração do Celery Beat - Tarefas agendadas
 celery_app.conf.beat_schedule = {
     'update-exchange-rate-daily': {
@@ -57,6 +71,26 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(hour=4, minute=0),  # Diariamente às 04:00
         'options': {'queue': 'default'}
     },
+    'archive-integration-log-payloads-daily': {
+        'task': 'archive_integration_log_payloads',
+        'schedule': crontab(hour=4, minute=30),  # Diariamente às 04:30
+        'options': {'queue': 'default'}
+    },
+    'reconcile-integration-cost-rollup-daily': {
+        'task': 'reconcile_integration_cost_rollup',
+        'schedule': crontab(hour=3, minute=30),  # Diariamente às 03:30
+        'options': {'queue': 'default'}
+    },
+    'drain-pending-integration-logs': {
+        'task': 'drain_pending_integration_logs',
+        'schedule': crontab(minute='*/10'),  # A cada 10 minutos
+        'options': {'queue': 'default'}
+    },
+    'refresh-fipe-catalog-daily': {
+        'task': 'refresh_fipe_catalog',
+        'schedule': crontab(hour=5, minute=0),  # Diariamente às 05:00 (só recarrega se a referência mudou)
+        'options': {'queue': 'default'}
+    },
     # ===== Tarefas de Inventário =====
     'sync-inventory-master-data-daily': {
         'task': 'sync_inventory_master_data',
@@ -68,5 +102,10 @@ celery_app.conf.beat_schedule = {
         'schedule': crontab(minute=30),  # A cada hora (minuto 30)
         'options': {'queue': 'default'}
     },
+    'reconcile-inventory-counters-hourly': {
+        'task': 'reconcile_inventory_session_counters',
+        'schedule': crontab(minute=15),  # A cada hora (minuto 15)
+        'options': {'queue': 'default'}
+    },
 }
 
@@ -16,14 +16,16 @@ from app.services.spec_extractor import SpecExtractor
 from app.services.spec_validator import SpecValidator
 from app.services.linear_meter import LinearMeterCalculator
 from app.models.product_specs import ProductSpecs, LinearMeterResult
-from app.services.integration_logger import log_anthropic_call, log_serpapi_call
+from app.services.integration_logger import IntegrationLogBuffer
+from app.services.evidence_store import register_screenshot, sha256_file, staging_path
+from app.services.screenshot_pipeline import store_screenshot, store_screenshot_file
+from app.services.image_preprocessing import prepare_input_image
 from app.core.config import settings
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import List, Optional
 from decimal import Decimal
 import os
-import hashlib
 from datetime import datetime, timezone
 import logging
 
@@ -69,6 +71,7 @@ class QuoteTask(Task):
 @celery_app.task(base=QuoteTask, bind=True)
 def process_quote_request(self, quote_request_id: int):
     db = SessionLocal()
+    integration_logs = None
 
     try:
         quote_request = db.query(QuoteRequest).filter(QuoteRequest.id == quote_request_id).first()
@@ -87,6 +90,9 @@ def process_quote_request(self, quote_request_id: int):
             logger.warning(f"Quote {quote_request_id} já está sendo processada por outro worker")
             return
 
+        # Logs de integração acumulados em memória e gravados em lote nos checkpoints
+        integration_logs = IntegrationLogBuffer(quote_request_id)
+
         # Verificar se pode retomar de checkpoint anterior
         can_resume = checkpoint_mgr.can_resume(quote_request)
         resume_checkpoint = checkpoint_mgr.get_resume_checkpoint(quote_request) if can_resume else None
@@ -158,10 +164,13 @@ def process_quote_request(self, quote_request_id: int):
                 File.type == FileType.INPUT_IMAGE
             ).all()
 
-            image_data_list = []
-            for img_file in input_images:
-                with open(img_file.storage_path, 'rb') as f:
-                    image_data_list.append(f.read())
+            # Orientadas, reduzidas à resolução do provedor e em cache pela sha256
+            # (recotações e retentativas reaproveitam o preparo)
+            image_provider = "openai" if ai_provider == "openai" else "anthropic"
+            image_data_list = [
+                prepare_input_image(img_file.storage_path, img_file.sha256, provider=image_provider)
+                for img_file in input_images
+            ]
 
             # Analisando entrada (imagem ou texto)
             if image_data_list:
@@ -195,9 +204,7 @@ def process_quote_request(self, quote_request_id: int):
                 elif isinstance(call_log, dict):
                     prompt_text = call_log.get('prompt')
 
-                log_anthropic_call(
-                    db=db,
-                    quote_request_id=quote_request.id,
+                integration_logs.log_ai_call(
                     model=model,
                     input_tokens=call_log.input_tokens if hasattr(call_log, 'input_tokens') else call_log.get('input_tokens', 0),
                     output_tokens=call_log.output_tokens if hasattr(call_log, 'output_tokens') else call_log.get('output_tokens', 0),
@@ -218,6 +225,7 @@ def process_quote_request(self, quote_request_id: int):
             # CHECKPOINT: Salvar após análise IA concluída
             # ========================================
             checkpoint_mgr.save_checkpoint(quote_request, ProcessingCheckpoint.AI_ANALYSIS_DONE, progress_percentage=30)
+            integration_logs.flush()
 
         else:
             # Recuperar analysis_result do JSON salvo
@@ -302,9 +310,7 @@ def process_quote_request(self, quote_request_id: int):
             logger.info(f"Shopping log: {shopping_log.model_dump_json()}")
 
             # Registrar chamada inicial do Google Shopping
-            log_serpapi_call(
-                db=db,
-                quote_request_id=quote_request.id,
+            integration_logs.log_serpapi_call(
                 api_used="google_shopping",
                 search_url=f"https://serpapi.com/search?engine=google_shopping&q={analysis_result.query_principal}",
                 activity=f"Busca inicial no Google Shopping: {analysis_result.query_principal}",
@@ -341,6 +347,7 @@ def process_quote_request(self, quote_request_id: int):
             # CHECKPOINT: Salvar após busca Google Shopping
             # ========================================
             checkpoint_mgr.save_checkpoint(quote_request, ProcessingCheckpoint.SHOPPING_SEARCH_DONE, progress_percentage=50)
+            integration_logs.flush()
         else:
             # Recuperar shopping_products do JSON salvo
             saved_data = quote_request.google_shopping_response_json
@@ -735,9 +742,7 @@ def process_quote_request(self, quote_request_id: int):
                                     raise ValueError("NO_STORE_LINK: Não foi possível obter URL do site")
 
                                 # Registrar chamada Immersive
-                                log_serpapi_call(
-                                    db=db,
-                                    quote_request_id=quote_request.id,
+                                integration_logs.log_serpapi_call(
                                     api_used="google_shopping_immersive",
                                     search_url=product.serpapi_immersive_product_api,
                                     activity=f"Obtendo link da loja para: {product.title[:50]}",
@@ -769,26 +774,14 @@ def process_quote_request(self, quote_request_id: int):
                                 if not screenshot_bytes:
                                     raise ValueError(f"SCREENSHOT_ERROR: Falha ao capturar screenshot de {store_result.url[:50]}")
 
-                                file_hash = hashlib.sha256(screenshot_bytes).hexdigest()
-                                screenshot_path = f"storage/screenshots/{file_hash}_screenshot.png"
-
-                                # Salvar arquivo no disco
-                                os.makedirs("storage/screenshots", exist_ok=True)
-                                with open(screenshot_path, "wb") as f:
-                                    f.write(screenshot_bytes)
-
-                                # Criar registro no banco
-                                screenshot_file = File(
-                                    type=FileType.SCREENSHOT,
-                                    mime_type="image/png",
-                                    storage_path=screenshot_path,
-                                    sha256=file_hash,
-                                    quote_request_id=quote_request_id
+                                # Recomprimir e salvar no armazenamento endereçado por conteúdo
+                                stored = await store_screenshot(screenshot_bytes)
+                                screenshot_file = register_screenshot(
+                                    db, stored.path, sha256=stored.sha256, quote_request_id=quote_request_id,
+                                    original_size_bytes=stored.original_size_bytes
                                 )
-                                db.add(screenshot_file)
-                                db.flush()
 
-                                logger.info(f"    Screenshot capturado: {screenshot_path}")
+                                logger.info(f"    Screenshot capturado: {stored.path} (economia {stored.bytes_saved // 1024} KB)")
 
                                 # ✅ SUCESSO - Criar QuoteSource com preço do Google
                                 source = QuoteSource(
@@ -1171,8 +1164,7 @@ def process_quote_request(self, quote_request_id: int):
                                     raise ValueError("NO_STORE_LINK: Immersive API não retornou URL")
 
                                 # Registrar chamada
-                                log_serpapi_call(
-                                    db=db, quote_request_id=quote_request.id,
+                                integration_logs.log_serpapi_call(
                                     api_used="google_immersive_product", search_url="",
                                     activity=f"Busca de loja para: {product.title[:50]}...",
                                     request_data={"product_title": product.title, "price": str(product.extracted_price)},
@@ -1195,8 +1187,7 @@ def process_quote_request(self, quote_request_id: int):
 
                                 # PASSO 3: Capturar screenshot e extrair preço
                                 screenshot_filename = f"screenshot_{quote_request_id}_{len(valid_sources)}.png"
-                                screenshot_path = os.path.join(settings.STORAGE_PATH, "screenshots", screenshot_filename)
-                                os.makedirs(os.path.dirname(screenshot_path), exist_ok=True)
+                                screenshot_path = staging_path(screenshot_filename)
 
                                 price, method = await extractor.extract_price_and_screenshot(
                                     store_result.url, screenshot_path
@@ -1219,14 +1210,12 @@ def process_quote_request(self, quote_request_id: int):
                                 # ✅ SUCESSO - Produto validado!
                                 urls_seen.add(store_result.url)
 
-                                screenshot_file = File(
-                                    type=FileType.SCREENSHOT,
-                                    mime_type="image/png",
-                                    storage_path=screenshot_path,
-                                    sha256=_calculate_sha256(screenshot_path)
+                                # Recomprimir e mover para o armazenamento endereçado por conteúdo
+                                stored = await store_screenshot_file(screenshot_path)
+                                screenshot_file = register_screenshot(
+                                    db, stored.path, sha256=stored.sha256,
+                                    original_size_bytes=stored.original_size_bytes
                                 )
-                                db.add(screenshot_file)
-                                db.flush()
 
                                 # Determinar preço final:
                                 # - Se enable_price_mismatch=True: usar preço extraído do site
@@ -1499,6 +1488,7 @@ def process_quote_request(self, quote_request_id: int):
         # CHECKPOINT: Marcar início da finalização
         # ========================================
         checkpoint_mgr.save_checkpoint(quote_request, ProcessingCheckpoint.FINALIZATION, progress_percentage=90)
+        integration_logs.flush()
 
         # Finalizando
         _update_progress(db, quote_request, "finalizing", 95, "Salvando resultados e finalizando cotação...")
@@ -1525,6 +1515,7 @@ def process_quote_request(self, quote_request_id: int):
         # ========================================
         # CHECKPOINT: Marcar processamento concluído
         # ========================================
+        integration_logs.flush()
         checkpoint_mgr.complete_processing(quote_request, quote_request.status)
 
         logger.info(f"Quote request {quote_request_id} finalized. Average price: R$ {quote_request.valor_medio}")
@@ -1533,6 +1524,10 @@ def process_quote_request(self, quote_request_id: int):
         error_msg = str(e)
         logger.error(f"Error processing quote request {quote_request_id}: {error_msg}")
 
+        # Gravar os logs acumulados antes de marcar o erro (o consumo de API conta mesmo assim)
+        if integration_logs is not None:
+            integration_logs.flush()
+
         # Rollback de transações pendentes antes de atualizar o status
         db.rollback()
 
@@ -1558,6 +1553,9 @@ def process_quote_request(self, quote_request_id: int):
         raise
 
     finally:
+        # Saídas antecipadas (ex.: fluxo FIPE) também gravam o que estiver no buffer
+        if integration_logs is not None:
+            integration_logs.flush()
         db.close()
 
 
@@ -1632,11 +1630,28 @@ def _get_parameter(db: Session, key: str, default, config_version_id: int = None
 
 
 def _calculate_sha256(file_path: str) -> str:
-    sha256_hash = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        for byte_block in iter(lambda: f.read(4096), b""):
-            sha256_hash.update(byte_block)
-    return sha256_hash.hexdigest()
+    return sha256_file(file_path)
+
+
+def _reusable_fipe_screenshot(db: Session, fipe_result: FipeSearchResult) -> Optional[str]:
+    """
+    Screenshot já capturado para o mesmo código FIPE e ano/combustível (year_id) no
+    mesmo mês de referência (Banco de Preços de Veículos), se o arquivo ainda existir.
+    """
+    from app.models import VehiclePriceBank
+
+    price = fipe_result.price
+    if not price or not fipe_result.year_id:
+        return None
+    vehicle = db.query(VehiclePriceBank).filter(
+        VehiclePriceBank.codigo_fipe == price.codeFipe,
+        VehiclePriceBank.year_id == fipe_result.year_id,
+        VehiclePriceBank.reference_month == price.referenceMonth.strip(),
+        VehiclePriceBank.has_screenshot.is_(True)
+    ).first()
+    if vehicle and vehicle.screenshot_path and os.path.exists(vehicle.screenshot_path):
+        return vehicle.screenshot_path
+    return None
 
 
 def _register_ai_cost(db: Session, quote_request: QuoteRequest, model: str, tokens_used: int, ai_provider: str = "anthropic"):
@@ -2053,8 +2068,9 @@ def _process_fipe_quote(db: Session, quote_request: QuoteRequest, analysis_resul
         _update_progress(db, quote_request, "searching_fipe", 50,
                         f"Consultando Tabela FIPE para {analysis_result.marca} {analysis_result.modelo}...")
 
-        # Criar cliente FIPE
-        fipe_client = FipeClient()
+        # Criar cliente FIPE (marca/modelo/ano resolvidos no catálogo espelhado, quando carregado)
+        from app.services.fipe_catalog import FipeCatalog
+        fipe_client = FipeClient(catalog=FipeCatalog(db))
 
         # Extrair ano modelo e combustivel (texto) do retorno da IA
         ano_modelo = None
@@ -2207,25 +2223,24 @@ def _process_fipe_quote(db: Session, quote_request: QuoteRequest, analysis_resul
             vehicle_type_map = {1: "cars", 2: "motorcycles", 3: "trucks"}
             vtype = vehicle_type_map.get(fipe_result.price.vehicleType, "cars") if fipe_result.price else "cars"
 
-            screenshot_path = asyncio.run(capture_fipe_screenshot(
-                codigo_fipe=fipe_result.price.codeFipe,
-                ano_modelo=fipe_result.price.modelYear,
-                combustivel=combustivel,
-                vehicle_type=vtype,
-                quote_id=quote_request.id
-            ))
+            # Mesmo código/ano/combustível já comprovado na tabela de referência atual:
+            # reaproveitar o screenshot (blob compartilhado) em vez de capturar de novo
+            screenshot_path = _reusable_fipe_screenshot(db, fipe_result)
+            if screenshot_path:
+                logger.info(f"[FIPE] Reutilizando screenshot da mesma referência: {screenshot_path}")
+            else:
+                screenshot_path = asyncio.run(capture_fipe_screenshot(
+                    codigo_fipe=fipe_result.price.codeFipe,
+                    ano_modelo=fipe_result.price.modelYear,
+                    combustivel=combustivel,
+                    vehicle_type=vtype,
+                    quote_id=quote_request.id
+                ))
 
             if screenshot_path:
                 logger.info(f"Screenshot FIPE capturado: {screenshot_path}")
                 # Criar registro de File para o screenshot
-                screenshot_file = File(
-                    type=FileType.SCREENSHOT,
-                    mime_type="image/png",
-                    storage_path=screenshot_path,
-                    sha256=_calculate_sha256(screenshot_path)
-                )
-                db.add(screenshot_file)
-                db.flush()
+                screenshot_file = register_screenshot(db, screenshot_path)
                 screenshot_file_id = screenshot_file.id
                 logger.info(f"Screenshot file registrado: ID={screenshot_file_id}")
             else:
@@ -2293,7 +2308,7 @@ def _process_fipe_quote(db: Session, quote_request: QuoteRequest, analysis_resul
                 "vehicle_type": vehicle_type_str,
                 "vehicle_name": f"{fipe_result.price.brand} {fipe_result.price.model} {fipe_result.price.modelYear}",
                 "price_value": Decimal(str(fipe_result.price.price_value)),
-                "reference_month": fipe_result.price.referenceMonth,
+                "reference_month": fipe_result.price.referenceMonth.strip(),
                 "reference_date": ref_date,
                 "quote_request_id": quote_request.id,
                 "api_response_json": fipe_data.get("price"),
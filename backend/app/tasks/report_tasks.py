@@ -0,0 +1,59 @@
+"""
+Tasks Celery de renderização de relatórios (fila "render").
+Mantém a geração de PDFs pesados fora do processo da API.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy.orm import joinedload
+
+from app.tasks.celery_app import celery_app
+from app.core.database import SessionLocal
+from app.models import InventorySession
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="render_inventory_report", bind=True)
+def render_inventory_report(self, session_id: int, include_details: bool = True, generated_by: Optional[str] = None):
+    """
+    Gera o relatório PDF de uma sessão de inventário e guarda em cache
+    (GeneratedDocument). Se a versão atual já estiver em cache, não renderiza.
+    """
+    from app.services.inventory_statistics import calculate_session_statistics
+    from app.services.inventory_report_pdf import (
+        report_version_stamp,
+        get_cached_report,
+        store_report,
+        build_inventory_pdf,
+    )
+
+    db = SessionLocal()
+    try:
+        session = db.query(InventorySession).options(
+            joinedload(InventorySession.project),
+            joinedload(InventorySession.ug),
+            joinedload(InventorySession.ul)
+        ).filter(InventorySession.id == session_id).first()
+
+        if not session:
+            raise ValueError(f"Sessão {session_id} não encontrada")
+
+        version_stamp = report_version_stamp(db, session, include_details)
+        document = get_cached_report(db, session_id, version_stamp)
+
+        if not document:
+            logger.info(f"Renderizando relatório PDF da sessão {session_id} ({version_stamp})")
+            stats = calculate_session_statistics(db, session_id)
+            pdf_bytes = build_inventory_pdf(
+                db, session, stats, include_details=include_details, generated_by=generated_by
+            )
+            document = store_report(db, session, version_stamp, pdf_bytes)
+
+        return {
+            "session_id": session_id,
+            "document_id": document.id,
+            "version_stamp": version_stamp
+        }
+    finally:
+        db.close()
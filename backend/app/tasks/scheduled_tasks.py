@@ -2,9 +2,14 @@
 Tasks agendadas (Celery Beat)
 - Atualização diária da taxa de câmbio USD -> BRL às 23:00
 - Sincronização periódica de dados mestres de inventário
+- Reconciliação dos contadores materializados de sessões de inventário
+- Reconciliação do consolidado diário de custos de integração
+- Gravação de logs de integração pendentes no Redis (workers interrompidos)
+- Arquivamento dos payloads antigos de logs de integração e partições mensais
+- Atualização do catálogo FIPE espelhado quando muda a tabela de referência
 """
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 import asyncio
 
 from app.tasks.celery_app import celery_app
@@ -153,9 +158,8 @@ def check_inventory_sessions_status():
     - Atualiza estatísticas de sessões
     """
     from app.models import InventorySession, InventorySessionStatus
-    from app.models.inventory_session import InventoryReadAsset, InventoryExpectedAsset
+    from app.services.inventory_statistics import calculate_statistics_for_sessions
     from datetime import timedelta
-    from sqlalchemy import func
 
     logger.info("Verificando status de sessões de inventário...")
 
@@ -184,26 +188,15 @@ def check_inventory_sessions_status():
             ])
         ).all()
 
+        stats_by_session = calculate_statistics_for_sessions(db, [s.id for s in active_sessions])
+
         for session in active_sessions:
-            # Contar bens por categoria
-            found_count = db.query(func.count(InventoryReadAsset.id)).filter(
-                InventoryReadAsset.session_id == session.id,
-                InventoryReadAsset.category == 'found'
-            ).scalar() or 0
-
-            unregistered_count = db.query(func.count(InventoryReadAsset.id)).filter(
-                InventoryReadAsset.session_id == session.id,
-                InventoryReadAsset.category == 'unregistered'
-            ).scalar() or 0
-
-            written_off_count = db.query(func.count(InventoryReadAsset.id)).filter(
-                InventoryReadAsset.session_id == session.id,
-                InventoryReadAsset.category == 'written_off'
-            ).scalar() or 0
-
-            expected_count = db.query(func.count(InventoryExpectedAsset.id)).filter(
-                InventoryExpectedAsset.session_id == session.id
-            ).scalar() or 0
+            # Contadores materializados (ver reconcile_inventory_session_counters)
+            stats = stats_by_session[session.id]
+            found_count = stats["total_found"]
+            unregistered_count = stats["total_unregistered"]
+            written_off_count = stats["total_written_off"]
+            expected_count = stats["total_expected"]
 
             not_found_count = expected_count - found_count
 
@@ -239,6 +232,267 @@ def check_inventory_sessions_status():
         db.close()
 
 
+@celery_app.task(name="reconcile_inventory_session_counters")
+def reconcile_inventory_session_counters(include_completed_days: int = 7):
+    """
+    Task para reconciliar os contadores materializados das sessões de inventário.
+    Executada a cada hora.
+
+    Recalcula as contagens (GROUP BY) das sessões ativas e das concluídas
+    recentemente e corrige divergências nos contadores.
+    """
+    from app.models import InventorySession, InventorySessionStatus
+    from app.services.inventory_statistics import reconcile_session_counters
+    from datetime import timedelta
+    from sqlalchemy import or_
+
+    logger.info("Reconciliando contadores de sessões de inventário...")
+
+    db = SessionLocal()
+    checked = 0
+    repaired = {}
+
+    try:
+        cutoff = datetime.utcnow() - timedelta(days=include_completed_days)
+        session_ids = [row.id for row in db.query(InventorySession.id).filter(
+            or_(
+                InventorySession.status.in_([
+                    InventorySessionStatus.DRAFT.value,
+                    InventorySessionStatus.IN_PROGRESS.value,
+                    InventorySessionStatus.PAUSED.value
+                ]),
+                InventorySession.completed_at >= cutoff
+            )
+        ).all()]
+
+        for session_id in session_ids:
+            try:
+                drift = reconcile_session_counters(db, session_id)
+                db.commit()
+                checked += 1
+                if drift:
+                    repaired[session_id] = drift
+            except Exception as e:
+                logger.error(f"Erro ao reconciliar contadores da sessão {session_id}: {str(e)}")
+                db.rollback()
+
+        logger.info(f"Reconciliação concluída: {checked} sessões verificadas, {len(repaired)} corrigidas")
+
+        return {
+            "success": True,
+            "sessions_checked": checked,
+            "sessions_repaired": len(repaired),
+            "drift": repaired if repaired else None
+        }
+
+    except Exception as e:
+        logger.error(f"Erro na reconciliação de contadores: {str(e)}")
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="reconcile_integration_cost_rollup")
+def reconcile_integration_cost_rollup(days: int = 3):
+    """
+    Task para reconstruir o consolidado diário de custos (integration_cost_daily)
+    dos últimos dias a partir dos logs de integração.
+    Executada diariamente; corrige incrementos perdidos pelo integration_logger.
+    """
+    from datetime import timedelta
+    from app.services.integration_cost_rollup import rebuild_cost_rollup
+
+    logger.info(f"Reconstruindo consolidado de custos dos últimos {days} dias...")
+
+    db = SessionLocal()
+    try:
+        start_day = (datetime.utcnow() - timedelta(days=days)).date()
+        rows = rebuild_cost_rollup(db, start_day=start_day)
+        db.commit()
+        return {"success": True, "start_day": start_day.isoformat(), "rows": rows}
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir consolidado de custos: {str(e)}")
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="drain_pending_integration_logs")
+def drain_pending_integration_logs():
+    """
+    Task para gravar os logs de integração que ficaram no Redis quando o
+    worker foi interrompido antes do flush do IntegrationLogBuffer.
+    Executada a cada 10 minutos.
+    """
+    from app.services.integration_logger import drain_pending_integration_logs as drain
+
+    db = SessionLocal()
+    try:
+        drained = drain(db)
+        if drained:
+            logger.info(f"{drained} logs de integração pendentes gravados")
+        return {"success": True, "drained": drained}
+    except Exception as e:
+        logger.error(f"Erro ao gravar logs de integração pendentes: {str(e)}")
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="archive_integration_log_payloads")
+def archive_integration_log_payloads():
+    """
+    Task para mover os payloads antigos de integration_logs para arquivos
+    comprimidos e criar as partições mensais dos próximos meses.
+    Executada diariamente às 04:30.
+    """
+    from app.services.integration_log_archive import (
+        archive_integration_payloads,
+        ensure_integration_log_partitions
+    )
+
+    db = SessionLocal()
+    try:
+        partitions = ensure_integration_log_partitions(db)
+        db.commit()
+        archived = archive_integration_payloads(db)
+        return {"success": True, "archived": archived, "partitions_created": partitions}
+    except Exception as e:
+        logger.error(f"Erro ao arquivar payloads de logs de integração: {str(e)}")
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="refresh_fipe_catalog")
+def refresh_fipe_catalog(force: bool = False):
+    """
+    Task para atualizar o catálogo FIPE espelhado (marcas, modelos e anos).
+    Executada diariamente às 05:00; só recarrega quando a referência FIPE muda.
+    """
+    from app.services.fipe_catalog import VEHICLE_TYPES, refresh_fipe_catalog as refresh
+
+    db = SessionLocal()
+    results = {}
+    try:
+        for vehicle_type in VEHICLE_TYPES:
+            try:
+                results[vehicle_type] = asyncio.run(refresh(db, vehicle_type, force=force))
+            except Exception as e:
+                logger.error(f"Erro ao atualizar catálogo FIPE ({vehicle_type}): {str(e)}")
+                db.rollback()
+                results[vehicle_type] = {"updated": False, "error": str(e)}
+
+        # Nova tabela de referência: atualizar também o Banco de Preços de Veículos
+        if any(result.get("updated") for result in results.values()):
+            refresh_vehicle_prices.delay()
+
+        return {"success": True, "results": results}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="refresh_vehicle_prices", bind=True, time_limit=4 * 3600, soft_time_limit=4 * 3600 - 60)
+def refresh_vehicle_prices(self, vehicle_type: str = None, brand_name: str = None, force: bool = False):
+    """
+    Task para atualizar em lote os preços do Banco de Preços de Veículos.
+    Disparada por POST /api/vehicle-prices/refresh-all e quando o catálogo FIPE
+    muda de referência; veículos já no mês vigente são ignorados (salvo force).
+    O andamento fica no estado PROGRESS da task.
+    """
+    from app.services.vehicle_price_refresh import refresh_vehicle_prices as refresh
+
+    def publish(stats):
+        self.update_state(state="PROGRESS", meta=dict(stats))
+
+    db = SessionLocal()
+    try:
+        stats = asyncio.run(refresh(
+            db, vehicle_type=vehicle_type, brand_name=brand_name, force=force, progress=publish
+        ))
+        return {"success": True, **stats}
+    except Exception as e:
+        logger.error(f"Erro na atualização em lote do Banco de Preços: {str(e)}")
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
+@celery_app.task(name="capture_missing_fipe_screenshots", time_limit=2 * 3600, soft_time_limit=2 * 3600 - 60)
+def capture_missing_fipe_screenshots(vehicle_ids: list = None, limit: int = 100):
+    """
+    Task para capturar os screenshots FIPE pendentes do Banco de Preços de Veículos
+    (has_screenshot falso), numa única sessão do portal FIPE.
+
+    Cada tentativa grava screenshot_attempted_at e os pendentes são ordenados
+    pela tentativa mais antiga (nunca tentados primeiro): veículos que falham
+    sempre vão para o fim da fila em vez de ocupar o lote a cada execução.
+
+    A tentativa é gravada (commit) antes de abrir o navegador e cada screenshot
+    é gravado assim que capturado: nenhuma transação fica aberta durante a fila.
+    """
+    from app.models import VehiclePriceBank
+    from app.services.fipe_screenshot import SolicitacaoScreenshot, capture_fipe_screenshots
+    from app.services.vehicle_price_refresh import api_vehicle_type, attach_screenshot
+
+    db = SessionLocal()
+    try:
+        query = db.query(VehiclePriceBank)
+        if vehicle_ids:
+            query = query.filter(VehiclePriceBank.id.in_(vehicle_ids))
+        else:
+            query = query.filter(
+                (VehiclePriceBank.has_screenshot.is_(None)) | (VehiclePriceBank.has_screenshot.is_(False))
+            )
+        vehicles = query.order_by(
+            VehiclePriceBank.screenshot_attempted_at.asc().nullsfirst(),
+            VehiclePriceBank.id
+        ).limit(limit).all()
+
+        solicitacoes = [
+            SolicitacaoScreenshot(
+                codigo_fipe=vehicle.codigo_fipe,
+                ano_modelo=vehicle.year_model,
+                combustivel=vehicle.fuel_type,
+                vehicle_type=api_vehicle_type(vehicle),
+                quote_id=vehicle.quote_request_id
+            )
+            for vehicle in vehicles
+        ]
+        attempted_at = datetime.now(timezone.utc)
+        for vehicle in vehicles:
+            vehicle.screenshot_attempted_at = attempted_at
+        db.commit()
+
+        captured = 0
+
+        def save_screenshot(index: int, path: str):
+            nonlocal captured
+            try:
+                attach_screenshot(db, vehicles[index], path)
+                db.commit()
+                captured += 1
+            except Exception as e:
+                logger.error(f"Erro ao gravar screenshot FIPE de {solicitacoes[index].codigo_fipe}: {e}")
+                db.rollback()
+
+        asyncio.run(capture_fipe_screenshots(solicitacoes, save_screenshot))
+
+        logger.info(f"Screenshots FIPE capturados: {captured}/{len(vehicles)}")
+        return {"success": True, "total": len(vehicles), "captured": captured}
+
+    except Exception as e:
+        logger.error(f"Erro ao capturar screenshots FIPE em lote: {str(e)}")
+        db.rollback()
+        return {"success": False, "error": str(e)}
+    finally:
+        db.close()
+
+
 @celery_app.task(name="update_exchange_rate")
 def update_exchange_rate():
     """
@@ -388,9 +642,15 @@ def cleanup_old_processing():
     Executada diariamente.
 
     Cotacoes em PROCESSING por mais de 24 horas sao marcadas como ERROR.
+    Em seguida remove os screenshots (blobs) que nao tem mais nenhuma referencia
+    e as imagens de entrada preparadas para a IA sem uso ha AI_IMAGE_CACHE_DAYS
+    (alem das imagens temporarias do Google Lens com URL ja expirada).
     """
     from datetime import timedelta
     from app.models.quote_request import QuoteRequest, QuoteStatus
+    from app.services.evidence_store import collect_unreferenced_blobs
+    from app.services.image_preprocessing import purge_prepared_images
+    from app.services.lens_image_host import purge_lens_images
     from sqlalchemy import and_
 
     logger.info("Iniciando limpeza de cotacoes antigas em PROCESSING...")
@@ -425,7 +685,17 @@ def cleanup_old_processing():
 
         logger.info(f"Limpeza concluida: {cleaned} cotacoes marcadas como ERROR")
 
-        return {"success": True, "cleaned": cleaned}
+        blobs = collect_unreferenced_blobs(db)
+        prepared_images = purge_prepared_images()
+        lens_images = purge_lens_images()
+
+        return {
+            "success": True,
+            "cleaned": cleaned,
+            "blobs_removed": blobs["removed"],
+            "prepared_images_removed": prepared_images,
+            "lens_images_removed": lens_images
+        }
 
     except Exception as e:
         logger.error(f"Erro na limpeza: {str(e)}")
@@ -0,0 +1,130 @@
+"""
+Benchmark do resumo em Excel das cotações em lote: implementação anterior
+(uma consulta de fontes por cotação + pd.ExcelWriter/openpyxl) x consulta
+única + gravação em streaming (services/batch_result_generator.py).
+
+Cada tamanho de lote é populado num SQLite temporário com numero_cotacoes
+fontes aceitas (e uma rejeitada) por cotação. O relatório mostra tempo,
+número de queries e pico de memória (tracemalloc) de cada caminho:
+
+    python scripts/benchmark_batch_excel.py --sizes 100 500 2000 --numero-cotacoes 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+from app.models import QuoteRequest, QuoteSource  # noqa: E402
+from app.models.quote_request import QuoteStatus  # noqa: E402
+from app.services.batch_result_generator import fetch_batch_summary, write_batch_excel  # noqa: E402
+
+BATCH_ID = 1
+
+
+def seed(session: Session, size: int, numero_cotacoes: int):
+    start = datetime(2026, 1, 20, 8, 0)
+    session.add_all([
+        QuoteRequest(
+            id=index + 1, batch_job_id=BATCH_ID, batch_index=index, codigo_item=f"{100000 + index}",
+            input_text=f"Item de teste {index} - cadeira giratória com braços reguláveis",
+            valor_medio=Decimal("250.00"), variacao_percentual=Decimal("12.5"),
+            status=QuoteStatus.DONE, created_at=start + timedelta(minutes=index)
+        )
+        for index in range(size)
+    ])
+    session.flush()
+    session.add_all([
+        QuoteSource(
+            quote_request_id=index + 1, url=f"https://loja{source}.example.com/p/{index}",
+            price_value=Decimal("200.00") + source * 10, is_accepted=source < numero_cotacoes
+        )
+        for index in range(size)
+        for source in range(numero_cotacoes + 1)
+    ])
+    session.commit()
+
+
+def legacy_generate(db: Session, path: str, numero_cotacoes: int):
+    """Caminho anterior: fontes consultadas cotação a cotação, DataFrame de dicts e openpyxl"""
+    quotes = db.query(QuoteRequest).filter(
+        QuoteRequest.batch_job_id == BATCH_ID
+    ).order_by(QuoteRequest.batch_index).all()
+
+    data = []
+    for quote in quotes:
+        sources = db.query(QuoteSource).filter(
+            QuoteSource.quote_request_id == quote.id,
+            QuoteSource.is_accepted == True  # noqa: E712
+        ).order_by(QuoteSource.id).all()
+        row = {'Código (Material)': quote.codigo_item or '', 'Descrição': quote.input_text or ''}
+        for i in range(numero_cotacoes):
+            row[f'Cotação {i + 1}'] = sources[i].price_value if i < len(sources) else None
+        row['Valor Médio'] = quote.valor_medio
+        row['Variação (%)'] = quote.variacao_percentual
+        row['Nº Cotação'] = quote.id
+        row['Data'] = quote.created_at.strftime('%d/%m/%Y %H:%M') if quote.created_at else ''
+        row['Status'] = quote.status.value if quote.status else ''
+        data.append(row)
+
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(data).to_excel(writer, index=False, sheet_name='Resumo')
+
+
+def streaming_generate(db: Session, path: str, numero_cotacoes: int):
+    write_batch_excel(fetch_batch_summary(db, BATCH_ID, numero_cotacoes), path, numero_cotacoes)
+
+
+def measure(engine, generate, path: str, numero_cotacoes: int):
+    queries = []
+
+    def count(*args):
+        queries.append(1)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        with Session(engine) as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+            generate(db, path, numero_cotacoes)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return elapsed, len(queries), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000], help="Cotações por lote")
+    parser.add_argument("--numero-cotacoes", type=int, default=3, help="Colunas de cotação")
+    args = parser.parse_args()
+
+    print(f"{'cotações':>9} {'caminho':<10} {'tempo':>9} {'queries':>8} {'pico mem':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            engine = create_engine(f"sqlite:///{os.path.join(workdir, f'lote_{size}.db')}")
+            Base.metadata.create_all(engine, tables=[QuoteRequest.__table__, QuoteSource.__table__])
+            with Session(engine) as session:
+                seed(session, size, args.numero_cotacoes)
+
+            for label, generate in (("anterior", legacy_generate), ("streaming", streaming_generate)):
+                path = os.path.join(workdir, f"{label}_{size}.xlsx")
+                elapsed, queries, peak = measure(engine, generate, path, args.numero_cotacoes)
+                print(f"{size:>9} {label:<10} {elapsed * 1000:>7.0f}ms {queries:>8} {peak / 1024 / 1024:>8.1f}MB")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
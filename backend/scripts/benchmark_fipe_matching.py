@@ -0,0 +1,192 @@
+"""
+Benchmark da resolução de marca/modelo FIPE: busca linear com difflib
+(implementação anterior) x índice de nomes (services/vehicle_name_index.py).
+
+Reproduz os search_path gravados em claude_payload_json["fipe_result"] das
+cotações: cada lista de marcas/modelos consultada é carregada do catálogo
+FIPE espelhado (fipe_catalog_*) e os termos de claude_payload_json["fipe_api"]
+(busca_marca/busca_modelo) são resolvidos pelos dois métodos. O relatório
+mostra o tempo de cada um e em quantas buscas escolheram o mesmo item.
+
+Requer o catálogo carregado (task refresh_fipe_catalog):
+
+    python scripts/benchmark_fipe_matching.py --limit 500 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.models import QuoteRequest  # noqa: E402
+from app.services.fipe_catalog import FipeCatalog  # noqa: E402
+from app.services.fipe_client import FipeClient  # noqa: E402
+from app.services.vehicle_name_index import name_index  # noqa: E402
+
+# "GET https://.../cars/brands/21/years/2020-5/models" ou "LOCAL cars/brands/21/models"
+LIST_PATH = re.compile(
+    r"(?P<vehicle_type>cars|motorcycles|trucks)/brands"
+    r"(?:/(?P<brand_id>\d+)/(?:years/(?P<year_id>[^/]+)/)?models)?$"
+)
+
+
+def legacy_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+def legacy_find_brand(brands, search_term, variations):
+    """Busca linear anterior de FipeClient.find_brand"""
+    client = FipeClient()
+    search_terms = [client._normalize_brand(search_term)] + [client._normalize_brand(v) for v in variations]
+    best_match, best_score = None, 0.0
+    for brand in brands:
+        brand_name_lower = brand.name.lower()
+        for term in search_terms:
+            if term in brand_name_lower or brand_name_lower in term:
+                return brand
+            score = legacy_similarity(term, brand_name_lower)
+            if score > best_score and score > 0.6:
+                best_score, best_match = score, brand
+    return best_match
+
+
+def legacy_find_model(models, search_term, variations, keywords):
+    """Busca linear anterior de FipeClient._find_model_in_list"""
+    search_terms = [search_term.lower()] + [v.lower() for v in variations]
+    search_words = [w for w in search_term.lower().split() if len(w) >= 2]
+    best_match, best_score, best_word_count = None, 0.0, 0
+    for model in models:
+        model_name_lower = model.name.lower()
+        if keywords and all(kw.lower() in model_name_lower for kw in keywords):
+            return model
+        matching_words = sum(1 for word in search_words if word in model_name_lower)
+        if matching_words > best_word_count:
+            best_word_count, best_match = matching_words, model
+            best_score = matching_words / len(search_words) if search_words else 0
+        elif matching_words == best_word_count and matching_words > 0:
+            for term in search_terms:
+                score = legacy_similarity(term, model_name_lower)
+                if score > best_score:
+                    best_score, best_match = score, model
+        elif best_word_count == 0:
+            for term in search_terms:
+                if term in model_name_lower or model_name_lower in term:
+                    return model
+                score = legacy_similarity(term, model_name_lower)
+                if score > best_score and score > 0.5:
+                    best_score, best_match = score, model
+    return best_match
+
+
+def collect_cases(db, catalog: FipeCatalog, limit: int):
+    """(tipo, lista, termo, variações, keywords) para cada lista do search_path gravado"""
+    cases = []
+    quotes = (
+        db.query(QuoteRequest)
+        .filter(QuoteRequest.claude_payload_json.isnot(None))
+        .order_by(QuoteRequest.id.desc())
+        .limit(limit)
+        .all()
+    )
+    for quote in quotes:
+        payload = quote.claude_payload_json or {}
+        fipe_result = payload.get("fipe_result") or {}
+        fipe_api = payload.get("fipe_api") or {}
+        busca_marca = fipe_api.get("busca_marca") or {}
+        busca_modelo = fipe_api.get("busca_modelo") or {}
+
+        for entry in fipe_result.get("search_path") or []:
+            match = LIST_PATH.search(entry)
+            if not match:
+                continue
+            vehicle_type, brand_id, year_id = match.group("vehicle_type", "brand_id", "year_id")
+            if brand_id is None and busca_marca.get("termo_principal"):
+                items = catalog.brands(vehicle_type)
+                cases.append(("brand", items, busca_marca["termo_principal"], busca_marca.get("variacoes", []), []))
+            elif brand_id is not None and busca_modelo.get("termo_principal"):
+                if year_id:
+                    items = catalog.models_by_brand_year(vehicle_type, brand_id, year_id)
+                else:
+                    items = catalog.models(vehicle_type, brand_id)
+                cases.append((
+                    "model", items, busca_modelo["termo_principal"],
+                    busca_modelo.get("variacoes", []), busca_modelo.get("palavras_chave", [])
+                ))
+    return [case for case in cases if case[1]]
+
+
+def run_legacy(case):
+    kind, items, term, variations, keywords = case
+    if kind == "brand":
+        return legacy_find_brand(items, term, variations)
+    return legacy_find_model(items, term, variations, keywords)
+
+
+def run_index(client: FipeClient, loop: asyncio.AbstractEventLoop, case):
+    kind, items, term, variations, keywords = case
+    if kind == "brand":
+        # Mesmo algoritmo de find_brand, sem a chamada get_brands
+        terms = [client._normalize_brand(term)] + [client._normalize_brand(v) for v in variations]
+        index = name_index(tuple(item.name for item in items))
+        position = index.first_direct_match(terms)
+        if position is None:
+            position, _ = index.best_similar(terms, threshold=0.6)
+        return items[position] if position is not None else None
+    return loop.run_until_complete(client._find_model_in_list(items, term, variations, keywords))
+
+
+def timed(fn, cases, repeat: int):
+    samples = []
+    results = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = [fn(case) for case in cases]
+        samples.append((time.perf_counter() - started) * 1000)
+    return results, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de matching de marca/modelo FIPE")
+    parser.add_argument("--limit", type=int, default=500, help="Cotações mais recentes a reproduzir")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições de cada método")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        cases = collect_cases(db, FipeCatalog(db), args.limit)
+    finally:
+        db.close()
+
+    if not cases:
+        print("Nenhum search_path reproduzível (catálogo FIPE vazio ou sem cotações FIPE).")
+        return
+
+    client = FipeClient()
+    loop = asyncio.new_event_loop()
+    legacy_results, legacy_ms = timed(run_legacy, cases, args.repeat)
+    index_results, index_ms = timed(lambda case: run_index(client, loop, case), cases, args.repeat)
+    loop.close()
+
+    agree = sum(
+        1 for a, b in zip(legacy_results, index_results)
+        if (a.code if a else None) == (b.code if b else None)
+    )
+    brands = sum(1 for case in cases if case[0] == "brand")
+
+    print(f"Buscas reproduzidas: {len(cases)} ({brands} marcas, {len(cases) - brands} modelos)")
+    print(f"difflib linear: mediana {statistics.median(legacy_ms):.1f} ms, min {min(legacy_ms):.1f} ms")
+    print(f"índice:         mediana {statistics.median(index_ms):.1f} ms, min {min(index_ms):.1f} ms")
+    print(f"Mesmo resultado: {agree}/{len(cases)} ({agree / len(cases):.1%})")
+    for case, a, b in zip(cases, legacy_results, index_results):
+        if (a.code if a else None) != (b.code if b else None):
+            print(f"  [{case[0]}] '{case[2]}': difflib={a.name if a else None} índice={b.name if b else None}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Benchmark da geração de PDFs (services/pdf_generator.py e fipe_pdf_generator.py).
+
+Gera, num diretório temporário, um conjunto fixo de cotações: relatórios de
+3 fontes com screenshots sintéticos (passados pelo screenshot_pipeline, como
+na captura real) e PDFs FIPE com screenshot de comprovação. Cada PDF é
+renderizado --repeat vezes e o relatório mostra o tempo médio/p95 e a média
+de cada seção do RenderProfile (estilos, resumo, cotações, build...).
+
+Com --cold os caches do processo (estilos e ImageReaders) são limpos antes de
+cada renderização, reproduzindo o custo de montar tudo a cada PDF:
+
+    python scripts/benchmark_pdf_render.py --quotes 10 --repeat 3
+    python scripts/benchmark_pdf_render.py --quotes 10 --repeat 3 --cold
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage, ImageDraw  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.services import pdf_templates, screenshot_pipeline  # noqa: E402
+from app.services.fipe_client import FipePrice, FipeSearchResult  # noqa: E402
+from app.services.fipe_pdf_generator import FipePDFGenerator  # noqa: E402
+from app.services.pdf_generator import PDFGenerator  # noqa: E402
+from app.services.pdf_templates import RenderProfile  # noqa: E402
+
+
+def synthetic_screenshot(seed: int, height: int) -> bytes:
+    """PNG 1366 px de largura com blocos e texto, parecido com uma página de loja"""
+    rng = random.Random(seed)
+    image = PILImage.new("RGB", (1366, height), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(300):
+        x, y = rng.randrange(1366), rng.randrange(height)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randrange(300), y + rng.randrange(120)], fill=color)
+    for y in range(0, height, 16):
+        draw.text((20, y), f"Produto {seed} - R$ {rng.randrange(100, 9999)},90 " * 6, fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def build_fixture(quotes: int):
+    """Cotações de 3 fontes e cotações FIPE, com screenshots já armazenados"""
+    quote_jobs = []
+    for quote_id in range(1, quotes + 1):
+        sources = []
+        for index in range(3):
+            stored = asyncio.run(screenshot_pipeline.store_screenshot(
+                synthetic_screenshot(quote_id * 10 + index, random.Random(quote_id + index).choice([900, 1350, 1800]))
+            ))
+            sources.append({
+                "url": f"https://loja{index}.example.com.br/produto/{quote_id}",
+                "price_value": Decimal("599.90") + index * 25,
+                "screenshot_path": stored.path,
+            })
+        quote_jobs.append({
+            "item_name": f"Notebook 15 polegadas 16GB RAM - item {quote_id}",
+            "codigo": f"10000{quote_id:04d}",
+            "sources": sources,
+            "valor_medio": Decimal("624.90"),
+            "local": "Online",
+            "pesquisador": "Sistema",
+            "data_pesquisa": datetime(2026, 1, 20),
+            "variacao_percentual": Decimal("8.3"),
+            "variacao_maxima_percent": 25.0,
+            "quote_id": quote_id,
+        })
+
+    fipe_jobs = []
+    for quote_id in range(1, quotes + 1):
+        stored = asyncio.run(screenshot_pipeline.store_screenshot(synthetic_screenshot(1000 + quote_id, 700)))
+        price = FipePrice(
+            price="R$ 80.000,00", brand="Fiat", model=f"Toro Freedom 1.3 T270 {quote_id}", modelYear=2020,
+            fuel="Flex", codeFipe="001480-2", referenceMonth="janeiro de 2026", vehicleType=1, fuelAcronym="F"
+        )
+        fipe_jobs.append({
+            "quote_request": SimpleNamespace(id=quote_id),
+            "fipe_result": FipeSearchResult(
+                success=True, price=price, brand_name="Fiat", model_name=price.model, year_id="2020-5",
+                api_calls=4, search_path=["LOCAL cars/brands", "LOCAL cars/brands/21/models"]
+            ),
+            "analysis_result": SimpleNamespace(
+                marca="Fiat", modelo="Toro", natureza="veiculo_carro",
+                especificacoes={"essenciais": {"ano_modelo": 2020, "combustivel": "flex"}, "complementares": {}}
+            ),
+            "screenshot_path": stored.path,
+        })
+    return quote_jobs, fipe_jobs
+
+
+def clear_caches():
+    pdf_templates.quote_styles.cache_clear()
+    pdf_templates.fipe_styles.cache_clear()
+    pdf_templates.fipe_info_table_style.cache_clear()
+    screenshot_pipeline._cached_reader.cache_clear()
+
+
+def run(label: str, jobs, render, repeat: int, cold: bool, output_dir: str):
+    timings = []
+    sections = defaultdict(list)
+    for attempt in range(repeat):
+        for index, job in enumerate(jobs):
+            if cold:
+                clear_caches()
+            profile = RenderProfile()
+            output_path = os.path.join(output_dir, f"{label}_{index}_{attempt}.pdf")
+            start = time.perf_counter()
+            render(output_path, job, profile)
+            timings.append((time.perf_counter() - start) * 1000)
+            for name, ms in profile.sections.items():
+                sections[name].append(ms)
+            os.remove(output_path)
+
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(f"\n{label}: {len(timings)} PDFs  média {statistics.mean(timings):.1f} ms  p95 {p95:.1f} ms")
+    for name, values in sections.items():
+        print(f"  {name:<12} {statistics.mean(values):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quotes", type=int, default=10, help="Cotações de cada tipo no conjunto")
+    parser.add_argument("--repeat", type=int, default=3, help="Renderizações de cada cotação")
+    parser.add_argument("--cold", action="store_true", help="Limpar os caches antes de cada PDF")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as storage_path:
+        settings.STORAGE_PATH = storage_path
+        quote_jobs, fipe_jobs = build_fixture(args.quotes)
+        quote_generator = PDFGenerator()
+        fipe_generator = FipePDFGenerator()
+        print(f"Caches {'limpos a cada PDF' if args.cold else 'do processo'}; {args.quotes} cotações de cada tipo")
+
+        run("cotacao_3_fontes", quote_jobs,
+            lambda path, job, profile: quote_generator.generate_quote_pdf(path, profile=profile, **job),
+            args.repeat, args.cold, storage_path)
+        run("fipe", fipe_jobs,
+            lambda path, job, profile: fipe_generator.generate(path, profile=profile, **job),
+            args.repeat, args.cold, storage_path)
+
+
+if __name__ == "__main__":
+    main()
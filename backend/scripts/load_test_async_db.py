@@ -0,0 +1,140 @@
+"""
+Teste de carga para medir a concorrência dos endpoints async com o banco.
+
+Executa uma carga mista contra uma API em execução:
+- leituras RFID (GET /api/rfid/batches, GET /api/rfid/stats)
+- gravações RFID (POST /api/rfid/tags, lotes novos a cada requisição)
+- sonda de latência (GET /health), que não acessa o banco: se o event loop
+  estiver bloqueado por consultas síncronas, a latência dela sobe junto
+
+Rodar antes e depois da migração para AsyncSession e comparar o relatório:
+
+    python scripts/load_test_async_db.py --base-url http://localhost:8000 \\
+        --email admin@exemplo.com --password *** --concurrency 50 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+# Peso de cada tipo de requisição na carga mista
+WORKLOAD = [
+    ("rfid_batches", 4),
+    ("rfid_stats", 2),
+    ("rfid_tags", 2),
+    ("health", 2),
+]
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/users/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def build_tag_batch(tags_per_batch: int) -> dict:
+    now = datetime.utcnow().isoformat() + "Z"
+    return {
+        "device_id": "LOADTEST-00:00:00:00:00:00",
+        "batch_id": str(uuid.uuid4()),
+        "location": "load-test",
+        "tags": [
+            {"epc": uuid.uuid4().hex[:24].upper(), "rssi": "-50", "timestamp": now}
+            for _ in range(tags_per_batch)
+        ],
+    }
+
+
+async def run_request(client: httpx.AsyncClient, kind: str, tags_per_batch: int) -> int:
+    if kind == "rfid_batches":
+        response = await client.get("/api/rfid/batches", params={"limit": 50})
+    elif kind == "rfid_stats":
+        response = await client.get("/api/rfid/stats")
+    elif kind == "rfid_tags":
+        response = await client.post("/api/rfid/tags", json=build_tag_batch(tags_per_batch))
+    else:
+        response = await client.get("/health")
+    return response.status_code
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    deadline: float,
+    tags_per_batch: int,
+    latencies: dict,
+    errors: dict
+):
+    kinds = [kind for kind, _ in WORKLOAD]
+    weights = [weight for _, weight in WORKLOAD]
+    while time.perf_counter() < deadline:
+        kind = random.choices(kinds, weights)[0]
+        started = time.perf_counter()
+        try:
+            status_code = await run_request(client, kind, tags_per_batch)
+            if status_code >= 400:
+                errors[kind] += 1
+        except httpx.HTTPError:
+            errors[kind] += 1
+            continue
+        latencies[kind].append((time.perf_counter() - started) * 1000)
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_report(latencies: dict, errors: dict, elapsed: float, concurrency: int):
+    total = sum(len(values) for values in latencies.values())
+    print(f"\nConcorrência: {concurrency} | duração: {elapsed:.1f}s | "
+          f"requisições: {total} | throughput: {total / elapsed:.1f} req/s\n")
+    print(f"{'tipo':<14}{'n':>8}{'erros':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'média ms':>10}")
+    for kind, _ in WORKLOAD:
+        values = latencies[kind]
+        if not values:
+            print(f"{kind:<14}{0:>8}{errors[kind]:>8}")
+            continue
+        print(
+            f"{kind:<14}{len(values):>8}{errors[kind]:>8}"
+            f"{percentile(values, 50):>10.1f}{percentile(values, 95):>10.1f}"
+            f"{percentile(values, 99):>10.1f}{statistics.mean(values):>10.1f}"
+        )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Carga mista para endpoints async com banco")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos de carga")
+    parser.add_argument("--tags-per-batch", type=int, default=100)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60.0, limits=limits) as client:
+        token = await login(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            worker(client, deadline, args.tags_per_batch, latencies, errors)
+            for _ in range(args.concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+
+    print_report(latencies, errors, elapsed, args.concurrency)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,23 @@
 """
 Configuração de fixtures para testes
 """
+import os
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import MetaData, create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
 from app.main import app
 from app.core.database import Base, get_db
 
 # Banco de dados de teste em memória
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
+# Banco PostgreSQL descartável para os testes de SQL específico do Postgres
+# (ON CONFLICT, FOR UPDATE). Sem a variável, esses testes são pulados.
+# Ex: TEST_POSTGRES_URL=postgresql://postgres@localhost/app_test
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
@@ -41,3 +48,55 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def table_session():
+    """
+    Fábrica de sessões SQLite em memória com só as tabelas informadas
+    (modelos ou Table). O schema completo não sobe no SQLite por causa dos
+    tipos do Postgres (JSONB); a sessão e a engine são fechadas no teardown.
+
+    Uso: db = table_session(QuoteRequest, IntegrationLog)
+    """
+    opened = []
+
+    def make(*tables) -> Session:
+        engine = create_engine("sqlite://")
+        MetaData().create_all(engine, tables=[getattr(table, "__table__", table) for table in tables])
+        session = Session(engine)
+        opened.append((engine, session))
+        return session
+
+    yield make
+    for engine, session in opened:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def pg_engine():
+    """Engine do banco PostgreSQL de teste, com o schema criado a partir dos modelos"""
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL não configurada (teste requer PostgreSQL)")
+    engine = create_engine(TEST_POSTGRES_URL)
+    # Schema recriado do zero: create_all não altera tabelas de execuções anteriores
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def pg_session(pg_engine):
+    """Sessão no PostgreSQL de teste; as tabelas são esvaziadas ao final de cada teste"""
+    session = Session(pg_engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        tables = ", ".join(f'"{name}"' for name in Base.metadata.tables)
+        with pg_engine.begin() as connection:
+            connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
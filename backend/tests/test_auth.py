@@ -53,3 +53,49 @@ def test_login_invalid_credentials():
 
     assert response.status_code == 401
     assert "detail" in response.json()
+
+
+def test_current_user_dependencies_do_not_block_event_loop(tmp_path):
+    """Testa a dependência síncrona (threadpool) e a variante na AsyncSession"""
+    import asyncio
+    import inspect
+
+    from fastapi import HTTPException
+    from fastapi.security import HTTPAuthorizationCredentials
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.core.auth import get_current_user, get_current_user_async
+    from app.models.user import User
+
+    pytest.importorskip("aiosqlite")
+
+    # def: o FastAPI executa a consulta síncrona fora do event loop
+    assert not inspect.iscoroutinefunction(get_current_user)
+
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'auth.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync_conn: User.__table__.create(sync_conn))
+        async with async_sessionmaker(engine)() as db:
+            db.add_all([
+                User(id=1, email="ativo@example.com", nome="Ativo", hashed_password="x"),
+                User(id=2, email="inativo@example.com", nome="Inativo", hashed_password="x", ativo=False),
+            ])
+            await db.commit()
+
+            def credentials(user_id):
+                return HTTPAuthorizationCredentials(
+                    scheme="Bearer", credentials=create_access_token(data={"sub": str(user_id)})
+                )
+
+            user = await get_current_user_async(credentials(1), db)
+            with pytest.raises(HTTPException) as inactive:
+                await get_current_user_async(credentials(2), db)
+            with pytest.raises(HTTPException) as missing:
+                await get_current_user_async(credentials(3), db)
+        await engine.dispose()
+        return user, inactive.value.status_code, missing.value.status_code
+
+    user, inactive_status, missing_status = asyncio.run(run())
+    assert user.email == "ativo@example.com"
+    assert (inactive_status, missing_status) == (403, 401)
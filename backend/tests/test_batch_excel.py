@@ -0,0 +1,79 @@
+"""
+Testes para o resumo em Excel das cotações em lote
+"""
+from datetime import datetime
+from decimal import Decimal
+
+import openpyxl
+import pytest
+from sqlalchemy import event
+
+from app.models import QuoteRequest, QuoteSource
+from app.models.quote_request import QuoteStatus
+from app.services import batch_result_generator
+from app.services.batch_result_generator import fetch_batch_summary, write_batch_excel
+
+
+@pytest.fixture
+def db(table_session):
+    session = table_session(QuoteRequest, QuoteSource)
+    priced = QuoteRequest(
+        batch_job_id=7, batch_index=0, codigo_item="100200", input_text="Cadeira giratória",
+        valor_medio=Decimal("250.00"), variacao_percentual=Decimal("12.5"),
+        status=QuoteStatus.DONE, created_at=datetime(2026, 1, 20, 9, 30)
+    )
+    empty = QuoteRequest(batch_job_id=7, batch_index=1, input_text="Mesa", status=QuoteStatus.ERROR)
+    session.add_all([empty, priced, QuoteRequest(batch_job_id=8, batch_index=0, input_text="Outro lote")])
+    session.flush()
+    for price, accepted in [("240.00", True), ("999.00", False), ("250.00", True), ("260.00", True), ("270.00", True)]:
+        session.add(QuoteSource(
+            quote_request_id=priced.id, url="https://loja.example.com", price_value=Decimal(price),
+            is_accepted=accepted
+        ))
+    session.commit()
+    return session
+
+
+def test_summary_is_fetched_in_one_query(db):
+    """Testa uma linha por cotação, na ordem do lote, com as N primeiras fontes aceitas"""
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    summary = fetch_batch_summary(db, 7, numero_cotacoes=3)
+
+    assert len(statements) == 1
+    assert list(summary.columns) == [
+        "Código (Material)", "Descrição", "Cotação 1", "Cotação 2", "Cotação 3",
+        "Valor Médio", "Variação (%)", "Nº Cotação", "Data", "Status",
+    ]
+    first, second = summary.to_dict("records")
+    assert first["Código (Material)"] == "100200" and first["Data"] == "20/01/2026 09:30"
+    assert [first[f"Cotação {i}"] for i in (1, 2, 3)] == [Decimal("240.00"), Decimal("250.00"), Decimal("260.00")]
+    assert second["Descrição"] == "Mesa" and second["Status"] == "ERROR"
+
+
+def test_summary_without_created_at(db):
+    """Testa cotação sem data (NULL vira NaT no pandas) com a coluna Data vazia"""
+    db.query(QuoteRequest).filter(QuoteRequest.input_text == "Mesa").update({QuoteRequest.created_at: None})
+    db.commit()
+
+    first, second = fetch_batch_summary(db, 7).to_dict("records")
+
+    assert first["Data"] == "20/01/2026 09:30"
+    assert second["Data"] == ""
+
+
+@pytest.mark.parametrize("xlsxwriter_available", [True, False])
+def test_write_batch_excel(db, tmp_path, monkeypatch, xlsxwriter_available):
+    """Testa a gravação em streaming (xlsxwriter e fallback openpyxl write-only)"""
+    monkeypatch.setattr(batch_result_generator, "XLSXWRITER_AVAILABLE", xlsxwriter_available)
+    path = tmp_path / "resumo.xlsx"
+
+    rows = write_batch_excel(fetch_batch_summary(db, 7), str(path))
+
+    assert rows == 2
+    ws = openpyxl.load_workbook(path)["Resumo"]
+    assert ws["A1"].value == "Código (Material)"
+    assert ws["C2"].value == 240 and ws["F2"].value == 250
+    assert ws["C3"].value is None and ws["B3"].value == "Mesa"
+    assert ws.column_dimensions["B"].width == pytest.approx(60, abs=1)
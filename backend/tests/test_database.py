@@ -0,0 +1,58 @@
+"""
+Testes para a camada de banco assíncrona
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import exc
+
+from app.core import database
+from app.core.database import async_database_url
+
+
+def test_async_database_url():
+    """Testa conversão da DATABASE_URL para o driver assíncrono"""
+    assert async_database_url("postgresql://user:pass@db:5432/app") == "postgresql+asyncpg://user:pass@db:5432/app"
+    assert async_database_url("postgres://user@db/app") == "postgresql+asyncpg://user@db/app"
+    assert async_database_url("postgresql+psycopg2://db/app") == "postgresql+asyncpg://db/app"
+    assert async_database_url("sqlite:////tmp/app.db") == "sqlite+aiosqlite:////tmp/app.db"
+
+    # Driver já assíncrono é mantido
+    assert async_database_url("postgresql+asyncpg://db/app") == "postgresql+asyncpg://db/app"
+
+
+def test_detect_process_role(monkeypatch):
+    """Testa detecção do papel do processo pela linha de comando"""
+    monkeypatch.setattr(database.settings, "PROCESS_ROLE", None)
+
+    monkeypatch.setattr(database.sys, "argv", ["/usr/bin/celery", "-A", "app.tasks.celery_app", "worker"])
+    assert database.detect_process_role() == "worker"
+
+    monkeypatch.setattr(database.sys, "argv", ["/usr/bin/celery", "-A", "app.tasks.celery_app", "beat"])
+    assert database.detect_process_role() == "beat"
+
+    monkeypatch.setattr(database.sys, "argv", ["uvicorn", "app.main:app"])
+    assert database.detect_process_role() == "api"
+
+    # Configuração explícita tem prioridade
+    monkeypatch.setattr(database.settings, "PROCESS_ROLE", "Worker")
+    assert database.detect_process_role() == "worker"
+
+
+def test_instrumented_pool_records_checkout_wait_and_timeouts(monkeypatch):
+    """Testa métricas de checkout do pool instrumentado"""
+    monkeypatch.setitem(database.pool_stats, "sync", database.PoolStats())
+    pool = database.InstrumentedQueuePool(
+        lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05
+    )
+
+    connection = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    connection.close()
+    pool.connect().close()
+
+    snapshot = database.pool_stats["sync"].snapshot()
+    assert snapshot["checkouts"] == 2
+    assert snapshot["checkout_timeouts"] == 1
+    assert snapshot["checkout_wait_max_ms"] >= 0
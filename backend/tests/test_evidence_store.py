@@ -0,0 +1,94 @@
+"""
+Testes para o armazenamento de screenshots endereçado por conteúdo
+"""
+import os
+import time
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.models import File, VehiclePriceBank
+from app.services.evidence_store import (
+    blob_reference_counts,
+    collect_unreferenced_blobs,
+    register_screenshot,
+    staging_path,
+    store_bytes,
+    store_file,
+)
+
+
+@pytest.fixture
+def db(table_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    return table_session(File, VehiclePriceBank)
+
+
+def _age(path: str, hours: int):
+    old = time.time() - hours * 3600
+    os.utime(path, (old, old))
+
+
+def test_same_content_is_stored_once(db):
+    """Testa blob único por conteúdo, tanto de bytes quanto de arquivo já gravado"""
+    sha256, path = store_bytes(b"png-1")
+    assert path.startswith(os.path.join(settings.STORAGE_PATH, "evidence", sha256[:2], sha256[2:4]))
+    assert store_bytes(b"png-1") == (sha256, path)
+
+    staged = staging_path("screenshot_10_0.png")
+    with open(staged, "wb") as f:
+        f.write(b"png-1")
+    assert store_file(staged) == (sha256, path)
+    assert not os.path.exists(staged)
+
+    first = register_screenshot(db, path, sha256=sha256, quote_request_id=10)
+    second = register_screenshot(db, path, quote_request_id=11)
+    assert first.storage_path == second.storage_path and second.sha256 == sha256
+    assert blob_reference_counts(db)[path] == 2
+
+
+def test_gc_removes_only_old_unreferenced_blobs(db):
+    """Testa a coleta: referenciados e recentes ficam, órfãos antigos saem"""
+    _, by_file = store_bytes(b"referenced-by-file")
+    _, by_vehicle = store_bytes(b"referenced-by-vehicle")
+    _, orphan = store_bytes(b"orphan")
+    _, recent_orphan = store_bytes(b"recent-orphan")
+    leftover = staging_path("screenshot_1_0.png")
+    open(leftover, "wb").close()
+
+    register_screenshot(db, by_file)
+    db.add(VehiclePriceBank(
+        codigo_fipe="001480-2", brand_id=21, brand_name="Fiat", model_id=9001, model_name="Toro",
+        year_id="2020-5", year_model=2020, fuel_type="Flex", fuel_code=5, vehicle_type="cars",
+        vehicle_name="Fiat Toro 2020", price_value=80000, reference_month="janeiro de 2026",
+        reference_date=date(2026, 1, 1),
+        screenshot_path=by_vehicle, has_screenshot=True
+    ))
+    db.commit()
+    for path in (by_file, by_vehicle, orphan, leftover):
+        _age(path, 48)
+
+    result = collect_unreferenced_blobs(db, grace_hours=24)
+
+    assert result == {"scanned": 5, "removed": 2}
+    assert os.path.exists(by_file) and os.path.exists(by_vehicle) and os.path.exists(recent_orphan)
+    assert not os.path.exists(orphan) and not os.path.exists(leftover)
+
+
+def test_reused_blob_is_not_collected_before_registration(db):
+    """Testa que reaproveitar um blob antigo renova o mtime e o protege da coleta"""
+    _, from_bytes = store_bytes(b"png-antigo")
+    _age(from_bytes, 48)
+    assert store_bytes(b"png-antigo")[1] == from_bytes
+
+    _, from_file = store_bytes(b"png-playwright")
+    _age(from_file, 48)
+    staged = staging_path("screenshot_20_0.png")
+    with open(staged, "wb") as f:
+        f.write(b"png-playwright")
+    assert store_file(staged)[1] == from_file
+
+    # Coleta roda antes de register_screenshot: nenhum dos dois blobs sai
+    assert collect_unreferenced_blobs(db, grace_hours=24)["removed"] == 0
+    assert os.path.exists(from_bytes) and os.path.exists(from_file)
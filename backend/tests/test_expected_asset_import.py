@@ -0,0 +1,52 @@
+"""
+Testes para importação colunar de bens esperados
+"""
+import pandas as pd
+import pytest
+
+from app.services.expected_asset_import import normalize_columns, prepare_expected_assets
+
+
+def test_normalize_columns_mapping():
+    """Testa mapeamento de colunas da planilha"""
+    df = pd.DataFrame({" Tombamento ": ["1"], "DESCRICAO": ["Mesa"], "RFID": ["E200"]})
+    df = normalize_columns(df)
+    assert list(df.columns) == ["asset_code", "description", "rfid_code"]
+
+
+def test_normalize_columns_missing_required():
+    """Testa erro quando falta coluna obrigatória"""
+    with pytest.raises(ValueError):
+        normalize_columns(pd.DataFrame({"tombamento": ["1"]}))
+
+
+def test_prepare_expected_assets_error_report():
+    """Testa validação vetorizada e relatório de erros por linha"""
+    df = pd.DataFrame({
+        "asset_code": ["001", "002", " ", "001", "x" * 60],
+        "description": ["Mesa", "Cadeira", "Armário", "Mesa nova", "Estante"],
+    })
+
+    prepared, errors = prepare_expected_assets(df)
+
+    # "001" duplicado: vale a última ocorrência (linha 5)
+    assert prepared["asset_code"].tolist() == ["002", "001"]
+    assert prepared.loc[prepared["asset_code"] == "001", "description"].item() == "Mesa nova"
+
+    assert [e["row"] for e in errors] == [2, 4, 6]
+    assert errors[1]["asset_code"] is None
+
+
+def test_prepare_expected_assets_numeric_codes_and_flags():
+    """Testa códigos numéricos e campos do sistema externo"""
+    df = pd.DataFrame.from_records([
+        {"asset_code": 123.0, "description": "A", "is_written_off": "S", "extra_data": {"CD_BEM_PERM": 123}},
+        {"asset_code": 124.0, "description": None, "is_written_off": None, "extra_data": None},
+    ])
+
+    prepared, errors = prepare_expected_assets(df, first_row_number=1)
+
+    assert errors == []
+    assert prepared["asset_code"].tolist() == ["123", "124"]
+    assert prepared["is_written_off"].tolist() == [True, False]
+    assert prepared["extra_data"].tolist() == ['{"CD_BEM_PERM": 123}', "{}"]
@@ -0,0 +1,253 @@
+"""
+Testes para a carga paginada de bens, o envio em lotes ao ASI e a
+sincronização dos dados mestres
+"""
+import asyncio
+import json
+from functools import partial
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.models.external_system import (
+    ExternalSystem,
+    InventoryMasterSyncLog,
+    InventoryMasterUG,
+    InventoryMasterUL,
+)
+from app.services import external_system_sync
+from app.services.external_system_sync import ExternalSystemSyncService
+
+
+def make_service(monkeypatch, handler, double_json_encoding=False):
+    """Cria o serviço com um transporte HTTP simulado"""
+    system = SimpleNamespace(
+        full_url="http://asi.local",
+        auth_type=None,
+        double_json_encoding=double_json_encoding,
+        endpoint_load_assets="/coletorweb/storages/create",
+        timeout_seconds=5,
+        retry_attempts=1,
+    )
+    monkeypatch.setattr(
+        external_system_sync.httpx, "AsyncClient",
+        partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    )
+    return ExternalSystemSyncService(db=None, system=system)
+
+
+def collect_pages(service, **kwargs):
+    async def run():
+        return [page async for page in service.iter_asset_pages("LEV001", **kwargs)]
+    return asyncio.run(run())
+
+
+def asset(code):
+    return {"CD_BEM_PERM": code, "DS_BEM": f"Bem {code}", "ST_BAIXADO": "N", "VL_BEM": 10.5}
+
+
+def test_iter_asset_pages_paginates_with_offset(monkeypatch):
+    """Testa paginação por $offset/$limit até a última página incompleta"""
+    assets = [asset(str(i)) for i in range(5)]
+    requests = []
+
+    def handler(request):
+        payload = json.loads(request.content)
+        requests.append(payload)
+        start = payload["$offset"]
+        return httpx.Response(200, json={"itens": assets[start:start + payload["$limit"]]})
+
+    service = make_service(monkeypatch, handler)
+    pages = collect_pages(service, page_size=2)
+
+    assert [p["offset"] for p in pages] == [0, 2, 4]
+    assert [p["next_offset"] for p in pages] == [2, 4, 5]
+    assert [item["asset_code"] for p in pages for item in p["items"]] == ["0", "1", "2", "3", "4"]
+    assert pages[0]["items"][0]["extra_data"]["VL_BEM"] == 10.5
+    assert len(requests) == 3
+
+
+def test_iter_asset_pages_resume_and_max_items(monkeypatch):
+    """Testa retomada a partir de um offset e limite total de itens"""
+    assets = [asset(str(i)) for i in range(10)]
+
+    def handler(request):
+        payload = json.loads(request.content)
+        start = payload["$offset"]
+        return httpx.Response(200, json=assets[start:start + payload["$limit"]])
+
+    service = make_service(monkeypatch, handler)
+    pages = collect_pages(service, page_size=3, start_offset=4, max_items=4)
+
+    assert [item["asset_code"] for p in pages for item in p["items"]] == ["4", "5", "6", "7"]
+
+
+def test_iter_asset_pages_stops_when_offset_ignored(monkeypatch):
+    """Testa que um servidor que ignora $offset não causa laço infinito"""
+    def handler(request):
+        return httpx.Response(200, json={"bens": [asset("1"), asset("2")]})
+
+    service = make_service(monkeypatch, handler)
+    pages = collect_pages(service, page_size=2)
+
+    assert len(pages) == 1
+
+
+def test_iter_asset_pages_double_json_encoding(monkeypatch):
+    """Testa resposta com double JSON encoding (lida por inteiro)"""
+    def handler(request):
+        body = json.dumps(json.dumps({"itens": [asset("1"), {"DS_BEM": "sem código"}]}))
+        return httpx.Response(200, content=body.encode())
+
+    service = make_service(monkeypatch, handler, double_json_encoding=True)
+    pages = collect_pages(service, page_size=10)
+
+    assert pages[0]["received"] == 2
+    assert [item["asset_code"] for item in pages[0]["items"]] == ["1"]
+
+
+def make_upload_service(monkeypatch, fail_chunks):
+    """Serviço com lotes e requisições de upload simulados"""
+    service = make_service(monkeypatch, lambda request: httpx.Response(500))
+    service.system.endpoint_upload = None
+    sent = []
+    saved = []
+
+    def iter_chunks(session, chunk_size, include_photos):
+        items = [{"C01": str(i)} for i in range(5)]
+        for index, start in enumerate(range(0, len(items), chunk_size)):
+            yield index, items[start:start + chunk_size], {}
+
+    async def upload_request(endpoint, data, compress=False):
+        codes = [item["C01"] for item in data["C12"]]
+        if codes[0] in fail_chunks:
+            raise ConnectionError("timeout")
+        sent.append(codes)
+        return {"C03": f"T{codes[0]}", "C14": "LEV"}
+
+    monkeypatch.setattr(service, "_iter_upload_chunks", iter_chunks)
+    monkeypatch.setattr(service, "_make_upload_request", upload_request)
+    monkeypatch.setattr(service, "_save_upload_state", lambda session_id, state: saved.append(json.loads(json.dumps(state))))
+    return service, sent, saved
+
+
+def make_session(upload_state=None):
+    return SimpleNamespace(
+        id=1, started_at=None, completed_at=None, collector_id=None, org_code=None,
+        ug_code=None, ua_code=None, ul_code=None, objective_code=None,
+        responsible_code=None, upload_state=upload_state
+    )
+
+
+def test_upload_inventory_results_resumes_failed_chunks(monkeypatch):
+    """Testa envio em lotes com retomada apenas dos lotes que falharam"""
+    fail_chunks = {"2"}
+    service, sent, saved = make_upload_service(monkeypatch, fail_chunks)
+
+    result = asyncio.run(service.upload_inventory_results(make_session(), chunk_size=2, max_concurrency=2))
+
+    assert result["success"] is False
+    assert result["chunks_failed"] == 1
+    assert sorted(sent) == [["0", "1"], ["4"]]
+    state = saved[-1]
+    assert state["status"] == "partial"
+    assert state["chunks"]["1"]["status"] == "failed"
+
+    fail_chunks.clear()
+    sent.clear()
+    result = asyncio.run(service.upload_inventory_results(make_session(state), chunk_size=2))
+
+    assert result["success"] is True
+    assert sent == [["2", "3"]]
+    assert result["items_sent"] == 5
+    assert result["transmission_number"] == "T4"
+    assert saved[-1]["chunks"]["1"]["attempts"] == 2
+
+
+def test_upload_inventory_results_cancels_chunks_on_error(monkeypatch):
+    """Testa que um erro ao montar os lotes cancela os envios ainda em andamento"""
+    service, sent, saved = make_upload_service(monkeypatch, set())
+
+    def iter_chunks(session, chunk_size, include_photos):
+        yield 0, [{"C01": "0"}], {}
+        raise RuntimeError("falha ao ler bens")
+
+    async def upload_request(endpoint, data, compress=False):
+        await asyncio.sleep(10)
+        sent.append(data["C12"])
+
+    monkeypatch.setattr(service, "_iter_upload_chunks", iter_chunks)
+    monkeypatch.setattr(service, "_make_upload_request", upload_request)
+
+    async def run():
+        result = await service.upload_inventory_results(make_session(), chunk_size=1, max_concurrency=2)
+        # Nenhuma tarefa de envio sobrevive ao retorno
+        return result, [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+
+    result, leftover = asyncio.run(run())
+
+    assert result["success"] is False
+    assert sent == []
+    assert leftover == []
+    assert saved[-1]["status"] == "failed"
+
+
+@pytest.fixture
+def master_db(pg_session):
+    """Upsert com ON CONFLICT pela constraint nomeada: requer PostgreSQL"""
+    pg_session.add(ExternalSystem(id=1, name="ASI", host="http://asi.local", full_url="http://asi.local"))
+    pg_session.commit()
+    return pg_session
+
+
+def sync_master(db, monkeypatch, method, items):
+    """Executa a sincronização com o payload do ASI simulado"""
+    service = ExternalSystemSyncService(db=db, system=db.get(ExternalSystem, 1))
+
+    async def fake_request(endpoint, *args, **kwargs):
+        return {"itens": items}
+
+    monkeypatch.setattr(service, "_make_request", fake_request)
+    return asyncio.run(getattr(service, method)())
+
+
+def test_bulk_upsert_inserts_skips_unchanged_and_updates(master_db, monkeypatch):
+    """Testa inserção, linha igual ignorada (hash) e linha alterada atualizada"""
+    first = sync_master(master_db, monkeypatch, "sync_ugs", [
+        {"C01": "UG1", "C02": "Reitoria"},
+        {"C01": "UG2", "C02": "Campus Norte"},
+    ])
+    assert (first["created"], first["updated"], first["unchanged"]) == (2, 0, 0)
+    hashes = dict(master_db.query(InventoryMasterUG.code, InventoryMasterUG.content_hash).all())
+
+    second = sync_master(master_db, monkeypatch, "sync_ugs", [
+        {"C01": "UG1", "C02": "Reitoria"},
+        {"C01": "UG2", "C02": "Campus Sul"},
+    ])
+    assert (second["created"], second["updated"], second["unchanged"]) == (0, 1, 1)
+
+    master_db.expire_all()
+    rows = {ug.code: ug for ug in master_db.query(InventoryMasterUG).all()}
+    assert len(rows) == 2
+    assert rows["UG2"].name == "Campus Sul" and rows["UG2"].content_hash != hashes["UG2"]
+    assert rows["UG1"].content_hash == hashes["UG1"]
+
+    log = master_db.query(InventoryMasterSyncLog).order_by(InventoryMasterSyncLog.id.desc()).first()
+    assert (log.items_created, log.items_updated, log.items_unchanged) == (0, 1, 1)
+
+
+def test_sync_uls_resolves_parent_ug_ids(master_db, monkeypatch):
+    """Testa a UG pai resolvida pelo mapa código -> id carregado uma única vez"""
+    sync_master(master_db, monkeypatch, "sync_ugs", [{"C01": "UG1", "C02": "Reitoria"}])
+    ug_id = master_db.query(InventoryMasterUG.id).filter(InventoryMasterUG.code == "UG1").scalar()
+
+    result = sync_master(master_db, monkeypatch, "sync_uls", [
+        {"C01": "UL1", "C02": "Bloco A", "C03": "UG1"},
+        {"C01": "UL2", "C02": "Bloco B", "C03": "UG9"},  # UG desconhecida
+        {"C01": "UL3", "C02": "Bloco C"},
+    ])
+
+    assert result["created"] == 3
+    uls = dict(master_db.query(InventoryMasterUL.code, InventoryMasterUL.ug_id).all())
+    assert uls == {"UL1": ug_id, "UL2": None, "UL3": None}
@@ -0,0 +1,117 @@
+"""
+Testes para o catálogo FIPE espelhado localmente
+"""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+
+from app.models import FipeCatalogReference, FipeCatalogModelYear, VehiclePriceBank
+from app.services.fipe_catalog import FipeCatalog, refresh_fipe_catalog
+from app.services.fipe_client import FipeClient
+
+BASE = "/api/v2/cars"
+
+PRICE = {
+    "price": "R$ 80.000,00", "brand": "Fiat", "model": "Toro Freedom 1.8", "modelYear": 2020,
+    "fuel": "Flex", "codeFipe": "001480-2", "referenceMonth": "janeiro de 2026",
+    "vehicleType": 1, "fuelAcronym": "F",
+}
+
+
+class FakeFipeApi:
+    """API FIPE em memória; registra os caminhos chamados"""
+
+    def __init__(self, reference_code: int = 320):
+        self.reference_code = reference_code
+        self.calls = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append(path)
+        routes = {
+            "/api/v2/references": [{"code": str(self.reference_code), "month": "janeiro de 2026 "}],
+            f"{BASE}/brands": [{"code": "21", "name": "Fiat"}],
+            f"{BASE}/brands/21/years": [
+                {"code": "2021-5", "name": "2021 Flex"},
+                {"code": "2020-5", "name": "2020 Flex"},
+            ],
+            f"{BASE}/brands/21/years/2021-5/models": [{"code": "9001", "name": "Toro Freedom 1.8"}],
+            f"{BASE}/brands/21/years/2020-5/models": [
+                {"code": "9001", "name": "Toro Freedom 1.8"},
+                {"code": "7002", "name": "Argo Drive 1.0"},
+            ],
+            f"{BASE}/brands/21/models/9001/years/2020-5": PRICE,
+        }
+        if path not in routes:
+            return httpx.Response(404)
+        return httpx.Response(200, json=routes[path])
+
+
+@pytest.fixture
+def db(pg_session):
+    return pg_session
+
+
+def _refresh(db, api: FakeFipeApi, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api.handler)) as client:
+            return await refresh_fipe_catalog(db, "cars", http_client=client, **kwargs)
+    return asyncio.run(run())
+
+
+def test_refresh_mirrors_catalog_only_when_reference_changes(db):
+    """Testa carga do espelho e que a mesma referência não gera nova carga"""
+    api = FakeFipeApi()
+    result = _refresh(db, api)
+    assert result["updated"] and result["full"]
+
+    reference = db.get(FipeCatalogReference, "cars")
+    assert reference.reference_month == "janeiro de 2026"
+    assert reference.models_count == 2
+    assert db.query(FipeCatalogModelYear).count() == 3
+
+    api.calls.clear()
+    assert _refresh(db, api)["updated"] is False
+    assert api.calls == ["/api/v2/references"]
+
+
+def test_client_resolves_catalog_locally(db):
+    """Testa que marca, ano e modelo saem do espelho e só o preço vai à API"""
+    api = FakeFipeApi()
+    _refresh(db, api)
+    api.calls.clear()
+
+    async def search():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api.handler)) as client:
+            fipe_client = FipeClient(catalog=FipeCatalog(db), http_client=client)
+            return await fipe_client.search_vehicle_optimized(
+                vehicle_type="cars",
+                busca_marca={"termo_principal": "Fiat"},
+                busca_modelo={"termo_principal": "Toro Freedom"},
+                ano_modelo="2020",
+                combustivel="flex"
+            )
+
+    result = asyncio.run(search())
+    assert result.success
+    assert result.model_id == "9001" and result.year_id == "2020-5"
+    assert result.api_calls == 1
+    assert api.calls == [f"{BASE}/brands/21/models/9001/years/2020-5"]
+
+    # Veículo já no Banco de Preços com a referência vigente: nenhuma chamada
+    db.add(VehiclePriceBank(
+        codigo_fipe="001480-2", brand_id=21, brand_name="Fiat", model_id=9001,
+        model_name="Toro Freedom 1.8", year_id="2020-5", year_model=2020, fuel_type="Flex",
+        fuel_code=5, vehicle_type="cars", vehicle_name="Fiat Toro Freedom 1.8 2020",
+        price_value=Decimal("80000"), reference_month="janeiro de 2026",
+        reference_date=date(2026, 1, 1), api_response_json=PRICE
+    ))
+    db.commit()
+    api.calls.clear()
+
+    result = asyncio.run(search())
+    assert result.success and result.api_calls == 0
+    assert api.calls == []
@@ -0,0 +1,69 @@
+"""
+Testes para a sessão reutilizável de screenshots FIPE (fila e recuperação de página)
+"""
+import asyncio
+
+from playwright.async_api import Error as PlaywrightError
+
+from app.services.fipe_screenshot import (
+    FipeScreenshotService,
+    ResultadoScreenshot,
+    SolicitacaoScreenshot,
+    TipoVeiculo,
+)
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeSessionService(FipeScreenshotService):
+    """Sessão sem navegador: registra consultas e recuperações"""
+
+    def __init__(self, falhas):
+        super().__init__()
+        self.page = FakePage()
+        self.falhas = list(falhas)
+        self.consultas = []
+        self.recuperacoes = 0
+
+    async def _executar_consulta(self, codigo_fipe, ano_modelo, combustivel, tipo, quote_id):
+        self.consultas.append((codigo_fipe, tipo))
+        if self.falhas:
+            raise self.falhas.pop(0)
+        self._portal_carregado = True
+        self._tipo_ativo = tipo
+        return ResultadoScreenshot(f"/tmp/{codigo_fipe}.png", True, {"codigo_fipe": codigo_fipe})
+
+    async def _recuperar_pagina(self):
+        self.recuperacoes += 1
+
+
+def test_detached_page_is_recovered_and_retried():
+    """Testa que erro de página desanexada reabre o portal e repete a consulta"""
+    service = FakeSessionService([PlaywrightError("Element is not attached to the DOM")])
+
+    resultado = asyncio.run(service.capture_fipe_result("001480-2", 2020, "Flex", "motorcycles"))
+
+    assert resultado.sucesso
+    assert service.recuperacoes == 1
+    assert service.consultas == [("001480-2", TipoVeiculo.MOTO)] * 2
+
+
+def test_batch_continues_after_failure_and_resets_portal():
+    """Testa que a fila segue após uma falha comum, que força recarregar o portal"""
+    service = FakeSessionService([ValueError("Ano 1990 nao disponivel")])
+
+    resultados = asyncio.run(service.capture_batch([
+        SolicitacaoScreenshot("000001-1", 1990, "Gasolina"),
+        SolicitacaoScreenshot("000002-2", 2020, "Diesel", vehicle_type="trucks"),
+    ]))
+
+    assert [r.sucesso for r in resultados] == [False, True]
+    assert "1990" in resultados[0].erro
+    assert service.recuperacoes == 0
+    assert service._tipo_ativo == TipoVeiculo.CAMINHAO
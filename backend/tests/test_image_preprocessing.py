@@ -0,0 +1,81 @@
+"""
+Testes para o preparo das imagens de entrada antes do OCR pela IA
+"""
+import io
+
+import pytest
+from PIL import Image as PILImage
+
+from app.core.config import settings
+from app.services import image_preprocessing
+from app.services.image_preprocessing import prepare_image, prepare_input_image
+
+
+def _photo(width: int, height: int, fmt: str = "JPEG", orientation: int = 1) -> bytes:
+    image = PILImage.new("RGB", (width, height), (200, 120, 40))
+    exif = PILImage.Exif()
+    exif[0x0112] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, exif=exif.tobytes() if fmt == "JPEG" else b"")
+    return buffer.getvalue()
+
+
+def _size(data: bytes):
+    with PILImage.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+@pytest.mark.parametrize("provider,expected", [
+    ("anthropic", (1238, 928)),   # ~1,15 MP
+    ("openai", (1024, 768)),      # 768 px no menor lado
+])
+def test_photo_is_oriented_and_downscaled(provider, expected):
+    """Testa a rotação pelo EXIF (retrato 3000x4000 -> paisagem) e a redução por provedor"""
+    prepared = prepare_image(_photo(3000, 4000, orientation=6), provider=provider)
+
+    assert prepared.media_type == "image/jpeg"
+    assert _size(prepared.data) == expected
+    assert len(prepared.data) < prepared.original_size_bytes
+
+
+def test_small_image_keeps_bytes_and_real_media_type():
+    """Testa que imagem já nos limites é enviada como veio, com o media_type real"""
+    data = _photo(800, 600, fmt="PNG")
+
+    prepared = prepare_image(data, provider="anthropic")
+
+    assert prepared.data == data
+    assert prepared.media_type == "image/png"
+
+
+def test_prepared_image_is_cached_by_sha256(tmp_path, monkeypatch):
+    """Testa que recotação/retentativa reaproveita o preparo sem reler o original"""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    source = tmp_path / "upload.jpg"
+    source.write_bytes(_photo(4000, 3000))
+
+    first = prepare_input_image(str(source), "ab" * 32, provider="anthropic")
+    source.unlink()
+    second = prepare_input_image(str(source), "ab" * 32, provider="anthropic")
+
+    assert not first.cached and second.cached
+    assert second.data == first.data and second.media_type == "image/jpeg"
+    assert image_preprocessing.purge_prepared_images(max_age_days=-1) == 1
+
+
+def test_cache_is_versioned_and_skips_fallback(tmp_path, monkeypatch):
+    """Testa que mudar a qualidade invalida o cache e que o original não preparado não é guardado"""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    source = tmp_path / "upload.jpg"
+    source.write_bytes(_photo(4000, 3000))
+
+    prepare_input_image(str(source), "ab" * 32, provider="anthropic")
+    monkeypatch.setattr(settings, "AI_IMAGE_JPEG_QUALITY", settings.AI_IMAGE_JPEG_QUALITY - 10)
+    assert not prepare_input_image(str(source), "ab" * 32, provider="anthropic").cached
+    assert prepare_input_image(str(source), "ab" * 32, provider="anthropic").cached
+
+    heic = tmp_path / "upload.heic"
+    heic.write_bytes(b"ftypheic-nao-suportado")
+    prepared = prepare_input_image(str(heic), "cd" * 32, provider="anthropic")
+    assert prepared.fallback and prepared.data == heic.read_bytes()
+    assert not prepare_input_image(str(heic), "cd" * 32, provider="anthropic").cached
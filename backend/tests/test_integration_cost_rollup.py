@@ -0,0 +1,137 @@
+"""
+Testes para o consolidado diário de custos de integração
+"""
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+
+from app.models import Client, IntegrationLog, IntegrationCostDaily, Project, QuoteRequest
+from app.services.integration_cost_rollup import (
+    rebuild_cost_rollup,
+    record_integration_cost,
+    record_integration_costs,
+)
+
+
+@pytest.fixture
+def db(pg_session):
+    pg_session.add(Project(id=7, client=Client(nome="Prefeitura"), nome="Inventário 2026"))
+    pg_session.add(QuoteRequest(id=1, project_id=7, input_text="Cadeira"))
+    pg_session.commit()
+    return pg_session
+
+
+def _at(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def _ai_log(tokens: int, cost: str, created_at=None) -> IntegrationLog:
+    return IntegrationLog(
+        quote_request_id=1,
+        integration_type="anthropic",
+        input_tokens=tokens,
+        output_tokens=0,
+        total_tokens=tokens,
+        estimated_cost_usd=Decimal(cost),
+        created_at=created_at
+    )
+
+
+def test_record_integration_cost_increments_daily_row(db):
+    """Testa incremento do consolidado a cada chamada registrada"""
+    for log in [
+        _ai_log(1000, "0.003"),
+        _ai_log(500, "0.0015"),
+        IntegrationLog(quote_request_id=1, integration_type="serpapi", api_used="google_shopping"),
+        IntegrationLog(quote_request_id=1, integration_type="serpapi", api_used="google_immersive_product"),
+        IntegrationLog(quote_request_id=1, integration_type="search_log"),
+    ]:
+        db.add(log)
+        record_integration_cost(db, log)
+    db.commit()
+
+    rows = {row.integration_type: row for row in db.query(IntegrationCostDaily).all()}
+    assert set(rows) == {"anthropic", "serpapi"}  # search_log não tem custo
+
+    assert rows["anthropic"].call_count == 2
+    assert rows["anthropic"].total_tokens == 1500
+    assert rows["anthropic"].cost_usd == Decimal("0.0045")
+    assert rows["anthropic"].project_id == 7
+
+    assert rows["serpapi"].call_count == 2
+    assert rows["serpapi"].shopping_calls == 1
+    assert rows["serpapi"].immersive_calls == 1
+
+
+def test_rebuild_cost_rollup_matches_logs(db):
+    """Testa reconstrução do consolidado por dia a partir dos logs"""
+    db.add_all([
+        _ai_log(1000, "0.003", _at(2025, 1, 10, 9)),
+        _ai_log(2000, "0.006", _at(2025, 1, 10, 15)),
+        _ai_log(100, "0.0003", _at(2025, 1, 11, 8)),
+    ])
+    db.commit()
+
+    assert rebuild_cost_rollup(db) == 2
+    db.commit()
+
+    rows = {str(row.day): row for row in db.query(IntegrationCostDaily).all()}
+    assert rows["2025-01-10"].call_count == 2
+    assert rows["2025-01-10"].total_tokens == 3000
+    assert rows["2025-01-11"].cost_usd == Decimal("0.0003")
+
+    # Reconstruir um intervalo não duplica linhas
+    rebuild_cost_rollup(db, start_day=datetime(2025, 1, 11).date())
+    db.commit()
+    assert db.query(IntegrationCostDaily).count() == 2
+
+
+def test_record_integration_costs_uses_log_day(db):
+    """Testa que logs gravados depois (ex: drenados do buffer) caem no dia da chamada"""
+    logs = [
+        _ai_log(1000, "0.003", _at(2025, 1, 10, 23, 50)),
+        _ai_log(500, "0.0015", _at(2025, 1, 11, 0, 10)),
+    ]
+    db.add_all(logs)
+    db.flush()
+    record_integration_costs(db, logs)
+    db.commit()
+
+    rows = {str(row.day): row for row in db.query(IntegrationCostDaily).all()}
+    assert rows["2025-01-10"].total_tokens == 1000
+    assert rows["2025-01-11"].total_tokens == 500
+    assert rows["2025-01-10"].first_call_at == _at(2025, 1, 10, 23, 50)
+
+
+def test_rebuild_cost_rollup_keeps_uncommitted_increment(db):
+    """Testa que a reconstrução espera a gravação em andamento e não perde o seu incremento"""
+    db.add_all([_ai_log(1000, "0.003", _at(2025, 1, 10, 9)), _ai_log(2000, "0.006", _at(2025, 1, 10, 15))])
+    db.commit()
+
+    # integration_logger gravando o mesmo dia, ainda sem commit
+    writer = Session(db.get_bind())
+    live = _ai_log(500, "0.0015", _at(2025, 1, 10, 18))
+    writer.add(live)
+    writer.flush()
+    record_integration_costs(writer, [live])
+
+    def rebuild():
+        with Session(db.get_bind()) as rebuild_db:
+            rebuild_cost_rollup(rebuild_db, start_day=datetime(2025, 1, 10).date())
+            rebuild_db.commit()
+
+    thread = threading.Thread(target=rebuild)
+    thread.start()
+    time.sleep(0.3)
+    writer.commit()
+    writer.close()
+    thread.join(timeout=10)
+
+    row = db.query(IntegrationCostDaily).one()
+    assert row.call_count == 3
+    assert row.total_tokens == 3500
+    assert row.cost_usd == Decimal("0.0105")
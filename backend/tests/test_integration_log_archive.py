@@ -0,0 +1,75 @@
+"""
+Testes para o arquivamento dos payloads de logs de integração
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import JSON, text
+
+from app.core.config import settings
+from app.models import IntegrationLog, QuoteRequest
+from app.services.integration_log_archive import archive_integration_payloads, load_archived_payloads
+from app.services.integration_logger import _serpapi_call_record, _log_from_record
+
+
+@pytest.fixture
+def db(pg_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    pg_session.add(QuoteRequest(id=1, input_text="Cadeira"))
+    pg_session.commit()
+    return pg_session
+
+
+def _log(created_at: datetime, prompt: str) -> IntegrationLog:
+    return IntegrationLog(
+        quote_request_id=1,
+        integration_type="anthropic",
+        total_tokens=100,
+        request_data={"prompt": prompt},
+        response_summary={"ok": True},
+        created_at=created_at
+    )
+
+
+def test_archive_moves_old_payloads_and_rehydrates(db, tmp_path):
+    """Testa que payloads antigos vão para arquivos por mês e voltam sob demanda"""
+    now = datetime.now(timezone.utc)
+    db.add_all([
+        _log(now - timedelta(days=200), "prompt antigo ção"),
+        _log(now - timedelta(days=120), "prompt intermediário"),
+        _log(now - timedelta(days=1), "prompt recente"),
+    ])
+    db.commit()
+
+    assert archive_integration_payloads(db, older_than_days=90, batch_size=1) == 2
+    assert archive_integration_payloads(db, older_than_days=90) == 0
+
+    logs = db.query(IntegrationLog).order_by(IntegrationLog.id).all()
+    old, middle, recent = logs
+    assert old.request_data is None and old.payload_archive
+    assert old.payload_archive.split("/")[0] != middle.payload_archive.split("/")[0]  # meses diferentes
+    assert recent.payload_archive is None
+    assert recent.request_data == {"prompt": "prompt recente"}
+    assert old.total_tokens == 100  # colunas de custo permanecem na tabela
+
+    payloads = load_archived_payloads(logs)
+    assert set(payloads) == {old.id, middle.id}
+    assert payloads[old.id]["request_data"] == {"prompt": "prompt antigo ção"}
+    assert payloads[middle.id]["response_summary"] == {"ok": True}
+
+
+def test_logs_without_payload_are_not_archived(db, tmp_path):
+    """Testa que payload ausente é NULL SQL (não JSON 'null') e não gera arquivo"""
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    record = _serpapi_call_record(1, "google_shopping", "", "Busca", None, None, None)
+    record["created_at"] = old.isoformat()
+    log = _log_from_record(record)
+    legacy = IntegrationLog(quote_request_id=1, integration_type="serpapi", created_at=old,
+                            request_data=JSON.NULL, response_summary=JSON.NULL)
+    db.add_all([log, legacy])
+    db.commit()
+
+    stored = db.execute(text("SELECT count(*) FROM integration_logs WHERE request_data IS NULL")).scalar()
+    assert stored == 1
+    assert archive_integration_payloads(db, older_than_days=90) == 0
+    assert not (tmp_path / "integration_log_archive").exists()
@@ -0,0 +1,169 @@
+"""
+Testes para o buffer de logs de integração (gravação em lote com fallback Redis)
+"""
+import json
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Client, IntegrationLog, IntegrationCostDaily, Project, QuoteRequest
+from app.models.quote_request import QuoteStatus
+from app.services import integration_logger
+from app.services.integration_logger import IntegrationLogBuffer, drain_pending_integration_logs
+
+
+class FakeRedis:
+    """Subconjunto dos comandos de lista usados pelo buffer"""
+
+    def __init__(self, idle: int = 0):
+        self.lists = {}
+        self.idle = idle
+
+    def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value.encode())
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def delete(self, key):
+        self.lists.pop(key, None)
+
+    def scan_iter(self, match):
+        prefix = match.rstrip("*")
+        return [key.encode() for key in list(self.lists) if key.startswith(prefix)]
+
+    def object(self, subcommand, key):
+        return self.idle
+
+
+@pytest.fixture(autouse=True)
+def redis_circuit_closed(monkeypatch):
+    monkeypatch.setattr(integration_logger, "_redis_down_until", 0.0)
+
+
+@pytest.fixture
+def session_factory(pg_session, monkeypatch):
+    pg_session.add(Project(id=7, client=Client(nome="Prefeitura"), nome="Inventário 2026"))
+    pg_session.add(QuoteRequest(id=1, project_id=7, input_text="Cadeira", status=QuoteStatus.PROCESSING))
+    pg_session.commit()
+    factory = sessionmaker(bind=pg_session.get_bind())
+    monkeypatch.setattr(integration_logger, "SessionLocal", factory)
+    return factory
+
+
+def test_buffer_writes_only_on_flush(session_factory):
+    """Testa que os logs ficam em memória/Redis até o flush, gravados em lote"""
+    redis_client = FakeRedis()
+    buffer = IntegrationLogBuffer(1, redis_client=redis_client)
+
+    buffer.log_ai_call(model="gpt-4o", input_tokens=1000, output_tokens=500, activity="Análise", integration_type="openai")
+    for _ in range(3):
+        buffer.log_serpapi_call(api_used="google_immersive_product", search_url="", activity="Busca de loja")
+
+    with session_factory() as db:
+        assert db.query(IntegrationLog).count() == 0
+    assert len(redis_client.lists[buffer.key]) == 4
+
+    assert buffer.flush() == 4
+    assert buffer.flush() == 0
+    assert buffer.key not in redis_client.lists
+
+    with session_factory() as db:
+        assert db.query(IntegrationLog).count() == 4
+        rollup = {row.integration_type: row for row in db.query(IntegrationCostDaily).all()}
+        assert rollup["serpapi"].immersive_calls == 3
+        assert rollup["openai"].total_tokens == 1500
+        assert rollup["openai"].cost_usd == Decimal("0.0075")
+
+
+def test_buffer_recovers_pending_records(session_factory):
+    """Testa que um novo processamento recarrega os logs de um worker interrompido"""
+    redis_client = FakeRedis()
+    crashed = IntegrationLogBuffer(1, redis_client=redis_client)
+    crashed.log_serpapi_call(api_used="google_shopping", search_url="", activity="Busca inicial")
+
+    resumed = IntegrationLogBuffer(1, redis_client=redis_client)
+    resumed.log_serpapi_call(api_used="google_immersive_product", search_url="", activity="Busca de loja")
+    assert len(resumed) == 2
+    assert resumed.flush() == 2
+
+
+def test_buffer_keeps_records_when_database_fails(session_factory, monkeypatch):
+    """Testa que uma falha no banco mantém os registros para o próximo flush"""
+    redis_client = FakeRedis()
+    buffer = IntegrationLogBuffer(1, redis_client=redis_client)
+    buffer.log_serpapi_call(api_used="google_shopping", search_url="", activity="Busca inicial")
+
+    monkeypatch.setattr(integration_logger, "persist_log_records", lambda records: False)
+    assert buffer.flush() == 0
+    assert len(buffer) == 1
+    assert len(redis_client.lists[buffer.key]) == 1
+
+
+def test_drain_skips_quotes_still_processing(session_factory):
+    """Testa a drenagem das listas pendentes de cotações interrompidas"""
+    redis_client = FakeRedis(idle=3600)
+    record = {"quote_request_id": 1, "integration_type": "serpapi", "api_used": "google_shopping"}
+    redis_client.rpush(f"{integration_logger.PENDING_KEY_PREFIX}1", json.dumps(record))
+
+    with session_factory() as db:
+        assert drain_pending_integration_logs(db, redis_client=redis_client) == 0
+
+        db.query(QuoteRequest).update({QuoteRequest.status: QuoteStatus.ERROR})
+        db.commit()
+        assert drain_pending_integration_logs(db, redis_client=redis_client) == 1
+
+    assert not redis_client.lists
+    with session_factory() as db:
+        assert db.query(IntegrationLog).count() == 1
+
+
+def test_records_persisted_before_crash_are_not_duplicated(session_factory, monkeypatch):
+    """Testa que um lote regravado após crash entre o commit e a limpeza do Redis é ignorado"""
+    class CrashingRedis(FakeRedis):
+        def delete(self, key):
+            raise ConnectionError("worker interrompido")
+
+    redis_client = CrashingRedis()
+    crashed = IntegrationLogBuffer(1, redis_client=redis_client)
+    crashed.log_ai_call(model="gpt-4o", input_tokens=1000, output_tokens=500, activity="Análise", integration_type="openai")
+    assert crashed.flush() == 1
+    assert len(redis_client.lists[crashed.key]) == 1  # Lista Redis não foi limpa
+
+    monkeypatch.setattr(integration_logger, "_redis_down_until", 0.0)  # Novo worker
+    resumed = IntegrationLogBuffer(1, redis_client=redis_client)
+    resumed.log_serpapi_call(api_used="google_shopping", search_url="", activity="Busca inicial")
+    assert resumed.flush() == 2
+
+    with session_factory() as db:
+        assert db.query(IntegrationLog).count() == 2
+        rollup = {row.integration_type: row for row in db.query(IntegrationCostDaily).all()}
+        assert rollup["openai"].call_count == 1
+        assert rollup["openai"].cost_usd == Decimal("0.0075")
+        assert rollup["serpapi"].shopping_calls == 1
+
+
+def test_buffer_skips_redis_after_failure(session_factory, monkeypatch):
+    """Testa que, após uma falha, o Redis é ignorado até o fim da janela de espera"""
+    class DownRedis(FakeRedis):
+        calls = 0
+
+        def rpush(self, key, value):
+            DownRedis.calls += 1
+            raise ConnectionError("timeout")
+
+    now = [1000.0]
+    monkeypatch.setattr(integration_logger.time, "monotonic", lambda: now[0])
+    buffer = IntegrationLogBuffer(1, redis_client=DownRedis())
+
+    for _ in range(3):
+        buffer.log_serpapi_call(api_used="google_shopping", search_url="", activity="Busca inicial")
+    assert DownRedis.calls == 1
+    assert len(buffer) == 3  # Registros seguem em memória
+
+    now[0] += integration_logger.REDIS_RETRY_SECONDS
+    buffer.log_serpapi_call(api_used="google_shopping", search_url="", activity="Busca de loja")
+    assert DownRedis.calls == 2
+
+    assert buffer.flush() == 4
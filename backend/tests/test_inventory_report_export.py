@@ -0,0 +1,108 @@
+"""
+Testes para a exportação em streaming do relatório de inventário
+"""
+import csv
+from types import SimpleNamespace
+
+import openpyxl
+
+from app.services import inventory_report_export
+from app.services.inventory_report_export import write_excel_report, write_csv_report
+
+STATS = {
+    "total_expected": 2,
+    "total_found": 1,
+    "total_not_found": 0,
+    "total_unregistered": 1,
+    "total_written_off": 0,
+    "completion_percentage": 50.0,
+}
+
+
+def make_session():
+    return SimpleNamespace(
+        id=1, code="LEV001", name=None, status="completed", project=None, ug=None, ul=None,
+        created_at=None, started_at=None, completed_at=None
+    )
+
+
+def patch_rows(monkeypatch):
+    asset_rows = [
+        ["001", "Mesa", "-", "-", "UL1", "Encontrado", "rfid", "01/01/2026 10:00", "BOM"],
+        ["002", "Cadeira", "-", "-", "UL1", "Pendente", "-", "-", "-"],
+    ]
+    monkeypatch.setattr(inventory_report_export, "iter_asset_rows", lambda db, session_id: iter(asset_rows))
+    monkeypatch.setattr(
+        inventory_report_export, "iter_unregistered_rows",
+        lambda db, session_id: iter([["E200FFFF", "rfid", "01/01/2026 10:05"]])
+    )
+
+
+def test_write_excel_report(monkeypatch, tmp_path):
+    """Testa abas, linhas e estilos nomeados do Excel write-only"""
+    patch_rows(monkeypatch)
+    path = tmp_path / "relatorio.xlsx"
+
+    rows = write_excel_report(None, make_session(), STATS, str(path))
+
+    assert rows == 2
+    wb = openpyxl.load_workbook(path)
+    assert wb.sheetnames == ["Resumo", "Bens Detalhados", "Não Cadastrados"]
+    ws = wb["Bens Detalhados"]
+    assert ws["A2"].value == "001"
+    assert ws["F2"].style == "status_found"
+    assert ws["F3"].style == "cell"
+    assert ws["A1"].style == "header"
+    assert wb["Não Cadastrados"]["A2"].value == "E200FFFF"
+
+
+def test_write_csv_report(monkeypatch, tmp_path):
+    """Testa CSV com bens esperados seguidos dos não cadastrados"""
+    patch_rows(monkeypatch)
+    path = tmp_path / "relatorio.csv"
+
+    rows = write_csv_report(None, make_session(), str(path))
+
+    assert rows == 3
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        lines = list(csv.reader(f, delimiter=";"))
+    assert lines[0][0] == "Código do Bem"
+    assert lines[3][0] == "E200FFFF"
+    assert lines[3][5] == "Não Cadastrado"
+
+
+def test_build_inventory_pdf_paginates_details(monkeypatch):
+    """Testa renderização do PDF com tabela detalhada em várias páginas"""
+    from app.services import inventory_report_pdf
+
+    rows = [
+        [f"{i:04d}", "Descrição longa de um bem patrimonial com muitos detalhes", "-", "-", "UL1",
+         "Encontrado", "rfid", "01/01/2026 10:00", "BOM"]
+        for i in range(95)
+    ]
+    monkeypatch.setattr(inventory_report_pdf, "iter_asset_rows", lambda db, session_id: iter(rows))
+
+    pdf = inventory_report_pdf.build_inventory_pdf(None, make_session(), STATS, include_details=True)
+    summary = inventory_report_pdf.build_inventory_pdf(None, make_session(), STATS, include_details=False)
+
+    assert pdf.startswith(b"%PDF")
+    assert pdf.count(b"/Type /Page\n") > summary.count(b"/Type /Page\n") >= 1
+
+
+def test_report_version_stamp_changes_on_asset_edit(pg_session):
+    """Testa que editar um bem esperado já existente invalida o PDF em cache"""
+    from app.models import Client, Project
+    from app.models.inventory_session import InventoryExpectedAsset, InventorySession
+    from app.services.inventory_report_pdf import report_version_stamp
+
+    session = InventorySession(project=Project(client=Client(nome="Prefeitura"), nome="Inventário 2026"), code="INV-1")
+    asset = InventoryExpectedAsset(session=session, asset_code="001", description="Mesa")
+    pg_session.add(asset)
+    pg_session.commit()
+    before = report_version_stamp(pg_session, session, include_details=True)
+
+    asset.description = "Mesa de reunião"
+    pg_session.commit()
+
+    assert report_version_stamp(pg_session, session, include_details=True) != before
+    assert report_version_stamp(pg_session, session, include_details=True).endswith("-full")
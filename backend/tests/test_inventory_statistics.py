@@ -0,0 +1,80 @@
+"""
+Testes para contadores materializados de sessões de inventário
+"""
+from app.models import Client, Project
+from app.models.inventory_session import InventoryReadAsset, InventorySession
+from app.services.inventory_statistics import (
+    build_statistics,
+    compute_session_counts,
+    get_session_counters,
+    reading_counter_keys,
+    reconcile_session_counters,
+    EXPECTED_TOTAL,
+)
+
+
+def test_reading_counter_keys():
+    """Testa chaves de contador afetadas por uma leitura"""
+    keys = reading_counter_keys("found", "barcode", "good")
+    assert keys == [("category", "found"), ("method", "barcode"), ("condition", "good")]
+
+    # Sem situação física não gera contador de condição
+    keys = reading_counter_keys("unregistered", "rfid", None)
+    assert ("condition", None) not in keys
+    assert len(keys) == 2
+
+    # Valores ausentes usam os defaults do modelo
+    assert reading_counter_keys(None, None, None) == [("category", "found"), ("method", "rfid")]
+
+
+def test_build_statistics():
+    """Testa montagem das estatísticas a partir dos contadores"""
+    counters = {
+        ("expected", EXPECTED_TOTAL): 10,
+        ("category", "found"): 6,
+        ("category", "not_found"): 2,
+        ("category", "unregistered"): 3,
+        ("category", "written_off"): 1,
+        ("method", "rfid"): 10,
+        ("method", "barcode"): 2,
+        ("condition", "good"): 4,
+    }
+
+    stats = build_statistics(counters)
+    assert stats["total_expected"] == 10
+    assert stats["total_found"] == 6
+    assert stats["total_unregistered"] == 3
+    assert stats["completion_percentage"] == 90.0
+    assert "by_method" not in stats
+
+    detailed = build_statistics(counters, detailed=True)
+    assert detailed["by_method"] == {"rfid": 10, "barcode": 2}
+    assert detailed["by_condition"] == {"good": 4}
+
+
+def test_build_statistics_empty_session():
+    """Testa sessão sem contadores"""
+    stats = build_statistics({}, detailed=True)
+    assert stats["total_expected"] == 0
+    assert stats["completion_percentage"] == 0.0
+    assert stats["by_method"] == {}
+
+
+def test_recount_matches_live_counters(pg_session):
+    """Testa que leitura sem categoria/método conta igual nos contadores e na recontagem"""
+    client = Client(nome="Prefeitura")
+    project = Project(client=client, nome="Inventário 2026")
+    session = InventorySession(project=project, code="INV-1")
+    pg_session.add_all([
+        session,
+        InventoryReadAsset(session=session, asset_code="001", category=None, read_method=None),
+        InventoryReadAsset(session=session, asset_code="002", category="unregistered", physical_condition="good"),
+    ])
+    pg_session.commit()
+
+    live = get_session_counters(pg_session, [session.id])[session.id]
+
+    assert live == compute_session_counts(pg_session, session.id)
+    assert live[("category", "found")] == 1
+    assert live[("method", "rfid")] == 2
+    assert reconcile_session_counters(pg_session, session.id) == {}
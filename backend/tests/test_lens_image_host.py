@@ -0,0 +1,154 @@
+"""
+Testes para a URL pública das imagens do Google Lens
+"""
+import asyncio
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from PIL import Image as PILImage
+
+from app.core.config import settings
+from app.core.security import encrypt_value
+from app.models.integration_setting import IntegrationSetting
+from app.services import lens_image_host
+from app.services.google_lens_service import GoogleLensService
+from app.services.lens_image_host import (
+    ImageHost,
+    LocalImageHost,
+    get_image_host,
+    imgbb_api_key,
+    public_image_url,
+    purge_lens_images,
+    verify_lens_image_signature,
+)
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    PILImage.new("RGB", (64, 48), (10, 200, 90)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class CountingHost(ImageHost):
+    name = "counting"
+
+    def __init__(self):
+        self.uploads = 0
+
+    async def upload(self, image_data, sha256, extension):
+        self.uploads += 1
+        return f"https://img.example.com/{sha256}{extension}"
+
+
+def test_local_host_signed_url(tmp_path, monkeypatch):
+    """Testa a gravação em lens_temp e a URL assinada aceita pelo endpoint"""
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    lens_image_host._url_cache.clear()
+
+    url = asyncio.run(public_image_url(_png(), LocalImageHost("https://api.example.com/")))
+
+    parsed = urlparse(url)
+    filename = os.path.basename(parsed.path)
+    query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+    assert parsed.path.startswith("/api/quotes/lens/image/") and filename.endswith(".png")
+    assert (tmp_path / "lens_temp" / filename).exists()
+    assert verify_lens_image_signature(filename, int(query["expires"]), query["signature"])
+    assert not verify_lens_image_signature("outra.png", int(query["expires"]), query["signature"])
+    assert not verify_lens_image_signature(filename, int(time.time()) - 1, query["signature"])
+
+
+def test_same_image_reuses_url():
+    """Testa que buscas repetidas com a mesma foto não reenviam a imagem"""
+    lens_image_host._url_cache.clear()
+    host = CountingHost()
+
+    first = asyncio.run(public_image_url(_png(), host))
+    second = asyncio.run(public_image_url(_png(), host))
+
+    assert first == second and host.uploads == 1
+
+
+def test_auto_host_selection(monkeypatch):
+    """Testa o provedor automático: local com BACKEND_PUBLIC_URL, senão imgbb"""
+    monkeypatch.setattr(settings, "LENS_IMAGE_HOST", "auto")
+    monkeypatch.setattr(settings, "BACKEND_PUBLIC_URL", None)
+    assert get_image_host(None) is None
+    assert get_image_host("chave").name == "imgbb"
+
+    monkeypatch.setattr(settings, "BACKEND_PUBLIC_URL", "https://api.example.com")
+    assert get_image_host("chave").name == "local"
+
+
+def test_image_host_requires_upload():
+    """Testa que ImageHost é abstrato: provedores precisam implementar upload"""
+    with pytest.raises(TypeError):
+        ImageHost()
+
+
+def test_imgbb_key_from_integration_or_environment(monkeypatch):
+    """Testa a chave do imgbb: integração IMGBB (criptografada ou não), senão o ambiente"""
+    monkeypatch.setenv("IMGBB_API_KEY", "chave-ambiente")
+
+    assert imgbb_api_key(IntegrationSetting(provider="IMGBB", settings_json={"api_key": encrypt_value("chave-db")})) == "chave-db"
+    assert imgbb_api_key(IntegrationSetting(provider="IMGBB", settings_json={"api_key": "chave-aberta"})) == "chave-aberta"
+    assert imgbb_api_key(IntegrationSetting(provider="IMGBB", settings_json={})) == "chave-ambiente"
+    assert imgbb_api_key(None) == "chave-ambiente"
+
+
+def test_search_by_image_data_uses_integration_key(monkeypatch):
+    """Testa que o serviço usa a chave da integração IMGBB, como o endpoint lens_search"""
+    monkeypatch.setattr(settings, "LENS_IMAGE_HOST", "imgbb")
+    monkeypatch.delenv("IMGBB_API_KEY", raising=False)
+    lens_image_host._url_cache.clear()
+    uploaded_with = []
+
+    async def load_key(db=None):
+        return "chave-db"
+
+    async def upload(image_data, api_key, expiration=600):
+        uploaded_with.append(api_key)
+        return None
+
+    monkeypatch.setattr(lens_image_host, "load_imgbb_api_key", load_key)
+    monkeypatch.setattr("app.services.google_lens_service.upload_image_to_imgbb", upload)
+
+    _, error = asyncio.run(GoogleLensService(api_key="serp").search_by_image_data(_png()))
+
+    assert uploaded_with == ["chave-db"]
+    assert "imgbb" in error
+
+
+class FakeS3Client:
+    """Subconjunto do cliente boto3 usado pela limpeza de lens/"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.deleted = []
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return SimpleNamespace(paginate=lambda Bucket, Prefix: self.pages)
+
+    def delete_objects(self, Bucket, Delete):
+        self.deleted.extend(obj["Key"] for obj in Delete["Objects"])
+
+
+def test_purge_removes_expired_s3_objects(tmp_path, monkeypatch):
+    """Testa que a limpeza também remove do bucket as imagens com URL já expirada"""
+    now = datetime.now(timezone.utc)
+    client = FakeS3Client([
+        {"Contents": [{"Key": "lens/antiga.jpg", "LastModified": now - timedelta(hours=2)}]},
+        {"Contents": [{"Key": "lens/recente.jpg", "LastModified": now}]},
+    ])
+    monkeypatch.setitem(sys.modules, "boto3", SimpleNamespace(client=lambda *args, **kwargs: client))
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "LENS_IMAGE_HOST", "s3")
+
+    assert purge_lens_images() == 1
+    assert client.deleted == ["lens/antiga.jpg"]
@@ -0,0 +1,71 @@
+"""
+Testes para paginação keyset e contagem de listagens
+"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, select, tuple_
+
+from app.core.pagination import (
+    COUNT_ESTIMATED,
+    COUNT_EXACT,
+    COUNT_NONE,
+    count_rows,
+    decode_cursor,
+    encode_cursor,
+)
+
+metadata = MetaData()
+items = Table(
+    "items",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("created_at", DateTime),
+)
+
+
+@pytest.fixture
+def db(table_session):
+    session = table_session(items)
+    session.execute(items.insert(), [
+        {"id": i, "created_at": datetime(2025, 1, 1 + i // 2)} for i in range(1, 11)
+    ])
+    session.commit()
+    return session
+
+
+def test_cursor_roundtrip():
+    """Testa codificação e decodificação do cursor"""
+    cursor = encode_cursor(datetime(2025, 3, 4, 5, 6, 7), 123)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (datetime(2025, 3, 4, 5, 6, 7), 123)
+
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-um-cursor")
+
+
+def test_keyset_pages_cover_all_rows(db):
+    """Páginas keyset em (created_at, id) não repetem nem pulam linhas com created_at empatado"""
+    seen = []
+    cursor = None
+    while True:
+        stmt = select(items).order_by(items.c.created_at.desc(), items.c.id.desc()).limit(3)
+        if cursor:
+            created_at, row_id = decode_cursor(cursor)
+            stmt = stmt.where(tuple_(items.c.created_at, items.c.id) < (created_at, row_id))
+        rows = db.execute(stmt).all()
+        seen.extend(row.id for row in rows)
+        if len(rows) < 3:
+            break
+        cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    assert seen == list(range(10, 0, -1))
+
+
+def test_count_rows_modes(db):
+    """Testa modos de contagem (estimativa cai para exata fora do PostgreSQL)"""
+    stmt = select(items.c.id).where(items.c.id > 4)
+
+    assert count_rows(db, stmt, COUNT_EXACT) == (6, False)
+    assert count_rows(db, stmt, COUNT_ESTIMATED) == (6, False)
+    assert count_rows(db, stmt, COUNT_NONE) == (None, False)
@@ -1,5 +1,7 @@
 import pytest
+from reportlab import rl_config
 from app.services.pdf_generator import PDFGenerator
+from app.services.pdf_templates import RenderProfile, quote_styles
 from datetime import datetime
 from decimal import Decimal
 import os
@@ -57,3 +59,31 @@ class TestPDFGenerator:
         assert isinstance(formatted, str)
         assert '8' in formatted
         assert '2025' in formatted
+
+    def test_profile_reports_sections_and_pages(self, tmp_path):
+        """Testa o perfil por seção/página e o reaproveitamento dos estilos entre gerações"""
+        sources = [
+            {'url': f'https://example.com/product{i}', 'price_value': Decimal('599.90'), 'screenshot_path': None}
+            for i in range(3)
+        ]
+        profile = RenderProfile()
+
+        self.generator.generate_quote_pdf(
+            output_path=str(tmp_path / 'quote.pdf'),
+            item_name='Tacômetro Foto Digital',
+            codigo='100002346',
+            sources=sources,
+            valor_medio=Decimal('599.90'),
+            local='Online',
+            pesquisador='Sistema',
+            data_pesquisa=datetime.now(),
+            profile=profile
+        )
+
+        assert list(profile.sections) == ['estilos', 'resumo', 'cotacoes', 'build']
+        assert len(profile.pages_ms) == 4  # Resumo + uma página por cotação
+        assert quote_styles() is quote_styles()
+
+        # Streams binários só durante o build: a configuração global do ReportLab é restaurada
+        assert b'/ASCII85Decode' not in (tmp_path / 'quote.pdf').read_bytes()
+        assert rl_config.useA85 == 1
@@ -0,0 +1,74 @@
+"""
+Testes para a instrumentação de queries
+"""
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core import query_profiler
+from app.core.query_profiler import (
+    RequestQueryStats,
+    SlowQueryBuffer,
+    instrument_engine,
+    normalize_statement,
+    start_request,
+)
+
+
+def test_request_stats_and_slow_buffer(monkeypatch):
+    """Testa contagem por requisição e registro de statements lentos"""
+    buffer = SlowQueryBuffer(maxlen=10)
+    monkeypatch.setattr(query_profiler, "slow_queries", buffer)
+    monkeypatch.setattr(query_profiler.settings, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(query_profiler.settings, "N_PLUS_ONE_THRESHOLD", 3)
+
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # Registro idempotente
+
+    stats = start_request("GET", "/api/test")
+    with engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT   1"))
+        conn.execute(text("SELECT 2"))
+
+    log = stats.as_log()
+    assert log["query_count"] == 4
+    assert log["db_time_ms"] >= 0
+    assert log["repeated_statement"] == {"statement": "SELECT 1", "count": 3}
+
+    offenders = buffer.top_offenders(5)
+    assert {o["statement"] for o in offenders} == {"SELECT 1", "SELECT 2"}
+    select_one = next(o for o in offenders if o["statement"] == "SELECT 1")
+    assert select_one["count"] == 3
+    assert select_one["paths"] == ["GET /api/test"]
+    assert len(buffer.recent(2)) == 2
+
+
+def test_failed_statement_does_not_leak_start_time(monkeypatch):
+    """Testa que um statement com erro não deixa início órfão na conexão"""
+    monkeypatch.setattr(query_profiler, "slow_queries", SlowQueryBuffer(maxlen=10))
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    stats = start_request("GET", "/api/erro")
+    with engine.connect() as conn:
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("SELECT * FROM tabela_inexistente"))
+        assert conn.info["query_start_time"] == []
+
+        conn.execute(text("SELECT 1"))
+        assert conn.info["query_start_time"] == []
+
+    assert stats.as_log()["query_count"] == 1
+
+
+def test_request_stats_without_repetition():
+    """Sem repetições acima do limite não há alerta de N+1"""
+    stats = RequestQueryStats("GET", "/")
+    stats.record("SELECT 1", 1.5)
+    assert stats.as_log() == {"query_count": 1, "db_time_ms": 1.5}
+
+
+def test_normalize_statement():
+    assert normalize_statement("SELECT *\n   FROM t\n WHERE id = ?") == "SELECT * FROM t WHERE id = ?"
+    assert len(normalize_statement("SELECT " + "x" * 5000)) == query_profiler.STATEMENT_MAX_LENGTH
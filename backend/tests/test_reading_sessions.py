@@ -0,0 +1,43 @@
+"""
+Testes para o envio de leituras pelo app (deduplicação e contador da sessão)
+"""
+import pytest
+from sqlalchemy import func
+
+from app.api.reading_sessions import BulkReadingsCreate, SessionReadingCreate, add_readings_from_app
+from app.models import ReadingSession, ReadingType, SessionReading, SessionStatus, User
+
+
+@pytest.fixture
+def db(pg_session):
+    pg_session.add(User(id=1, email="leitor@example.com", nome="Leitor", hashed_password="x"))
+    pg_session.add(ReadingSession(id=1, reading_type=ReadingType.RFID, status=SessionStatus.ACTIVE, user_id=1))
+    pg_session.commit()
+    return pg_session
+
+
+def _payload(*codes):
+    return BulkReadingsCreate(readings=[SessionReadingCreate(code=code, rssi="-60") for code in codes])
+
+
+def test_duplicate_readings_keep_count_consistent(db):
+    """Testa que releituras (no payload e entre envios) não duplicam linhas nem o contador"""
+    first = add_readings_from_app(1, _payload("E200A", "E200B", "E200A", "E200B"), db=db)
+    second = add_readings_from_app(1, _payload("E200A", "E200B", "E200C", "E200C"), db=db)
+
+    assert (first["added_count"], first["total_count"]) == (2, 2)
+    assert (second["added_count"], second["total_count"]) == (1, 3)
+
+    rows = db.query(func.count(SessionReading.id)).filter(SessionReading.session_id == 1).scalar()
+    db.expire_all()
+    assert rows == 3 == db.get(ReadingSession, 1).readings_count
+
+
+def test_resending_same_batch_adds_nothing(db):
+    """Testa o reenvio idêntico (retentativa do app) sem alterar a sessão"""
+    add_readings_from_app(1, _payload("E200A", "E200B"), db=db)
+
+    again = add_readings_from_app(1, _payload("E200A", "E200B"), db=db)
+
+    assert (again["added_count"], again["total_count"]) == (0, 2)
+    assert db.query(func.count(SessionReading.id)).scalar() == 2
@@ -0,0 +1,83 @@
+"""
+Testes para o pipeline de compressão de screenshots e a variante para PDF
+"""
+import asyncio
+import io
+import os
+import random
+
+import pytest
+from PIL import Image as PILImage, ImageDraw
+from reportlab.platypus import SimpleDocTemplate
+
+from app.core.config import settings
+from app.models import File, VehiclePriceBank
+from app.services.evidence_store import collect_unreferenced_blobs, register_screenshot
+from app.services.screenshot_pipeline import (
+    pdf_image_reader,
+    pdf_screenshot,
+    pdf_variant_path,
+    store_screenshot,
+)
+
+
+def _png(width: int = 1366, height: int = 1200) -> bytes:
+    """Página sintética: blocos coloridos e linhas de texto"""
+    rng = random.Random(1)
+    image = PILImage.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    for _ in range(400):
+        x, y = rng.randrange(width), rng.randrange(height)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.rectangle([x, y, x + rng.randrange(200), y + rng.randrange(100)], fill=color)
+    for y in range(0, height, 14):
+        draw.text((10, y), "Produto R$ 1.234,56 " * 8, fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def db(table_session, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_PATH", str(tmp_path))
+    return table_session(File, VehiclePriceBank)
+
+
+def test_capture_is_compressed_with_pdf_variant(db):
+    """Testa recompressão em WebP, variante reduzida ao quadro A4 e economia registrada"""
+    png = _png()
+    stored = asyncio.run(store_screenshot(png))
+
+    assert stored.path.endswith(".webp") and os.path.exists(stored.path)
+    assert stored.original_size_bytes == len(png)
+    assert stored.bytes_saved > 0
+
+    with PILImage.open(pdf_variant_path(stored.path)) as variant:
+        assert variant.format == "JPEG"
+        assert variant.size == (1009, 886)  # Cabe no quadro de 180x150mm a 150 dpi
+
+    screenshot_file = register_screenshot(
+        db, stored.path, sha256=stored.sha256, original_size_bytes=stored.original_size_bytes
+    )
+    assert screenshot_file.mime_type == "image/webp"
+    assert screenshot_file.size_bytes == stored.size_bytes
+    db.commit()
+
+    # A variante acompanha o blob referenciado na coleta
+    os.utime(stored.path, (0, 0))
+    os.utime(pdf_variant_path(stored.path), (0, 0))
+    assert collect_unreferenced_blobs(db, grace_hours=0)["removed"] == 0
+
+
+def test_pdf_reuses_cached_reader(db, tmp_path):
+    """Testa que o PDF usa a variante e reaproveita o ImageReader entre gerações"""
+    stored = asyncio.run(store_screenshot(_png(800, 600)))
+
+    reader = pdf_image_reader(stored.path)
+    assert reader.fileName == pdf_variant_path(stored.path)
+    assert pdf_image_reader(stored.path) is reader
+
+    for attempt in range(2):
+        image = pdf_screenshot(stored.path, width=171, height=150, kind="proportional")
+        assert image._img is reader
+        SimpleDocTemplate(str(tmp_path / f"quote_{attempt}.pdf")).build([image])
@@ -0,0 +1,125 @@
+"""
+Testes para o índice de nomes de veículos (matching de marca/modelo FIPE)
+"""
+import asyncio
+
+import pytest
+
+from app.services.fipe_client import FipeBrand, FipeClient, FipeModel
+from app.services.vehicle_name_index import VehicleNameIndex, normalize_brand, normalize_vehicle_name
+
+BRANDS = ["Fiat", "GM - Chevrolet", "Mercedes-Benz", "VW - VolksWagen", "Citroën"]
+
+MODELS = [
+    "Toro Endurance 1.8 16V Flex Aut.",
+    "Toro Freedom 1.8 16V Flex Aut.",
+    "Toro Freedom 2.0 16V 4x4 TB Diesel Aut.",
+    "Argo Drive 1.0 6V Flex",
+    "Uno",
+]
+
+
+def test_normalization_and_aliases():
+    """Testa normalização de acentos/pontuação e apelidos de marca"""
+    assert normalize_vehicle_name("  Citroën  C4,  Cactus ") == "citroen c4 cactus"
+    assert normalize_vehicle_name("Toro 1.8 16V Flex Aut.") == "toro 1.8 16v flex aut."
+    assert normalize_brand("VW") == "volkswagen"
+    assert normalize_brand(" Mercedes ") == "mercedes-benz"
+
+
+def test_index_lookups_return_first_position():
+    """Testa match direto nos dois sentidos, keywords e contagem de palavras"""
+    index = VehicleNameIndex(MODELS)
+
+    assert index.first_direct_match(["freedom"]) == 1
+    assert index.first_direct_match(["Fiat Uno Mille"]) == 4  # nome contido no termo
+    assert index.first_direct_match(["corolla"]) is None
+
+    assert index.first_with_all(["toro", "diesel"]) == 2
+    assert index.first_with_all(["toro", "argo"]) is None
+
+    counts = index.word_matches(["toro", "freedom", "1.8"])
+    assert counts[1] == 3 and counts[0] == 2 and counts[2] == 2
+    assert 3 not in counts
+
+    position, score = index.best_similar(["argo drive"], threshold=0.5)
+    assert position == 3 and score > 0.5
+    assert index.best_similar(["xyz"], threshold=0.5) == (None, 0.0)
+
+
+def test_client_resolves_brand_and_model():
+    """Testa FipeClient.find_brand e _find_model_in_list sobre o índice"""
+    client = FipeClient()
+    brands = [FipeBrand(code=str(i), name=name) for i, name in enumerate(BRANDS)]
+    models = [FipeModel(code=str(i), name=name) for i, name in enumerate(MODELS)]
+
+    async def get_brands(vehicle_type):
+        return brands
+    client.get_brands = get_brands
+
+    async def run():
+        return (
+            await client.find_brand("cars", "VW"),
+            await client.find_brand("cars", "Citroen"),
+            await client.find_brand("cars", "Fait"),
+            await client._find_model_in_list(models, "Toro Freedom 1.8"),
+            await client._find_model_in_list(models, "Toro", keywords=["endurance"]),
+            await client._find_model_in_list(models, "Argo Drve"),
+        )
+
+    vw, citroen, typo, freedom, endurance, argo = asyncio.run(run())
+    assert vw.name == "VW - VolksWagen"
+    assert citroen.name == "Citroën"
+    assert typo.name == "Fiat"
+    assert freedom.name == "Toro Freedom 1.8 16V Flex Aut."
+    assert endurance.name == "Toro Endurance 1.8 16V Flex Aut."
+    assert argo.name == "Argo Drive 1.0 6V Flex"
+
+
+# Listas como as do search_path (modelos de uma marca/ano), com os desempates
+# da busca linear anterior: o primeiro da lista que satisfaz um critério de
+# retorno imediato vence, mesmo que um modelo posterior tenha mais palavras
+ORDER_CASES = [
+    # Match direto por variação antes de qualquer modelo com palavras em comum
+    (["Uno Mille 1.0 Fire", "Toro Freedom 1.8 16V Flex Aut."], "Freedom Toro", ["uno"], None, "Uno Mille 1.0 Fire"),
+    # Modelo com palavras em comum antes do match direto: palavras vencem
+    (["Toro Freedom 1.8 16V Flex Aut.", "Uno Mille 1.0 Fire"], "Freedom Toro", ["uno"], None, "Toro Freedom 1.8 16V Flex Aut."),
+    # Keywords em modelo posterior ao match direto: o match direto vence
+    (["Uno Mille 1.0 Fire", "Toro Endurance 1.8 16V Flex Aut."], "Strada", ["uno"], ["endurance"], "Uno Mille 1.0 Fire"),
+    # Keywords em modelo posterior a um com palavras em comum: keywords vencem
+    (["Uno Mille 1.0 Fire", "Toro Endurance 1.8 16V Flex Aut."], "Mille", [], ["endurance"], "Toro Endurance 1.8 16V Flex Aut."),
+    # Empate em palavras: o primeiro só é trocado se a similaridade superar a fração de palavras
+    (["Toro Volcano 2.0 16V Diesel 4x4 Aut.", "Toro Diesel 2.0 Turbo 4x4"], "Toro Diesel Ranch", [], None,
+     "Toro Volcano 2.0 16V Diesel 4x4 Aut."),
+    (["Toro Volcano 2.0 Diesel 4x4", "Toro Ranch"], "Toro Ranch", [], None, "Toro Ranch"),
+]
+
+
+@pytest.mark.parametrize("names,term,variations,keywords,expected", ORDER_CASES)
+def test_find_model_in_list_keeps_linear_order(names, term, variations, keywords, expected):
+    """Testa que _find_model_in_list mantém os desempates da busca linear"""
+    models = [FipeModel(code=str(i), name=name) for i, name in enumerate(names)]
+
+    found = asyncio.run(FipeClient()._find_model_in_list(models, term, variations, keywords))
+
+    assert found.name == expected
+
+
+def test_find_model_returns_first_keyword_or_direct_match():
+    """Testa que find_model devolve o primeiro modelo com keywords ou match direto"""
+    client = FipeClient()
+    models = [FipeModel(code=str(i), name=name) for i, name in enumerate(MODELS)]
+
+    async def get_models(vehicle_type, brand_id):
+        return models
+    client.get_models = get_models
+
+    async def run():
+        return (
+            await client.find_model("cars", "1", "Freedom", keywords=["diesel"]),
+            await client.find_model("cars", "1", "Argo", keywords=["toro", "endurance"]),
+        )
+
+    freedom, endurance = asyncio.run(run())
+    assert freedom.name == "Toro Freedom 1.8 16V Flex Aut."  # Antes do modelo com "diesel"
+    assert endurance.name == "Toro Endurance 1.8 16V Flex Aut."  # Keywords antes do "Argo"
@@ -0,0 +1,160 @@
+"""
+Testes para a atualização em lote do Banco de Preços de Veículos
+"""
+import asyncio
+from datetime import date
+from decimal import Decimal
+
+import httpx
+import pytest
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import VehiclePriceBank
+from app.services.vehicle_price_refresh import parse_reference_month, refresh_vehicle_prices
+
+
+def _price(model_id: int, value: str) -> dict:
+    return {
+        "price": value, "brand": "Fiat", "model": f"Modelo {model_id}", "modelYear": 2020,
+        "fuel": "Flex", "codeFipe": f"00{model_id}-1", "referenceMonth": "fevereiro de 2026 ",
+        "vehicleType": 1, "fuelAcronym": "F",
+    }
+
+
+class FakeFipeApi:
+    """API FIPE em memória; o modelo 3 responde 429 uma vez e o 4 não existe"""
+
+    def __init__(self):
+        self.calls = []
+        self.rate_limited = False
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        self.calls.append(path)
+        if path == "/api/v2/references":
+            return httpx.Response(200, json=[{"code": "321", "month": "fevereiro de 2026 "}])
+        model_id = int(path.split("/models/")[1].split("/")[0])
+        if model_id == 3 and not self.rate_limited:
+            self.rate_limited = True
+            return httpx.Response(429)
+        if model_id == 4:
+            return httpx.Response(404)
+        return httpx.Response(200, json=_price(model_id, f"R$ {model_id}1.000,00"))
+
+
+@pytest.fixture
+def db(table_session):
+    session = table_session(VehiclePriceBank)
+    for model_id, reference_month, vehicle_type in [
+        (1, "janeiro de 2026", "cars"),
+        (2, "fevereiro de 2026", "cars"),  # já na referência vigente
+        (3, "janeiro de 2026", "1"),  # tipo legado
+        (4, "janeiro de 2026", "cars"),
+    ]:
+        session.add(VehiclePriceBank(
+            codigo_fipe=f"00{model_id}-1", brand_id=21, brand_name="Fiat", model_id=model_id,
+            model_name=f"Modelo {model_id}", year_id="2020-5", year_model=2020, fuel_type="Flex",
+            fuel_code=5, vehicle_type=vehicle_type, vehicle_name=f"Fiat Modelo {model_id} 2020",
+            price_value=Decimal("1000"), reference_month=reference_month,
+            reference_date=parse_reference_month(reference_month)
+        ))
+    session.commit()
+    return session
+
+
+def test_refresh_skips_current_and_commits_in_chunks(db, monkeypatch):
+    """Testa que só veículos fora da referência vigente são consultados, com progresso por bloco"""
+    monkeypatch.setattr(settings, "FIPE_REFRESH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "FIPE_REFRESH_RATE_PER_SECOND", 0)
+    monkeypatch.setattr("app.services.vehicle_price_refresh.asyncio.sleep", _no_sleep)
+    api = FakeFipeApi()
+    snapshots = []
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(api.handler)) as client:
+            return await refresh_vehicle_prices(
+                db, http_client=client, progress=lambda stats: snapshots.append(dict(stats))
+            )
+
+    stats = asyncio.run(run())
+
+    assert stats["total"] == 4 and stats["skipped"] == 1 and stats["pending"] == 3
+    assert stats["success_count"] == 2 and stats["error_count"] == 1
+    assert [s["processed"] for s in snapshots] == [0, 2, 3]
+    assert not any("/models/2/" in call for call in api.calls)
+    assert "/api/v2/cars/brands/21/models/3/years/2020-5" in api.calls
+
+    refreshed = db.query(VehiclePriceBank).filter(VehiclePriceBank.model_id == 3).one()
+    assert refreshed.price_value == Decimal("31000.00")
+    assert refreshed.reference_month == "fevereiro de 2026"
+    assert refreshed.reference_date == date(2026, 2, 1)
+
+    # Segunda execução: só o veículo com erro continua pendente
+    api.calls.clear()
+    stats = asyncio.run(run())
+    assert stats["pending"] == 1 and stats["skipped"] == 3
+
+
+async def _no_sleep(_seconds):
+    return None
+
+
+def test_failed_screenshots_do_not_block_the_queue(db, monkeypatch):
+    """Testa que veículos cuja captura falha vão para o fim da fila de screenshots pendentes"""
+    from app.tasks import scheduled_tasks
+
+    requested = []
+
+    async def fake_capture(solicitacoes, ao_capturar=None):
+        requested.append([s.codigo_fipe for s in solicitacoes])
+        return [None] * len(solicitacoes)  # Portal FIPE falha para todos
+
+    monkeypatch.setattr(scheduled_tasks, "SessionLocal", lambda: Session(db.get_bind()))
+    monkeypatch.setattr("app.services.fipe_screenshot.capture_fipe_screenshots", fake_capture)
+
+    assert scheduled_tasks.capture_missing_fipe_screenshots(limit=2)["captured"] == 0
+    assert scheduled_tasks.capture_missing_fipe_screenshots(limit=2)["captured"] == 0
+    scheduled_tasks.capture_missing_fipe_screenshots(limit=2)
+
+    assert requested == [["001-1", "002-1"], ["003-1", "004-1"], ["001-1", "002-1"]]
+
+
+def test_screenshots_are_committed_as_they_are_captured(db, monkeypatch, tmp_path):
+    """Testa que a tentativa é gravada antes do navegador e cada captura em seguida, sem transação aberta"""
+    from app.tasks import scheduled_tasks
+
+    sessions = []
+    in_transaction = []
+
+    def session_factory():
+        sessions.append(Session(db.get_bind()))
+        return sessions[-1]
+
+    async def fake_capture(solicitacoes, ao_capturar=None):
+        in_transaction.append(sessions[0].in_transaction())
+        for index, solicitacao in enumerate(solicitacoes):
+            if solicitacao.codigo_fipe != "002-1":
+                ao_capturar(index, str(tmp_path / f"{solicitacao.codigo_fipe}.png"))
+                in_transaction.append(sessions[0].in_transaction())
+        return []
+
+    attached = []
+
+    def fake_attach(session, vehicle, path):
+        vehicle.has_screenshot = True
+        attached.append(vehicle.codigo_fipe)
+
+    monkeypatch.setattr(scheduled_tasks, "SessionLocal", session_factory)
+    monkeypatch.setattr("app.services.fipe_screenshot.capture_fipe_screenshots", fake_capture)
+    monkeypatch.setattr("app.services.vehicle_price_refresh.attach_screenshot", fake_attach)
+
+    result = scheduled_tasks.capture_missing_fipe_screenshots(limit=3)
+
+    assert result == {"success": True, "total": 3, "captured": 2}
+    assert in_transaction == [False, False, False]
+    assert attached == ["001-1", "003-1"]
+    db.expire_all()
+    pending = db.query(VehiclePriceBank).filter(VehiclePriceBank.has_screenshot.isnot(True)).all()
+    assert [vehicle.codigo_fipe for vehicle in pending] == ["002-1", "004-1"]
+    assert pending[0].screenshot_attempted_at is not None and pending[1].screenshot_attempted_at is None
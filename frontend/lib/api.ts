@@ -275,6 +275,8 @@ export const quotesApi = {
       project_id?: number
       date_from?: string
       date_to?: string
+      cursor?: string  // next_cursor da página anterior (paginação keyset)
+      count?: 'exact' | 'estimated' | 'none'
     }
   ) => {
     const response = await api.get('/api/quotes', {
@@ -749,12 +751,23 @@ export interface RefreshPriceResponse {
 }
 
 export interface BulkRefreshResponse {
+  reference_month?: string
   total: number
+  pending: number
+  skipped: number
+  processed: number
   success_count: number
   error_count: number
   errors: string[]
 }
 
+export interface BulkRefreshJobResponse {
+  job_id: string
+  status: string
+  progress?: BulkRefreshResponse
+  error?: string
+}
+
 export const vehiclePricesApi = {
   list: async (params: {
     page?: number
@@ -796,11 +809,17 @@ export const vehiclePricesApi = {
   refreshAll: async (params?: {
     vehicle_type?: string
     brand_name?: string
-  }): Promise<BulkRefreshResponse> => {
+    force?: boolean
+  }): Promise<BulkRefreshJobResponse> => {
     const response = await api.post('/api/vehicle-prices/refresh-all', null, { params })
     return response.data
   },
 
+  getRefreshAllJob: async (jobId: string): Promise<BulkRefreshJobResponse> => {
+    const response = await api.get(`/api/vehicle-prices/refresh-all/jobs/${jobId}`)
+    return response.data
+  },
+
   getBrands: async (): Promise<string[]> => {
     const response = await api.get('/api/vehicle-prices/filters/brands')
     return response.data
@@ -1180,7 +1199,9 @@ export const inventorySessionsApi = {
 
   syncExpectedAssets: async (sessionId: number, options?: {
     limit?: number
+    page_size?: number
     clear_existing?: boolean
+    resume?: boolean
   }): Promise<{
     success: boolean
     message: string
@@ -1192,6 +1213,7 @@ export const inventorySessionsApi = {
       updated: number
       failed: number
       total_expected: number
+      resumed_from?: number | null
     }
     errors?: string[]
   }> => {